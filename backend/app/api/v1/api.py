@@ -1,21 +1,28 @@
 """
 Router principal de la API v1
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 from app.api.v1.endpoints import (auth, fincas, animales, sync, 
                                      control_sanitario, control_reproductivo,
-                                     produccion, transacciones, dashboard, imagenes)
+                                     produccion, transacciones, dashboard, imagenes,
+                                     pesajes, reportes)
+from app.core.limites import limitar
 
 api_router = APIRouter()
 
+# Límites de uso: las rutas pesadas tienen su propio presupuesto, más chico
+limite_general = [Depends(limitar("general"))]
+
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
-api_router.include_router(fincas.router, prefix="/fincas", tags=["fincas"])
-api_router.include_router(animales.router, prefix="/animales", tags=["animales"])
-api_router.include_router(control_sanitario.router, prefix="/control-sanitario", tags=["control-sanitario"])
-api_router.include_router(control_reproductivo.router, prefix="/control-reproductivo", tags=["control-reproductivo"])
-api_router.include_router(produccion.router, prefix="/produccion", tags=["produccion"])
-api_router.include_router(transacciones.router, prefix="/transacciones", tags=["transacciones"])
-api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
-api_router.include_router(imagenes.router, prefix="/imagenes", tags=["imagenes"])
-api_router.include_router(sync.router, prefix="/sync", tags=["synchronization"])
+api_router.include_router(fincas.router, prefix="/fincas", tags=["fincas"], dependencies=limite_general)
+api_router.include_router(animales.router, prefix="/animales", tags=["animales"], dependencies=limite_general)
+api_router.include_router(control_sanitario.router, prefix="/control-sanitario", tags=["control-sanitario"], dependencies=limite_general)
+api_router.include_router(control_reproductivo.router, prefix="/control-reproductivo", tags=["control-reproductivo"], dependencies=limite_general)
+api_router.include_router(pesajes.router, prefix="/pesajes", tags=["pesajes"], dependencies=limite_general)
+api_router.include_router(produccion.router, prefix="/produccion", tags=["produccion"], dependencies=limite_general)
+api_router.include_router(transacciones.router, prefix="/transacciones", tags=["transacciones"], dependencies=limite_general)
+api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"], dependencies=[Depends(limitar("dashboard"))])
+api_router.include_router(reportes.router, prefix="/reportes", tags=["reportes"], dependencies=[Depends(limitar("reportes"))])
+api_router.include_router(imagenes.router, prefix="/imagenes", tags=["imagenes"], dependencies=limite_general)
+api_router.include_router(sync.router, prefix="/sync", tags=["synchronization"], dependencies=[Depends(limitar("sync"))])
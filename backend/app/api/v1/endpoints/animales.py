@@ -1,14 +1,17 @@
 """
 Endpoints CRUD para Animales
 """
+from datetime import date
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
 from app.core.deps import get_db, get_current_user
 from app.core.config import settings
+from app.core.proyeccion import DESCRIPCION_FIELDS, Proyeccion
 from app.models.usuario import Usuario
 from app.models.animal import Animal
+from app.services.pesajes import registrar_pesajes
 from app.schemas.animal import (
     AnimalCreate,
     AnimalUpdate,
@@ -18,6 +21,16 @@ from app.schemas.animal import (
 
 router = APIRouter()
 
+# fields= del listado; resumen es lo que muestran las tablas y la app móvil
+PROYECCION_ANIMALES = Proyeccion(
+    Animal,
+    AnimalResponse,
+    presets={
+        "resumen": ["numero_identificacion", "nombre", "sexo", "categoria", "estado", "peso_actual", "foto_urls"],
+    },
+    dependencias={"foto_urls": ["foto_url"]}
+)
+
 
 @router.get("", response_model=AnimalListResponse)
 def list_animales(
@@ -28,12 +41,15 @@ def list_animales(
     estado: Optional[str] = Query(None, description="Filtrar por estado"),
     sexo: Optional[str] = Query(None, description="Filtrar por sexo"),
     categoria: Optional[str] = Query(None, description="Filtrar por categoría"),
-    search: Optional[str] = Query(None, description="Buscar por identificación o nombre")
+    search: Optional[str] = Query(None, description="Buscar por identificación o nombre"),
+    fields: Optional[str] = Query(None, description=DESCRIPCION_FIELDS)
 ):
     """
     Listar animales de la finca del usuario actual.
-    Soporta paginación y filtros.
+    Soporta paginación, filtros y proyección de campos (fields=resumen).
     """
+    campos = PROYECCION_ANIMALES.campos(fields)
+    
     # Query base filtrado por finca del usuario
     query = db.query(Animal).filter(Animal.finca_id == current_user.finca_id)
     
@@ -56,9 +72,13 @@ def list_animales(
     
     # Aplicar paginación
     offset = (page - 1) * page_size
-    animales = query.order_by(Animal.created_at.desc()).offset(offset).limit(page_size).all()
+    animales = PROYECCION_ANIMALES.filas(
+        query.order_by(Animal.created_at.desc()).offset(offset).limit(page_size), campos
+    )
     
-    return AnimalListResponse(
+    return PROYECCION_ANIMALES.respuesta(
+        AnimalListResponse,
+        campos,
         total=total,
         page=page,
         page_size=page_size,
@@ -113,10 +133,7 @@ def create_animal(
     # Crear animal
     animal_dict = animal_data.model_dump()
     
-    # Si tiene peso_actual al crear, establecer fecha de pesaje
-    if animal_dict.get("peso_actual") is not None:
-        from datetime import date
-        animal_dict["ultima_fecha_pesaje"] = date.today()
+    peso_inicial = animal_dict.pop("peso_actual", None)
     
     new_animal = Animal(
         **animal_dict,
@@ -125,6 +142,20 @@ def create_animal(
     )
     
     db.add(new_animal)
+    
+    # Si tiene peso al crear, queda como primer pesaje del historial
+    if peso_inicial is not None:
+        db.flush()
+        registrar_pesajes(
+            db,
+            finca_id=current_user.finca_id,
+            fecha=date.today(),
+            pesos={new_animal.id: peso_inicial},
+            animales={new_animal.id: new_animal},
+            registrado_por=current_user.id,
+            marcar_sync=False
+        )
+    
     db.commit()
     db.refresh(new_animal)
     
@@ -191,17 +222,35 @@ def update_animal(
                 detail=f"Ya existe otro animal con identificación {update_data['numero_identificacion']}"
             )
     
-    # Si se actualiza el peso_actual, guardar el peso anterior y actualizar fecha
-    if "peso_actual" in update_data and update_data["peso_actual"] is not None:
-        from datetime import date
-        # Guardar el peso actual como peso_anterior
-        if animal.peso_actual is not None:
-            update_data["peso_anterior"] = animal.peso_actual
-        update_data["ultima_fecha_pesaje"] = date.today()
+    # El peso solo se quita eliminando sus pesajes (DELETE /pesajes/{id})
+    if "peso_actual" in update_data and update_data["peso_actual"] is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="peso_actual no puede ser nulo; para corregir un peso elimine el pesaje"
+        )
+    
+    # Un nuevo peso se registra en el historial de pesajes, que además
+    # actualiza peso_actual, peso_anterior y ultima_fecha_pesaje; la fecha
+    # enviada junto al peso es la del pesaje (sin peso se guarda tal cual)
+    nuevo_peso = update_data.pop("peso_actual", None)
+    fecha_pesaje = date.today()
+    if nuevo_peso is not None:
+        fecha_pesaje = update_data.pop("ultima_fecha_pesaje", None) or fecha_pesaje
     
     for field, value in update_data.items():
         setattr(animal, field, value)
     
+    if nuevo_peso is not None:
+        registrar_pesajes(
+            db,
+            finca_id=current_user.finca_id,
+            fecha=fecha_pesaje,
+            pesos={animal.id: nuevo_peso},
+            animales={animal.id: animal},
+            registrado_por=current_user.id,
+            marcar_sync=False
+        )
+    
     # Incrementar versión de sync
     animal.sync_version += 1
     animal.sync_status = "pending"
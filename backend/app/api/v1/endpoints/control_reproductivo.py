@@ -5,23 +5,40 @@ from typing import Any
 from datetime import date, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import or_, func
 
 from app.db.database import get_db
 from app.core.deps import get_current_user
+from app.core.proyeccion import DESCRIPCION_FIELDS, Proyeccion
+from app.core.respuestas import columnas_orm
 from app.models.usuario import Usuario
 from app.models.control_reproductivo import ControlReproductivo
 from app.models.animal import Animal
+from app.models.estado_reproductivo import EstadoReproductivoActual
+from app.services import rollups_finanzas
+from app.services.estado_reproductivo import actualizar_estado, resumen_estados, proximos_partos
+from app.services.kpis_reproductivos import kpis_reproductivos
 from app.schemas.control_reproductivo import (
     ControlReproductivoCreate,
     ControlReproductivoUpdate,
     ControlReproductivoResponse,
     ControlReproductivoListResponse,
-    EstadisticasReproductivas
+    EstadisticasReproductivas,
+    EstadoReproductivoResponse,
+    EstadoReproductivoListResponse,
+    KpisReproductivos
 )
 
 router = APIRouter()
 
+# fields= del listado (ver app/core/proyeccion.py)
+PROYECCION_REPRODUCTIVO = Proyeccion(
+    ControlReproductivo,
+    ControlReproductivoResponse,
+    presets={"resumen": ["fecha_evento", "tipo_evento", "animal_numero", "animal_nombre", "diagnostico", "fecha_probable_parto"]},
+    dependencias={"animal_numero": ["animal_id"], "animal_nombre": ["animal_id"], "toro_numero": ["toro_id"], "toro_nombre": ["toro_id"]}
+)
+
 
 @router.post("/", response_model=ControlReproductivoResponse, status_code=status.HTTP_201_CREATED)
 def crear_registro_reproductivo(
@@ -80,12 +97,15 @@ def crear_registro_reproductivo(
     )
     
     db.add(db_registro)
+    db.flush()
+    actualizar_estado(db, animal.id)
+    rollups_finanzas.marcar_libro(db, current_user.finca_id)
     db.commit()
     db.refresh(db_registro)
     
     # Preparar respuesta
     response = ControlReproductivoResponse(
-        **db_registro.__dict__,
+        **columnas_orm(db_registro),
         animal_numero=animal.numero_identificacion,
         animal_nombre=animal.nombre,
         toro_numero=toro.numero_identificacion if toro else None,
@@ -106,11 +126,14 @@ def listar_registros_reproductivos(
     fecha_hasta: str | None = Query(None),
     diagnostico: str | None = Query(None),
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=100)
+    limit: int = Query(100, ge=1, le=100),
+    fields: str | None = Query(None, description=DESCRIPCION_FIELDS)
 ) -> Any:
     """
     Listar registros reproductivos con filtros
     """
+    campos = PROYECCION_REPRODUCTIVO.campos(fields)
+    
     query = db.query(ControlReproductivo).filter(
         ControlReproductivo.finca_id == current_user.finca_id
     )
@@ -133,27 +156,37 @@ def listar_registros_reproductivos(
     query = query.order_by(ControlReproductivo.fecha_evento.desc())
     
     total = query.count()
-    registros = query.offset(skip).limit(limit).all()
+    registros = PROYECCION_REPRODUCTIVO.filas(query.offset(skip).limit(limit), campos)
+    
+    # Cargar animales y toros de la página en una sola consulta
+    ids = set()
+    if PROYECCION_REPRODUCTIVO.incluye(campos, "animal_numero", "animal_nombre"):
+        ids |= {registro["animal_id"] for registro in registros}
+    if PROYECCION_REPRODUCTIVO.incluye(campos, "toro_numero", "toro_nombre"):
+        ids |= {registro["toro_id"] for registro in registros if registro["toro_id"]}
+    animales = {
+        a.id: a for a in db.query(Animal.id, Animal.numero_identificacion, Animal.nombre).filter(
+            Animal.finca_id == current_user.finca_id,
+            Animal.id.in_(ids)
+        )
+    } if ids else {}
     
-    # Cargar animales y toros
     items = []
     for registro in registros:
-        animal = db.query(Animal).filter(Animal.id == registro.animal_id).first()
-        toro = None
-        if registro.toro_id:
-            toro = db.query(Animal).filter(Animal.id == registro.toro_id).first()
+        animal = animales.get(registro.get("animal_id"))
+        toro = animales.get(registro.get("toro_id"))
         
-        items.append(
-            ControlReproductivoResponse(
-                **registro.__dict__,
-                animal_numero=animal.numero_identificacion if animal else None,
-                animal_nombre=animal.nombre if animal else None,
-                toro_numero=toro.numero_identificacion if toro else None,
-                toro_nombre=toro.nombre if toro else None
-            )
-        )
-    
-    return ControlReproductivoListResponse(
+        items.append({
+            **registro,
+            "animal_numero": animal.numero_identificacion if animal else None,
+            "animal_nombre": animal.nombre if animal else None,
+            "toro_numero": toro.numero_identificacion if toro else None,
+            "toro_nombre": toro.nombre if toro else None
+        })
+    
+    return PROYECCION_REPRODUCTIVO.respuesta(
+        ControlReproductivoListResponse,
+        campos,
         total=total,
         items=items,
         skip=skip,
@@ -161,6 +194,54 @@ def listar_registros_reproductivos(
     )
 
 
+@router.get("/estados", response_model=EstadoReproductivoListResponse)
+def listar_estados_reproductivos(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user),
+    estado: str | None = Query(None, pattern="^(vacia|servida|prenada|parida|seca)$"),
+    gestante: bool | None = Query(None),
+    animal_id: int | None = Query(None)
+) -> Any:
+    """
+    Estado reproductivo actual de las hembras (con días abiertos y fecha probable de parto)
+    """
+    query = db.query(
+        EstadoReproductivoActual,
+        Animal.numero_identificacion,
+        Animal.nombre
+    ).join(
+        Animal, Animal.id == EstadoReproductivoActual.animal_id
+    ).filter(
+        EstadoReproductivoActual.finca_id == current_user.finca_id,
+        Animal.estado == "activo"
+    )
+    if estado:
+        query = query.filter(EstadoReproductivoActual.estado == estado)
+    if gestante is not None:
+        query = query.filter(EstadoReproductivoActual.gestante.is_(gestante))
+    if animal_id:
+        query = query.filter(EstadoReproductivoActual.animal_id == animal_id)
+    
+    hoy = date.today()
+    items = []
+    for registro, numero, nombre in query.order_by(Animal.numero_identificacion).all():
+        item = EstadoReproductivoResponse.model_validate(registro).model_copy(update={
+            "animal_numero": numero,
+            "animal_nombre": nombre
+        })
+        # Hembras abiertas: los días abiertos siguen corriendo
+        if item.dias_abiertos is None and item.ultimo_parto and not item.gestante:
+            item.dias_abiertos = (hoy - item.ultimo_parto).days
+        items.append(item)
+    
+    return EstadoReproductivoListResponse(
+        total=len(items),
+        resumen=resumen_estados(db, current_user.finca_id),
+        items=items
+    )
+
+
 @router.get("/{registro_id}", response_model=ControlReproductivoResponse)
 def obtener_registro_reproductivo(
     *,
@@ -188,7 +269,7 @@ def obtener_registro_reproductivo(
         toro = db.query(Animal).filter(Animal.id == registro.toro_id).first()
     
     return ControlReproductivoResponse(
-        **registro.__dict__,
+        **columnas_orm(registro),
         animal_numero=animal.numero_identificacion if animal else None,
         animal_nombre=animal.nombre if animal else None,
         toro_numero=toro.numero_identificacion if toro else None,
@@ -222,6 +303,9 @@ def actualizar_registro_reproductivo(
     for field, value in update_data.items():
         setattr(registro, field, value)
     
+    db.flush()
+    actualizar_estado(db, registro.animal_id)
+    rollups_finanzas.marcar_libro(db, current_user.finca_id)
     db.commit()
     db.refresh(registro)
     
@@ -231,7 +315,7 @@ def actualizar_registro_reproductivo(
         toro = db.query(Animal).filter(Animal.id == registro.toro_id).first()
     
     return ControlReproductivoResponse(
-        **registro.__dict__,
+        **columnas_orm(registro),
         animal_numero=animal.numero_identificacion if animal else None,
         animal_nombre=animal.nombre if animal else None,
         toro_numero=toro.numero_identificacion if toro else None,
@@ -260,7 +344,11 @@ def eliminar_registro_reproductivo(
             detail="Registro reproductivo no encontrado"
         )
     
+    animal_id = registro.animal_id
     db.delete(registro)
+    db.flush()
+    actualizar_estado(db, animal_id)
+    rollups_finanzas.marcar_libro(db, current_user.finca_id)
     db.commit()
     
     return None
@@ -282,41 +370,10 @@ def obtener_estadisticas_reproductivas(
         Animal.estado == "activo"
     ).count()
     
-    # Obtener último diagnóstico de cada hembra
-    ultimo_diagnostico_subquery = (
-        db.query(
-            ControlReproductivo.animal_id,
-            func.max(ControlReproductivo.fecha_evento).label("ultima_fecha")
-        )
-        .filter(
-            ControlReproductivo.finca_id == current_user.finca_id,
-            ControlReproductivo.tipo_evento == "diagnostico"
-        )
-        .group_by(ControlReproductivo.animal_id)
-        .subquery()
-    )
-    
-    # Hembras preñadas (último diagnóstico = prenada)
-    hembras_prenadas = db.query(ControlReproductivo).join(
-        ultimo_diagnostico_subquery,
-        and_(
-            ControlReproductivo.animal_id == ultimo_diagnostico_subquery.c.animal_id,
-            ControlReproductivo.fecha_evento == ultimo_diagnostico_subquery.c.ultima_fecha
-        )
-    ).filter(
-        ControlReproductivo.diagnostico == "prenada"
-    ).count()
-    
-    # Hembras vacías
-    hembras_vacias = db.query(ControlReproductivo).join(
-        ultimo_diagnostico_subquery,
-        and_(
-            ControlReproductivo.animal_id == ultimo_diagnostico_subquery.c.animal_id,
-            ControlReproductivo.fecha_evento == ultimo_diagnostico_subquery.c.ultima_fecha
-        )
-    ).filter(
-        ControlReproductivo.diagnostico == "vacia"
-    ).count()
+    # Hembras por estado, desde el estado reproductivo mantenido
+    estados = resumen_estados(db, current_user.finca_id)
+    hembras_prenadas = estados["gestantes"]
+    hembras_vacias = estados.get("vacia", 0)
     
     # Servicios último mes
     hace_30_dias = date.today() - timedelta(days=30)
@@ -345,12 +402,7 @@ def obtener_estadisticas_reproductivas(
     
     # Próximos partos en 30 días
     dentro_30_dias = date.today() + timedelta(days=30)
-    proximos_partos = db.query(ControlReproductivo).filter(
-        ControlReproductivo.finca_id == current_user.finca_id,
-        ControlReproductivo.fecha_probable_parto.isnot(None),
-        ControlReproductivo.fecha_probable_parto <= dentro_30_dias,
-        ControlReproductivo.fecha_probable_parto >= date.today()
-    ).count()
+    partos_30_dias = proximos_partos(db, current_user.finca_id, dentro_30_dias).count()
     
     return EstadisticasReproductivas(
         total_hembras=total_hembras,
@@ -360,5 +412,30 @@ def obtener_estadisticas_reproductivas(
         partos_ultimo_mes=partos_ultimo_mes,
         tasa_prenez=round(tasa_prenez, 2),
         promedio_dias_gestacion=round(promedio_dias_gestacion, 1) if promedio_dias_gestacion else None,
-        proximos_partos_30_dias=proximos_partos
+        proximos_partos_30_dias=partos_30_dias
     )
+
+
+@router.get("/estadisticas/kpis", response_model=KpisReproductivos)
+def obtener_kpis_reproductivos(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user),
+    fecha_desde: date | None = Query(None, description="Por defecto, últimos 365 días"),
+    fecha_hasta: date | None = Query(None),
+    por_toro: bool = Query(True, description="Incluir el desglose por toro / pajuela")
+) -> Any:
+    """
+    Indicadores reproductivos del periodo: intervalo entre partos, días
+    abiertos, servicios por concepción, tasa de concepción, tasa de detección
+    de celos y tasa de preñez a 21 días.
+    """
+    fecha_hasta = fecha_hasta or date.today()
+    fecha_desde = fecha_desde or fecha_hasta - timedelta(days=365)
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(status_code=400, detail="fecha_desde debe ser anterior a fecha_hasta")
+    
+    kpis = kpis_reproductivos(db, current_user.finca_id, fecha_desde, fecha_hasta)
+    if not por_toro:
+        kpis = {**kpis, "por_toro": []}
+    return kpis
@@ -1,25 +1,49 @@
 """
 Endpoints para gestión de Control Sanitario
 """
+from datetime import date
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, insert, select
 
 from app.db.database import get_db
 from app.core.deps import get_current_user
+from app.core.proyeccion import DESCRIPCION_FIELDS, Proyeccion
+from app.core.respuestas import columnas_orm
 from app.models.usuario import Usuario
 from app.models.control_sanitario import ControlSanitario
 from app.models.animal import Animal
+from app.models.retiro import RetiroSanitario
+from app.services import rollups_finanzas
+from app.services.retiros import (
+    sincronizar_retiros,
+    registrar_retiros_lote,
+    eliminar_retiros,
+    animales_en_retiro
+)
 from app.schemas.control_sanitario import (
     ControlSanitarioCreate,
     ControlSanitarioUpdate,
     ControlSanitarioResponse,
-    ControlSanitarioListResponse
+    ControlSanitarioListResponse,
+    CampanaSanitariaCreate,
+    CampanaSanitariaResponse,
+    RetiroResponse,
+    RetiroListResponse,
+    EstadoRetiroAnimal
 )
 
 router = APIRouter()
 
+# fields= del listado (ver app/core/proyeccion.py)
+PROYECCION_SANITARIO = Proyeccion(
+    ControlSanitario,
+    ControlSanitarioResponse,
+    presets={"resumen": ["fecha", "tipo", "producto", "animal_numero", "animal_nombre", "proxima_dosis"]},
+    dependencias={"animal_numero": ["animal_id"], "animal_nombre": ["animal_id"]}
+)
+
 
 @router.post("/", response_model=ControlSanitarioResponse, status_code=status.HTTP_201_CREATED)
 def crear_registro_sanitario(
@@ -51,12 +75,15 @@ def crear_registro_sanitario(
     )
     
     db.add(db_registro)
+    db.flush()
+    sincronizar_retiros(db, db_registro)
+    rollups_finanzas.marcar_libro(db, current_user.finca_id)
     db.commit()
     db.refresh(db_registro)
     
     # Preparar respuesta con datos del animal
     response = ControlSanitarioResponse(
-        **db_registro.__dict__,
+        **columnas_orm(db_registro),
         animal_numero=animal.numero_identificacion,
         animal_nombre=animal.nombre
     )
@@ -64,6 +91,105 @@ def crear_registro_sanitario(
     return response
 
 
+@router.post("/campana", response_model=CampanaSanitariaResponse, status_code=status.HTTP_201_CREATED)
+def aplicar_campana_sanitaria(
+    *,
+    db: Session = Depends(get_db),
+    campana_in: CampanaSanitariaCreate,
+    current_user: Usuario = Depends(get_current_user)
+) -> Any:
+    """
+    Aplicar un mismo producto a un grupo de animales (toda la finca, un lote,
+    una categoría o una lista explícita) en una sola transacción.
+    
+    Los animales que ya tienen el producto registrado en la fecha se omiten,
+    así reintentar la misma campaña no duplica registros.
+    """
+    selector = campana_in.selector
+    
+    # Resolver el grupo de animales en una sola consulta
+    consulta = select(Animal.id).where(
+        Animal.finca_id == current_user.finca_id,
+        Animal.estado == "activo"
+    )
+    if selector.animal_ids:
+        consulta = consulta.where(Animal.id.in_(selector.animal_ids))
+    if selector.lote:
+        consulta = consulta.where(Animal.lote_actual == selector.lote)
+    if selector.potrero:
+        consulta = consulta.where(Animal.potrero_actual == selector.potrero)
+    if selector.categoria:
+        consulta = consulta.where(Animal.categoria == selector.categoria)
+    if selector.sexo:
+        consulta = consulta.where(Animal.sexo == selector.sexo.lower())
+    animal_ids = set(db.scalars(consulta).all())
+    
+    if selector.animal_ids:
+        no_encontrados = set(selector.animal_ids) - animal_ids
+        if no_encontrados:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Animales no encontrados o inactivos en esta finca: {', '.join(map(str, sorted(no_encontrados)))}"
+            )
+    
+    if not animal_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ningún animal activo coincide con el selector de la campaña"
+        )
+    
+    ya_aplicados = set(db.scalars(
+        select(ControlSanitario.animal_id).where(
+            ControlSanitario.finca_id == current_user.finca_id,
+            ControlSanitario.fecha == campana_in.fecha,
+            ControlSanitario.tipo == campana_in.tipo,
+            ControlSanitario.producto == campana_in.producto
+        )
+    ).all())
+    pendientes = sorted(animal_ids - ya_aplicados)
+    
+    comunes = campana_in.model_dump(exclude={"selector", "costo_por_animal"})
+    filas = [
+        {
+            **comunes,
+            "animal_id": animal_id,
+            "finca_id": current_user.finca_id,
+            "costo": campana_in.costo_por_animal,
+            "aplicado_por": current_user.id,
+        }
+        for animal_id in pendientes
+    ]
+    
+    if filas:
+        # INSERT por lotes; RETURNING trae los ids para las ventanas de retiro
+        controles = db.execute(
+            insert(ControlSanitario).returning(
+                ControlSanitario.id,
+                ControlSanitario.finca_id,
+                ControlSanitario.animal_id,
+                ControlSanitario.fecha,
+                ControlSanitario.dias_retiro_leche,
+                ControlSanitario.dias_retiro_carne
+            ),
+            filas
+        ).all()
+        registrar_retiros_lote(db, controles)
+        rollups_finanzas.marcar_libro(db, current_user.finca_id)
+    db.commit()
+    
+    return CampanaSanitariaResponse(
+        fecha=campana_in.fecha,
+        producto=campana_in.producto,
+        aplicados=len(filas),
+        omitidos=len(ya_aplicados & animal_ids),
+        proxima_dosis=campana_in.proxima_dosis,
+        costo_total=(
+            round(campana_in.costo_por_animal * len(filas), 2)
+            if campana_in.costo_por_animal is not None else None
+        )
+    )
+
+
 @router.get("/", response_model=ControlSanitarioListResponse)
 def listar_registros_sanitarios(
     *,
@@ -75,11 +201,14 @@ def listar_registros_sanitarios(
     fecha_hasta: str | None = Query(None, description="Fecha hasta (YYYY-MM-DD)"),
     producto: str | None = Query(None, description="Buscar por producto"),
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=100)
+    limit: int = Query(100, ge=1, le=100),
+    fields: str | None = Query(None, description=DESCRIPCION_FIELDS)
 ) -> Any:
     """
     Listar registros sanitarios con filtros
     """
+    campos = PROYECCION_SANITARIO.campos(fields)
+    
     # Query base
     query = db.query(ControlSanitario).filter(
         ControlSanitario.finca_id == current_user.finca_id
@@ -108,21 +237,31 @@ def listar_registros_sanitarios(
     total = query.count()
     
     # Paginar
-    registros = query.offset(skip).limit(limit).all()
+    registros = PROYECCION_SANITARIO.filas(query.offset(skip).limit(limit), campos)
+    
+    # Cargar datos de animales en una sola consulta
+    ids = {
+        registro["animal_id"] for registro in registros
+    } if PROYECCION_SANITARIO.incluye(campos, "animal_numero", "animal_nombre") else set()
+    animales = {
+        a.id: a for a in db.query(Animal.id, Animal.numero_identificacion, Animal.nombre).filter(
+            Animal.finca_id == current_user.finca_id,
+            Animal.id.in_(ids)
+        )
+    } if ids else {}
     
-    # Cargar datos de animales
     items = []
     for registro in registros:
-        animal = db.query(Animal).filter(Animal.id == registro.animal_id).first()
-        items.append(
-            ControlSanitarioResponse(
-                **registro.__dict__,
-                animal_numero=animal.numero_identificacion if animal else None,
-                animal_nombre=animal.nombre if animal else None
-            )
-        )
-    
-    return ControlSanitarioListResponse(
+        animal = animales.get(registro.get("animal_id"))
+        items.append({
+            **registro,
+            "animal_numero": animal.numero_identificacion if animal else None,
+            "animal_nombre": animal.nombre if animal else None
+        })
+    
+    return PROYECCION_SANITARIO.respuesta(
+        ControlSanitarioListResponse,
+        campos,
         total=total,
         items=items,
         skip=skip,
@@ -130,6 +269,52 @@ def listar_registros_sanitarios(
     )
 
 
+@router.get("/retiros", response_model=RetiroListResponse)
+def listar_retiros_vigentes(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user),
+    tipo: str | None = Query(None, pattern="^(leche|carne)$", description="Filtrar por tipo de retiro"),
+    fecha: date | None = Query(None, description="Por defecto, hoy")
+) -> Any:
+    """
+    Animales en periodo de retiro de leche o carne en una fecha
+    """
+    fecha = fecha or date.today()
+    query = db.query(
+        RetiroSanitario,
+        Animal.numero_identificacion,
+        Animal.nombre,
+        ControlSanitario.producto
+    ).join(
+        Animal, Animal.id == RetiroSanitario.animal_id
+    ).join(
+        ControlSanitario, ControlSanitario.id == RetiroSanitario.control_sanitario_id
+    ).filter(
+        RetiroSanitario.finca_id == current_user.finca_id,
+        RetiroSanitario.fecha_liberacion > fecha,
+        RetiroSanitario.fecha_inicio <= fecha
+    )
+    if tipo:
+        query = query.filter(RetiroSanitario.tipo == tipo)
+    
+    filas = query.order_by(RetiroSanitario.fecha_liberacion.desc(), Animal.numero_identificacion).all()
+    items = [
+        RetiroResponse(
+            animal_id=retiro.animal_id,
+            animal_numero=numero,
+            animal_nombre=nombre,
+            tipo=retiro.tipo,
+            fecha_inicio=retiro.fecha_inicio,
+            fecha_liberacion=retiro.fecha_liberacion,
+            control_sanitario_id=retiro.control_sanitario_id,
+            producto=producto
+        )
+        for retiro, numero, nombre, producto in filas
+    ]
+    return RetiroListResponse(fecha=fecha, total=len(items), items=items)
+
+
 @router.get("/{registro_id}", response_model=ControlSanitarioResponse)
 def obtener_registro_sanitario(
     *,
@@ -155,7 +340,7 @@ def obtener_registro_sanitario(
     animal = db.query(Animal).filter(Animal.id == registro.animal_id).first()
     
     return ControlSanitarioResponse(
-        **registro.__dict__,
+        **columnas_orm(registro),
         animal_numero=animal.numero_identificacion if animal else None,
         animal_nombre=animal.nombre if animal else None
     )
@@ -189,6 +374,8 @@ def actualizar_registro_sanitario(
     for field, value in update_data.items():
         setattr(registro, field, value)
     
+    sincronizar_retiros(db, registro)
+    rollups_finanzas.marcar_libro(db, current_user.finca_id)
     db.commit()
     db.refresh(registro)
     
@@ -196,7 +383,7 @@ def actualizar_registro_sanitario(
     animal = db.query(Animal).filter(Animal.id == registro.animal_id).first()
     
     return ControlSanitarioResponse(
-        **registro.__dict__,
+        **columnas_orm(registro),
         animal_numero=animal.numero_identificacion if animal else None,
         animal_nombre=animal.nombre if animal else None
     )
@@ -223,7 +410,9 @@ def eliminar_registro_sanitario(
             detail="Registro sanitario no encontrado"
         )
     
+    eliminar_retiros(db, registro.id)
     db.delete(registro)
+    rollups_finanzas.marcar_libro(db, current_user.finca_id)
     db.commit()
     
     return None
@@ -270,7 +459,7 @@ def obtener_historial_sanitario_animal(
     
     items = [
         ControlSanitarioResponse(
-            **registro.__dict__,
+            **columnas_orm(registro),
             animal_numero=animal.numero_identificacion,
             animal_nombre=animal.nombre
         )
@@ -283,3 +472,38 @@ def obtener_historial_sanitario_animal(
         skip=skip,
         limit=limit
     )
+
+
+@router.get("/animal/{animal_id}/retiro", response_model=EstadoRetiroAnimal)
+def obtener_retiro_animal(
+    *,
+    db: Session = Depends(get_db),
+    animal_id: int,
+    current_user: Usuario = Depends(get_current_user),
+    fecha: date | None = Query(None, description="Por defecto, hoy")
+) -> Any:
+    """
+    ¿La leche de este animal puede ir al tanque? ¿Se puede vender para carne?
+    """
+    animal = db.query(Animal).filter(
+        Animal.id == animal_id,
+        Animal.finca_id == current_user.finca_id
+    ).first()
+    
+    if not animal:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Animal no encontrado"
+        )
+    
+    fecha = fecha or date.today()
+    leche = animales_en_retiro(db, current_user.finca_id, "leche", fecha, [animal_id]).get(animal_id)
+    carne = animales_en_retiro(db, current_user.finca_id, "carne", fecha, [animal_id]).get(animal_id)
+    return EstadoRetiroAnimal(
+        animal_id=animal_id,
+        fecha=fecha,
+        apto_leche=leche is None,
+        leche_liberada_desde=leche,
+        apto_carne=carne is None,
+        carne_liberada_desde=carne
+    )
@@ -3,18 +3,22 @@ Endpoints para Dashboard y Reportes
 """
 from typing import Any
 from datetime import date, timedelta
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func
 
-from app.db.database import get_db
+from app.db.database import SessionLocal, get_db
 from app.core.deps import get_current_user
+from app.core.coalescencia import coalescedor
+from app.core.respuestas import respuesta_json
 from app.models.usuario import Usuario
 from app.models.animal import Animal
 from app.models.control_sanitario import ControlSanitario
 from app.models.control_reproductivo import ControlReproductivo
-from app.models.registro_produccion import RegistroProduccion
-from app.models.transaccion import Transaccion
+from app.models.produccion_resumen import ProduccionDiaria, ProduccionMensual
+from app.models.estado_reproductivo import EstadoReproductivoActual
+from app.services import rollups_finanzas
+from app.services.estado_reproductivo import resumen_estados, proximos_partos
 from app.schemas.dashboard import (
     DashboardCompleto,
     InventarioResumen,
@@ -37,9 +41,28 @@ def obtener_dashboard_completo(
 ) -> Any:
     """
     Obtener dashboard completo con todas las métricas de la finca
+    
+    Las requests simultáneas de la misma finca comparten un solo cálculo.
     """
     finca_id = current_user.finca_id
-    
+    hoy = date.today()
+    db.close()  # Esperando el cálculo de otra request no se retiene una conexión del pool
+    contenido = coalescedor().ejecutar(
+        ("dashboard", finca_id, hoy), lambda: _calcular(_dashboard_completo, finca_id, hoy)
+    )
+    return Response(content=contenido, media_type="application/json")
+
+
+def _calcular(funcion, finca_id: int, hoy: date) -> bytes:
+    """JSON de `funcion` con una sesión propia (la de la request ya se liberó)"""
+    db = SessionLocal()
+    try:
+        return respuesta_json(funcion(db, finca_id, hoy)).body
+    finally:
+        db.close()
+
+
+def _dashboard_completo(db: Session, finca_id: int, hoy: date) -> DashboardCompleto:
     # ========== INVENTARIO ==========
     total_animales = db.query(Animal).filter(Animal.finca_id == finca_id).count()
     hembras = db.query(Animal).filter(
@@ -89,7 +112,6 @@ def obtener_dashboard_completo(
     )
     
     # ========== SANIDAD ==========
-    hoy = date.today()
     dentro_30_dias = hoy + timedelta(days=30)
     
     proximas_vacunas = db.query(ControlSanitario).filter(
@@ -107,44 +129,18 @@ def obtener_dashboard_completo(
     )
     
     # ========== REPRODUCCIÓN ==========
-    # Obtener último diagnóstico de cada hembra
-    ultimo_diagnostico_subquery = (
-        db.query(
-            ControlReproductivo.animal_id,
-            func.max(ControlReproductivo.fecha_evento).label("ultima_fecha")
-        )
-        .filter(
-            ControlReproductivo.finca_id == finca_id,
-            ControlReproductivo.tipo_evento == "diagnostico"
-        )
-        .group_by(ControlReproductivo.animal_id)
-        .subquery()
-    )
-    
-    hembras_prenadas = db.query(ControlReproductivo).join(
-        ultimo_diagnostico_subquery,
-        and_(
-            ControlReproductivo.animal_id == ultimo_diagnostico_subquery.c.animal_id,
-            ControlReproductivo.fecha_evento == ultimo_diagnostico_subquery.c.ultima_fecha
-        )
-    ).filter(ControlReproductivo.diagnostico == "prenada").count()
-    
-    hembras_vacias = db.query(ControlReproductivo).join(
-        ultimo_diagnostico_subquery,
-        and_(
-            ControlReproductivo.animal_id == ultimo_diagnostico_subquery.c.animal_id,
-            ControlReproductivo.fecha_evento == ultimo_diagnostico_subquery.c.ultima_fecha
-        )
-    ).filter(ControlReproductivo.diagnostico == "vacia").count()
-    
-    tasa_prenez = (hembras_prenadas / hembras * 100) if hembras > 0 else 0.0
-    
-    proximos_partos = db.query(ControlReproductivo).filter(
-        ControlReproductivo.finca_id == finca_id,
-        ControlReproductivo.fecha_probable_parto.isnot(None),
-        ControlReproductivo.fecha_probable_parto <= dentro_30_dias,
-        ControlReproductivo.fecha_probable_parto >= hoy
+    # Conteos sobre el estado reproductivo mantenido por hembra
+    estados = resumen_estados(db, finca_id)
+    hembras_prenadas = estados["gestantes"]
+    hembras_vacias = estados.get("vacia", 0)
+    
+    # Sobre las hembras activas, las mismas que cuenta resumen_estados
+    hembras_activas = db.query(Animal).filter(
+        Animal.finca_id == finca_id, Animal.sexo == "hembra", Animal.estado == "activo"
     ).count()
+    tasa_prenez = (hembras_prenadas / hembras_activas * 100) if hembras_activas > 0 else 0.0
+    
+    partos_30_dias = proximos_partos(db, finca_id, dentro_30_dias, desde=hoy).count()
     
     hace_30_dias = hoy - timedelta(days=30)
     servicios_mes = db.query(ControlReproductivo).filter(
@@ -157,22 +153,22 @@ def obtener_dashboard_completo(
         hembras_prenadas=hembras_prenadas,
         hembras_vacias=hembras_vacias,
         tasa_prenez=round(tasa_prenez, 2),
-        proximos_partos_30_dias=proximos_partos,
+        proximos_partos_30_dias=partos_30_dias,
         servicios_mes_actual=servicios_mes
     )
     
     # ========== PRODUCCIÓN ==========
-    produccion_hoy = db.query(func.sum(RegistroProduccion.cantidad_litros)).filter(
-        RegistroProduccion.finca_id == finca_id,
-        RegistroProduccion.tipo_produccion == "leche",
-        RegistroProduccion.fecha == hoy
+    # Desde los resúmenes: una fila por animal en lugar de todos los ordeños
+    produccion_hoy = db.query(func.sum(ProduccionDiaria.litros_total)).filter(
+        ProduccionDiaria.finca_id == finca_id,
+        ProduccionDiaria.fecha == hoy
     ).scalar() or 0.0
     
     primer_dia_mes = hoy.replace(day=1)
-    produccion_mes = db.query(func.sum(RegistroProduccion.cantidad_litros)).filter(
-        RegistroProduccion.finca_id == finca_id,
-        RegistroProduccion.tipo_produccion == "leche",
-        RegistroProduccion.fecha >= primer_dia_mes
+    produccion_mes = db.query(func.sum(ProduccionMensual.litros_total)).filter(
+        ProduccionMensual.finca_id == finca_id,
+        ProduccionMensual.anio == hoy.year,
+        ProduccionMensual.mes == hoy.month
     ).scalar() or 0.0
     
     vacas_produccion = db.query(Animal).filter(
@@ -191,28 +187,16 @@ def obtener_dashboard_completo(
     )
     
     # ========== FINANZAS ==========
-    ventas_mes = db.query(func.sum(Transaccion.monto)).filter(
-        Transaccion.finca_id == finca_id,
-        Transaccion.tipo == "venta",
-        Transaccion.fecha >= primer_dia_mes
-    ).scalar() or 0.0
-    
-    gastos_mes = db.query(func.sum(Transaccion.monto)).filter(
-        Transaccion.finca_id == finca_id,
-        Transaccion.tipo == "gasto",
-        Transaccion.fecha >= primer_dia_mes
-    ).scalar() or 0.0
+    # Desde el resumen financiero mensual (no se recorre el libro completo)
+    mes_actual = rollups_finanzas.totales_por_tipo(db, finca_id, desde=primer_dia_mes)
+    ventas_mes = mes_actual.get("venta", 0.0)
+    gastos_mes = mes_actual.get("gasto", 0.0)
     
     balance_mes = ventas_mes - gastos_mes
     
-    total_ventas = db.query(func.sum(Transaccion.monto)).filter(
-        Transaccion.finca_id == finca_id, Transaccion.tipo == "venta"
-    ).scalar() or 0.0
-    
-    total_gastos = db.query(func.sum(Transaccion.monto)).filter(
-        Transaccion.finca_id == finca_id,
-        Transaccion.tipo.in_(["gasto", "compra"])
-    ).scalar() or 0.0
+    totales = rollups_finanzas.totales_por_tipo(db, finca_id)
+    total_ventas = totales.get("venta", 0.0)
+    total_gastos = totales.get("gasto", 0.0) + totales.get("compra", 0.0)
     
     balance_total = total_ventas - total_gastos
     
@@ -241,15 +225,27 @@ def obtener_alertas(
 ) -> Any:
     """
     Obtener alertas importantes de la finca
+    
+    Las requests simultáneas de la misma finca comparten un solo cálculo.
     """
     finca_id = current_user.finca_id
+    hoy = date.today()
+    db.close()
+    contenido = coalescedor().ejecutar(
+        ("dashboard/alertas", finca_id, hoy), lambda: _calcular(_alertas, finca_id, hoy)
+    )
+    return Response(content=contenido, media_type="application/json")
+
+
+def _alertas(db: Session, finca_id: int, hoy: date) -> AlertasResponse:
     alertas = []
     
-    hoy = date.today()
     dentro_15_dias = hoy + timedelta(days=15)
     
     # Alertas de vacunas próximas
-    vacunas_proximas = db.query(ControlSanitario).filter(
+    vacunas_proximas = db.query(ControlSanitario, Animal).join(
+        Animal, Animal.id == ControlSanitario.animal_id
+    ).filter(
         ControlSanitario.finca_id == finca_id,
         ControlSanitario.tipo == "vacuna",
         ControlSanitario.proxima_dosis.isnot(None),
@@ -257,43 +253,36 @@ def obtener_alertas(
         ControlSanitario.proxima_dosis >= hoy
     ).all()
     
-    for vacuna in vacunas_proximas:
-        animal = db.query(Animal).filter(Animal.id == vacuna.animal_id).first()
-        if animal:
-            dias_restantes = (vacuna.proxima_dosis - hoy).days
-            prioridad = "alta" if dias_restantes <= 3 else "media"
-            alertas.append(AlertaGanadera(
-                tipo="vacuna",
-                prioridad=prioridad,
-                animal_id=animal.id,
-                animal_numero=animal.numero_identificacion,
-                animal_nombre=animal.nombre,
-                mensaje=f"Vacuna/refuerzo pendiente: {vacuna.producto or 'N/A'}",
-                fecha_limite=vacuna.proxima_dosis
-            ))
-    
-    # Alertas de partos próximos
-    partos_proximos = db.query(ControlReproductivo).filter(
-        ControlReproductivo.finca_id == finca_id,
-        ControlReproductivo.fecha_probable_parto.isnot(None),
-        ControlReproductivo.fecha_probable_parto <= dentro_15_dias,
-        ControlReproductivo.fecha_probable_parto >= hoy
+    for vacuna, animal in vacunas_proximas:
+        dias_restantes = (vacuna.proxima_dosis - hoy).days
+        prioridad = "alta" if dias_restantes <= 3 else "media"
+        alertas.append(AlertaGanadera(
+            tipo="vacuna",
+            prioridad=prioridad,
+            animal_id=animal.id,
+            animal_numero=animal.numero_identificacion,
+            animal_nombre=animal.nombre,
+            mensaje=f"Vacuna/refuerzo pendiente: {vacuna.producto or 'N/A'}",
+            fecha_limite=vacuna.proxima_dosis
+        ))
+    
+    # Alertas de partos próximos (hembras gestantes, con su animal en la misma consulta)
+    partos_proximos = proximos_partos(db, finca_id, dentro_15_dias, desde=hoy).with_entities(
+        EstadoReproductivoActual, Animal
     ).all()
     
-    for parto in partos_proximos:
-        animal = db.query(Animal).filter(Animal.id == parto.animal_id).first()
-        if animal:
-            dias_restantes = (parto.fecha_probable_parto - hoy).days
-            prioridad = "alta" if dias_restantes <= 7 else "media"
-            alertas.append(AlertaGanadera(
-                tipo="parto",
-                prioridad=prioridad,
-                animal_id=animal.id,
-                animal_numero=animal.numero_identificacion,
-                animal_nombre=animal.nombre,
-                mensaje=f"Parto próximo en {dias_restantes} días",
-                fecha_limite=parto.fecha_probable_parto
-            ))
+    for parto, animal in partos_proximos:
+        dias_restantes = (parto.fecha_probable_parto - hoy).days
+        prioridad = "alta" if dias_restantes <= 7 else "media"
+        alertas.append(AlertaGanadera(
+            tipo="parto",
+            prioridad=prioridad,
+            animal_id=animal.id,
+            animal_numero=animal.numero_identificacion,
+            animal_nombre=animal.nombre,
+            mensaje=f"Parto próximo en {dias_restantes} días",
+            fecha_limite=parto.fecha_probable_parto
+        ))
     
     return AlertasResponse(
         total=len(alertas),
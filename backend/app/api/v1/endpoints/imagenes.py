@@ -1,12 +1,15 @@
 """
 Endpoints para gestión de imágenes de animales
 """
-import os
-import shutil
-from typing import Any
+import hashlib
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
 from pathlib import Path
-from datetime import datetime
+from uuid import uuid4
+import anyio
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.db.database import get_db
@@ -14,27 +17,145 @@ from app.core.deps import get_current_user
 from app.core.config import settings
 from app.models.usuario import Usuario
 from app.models.animal import Animal
+from app.services.imagenes import (
+    RENDICIONES,
+    RENDICION_PRINCIPAL,
+    BYTES_FIRMA,
+    ImagenInvalidaError,
+    detectar_formato,
+    procesar_imagen,
+    urls_foto
+)
+from app.services.almacenamiento import GRACIA_SUBIDAS, clave_foto_animal, obtener_almacen
 from pydantic import BaseModel
 
 router = APIRouter()
 
-# Directorio para almacenar imágenes
-IMAGENES_DIR = Path("media/animales")
-IMAGENES_DIR.mkdir(parents=True, exist_ok=True)
-
 # Extensiones permitidas
 EXTENSIONES_PERMITIDAS = {".jpg", ".jpeg", ".png", ".webp"}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+CHUNK_SIZE = 64 * 1024
 
 
 class ImagenResponse(BaseModel):
     """Respuesta después de subir imagen"""
     url: str
+    urls: Dict[str, str]  # thumb, medium, full
     filename: str
     animal_id: int
     mensaje: str
 
 
+def _guardar_rendiciones(origen: Path, hash_contenido: str) -> None:
+    """
+    Generar las rendiciones WebP y guardarlas en el almacén.
+    Si la misma foto ya se subió antes, se reutilizan sus blobs renovando su
+    fecha: así ningún borrado los toma por abandonados antes del commit.
+    """
+    almacen = obtener_almacen()
+    claves = {nombre: clave_foto_animal(hash_contenido, nombre) for nombre in RENDICIONES}
+    if all(almacen.renovar(clave, "image/webp") for clave in claves.values()):
+        return
+    
+    rendiciones = procesar_imagen(origen)
+    # La rendición principal se guarda al final: su existencia implica las demás
+    for nombre in sorted(rendiciones, key=lambda n: n == RENDICION_PRINCIPAL):
+        almacen.guardar(claves[nombre], rendiciones[nombre], "image/webp")
+
+
+def _liberar_foto(db: Session, foto_url: Optional[str]) -> None:
+    """
+    Eliminar las rendiciones de una foto si ningún animal la sigue usando.
+    
+    Los blobs renovados hace menos de GRACIA_SUBIDAS se dejan: otra subida de
+    la misma foto puede estar por hacer commit. Esos, y los que no se puedan
+    borrar, los limpia la recolección de huérfanos (gc_media.py).
+    """
+    urls = urls_foto(foto_url)
+    if not urls:
+        return
+    
+    almacen = obtener_almacen()
+    limite = datetime.now(timezone.utc) - GRACIA_SUBIDAS
+    for url in set(urls.values()):
+        clave = almacen.clave_desde_url(url)
+        if not clave:
+            continue
+        try:
+            modificado = almacen.modificado(clave)
+            if modificado is None or modificado > limite:
+                continue
+            # Verificar las referencias justo antes de cada borrado
+            if db.query(Animal.id).filter(Animal.foto_url == foto_url).first():
+                return
+            almacen.eliminar(clave)
+        except Exception:
+            pass  # No fallar si no se puede eliminar el archivo
+
+
+async def _recibir_archivo(file: UploadFile) -> tuple[Path, str]:
+    """
+    Copiar la subida a un archivo temporal en una sola pasada.
+    
+    Valida la firma del contenido con el primer bloque, corta en cuanto se
+    supera el tamaño máximo y calcula el hash SHA-256 durante la copia.
+    La escritura no bloquea el event loop.
+    
+    Returns:
+        (ruta del temporal, hash hexadecimal del contenido)
+    """
+    temporal = Path(tempfile.gettempdir()) / f"ganadero_subida_{uuid4().hex}.tmp"
+    hash_contenido = hashlib.sha256()
+    file_size = 0
+    try:
+        async with await anyio.open_file(temporal, "wb") as destino:
+            while chunk := await file.read(CHUNK_SIZE):
+                if file_size == 0 and detectar_formato(chunk[:BYTES_FIRMA]) is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="El contenido no es una imagen JPEG, PNG o WebP válida"
+                    )
+                file_size += len(chunk)
+                if file_size > MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Archivo muy grande. Máximo {MAX_FILE_SIZE / 1024 / 1024}MB"
+                    )
+                hash_contenido.update(chunk)
+                await destino.write(chunk)
+    except BaseException:
+        await anyio.Path(temporal).unlink(missing_ok=True)
+        raise
+    finally:
+        await file.close()
+    
+    if file_size == 0:
+        await anyio.Path(temporal).unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El archivo está vacío"
+        )
+    
+    return temporal, hash_contenido.hexdigest()
+
+
+def _obtener_animal(db: Session, animal_id: int, finca_id: int) -> Animal | None:
+    return db.query(Animal).filter(
+        Animal.id == animal_id,
+        Animal.finca_id == finca_id
+    ).first()
+
+
+def _asignar_foto(db: Session, animal: Animal, foto_url: str) -> None:
+    """Guardar la nueva URL y liberar la foto anterior"""
+    foto_anterior = animal.foto_url
+    animal.foto_url = foto_url
+    db.commit()
+    db.refresh(animal)
+    if foto_anterior != foto_url:
+        _liberar_foto(db, foto_anterior)
+
+
 @router.post("/animales/{animal_id}/foto", response_model=ImagenResponse)
 async def subir_foto_animal(
     *,
@@ -47,10 +168,7 @@ async def subir_foto_animal(
     Subir foto de un animal
     """
     # Verificar que el animal exista y pertenezca a la finca
-    animal = db.query(Animal).filter(
-        Animal.id == animal_id,
-        Animal.finca_id == current_user.finca_id
-    ).first()
+    animal = await run_in_threadpool(_obtener_animal, db, animal_id, current_user.finca_id)
     
     if not animal:
         raise HTTPException(
@@ -59,53 +177,44 @@ async def subir_foto_animal(
         )
     
     # Validar extensión
-    extension = Path(file.filename).suffix.lower()
+    extension = Path(file.filename or "").suffix.lower()
     if extension not in EXTENSIONES_PERMITIDAS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Extensión no permitida. Use: {', '.join(EXTENSIONES_PERMITIDAS)}"
         )
     
-    # Validar tamaño (leer el archivo en chunks)
-    file_size = 0
-    for chunk in iter(lambda: file.file.read(8192), b""):
-        file_size += len(chunk)
-        if file_size > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail=f"Archivo muy grande. Máximo {MAX_FILE_SIZE / 1024 / 1024}MB"
-            )
-    
-    # Resetear el puntero del archivo
-    file.file.seek(0)
-    
-    # Generar nombre único: finca_id_animal_id_timestamp.ext
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{current_user.finca_id}_{animal_id}_{timestamp}{extension}"
-    filepath = IMAGENES_DIR / filename
+    # Recibir el archivo (tamaño, firma y hash calculados durante la copia)
+    temporal, hash_contenido = await _recibir_archivo(file)
     
-    # Guardar archivo
+    # Procesar y guardar rendiciones fuera del event loop
+    clave = clave_foto_animal(hash_contenido, RENDICION_PRINCIPAL)
+    foto_url = obtener_almacen().url(clave)
     try:
-        with filepath.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al guardar archivo: {str(e)}"
-        )
+        try:
+            await run_in_threadpool(_guardar_rendiciones, temporal, hash_contenido)
+        except ImagenInvalidaError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error al guardar archivo: {str(e)}"
+            )
+        
+        # Actualizar URL en el animal (rendición principal)
+        await run_in_threadpool(_asignar_foto, db, animal, foto_url)
+        # Ya referenciados: si un borrado concurrente se adelantó al commit, reponerlos
+        await run_in_threadpool(_guardar_rendiciones, temporal, hash_contenido)
     finally:
-        file.file.close()
-    
-    # Actualizar URL en el animal
-    foto_url = f"/media/animales/{filename}"
-    animal.foto_url = foto_url
-    
-    db.commit()
-    db.refresh(animal)
+        await anyio.Path(temporal).unlink(missing_ok=True)
     
     return ImagenResponse(
         url=foto_url,
-        filename=filename,
+        urls=urls_foto(foto_url),
+        filename=clave.split("/")[-1],
         animal_id=animal_id,
         mensaje="Foto subida exitosamente"
     )
@@ -138,19 +247,11 @@ def eliminar_foto_animal(
             detail="El animal no tiene foto"
         )
     
-    # Extraer nombre de archivo de la URL
-    filename = animal.foto_url.split("/")[-1]
-    filepath = IMAGENES_DIR / filename
-    
-    # Eliminar archivo físico si existe
-    if filepath.exists():
-        try:
-            filepath.unlink()
-        except Exception:
-            pass  # No fallar si no se puede eliminar el archivo
-    
-    # Actualizar BD
+    # Actualizar BD primero: un fallo al borrar solo deja un huérfano recolectable
+    foto_anterior = animal.foto_url
     animal.foto_url = None
     db.commit()
     
+    _liberar_foto(db, foto_anterior)
+    
     return None
@@ -0,0 +1,243 @@
+"""
+Endpoints para Pesajes: sesiones de báscula, historial y ganancia de peso
+"""
+from datetime import date, timedelta
+from typing import Any
+from uuid import uuid4
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.db.database import get_db
+from app.core.deps import get_current_user
+from app.models.usuario import Usuario
+from app.models.animal import Animal
+from app.models.pesaje import Pesaje
+from app.services.pesajes import (
+    registrar_pesajes,
+    eliminar_pesaje,
+    ganancia_por_grupo,
+    animales_bajo_objetivo
+)
+from app.schemas.pesaje import (
+    PesajeSesionCreate,
+    PesajeSesionResponse,
+    PesajeResponse,
+    PesajeListResponse,
+    GananciaResponse,
+    AnimalBajoObjetivo,
+    BajoObjetivoResponse
+)
+
+router = APIRouter()
+
+
+@router.post("/sesion", response_model=PesajeSesionResponse, status_code=status.HTTP_201_CREATED)
+def registrar_sesion_pesaje(
+    *,
+    db: Session = Depends(get_db),
+    sesion_in: PesajeSesionCreate,
+    current_user: Usuario = Depends(get_current_user)
+) -> Any:
+    """
+    Registrar una sesión de báscula (todos los animales pesados en una jornada).
+    Los animales se identifican por ID o por número de identificación (chapeta).
+    """
+    ids = {p.animal_id for p in sesion_in.pesajes if p.animal_id is not None}
+    numeros = {p.numero_identificacion for p in sesion_in.pesajes if p.animal_id is None}
+    
+    # Resolver todos los animales de la sesión en una sola consulta
+    condiciones = []
+    if ids:
+        condiciones.append(Animal.id.in_(ids))
+    if numeros:
+        condiciones.append(Animal.numero_identificacion.in_(numeros))
+    animales = db.query(Animal).filter(
+        Animal.finca_id == current_user.finca_id,
+        or_(*condiciones)
+    ).all()
+    por_id = {a.id: a for a in animales}
+    por_numero = {a.numero_identificacion: a for a in animales}
+    
+    pesos = {}
+    no_encontrados = []
+    for item in sesion_in.pesajes:
+        animal = por_id.get(item.animal_id) if item.animal_id is not None else por_numero.get(item.numero_identificacion)
+        if animal is None:
+            no_encontrados.append(str(item.animal_id or item.numero_identificacion))
+            continue
+        if animal.id in pesos:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El animal {animal.numero_identificacion} aparece más de una vez en la sesión"
+            )
+        pesos[animal.id] = item.peso
+    
+    if no_encontrados:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Animales no encontrados en esta finca: {', '.join(no_encontrados)}"
+        )
+    
+    sesion_id = str(uuid4())
+    pesajes = registrar_pesajes(
+        db,
+        finca_id=current_user.finca_id,
+        fecha=sesion_in.fecha,
+        pesos=pesos,
+        animales=por_id,
+        sesion_id=sesion_id,
+        metodo=sesion_in.metodo,
+        observaciones=sesion_in.observaciones,
+        registrado_por=current_user.id
+    )
+    db.commit()
+    
+    items = [
+        PesajeResponse.model_validate(pesaje).model_copy(update={
+            "animal_numero": por_id[pesaje.animal_id].numero_identificacion,
+            "animal_nombre": por_id[pesaje.animal_id].nombre
+        })
+        for pesaje in pesajes
+    ]
+    return PesajeSesionResponse(
+        sesion_id=sesion_id,
+        fecha=sesion_in.fecha,
+        registrados=len(items),
+        items=items
+    )
+
+
+@router.get("/", response_model=PesajeListResponse)
+def listar_pesajes(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user),
+    animal_id: int | None = Query(None, description="Historial de un animal"),
+    sesion_id: str | None = Query(None),
+    fecha_desde: date | None = Query(None),
+    fecha_hasta: date | None = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500)
+) -> Any:
+    """
+    Historial de pesajes
+    """
+    query = db.query(Pesaje, Animal.numero_identificacion, Animal.nombre).join(
+        Animal, Animal.id == Pesaje.animal_id
+    ).filter(Pesaje.finca_id == current_user.finca_id)
+    
+    if animal_id:
+        query = query.filter(Pesaje.animal_id == animal_id)
+    if sesion_id:
+        query = query.filter(Pesaje.sesion_id == sesion_id)
+    if fecha_desde:
+        query = query.filter(Pesaje.fecha >= fecha_desde)
+    if fecha_hasta:
+        query = query.filter(Pesaje.fecha <= fecha_hasta)
+    
+    total = query.count()
+    filas = query.order_by(Pesaje.fecha.desc(), Pesaje.id.desc()).offset(skip).limit(limit).all()
+    
+    items = [
+        PesajeResponse.model_validate(pesaje).model_copy(update={
+            "animal_numero": numero,
+            "animal_nombre": nombre
+        })
+        for pesaje, numero, nombre in filas
+    ]
+    return PesajeListResponse(total=total, items=items, skip=skip, limit=limit)
+
+
+@router.get("/ganancia", response_model=GananciaResponse)
+def ganancia_diaria_peso(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user),
+    agrupar: str = Query("animal", pattern="^(animal|lote|potrero)$"),
+    fecha_desde: date | None = Query(None, description="Por defecto, últimos 90 días"),
+    fecha_hasta: date | None = Query(None),
+    lote: str | None = Query(None),
+    potrero: str | None = Query(None)
+) -> Any:
+    """
+    Ganancia diaria de peso (kg/día) por animal, lote o potrero en un periodo
+    """
+    fecha_hasta = fecha_hasta or date.today()
+    fecha_desde = fecha_desde or fecha_hasta - timedelta(days=90)
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(status_code=400, detail="fecha_desde debe ser anterior a fecha_hasta")
+    
+    items = ganancia_por_grupo(
+        db,
+        current_user.finca_id,
+        agrupar=agrupar,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+        lote=lote,
+        potrero=potrero
+    )
+    return GananciaResponse(
+        agrupar=agrupar,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+        items=items
+    )
+
+
+@router.get("/bajo-objetivo", response_model=BajoObjetivoResponse)
+def listar_bajo_objetivo(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user),
+    objetivo: float = Query(..., description="Ganancia diaria objetivo (kg/día)"),
+    lote: str | None = Query(None),
+    potrero: str | None = Query(None)
+) -> Any:
+    """
+    Animales activos cuya ganancia desde el pesaje anterior está bajo el objetivo
+    """
+    filas = animales_bajo_objetivo(db, current_user.finca_id, objetivo, lote=lote, potrero=potrero)
+    items = [
+        AnimalBajoObjetivo(
+            animal_id=pesaje.animal_id,
+            animal_numero=numero,
+            animal_nombre=nombre,
+            lote_actual=lote_actual,
+            potrero_actual=potrero_actual,
+            fecha_ultimo_pesaje=pesaje.fecha,
+            peso=pesaje.peso,
+            dias_desde_anterior=pesaje.dias_desde_anterior,
+            ganancia_diaria=pesaje.ganancia_diaria
+        )
+        for pesaje, numero, nombre, lote_actual, potrero_actual in filas
+    ]
+    return BajoObjetivoResponse(objetivo=objetivo, total=len(items), items=items)
+
+
+@router.delete("/{pesaje_id}", status_code=status.HTTP_204_NO_CONTENT)
+def eliminar_registro_pesaje(
+    *,
+    db: Session = Depends(get_db),
+    pesaje_id: int,
+    current_user: Usuario = Depends(get_current_user)
+) -> None:
+    """
+    Eliminar un pesaje (corrección de errores de báscula)
+    """
+    pesaje = db.query(Pesaje).filter(
+        Pesaje.id == pesaje_id,
+        Pesaje.finca_id == current_user.finca_id
+    ).first()
+    
+    if not pesaje:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pesaje no encontrado"
+        )
+    
+    animal = db.query(Animal).filter(Animal.id == pesaje.animal_id).first()
+    eliminar_pesaje(db, pesaje, animal)
+    db.commit()
+    
+    return None
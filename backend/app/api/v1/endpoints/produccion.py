@@ -1,24 +1,56 @@
 """
 Endpoints para gestión de Registros de Producción
 """
+from datetime import date, timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
 from app.db.database import get_db
 from app.core.deps import get_current_user
+from app.core.proyeccion import DESCRIPCION_FIELDS, Proyeccion
+from app.core.respuestas import columnas_orm
 from app.models.usuario import Usuario
 from app.models.registro_produccion import RegistroProduccion
 from app.models.animal import Animal
+from app.services import rollups_produccion
+from app.services.lactancias import analizar_lactancias
+from app.services.series import serie_produccion
+from app.services.retiros import animales_en_retiro, fecha_liberacion
 from app.schemas.produccion import (
     RegistroProduccionCreate,
     RegistroProduccionUpdate,
     RegistroProduccionResponse,
-    RegistroProduccionListResponse
+    RegistroProduccionListResponse,
+    OrdenoLoteCreate,
+    OrdenoLoteResponse,
+    OrdenoRechazado,
+    LactanciaResponse,
+    LactanciaListResponse,
+    SeriesProduccionResponse
 )
 
 router = APIRouter()
 
+# fields= del listado (ver app/core/proyeccion.py)
+PROYECCION_PRODUCCION = Proyeccion(
+    RegistroProduccion,
+    RegistroProduccionResponse,
+    presets={"resumen": ["fecha", "turno", "cantidad_litros", "animal_numero", "animal_nombre"]},
+    dependencias={"animal_numero": ["animal_id"], "animal_nombre": ["animal_id"]}
+)
+
+
+def _verificar_sin_retiro_de_leche(db: Session, animal: Animal, fecha: date) -> None:
+    """La leche de un animal en retiro no puede ir al tanque"""
+    liberacion = fecha_liberacion(db, animal.id, "leche", fecha)
+    if liberacion:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"El animal {animal.numero_identificacion} está en retiro de leche (apta desde el {liberacion.isoformat()})"
+        )
+
 
 @router.post("/", response_model=RegistroProduccionResponse, status_code=status.HTTP_201_CREATED)
 def crear_registro_produccion(
@@ -36,6 +68,9 @@ def crear_registro_produccion(
     if not animal:
         raise HTTPException(status_code=404, detail="Animal no encontrado")
     
+    if registro_in.tipo_produccion == "leche":
+        _verificar_sin_retiro_de_leche(db, animal, registro_in.fecha)
+    
     db_registro = RegistroProduccion(
         **registro_in.model_dump(),
         finca_id=current_user.finca_id,
@@ -43,16 +78,99 @@ def crear_registro_produccion(
     )
     
     db.add(db_registro)
+    rollups_produccion.registrar_alta(db, db_registro)
     db.commit()
     db.refresh(db_registro)
     
     return RegistroProduccionResponse(
-        **db_registro.__dict__,
+        **columnas_orm(db_registro),
         animal_numero=animal.numero_identificacion,
         animal_nombre=animal.nombre
     )
 
 
+@router.post("/lote", response_model=OrdenoLoteResponse, status_code=status.HTTP_201_CREATED)
+def registrar_ordeno_lote(
+    *,
+    db: Session = Depends(get_db),
+    lote_in: OrdenoLoteCreate,
+    current_user: Usuario = Depends(get_current_user)
+) -> Any:
+    """
+    Registrar un ordeño completo en una sola petición.
+    La leche de los animales en retiro no se registra y se devuelve en `rechazados`.
+    """
+    ids = {r.animal_id for r in lote_in.registros if r.animal_id is not None}
+    numeros = {r.numero_identificacion for r in lote_in.registros if r.animal_id is None}
+    
+    # Resolver todos los animales del ordeño en una sola consulta
+    condiciones = []
+    if ids:
+        condiciones.append(Animal.id.in_(ids))
+    if numeros:
+        condiciones.append(Animal.numero_identificacion.in_(numeros))
+    animales = db.query(Animal).filter(
+        Animal.finca_id == current_user.finca_id,
+        or_(*condiciones)
+    ).all()
+    por_id = {a.id: a for a in animales}
+    por_numero = {a.numero_identificacion: a for a in animales}
+    
+    items = []
+    no_encontrados = []
+    for item in lote_in.registros:
+        animal = por_id.get(item.animal_id) if item.animal_id is not None else por_numero.get(item.numero_identificacion)
+        if animal is None:
+            no_encontrados.append(str(item.animal_id or item.numero_identificacion))
+        else:
+            items.append((animal, item))
+    
+    if no_encontrados:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Animales no encontrados en esta finca: {', '.join(no_encontrados)}"
+        )
+    
+    en_retiro = animales_en_retiro(
+        db, current_user.finca_id, "leche", lote_in.fecha, [animal.id for animal, _ in items]
+    )
+    
+    registros = []
+    rechazados = []
+    for animal, item in items:
+        if animal.id in en_retiro:
+            rechazados.append(OrdenoRechazado(
+                animal_id=animal.id,
+                animal_numero=animal.numero_identificacion,
+                cantidad_litros=item.cantidad_litros,
+                leche_liberada_desde=en_retiro[animal.id]
+            ))
+            continue
+        registros.append(RegistroProduccion(
+            finca_id=current_user.finca_id,
+            animal_id=animal.id,
+            tipo_produccion="leche",
+            fecha=lote_in.fecha,
+            turno=lote_in.turno,
+            cantidad_litros=item.cantidad_litros,
+            calidad=item.calidad,
+            observaciones=item.observaciones,
+            registrado_por=current_user.id
+        ))
+    
+    db.add_all(registros)
+    rollups_produccion.registrar_altas(db, registros)
+    db.commit()
+    
+    return OrdenoLoteResponse(
+        fecha=lote_in.fecha,
+        turno=lote_in.turno,
+        registrados=len(registros),
+        litros_registrados=round(sum(r.cantidad_litros for r in registros), 2),
+        rechazados=rechazados
+    )
+
+
 @router.get("/", response_model=RegistroProduccionListResponse)
 def listar_registros_produccion(
     *,
@@ -63,9 +181,11 @@ def listar_registros_produccion(
     fecha_desde: str | None = Query(None),
     fecha_hasta: str | None = Query(None),
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=100)
+    limit: int = Query(100, ge=1, le=100),
+    fields: str | None = Query(None, description=DESCRIPCION_FIELDS)
 ) -> Any:
     """Listar registros de producción"""
+    campos = PROYECCION_PRODUCCION.campos(fields)
     query = db.query(RegistroProduccion).filter(
         RegistroProduccion.finca_id == current_user.finca_id
     )
@@ -81,18 +201,119 @@ def listar_registros_produccion(
     
     query = query.order_by(RegistroProduccion.fecha.desc())
     total = query.count()
-    registros = query.offset(skip).limit(limit).all()
+    registros = PROYECCION_PRODUCCION.filas(query.offset(skip).limit(limit), campos)
+    
+    # Animales de la página en una sola consulta
+    ids = {
+        registro["animal_id"] for registro in registros
+    } if PROYECCION_PRODUCCION.incluye(campos, "animal_numero", "animal_nombre") else set()
+    animales = {
+        a.id: a for a in db.query(Animal.id, Animal.numero_identificacion, Animal.nombre).filter(
+            Animal.finca_id == current_user.finca_id,
+            Animal.id.in_(ids)
+        )
+    } if ids else {}
     
     items = []
     for registro in registros:
-        animal = db.query(Animal).filter(Animal.id == registro.animal_id).first()
-        items.append(RegistroProduccionResponse(
-            **registro.__dict__,
+        animal = animales.get(registro.get("animal_id"))
+        items.append({
+            **registro,
+            "animal_numero": animal.numero_identificacion if animal else None,
+            "animal_nombre": animal.nombre if animal else None
+        })
+    
+    return PROYECCION_PRODUCCION.respuesta(
+        RegistroProduccionListResponse, campos, total=total, items=items, skip=skip, limit=limit
+    )
+
+
+@router.get("/series", response_model=SeriesProduccionResponse)
+def series_produccion(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user),
+    agrupar: str = Query("finca", pattern="^(finca|lote|animal)$"),
+    resolucion: str = Query("dia", pattern="^(dia|semana|mes)$"),
+    fecha_desde: date | None = Query(None, description="Por defecto, últimos 90 días"),
+    fecha_hasta: date | None = Query(None),
+    animal_id: int | None = Query(None),
+    lote: str | None = Query(None),
+    max_points: int | None = Query(None, ge=3, le=5000, description="Reducir cada serie a este número de puntos (LTTB)")
+) -> Any:
+    """
+    Series de producción de leche agregadas para gráficos,
+    calculadas desde las tablas de resumen diario y mensual
+    """
+    fecha_hasta = fecha_hasta or date.today()
+    fecha_desde = fecha_desde or fecha_hasta - timedelta(days=90)
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(status_code=400, detail="fecha_desde debe ser anterior a fecha_hasta")
+    if agrupar == "animal" and animal_id is None and lote is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Para series por animal indique animal_id o lote"
+        )
+    
+    series = serie_produccion(
+        db,
+        current_user.finca_id,
+        agrupar=agrupar,
+        resolucion=resolucion,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+        animal_id=animal_id,
+        lote=lote,
+        max_puntos=max_points
+    )
+    
+    return SeriesProduccionResponse(
+        agrupar=agrupar,
+        resolucion=resolucion,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+        series=series
+    )
+
+
+@router.get("/lactancias", response_model=LactanciaListResponse)
+def listar_lactancias(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user),
+    animal_id: int | None = Query(None),
+    fecha_desde: date | None = Query(None, description="Partos desde esta fecha (por defecto, último año)"),
+    solo_en_curso: bool = Query(False)
+) -> Any:
+    """
+    Análisis de lactancias: producción acumulada, proyección a 305 días,
+    pico y persistencia según la curva de Wood ajustada a cada lactancia
+    """
+    if fecha_desde is None:
+        fecha_desde = date.today() - timedelta(days=365)
+    
+    lactancias = analizar_lactancias(db, current_user.finca_id, fecha_desde, animal_id)
+    if solo_en_curso:
+        lactancias = [l for l in lactancias if l["en_curso"]]
+    
+    ids = {l["animal_id"] for l in lactancias}
+    animales = {
+        a.id: a for a in db.query(Animal.id, Animal.numero_identificacion, Animal.nombre).filter(
+            Animal.finca_id == current_user.finca_id,
+            Animal.id.in_(ids)
+        )
+    } if ids else {}
+    
+    items = []
+    for lactancia in lactancias:
+        animal = animales.get(lactancia["animal_id"])
+        items.append(LactanciaResponse(
+            **lactancia,
             animal_numero=animal.numero_identificacion if animal else None,
             animal_nombre=animal.nombre if animal else None
         ))
     
-    return RegistroProduccionListResponse(total=total, items=items, skip=skip, limit=limit)
+    return LactanciaListResponse(total=len(items), items=items)
 
 
 @router.get("/{registro_id}", response_model=RegistroProduccionResponse)
@@ -113,7 +334,7 @@ def obtener_registro_produccion(
     
     animal = db.query(Animal).filter(Animal.id == registro.animal_id).first()
     return RegistroProduccionResponse(
-        **registro.__dict__,
+        **columnas_orm(registro),
         animal_numero=animal.numero_identificacion if animal else None,
         animal_nombre=animal.nombre if animal else None
     )
@@ -136,15 +357,26 @@ def actualizar_registro_produccion(
     if not registro:
         raise HTTPException(status_code=404, detail="Registro no encontrado")
     
-    for field, value in registro_in.model_dump(exclude_unset=True).items():
+    animal = db.query(Animal).filter(Animal.id == registro.animal_id).first()
+    cambios = registro_in.model_dump(exclude_unset=True)
+    
+    # Mover un registro de leche a otro día o convertirlo en leche: la nueva
+    # fecha pasa por la misma verificación de retiro que un alta
+    tipo = cambios.get("tipo_produccion", registro.tipo_produccion)
+    fecha = cambios.get("fecha", registro.fecha)
+    if tipo == "leche" and (tipo, fecha) != (registro.tipo_produccion, registro.fecha) and animal:
+        _verificar_sin_retiro_de_leche(db, animal, fecha)
+    
+    anterior = rollups_produccion.datos_registro(registro)
+    for field, value in cambios.items():
         setattr(registro, field, value)
+    rollups_produccion.registrar_cambio(db, anterior, registro)
     
     db.commit()
     db.refresh(registro)
     
-    animal = db.query(Animal).filter(Animal.id == registro.animal_id).first()
     return RegistroProduccionResponse(
-        **registro.__dict__,
+        **columnas_orm(registro),
         animal_numero=animal.numero_identificacion if animal else None,
         animal_nombre=animal.nombre if animal else None
     )
@@ -166,6 +398,7 @@ def eliminar_registro_produccion(
     if not registro:
         raise HTTPException(status_code=404, detail="Registro no encontrado")
     
+    rollups_produccion.registrar_baja(db, registro)
     db.delete(registro)
     db.commit()
     return None
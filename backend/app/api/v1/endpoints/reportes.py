@@ -0,0 +1,169 @@
+"""
+Endpoints de Reportes: estado de resultados y reportes descargables (PDF / XLSX)
+"""
+from datetime import date
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.db.database import get_db
+from app.core.deps import get_current_user
+from app.models.usuario import Usuario
+from app.models.trabajo_reporte import TrabajoReporte
+from app.services.reportes_financieros import estado_resultados
+from app.services.reportes_archivos import FORMATOS, solicitar_reporte, encolar, leer_archivo
+from app.schemas.reporte import (
+    EstadoResultadosResponse,
+    TrabajoReporteCreate,
+    TrabajoReporteResponse,
+    TrabajoReporteListResponse
+)
+
+router = APIRouter()
+
+
+@router.get("/pyg", response_model=EstadoResultadosResponse)
+def obtener_estado_resultados(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user),
+    fecha_desde: date | None = Query(None, description="Por defecto, inicio del año"),
+    fecha_hasta: date | None = Query(None),
+    dimension: str = Query("mes", pattern="^(mes|categoria|animal)$"),
+    comparar: str | None = Query(None, pattern="^(periodo_anterior|anio_anterior)$")
+) -> Any:
+    """
+    Estado de resultados (PyG) y flujo de caja por mes, categoría o animal.
+    
+    Incluye ventas, compras y gastos del libro, y los costos registrados en
+    los controles sanitarios y reproductivos. Por animal se obtiene precio de
+    compra vs. precio de venta vs. costos atribuidos.
+    """
+    fecha_hasta = fecha_hasta or date.today()
+    fecha_desde = fecha_desde or fecha_hasta.replace(month=1, day=1)
+    if fecha_desde > fecha_hasta:
+        raise HTTPException(status_code=400, detail="fecha_desde debe ser anterior a fecha_hasta")
+    
+    return estado_resultados(
+        db,
+        current_user.finca_id,
+        fecha_desde=fecha_desde,
+        fecha_hasta=fecha_hasta,
+        dimension=dimension,
+        comparar=comparar
+    )
+
+
+# ============================================
+# Reportes descargables (PDF / XLSX)
+# ============================================
+
+@router.post("/trabajos", response_model=TrabajoReporteResponse, status_code=status.HTTP_202_ACCEPTED)
+def crear_trabajo_reporte(
+    *,
+    db: Session = Depends(get_db),
+    trabajo_in: TrabajoReporteCreate,
+    current_user: Usuario = Depends(get_current_user),
+    response: Response
+) -> Any:
+    """
+    Solicitar un reporte PDF o Excel: inventario del hato, registro sanitario
+    para inspecciones del ICA, estado financiero o resumen de producción.
+    
+    El archivo se genera en segundo plano; consultar el estado en
+    GET /reportes/trabajos/{id} y descargarlo en /reportes/trabajos/{id}/archivo.
+    Si ya existe un reporte idéntico sobre los mismos datos, se devuelve ese.
+    """
+    trabajo, es_nuevo = solicitar_reporte(
+        db,
+        finca_id=current_user.finca_id,
+        tipo=trabajo_in.tipo,
+        formato=trabajo_in.formato,
+        fecha_desde=trabajo_in.fecha_desde,
+        fecha_hasta=trabajo_in.fecha_hasta,
+        usuario_id=current_user.id
+    )
+    db.commit()
+    db.refresh(trabajo)
+    
+    if es_nuevo:
+        encolar(trabajo.id)
+    elif trabajo.estado == "completado":
+        response.status_code = status.HTTP_200_OK
+    return trabajo
+
+
+@router.get("/trabajos", response_model=TrabajoReporteListResponse)
+def listar_trabajos_reporte(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=200)
+) -> Any:
+    """
+    Últimos reportes solicitados en la finca
+    """
+    query = db.query(TrabajoReporte).filter(TrabajoReporte.finca_id == current_user.finca_id)
+    total = query.count()
+    items = query.order_by(TrabajoReporte.id.desc()).limit(limit).all()
+    return TrabajoReporteListResponse(total=total, items=items)
+
+
+def _obtener_trabajo(db: Session, trabajo_id: int, finca_id: int) -> TrabajoReporte:
+    trabajo = db.query(TrabajoReporte).filter(
+        TrabajoReporte.id == trabajo_id,
+        TrabajoReporte.finca_id == finca_id
+    ).first()
+    if not trabajo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reporte no encontrado"
+        )
+    return trabajo
+
+
+@router.get("/trabajos/{trabajo_id}", response_model=TrabajoReporteResponse)
+def obtener_trabajo_reporte(
+    *,
+    db: Session = Depends(get_db),
+    trabajo_id: int,
+    current_user: Usuario = Depends(get_current_user)
+) -> Any:
+    """
+    Estado de un reporte solicitado
+    """
+    return _obtener_trabajo(db, trabajo_id, current_user.finca_id)
+
+
+@router.get("/trabajos/{trabajo_id}/archivo")
+def descargar_reporte(
+    *,
+    db: Session = Depends(get_db),
+    trabajo_id: int,
+    current_user: Usuario = Depends(get_current_user)
+) -> Any:
+    """
+    Descargar el archivo de un reporte completado
+    """
+    trabajo = _obtener_trabajo(db, trabajo_id, current_user.finca_id)
+    if trabajo.estado != "completado":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"El reporte aún no está disponible (estado: {trabajo.estado})"
+        )
+    
+    contenido = leer_archivo(trabajo.nombre_archivo)
+    if contenido is None:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="El archivo del reporte ya no existe; solicítelo de nuevo"
+        )
+    
+    # Sin Content-Length: el archivo pudo regenerarse (mismo nombre) con otro tamaño
+    nombre = f"{trabajo.tipo}_{trabajo.created_at:%Y%m%d}_{trabajo.id}.{trabajo.formato}"
+    return StreamingResponse(
+        contenido,
+        media_type=FORMATOS[trabajo.formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
@@ -5,19 +5,26 @@ from typing import Any
 from datetime import date, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from app.db.database import get_db
-from app.core.deps import get_current_user
+from app.core.deps import get_current_user, get_current_admin
+from app.core.proyeccion import DESCRIPCION_FIELDS, Proyeccion
+from app.core.respuestas import columnas_orm
 from app.models.usuario import Usuario
 from app.models.transaccion import Transaccion
 from app.models.animal import Animal
+from app.models.finanzas_resumen import CierrePeriodo
+from app.services import rollups_finanzas
+from app.services.pesajes import registrar_pesajes
+from app.services.retiros import fecha_liberacion
 from app.schemas.transaccion import (
     TransaccionCreate,
     TransaccionUpdate,
     TransaccionResponse,
     TransaccionListResponse,
-    ResumenFinanciero
+    ResumenFinanciero,
+    CierrePeriodoCreate,
+    CierrePeriodoResponse
 )
 from app.schemas.compra_animal import (
     CompraAnimalRequest,
@@ -26,6 +33,23 @@ from app.schemas.compra_animal import (
 
 router = APIRouter()
 
+# fields= del listado (ver app/core/proyeccion.py)
+PROYECCION_TRANSACCIONES = Proyeccion(
+    Transaccion,
+    TransaccionResponse,
+    presets={"resumen": ["fecha", "tipo", "concepto", "monto", "categoria_gasto"]},
+    dependencias={"animal_numero": ["animal_id"], "animal_nombre": ["animal_id"]}
+)
+
+
+def _verificar_periodo_abierto(db: Session, finca_id: int, fecha: date) -> None:
+    """Las transacciones de un mes cerrado no se pueden crear, modificar ni eliminar"""
+    if rollups_finanzas.periodo_cerrado(db, finca_id, fecha):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"El periodo {fecha.year}-{fecha.month:02d} está cerrado"
+        )
+
 
 @router.post("/compra-animal", response_model=CompraAnimalResponse, status_code=status.HTTP_201_CREATED)
 def comprar_animal(
@@ -50,22 +74,36 @@ def comprar_animal(
             detail=f"Ya existe un animal con identificación {data.animal.numero_identificacion} en tu finca"
         )
     
+    _verificar_periodo_abierto(db, current_user.finca_id, data.transaccion.fecha)
+    
     try:
         # 1. Crear el animal
         animal_dict = data.animal.model_dump()
+        peso_compra = animal_dict.pop("peso_actual", None)
         
         new_animal = Animal(
             **animal_dict,
             finca_id=current_user.finca_id,
             estado="activo",
             fecha_ingreso=data.transaccion.fecha,
-            tipo_adquisicion="comprado",
-            ultima_fecha_pesaje=data.transaccion.fecha if data.animal.peso_actual else None
+            tipo_adquisicion="comprado"
         )
         
         db.add(new_animal)
         db.flush()  # Para obtener el ID del animal antes del commit
         
+        # El peso de compra es el primer pesaje del historial, en la fecha de la compra
+        if peso_compra is not None:
+            registrar_pesajes(
+                db,
+                finca_id=current_user.finca_id,
+                fecha=data.transaccion.fecha,
+                pesos={new_animal.id: peso_compra},
+                animales={new_animal.id: new_animal},
+                registrado_por=current_user.id,
+                marcar_sync=False
+            )
+        
         # 2. Crear la transacción de compra
         concepto = f"Compra de animal {data.animal.numero_identificacion}"
         if data.animal.nombre:
@@ -89,6 +127,7 @@ def comprar_animal(
         )
         
         db.add(transaccion)
+        rollups_finanzas.registrar_alta(db, transaccion)
         db.commit()
         db.refresh(new_animal)
         db.refresh(transaccion)
@@ -99,7 +138,7 @@ def comprar_animal(
             transaccion_id=transaccion.id,
             mensaje=f"Animal '{new_animal.numero_identificacion}' creado y compra registrada exitosamente"
         )
-        
+    
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -116,6 +155,8 @@ def crear_transaccion(
     current_user: Usuario = Depends(get_current_user)
 ) -> Any:
     """Crear nueva transacción"""
+    _verificar_periodo_abierto(db, current_user.finca_id, transaccion_in.fecha)
+    
     animal = None
     if transaccion_in.animal_id:
         animal = db.query(Animal).filter(
@@ -127,6 +168,13 @@ def crear_transaccion(
         
         # Si es una VENTA, actualizar estado del animal a vendido
         if transaccion_in.tipo == "venta":
+            # No se puede vender para consumo un animal en retiro de carne
+            liberacion = fecha_liberacion(db, animal.id, "carne", transaccion_in.fecha)
+            if liberacion:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"El animal {animal.numero_identificacion} está en retiro de carne (apto para venta desde el {liberacion.isoformat()})"
+                )
             animal.estado = "vendido"
             animal.fecha_salida = transaccion_in.fecha
             animal.motivo_salida = f"Venta - {transaccion_in.concepto}"
@@ -147,11 +195,12 @@ def crear_transaccion(
     )
     
     db.add(db_transaccion)
+    rollups_finanzas.registrar_alta(db, db_transaccion)
     db.commit()
     db.refresh(db_transaccion)
     
     return TransaccionResponse(
-        **db_transaccion.__dict__,
+        **columnas_orm(db_transaccion),
         animal_numero=animal.numero_identificacion if animal else None,
         animal_nombre=animal.nombre if animal else None
     )
@@ -167,9 +216,11 @@ def listar_transacciones(
     fecha_hasta: str | None = Query(None),
     categoria_gasto: str | None = Query(None),
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=100)
+    limit: int = Query(100, ge=1, le=100),
+    fields: str | None = Query(None, description=DESCRIPCION_FIELDS)
 ) -> Any:
     """Listar transacciones"""
+    campos = PROYECCION_TRANSACCIONES.campos(fields)
     query = db.query(Transaccion).filter(
         Transaccion.finca_id == current_user.finca_id
     )
@@ -185,20 +236,98 @@ def listar_transacciones(
     
     query = query.order_by(Transaccion.fecha.desc())
     total = query.count()
-    transacciones = query.offset(skip).limit(limit).all()
+    transacciones = PROYECCION_TRANSACCIONES.filas(query.offset(skip).limit(limit), campos)
+    
+    # Animales de la página en una sola consulta
+    ids = {
+        trans["animal_id"] for trans in transacciones if trans["animal_id"]
+    } if PROYECCION_TRANSACCIONES.incluye(campos, "animal_numero", "animal_nombre") else set()
+    animales = {
+        a.id: a for a in db.query(Animal.id, Animal.numero_identificacion, Animal.nombre).filter(
+            Animal.finca_id == current_user.finca_id,
+            Animal.id.in_(ids)
+        )
+    } if ids else {}
     
     items = []
     for trans in transacciones:
-        animal = None
-        if trans.animal_id:
-            animal = db.query(Animal).filter(Animal.id == trans.animal_id).first()
-        items.append(TransaccionResponse(
-            **trans.__dict__,
-            animal_numero=animal.numero_identificacion if animal else None,
-            animal_nombre=animal.nombre if animal else None
-        ))
-    
-    return TransaccionListResponse(total=total, items=items, skip=skip, limit=limit)
+        animal = animales.get(trans.get("animal_id"))
+        items.append({
+            **trans,
+            "animal_numero": animal.numero_identificacion if animal else None,
+            "animal_nombre": animal.nombre if animal else None
+        })
+    
+    return PROYECCION_TRANSACCIONES.respuesta(
+        TransaccionListResponse, campos, total=total, items=items, skip=skip, limit=limit
+    )
+
+
+@router.get("/cierres", response_model=list[CierrePeriodoResponse])
+def listar_cierres(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+) -> Any:
+    """Listar los meses cerrados de la finca"""
+    return db.query(CierrePeriodo).filter(
+        CierrePeriodo.finca_id == current_user.finca_id
+    ).order_by(CierrePeriodo.anio.desc(), CierrePeriodo.mes.desc()).all()
+
+
+@router.post("/cierres", response_model=CierrePeriodoResponse, status_code=status.HTTP_201_CREATED)
+def cerrar_periodo(
+    *,
+    db: Session = Depends(get_db),
+    cierre_in: CierrePeriodoCreate,
+    current_user: Usuario = Depends(get_current_admin)
+) -> Any:
+    """
+    Cerrar un mes: sus transacciones quedan congeladas y se guarda
+    la foto de los totales del periodo
+    """
+    hoy = date.today()
+    if (cierre_in.anio, cierre_in.mes) >= (hoy.year, hoy.month):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Solo se pueden cerrar meses ya terminados"
+        )
+    
+    if rollups_finanzas.periodo_cerrado(db, current_user.finca_id, date(cierre_in.anio, cierre_in.mes, 1)):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"El periodo {cierre_in.anio}-{cierre_in.mes:02d} ya está cerrado"
+        )
+    
+    cierre = rollups_finanzas.cerrar_periodo(
+        db, current_user.finca_id, cierre_in.anio, cierre_in.mes, current_user.id
+    )
+    db.commit()
+    db.refresh(cierre)
+    return cierre
+
+
+@router.delete("/cierres/{anio}/{mes}", status_code=status.HTTP_204_NO_CONTENT)
+def reabrir_periodo(
+    *,
+    db: Session = Depends(get_db),
+    anio: int,
+    mes: int,
+    current_user: Usuario = Depends(get_current_admin)
+) -> None:
+    """Reabrir un mes cerrado para corregir transacciones"""
+    cierre = db.query(CierrePeriodo).filter(
+        CierrePeriodo.finca_id == current_user.finca_id,
+        CierrePeriodo.anio == anio,
+        CierrePeriodo.mes == mes
+    ).first()
+    
+    if not cierre:
+        raise HTTPException(status_code=404, detail="El periodo no está cerrado")
+    
+    db.delete(cierre)
+    db.commit()
+    return None
 
 
 @router.get("/{transaccion_id}", response_model=TransaccionResponse)
@@ -222,7 +351,7 @@ def obtener_transaccion(
         animal = db.query(Animal).filter(Animal.id == trans.animal_id).first()
     
     return TransaccionResponse(
-        **trans.__dict__,
+        **columnas_orm(trans),
         animal_numero=animal.numero_identificacion if animal else None,
         animal_nombre=animal.nombre if animal else None
     )
@@ -245,8 +374,15 @@ def actualizar_transaccion(
     if not trans:
         raise HTTPException(status_code=404, detail="Transacción no encontrada")
     
-    for field, value in transaccion_in.model_dump(exclude_unset=True).items():
+    update_data = transaccion_in.model_dump(exclude_unset=True)
+    _verificar_periodo_abierto(db, current_user.finca_id, trans.fecha)
+    if update_data.get("fecha"):
+        _verificar_periodo_abierto(db, current_user.finca_id, update_data["fecha"])
+    
+    anterior = rollups_finanzas.datos_transaccion(trans)
+    for field, value in update_data.items():
         setattr(trans, field, value)
+    rollups_finanzas.registrar_cambio(db, anterior, trans)
     
     db.commit()
     db.refresh(trans)
@@ -256,7 +392,7 @@ def actualizar_transaccion(
         animal = db.query(Animal).filter(Animal.id == trans.animal_id).first()
     
     return TransaccionResponse(
-        **trans.__dict__,
+        **columnas_orm(trans),
         animal_numero=animal.numero_identificacion if animal else None,
         animal_nombre=animal.nombre if animal else None
     )
@@ -278,6 +414,8 @@ def eliminar_transaccion(
     if not trans:
         raise HTTPException(status_code=404, detail="Transacción no encontrada")
     
+    _verificar_periodo_abierto(db, current_user.finca_id, trans.fecha)
+    
     # Si era una VENTA con animal, revertir el estado del animal
     if trans.tipo == "venta" and trans.animal_id:
         animal = db.query(Animal).filter(Animal.id == trans.animal_id).first()
@@ -287,6 +425,7 @@ def eliminar_transaccion(
             animal.motivo_salida = None
             db.add(animal)
     
+    rollups_finanzas.registrar_baja(db, trans)
     db.delete(trans)
     db.commit()
     return None
@@ -298,57 +437,23 @@ def obtener_resumen_financiero(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ) -> Any:
-    """Obtener resumen financiero de la finca"""
-    # Total ventas
-    total_ventas = db.query(func.sum(Transaccion.monto)).filter(
-        Transaccion.finca_id == current_user.finca_id,
-        Transaccion.tipo == "venta"
-    ).scalar() or 0.0
-    
-    # Total compras
-    total_compras = db.query(func.sum(Transaccion.monto)).filter(
-        Transaccion.finca_id == current_user.finca_id,
-        Transaccion.tipo == "compra"
-    ).scalar() or 0.0
-    
-    # Total gastos
-    total_gastos = db.query(func.sum(Transaccion.monto)).filter(
-        Transaccion.finca_id == current_user.finca_id,
-        Transaccion.tipo == "gasto"
-    ).scalar() or 0.0
+    """Obtener resumen financiero de la finca (desde el resumen mensual)"""
+    totales = rollups_finanzas.totales_por_tipo(db, current_user.finca_id)
+    total_ventas = totales.get("venta", 0.0)
+    total_compras = totales.get("compra", 0.0)
+    total_gastos = totales.get("gasto", 0.0)
     
     # Mes actual
-    primer_dia_mes = date.today().replace(day=1)
-    ventas_mes = db.query(func.sum(Transaccion.monto)).filter(
-        Transaccion.finca_id == current_user.finca_id,
-        Transaccion.tipo == "venta",
-        Transaccion.fecha >= primer_dia_mes
-    ).scalar() or 0.0
-    
-    gastos_mes = db.query(func.sum(Transaccion.monto)).filter(
-        Transaccion.finca_id == current_user.finca_id,
-        Transaccion.tipo == "gasto",
-        Transaccion.fecha >= primer_dia_mes
-    ).scalar() or 0.0
-    
-    # Gastos por categoría
-    gastos_por_cat = db.query(
-        Transaccion.categoria_gasto,
-        func.sum(Transaccion.monto).label("total")
-    ).filter(
-        Transaccion.finca_id == current_user.finca_id,
-        Transaccion.tipo == "gasto",
-        Transaccion.categoria_gasto.isnot(None)
-    ).group_by(Transaccion.categoria_gasto).all()
-    
-    gasto_por_categoria = {cat: float(total) for cat, total in gastos_por_cat}
+    mes_actual = rollups_finanzas.totales_por_tipo(
+        db, current_user.finca_id, desde=date.today().replace(day=1)
+    )
     
     return ResumenFinanciero(
-        total_ventas=float(total_ventas),
-        total_compras=float(total_compras),
-        total_gastos=float(total_gastos),
-        balance_neto=float(total_ventas - total_compras - total_gastos),
-        ventas_mes_actual=float(ventas_mes),
-        gastos_mes_actual=float(gastos_mes),
-        gasto_por_categoria=gasto_por_categoria
+        total_ventas=total_ventas,
+        total_compras=total_compras,
+        total_gastos=total_gastos,
+        balance_neto=total_ventas - total_compras - total_gastos,
+        ventas_mes_actual=mes_actual.get("venta", 0.0),
+        gastos_mes_actual=mes_actual.get("gasto", 0.0),
+        gasto_por_categoria=rollups_finanzas.gasto_por_categoria(db, current_user.finca_id)
     )
@@ -0,0 +1,51 @@
+"""
+Caché en memoria para resultados analíticos costosos
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class CacheVersionado:
+    """
+    Caché LRU por proceso en la que cada entrada guarda la "versión" de los datos
+    con que se calculó (p.ej. conteo y última modificación de las tablas de origen).
+    
+    Al consultar se pasa la versión actual: si no coincide, la entrada se descarta.
+    Así el resultado se invalida en cuanto llegan datos nuevos, incluso si el cambio
+    se hizo desde otro worker, sin necesidad de avisar a cada proceso.
+    """
+    
+    def __init__(self, max_entradas: int = 256):
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[Hashable, Tuple[Hashable, Any]]" = OrderedDict()
+        self._lock = Lock()
+    
+    def obtener(self, clave: Hashable, version: Hashable) -> Optional[Any]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            if entrada[0] != version:
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada[1]
+    
+    def guardar(self, clave: Hashable, version: Hashable, valor: Any) -> None:
+        with self._lock:
+            self._entradas[clave] = (version, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+    
+    def obtener_o_calcular(self, clave: Hashable, version: Hashable, calcular: Callable[[], Any]) -> Any:
+        valor = self.obtener(clave, version)
+        if valor is None:
+            valor = calcular()
+            self.guardar(clave, version, valor)
+        return valor
+    
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
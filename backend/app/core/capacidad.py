@@ -0,0 +1,78 @@
+"""
+Dimensionamiento de workers y del pool de conexiones a la base de datos.
+
+Cada worker del servidor (proceso de gunicorn/uvicorn) tiene su propio pool,
+así que el total de conexiones es workers x (pool_size + max_overflow) y debe
+caber en max_connections de Postgres (100 por defecto, menos en muchos planes
+administrados). Aquí se reparte ese presupuesto (DB_MAX_CONNECTIONS, menos
+DB_RESERVED_CONNECTIONS para migraciones, scripts y consolas) entre los
+workers declarados en WEB_CONCURRENCY.
+
+Con PgBouncer en modo transacción (DB_PGBOUNCER) el límite lo administra
+PgBouncer: la app no guarda conexiones propias (NullPool) y cada sesión abre
+una conexión barata contra PgBouncer.
+"""
+import os
+from typing import Any, Dict, Optional
+
+from sqlalchemy.pool import NullPool
+
+# Hilos con que Starlette ejecuta los endpoints síncronos (límite por defecto de
+# anyio): más conexiones por worker que hilos + reportes nunca se usarían
+HILOS_POR_WORKER = 40
+MINIMO_POR_WORKER = 3  # Una request, un reporte y margen para el health check
+
+
+def workers_recomendados(
+    configurados: Optional[int] = None,
+    presupuesto: int = 100,
+    reservadas: int = 10,
+    cpus: Optional[int] = None
+) -> int:
+    """
+    Workers del servidor: los configurados (WEB_CONCURRENCY) o 2 x CPUs + 1,
+    sin pasar de los que caben en el presupuesto de conexiones.
+    """
+    if configurados:
+        return max(1, configurados)
+    cpus = cpus or os.cpu_count() or 1
+    caben = max(1, (presupuesto - reservadas) // MINIMO_POR_WORKER)
+    return min(2 * cpus + 1, caben)
+
+
+def conexiones_por_worker(
+    workers: int,
+    presupuesto: int,
+    reservadas: int,
+    hilos_reportes: int = 0
+) -> int:
+    """Conexiones (pool_size + max_overflow) que le tocan a cada worker"""
+    disponibles = (presupuesto - reservadas) // max(1, workers)
+    return max(1, min(disponibles, HILOS_POR_WORKER + hilos_reportes))
+
+
+def opciones_pool(settings) -> Dict[str, Any]:
+    """
+    Argumentos de create_engine para el pool de este worker.
+
+    DB_POOL_SIZE y DB_MAX_OVERFLOW, si se configuran, tienen prioridad sobre
+    el reparto automático; el resto de conexiones del reparto queda como
+    overflow (se abren solo en picos y se cierran al devolverse).
+    """
+    if settings.DB_PGBOUNCER:
+        return {"poolclass": NullPool}
+
+    total = conexiones_por_worker(
+        settings.WEB_CONCURRENCY or 1,
+        settings.DB_MAX_CONNECTIONS,
+        settings.DB_RESERVED_CONNECTIONS,
+        settings.REPORTES_WORKERS
+    )
+    pool_size = settings.DB_POOL_SIZE or max(1, total // 3)
+    max_overflow = settings.DB_MAX_OVERFLOW if settings.DB_MAX_OVERFLOW is not None else max(0, total - pool_size)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
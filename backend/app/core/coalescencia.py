@@ -0,0 +1,187 @@
+"""
+Coalescencia de requests idénticas (single-flight).
+
+Cuando llegan a la vez varias requests que calculan lo mismo (p.ej. todos
+los trabajadores de una finca abriendo el dashboard a las 5am), solo la
+primera ejecuta el cálculo; las demás esperan y reciben el mismo resultado.
+No es una caché: el resultado se comparte solo con quienes esperaban
+mientras se calculaba, la siguiente request vuelve a calcular.
+
+Dentro de un worker los hilos se coordinan en memoria. Con
+COALESCE_BACKEND=redis además se coordinan los workers y nodos: el primero
+toma un lock en Redis (SET NX) y publica el resultado bajo el id de su
+ejecución; los demás lo leen de ahí. Si Redis no responde, o el worker que
+calculaba falla o tarda más que COALESCE_WAIT_SECONDS, cada uno calcula por
+su cuenta: la coalescencia ahorra trabajo, nunca debe impedirlo.
+
+Los resultados son bytes (p.ej. el JSON de la respuesta) para poder
+compartirlos entre procesos tal cual.
+"""
+import logging
+from threading import Event, Lock
+from time import monotonic, sleep
+from typing import Callable, Dict, Hashable, Optional, Tuple
+from uuid import uuid4
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _Vuelo:
+    """Cálculo en curso de una clave, con el resultado para quienes esperan"""
+    
+    __slots__ = ("terminado", "valor", "error", "esperando")
+    
+    def __init__(self):
+        self.terminado = Event()
+        self.valor: Optional[bytes] = None
+        self.error: Optional[BaseException] = None
+        self.esperando = 0
+
+
+# Borrar el lock solo si sigue siendo del mismo vuelo (no el de uno posterior)
+_SCRIPT_LIBERAR = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class CoordinadorRedis:
+    """Un solo cálculo por clave entre workers, con lock y resultado en Redis"""
+    
+    def __init__(
+        self,
+        url: str,
+        espera_max: float,
+        prefijo: str = "vuelo:",
+        intervalo: float = 0.02,
+        vida_resultado: float = 10.0
+    ):
+        import redis  # Solo con COALESCE_BACKEND=redis
+        
+        self.cliente = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.liberar = self.cliente.register_script(_SCRIPT_LIBERAR)
+        self.espera_max = espera_max
+        self.prefijo = prefijo
+        self.intervalo = intervalo
+        self.vida_resultado = vida_resultado
+    
+    def ejecutar(self, clave: str, calcular: Callable[[], bytes]) -> bytes:
+        lock = f"{self.prefijo}lock:{clave}"
+        vuelo = uuid4().hex
+        try:
+            # El lock vence solo por si el worker que calcula muere a mitad de camino
+            propio = self.cliente.set(lock, vuelo, nx=True, px=int(self.espera_max * 1000))
+            lider = None if propio else self.cliente.get(lock)
+        except Exception as e:
+            logger.warning("Coalescencia sin Redis (%s); se calcula localmente", e)
+            return calcular()
+        
+        if propio:
+            valor = None
+            try:
+                valor = calcular()
+            finally:
+                self._publicar(lock, vuelo, valor)
+            return valor
+        
+        if lider is not None:
+            valor = self._esperar(lock, lider.decode())
+            if valor is not None:
+                return valor
+        # El lock se liberó entre SET y GET, el otro worker falló o tardó demasiado
+        return calcular()
+    
+    def _publicar(self, lock: str, vuelo: str, valor: Optional[bytes]) -> None:
+        # Primero el resultado y después liberar el lock: quien vea el lock libre ya lo encuentra
+        try:
+            if valor is not None:
+                self.cliente.set(f"{self.prefijo}resultado:{vuelo}", valor, px=int(self.vida_resultado * 1000))
+            self.liberar(keys=[lock], args=[vuelo])
+        except Exception as e:
+            logger.warning("No se pudo publicar el resultado en Redis (%s)", e)
+    
+    def _esperar(self, lock: str, lider: str) -> Optional[bytes]:
+        """Resultado del vuelo `lider`, o None si no llega"""
+        resultado = f"{self.prefijo}resultado:{lider}"
+        limite = monotonic() + self.espera_max
+        try:
+            while monotonic() < limite:
+                valor = self.cliente.get(resultado)
+                if valor is not None:
+                    return valor
+                if self.cliente.get(lock) != lider.encode():
+                    # Lock liberado: el resultado ya debería estar; si no, el líder falló
+                    return self.cliente.get(resultado)
+                sleep(self.intervalo)
+        except Exception as e:
+            logger.warning("Coalescencia sin Redis (%s); se calcula localmente", e)
+        return None
+
+
+class Coalescedor:
+    """
+    Ejecuta una sola vez los cálculos concurrentes con la misma clave.
+    
+    Ejemplo:
+        contenido = coalescedor().ejecutar(
+            ("dashboard", finca_id, hoy), lambda: calcular_dashboard(db, finca_id)
+        )
+    """
+    
+    def __init__(self, espera_max: float = 30, redis: Optional[CoordinadorRedis] = None):
+        self.espera_max = espera_max
+        self.redis = redis
+        self._vuelos: Dict[Tuple[Hashable, ...], _Vuelo] = {}
+        self._lock = Lock()
+        self.calculos = 0
+        self.compartidos = 0
+    
+    def ejecutar(self, clave: Tuple[Hashable, ...], calcular: Callable[[], bytes]) -> bytes:
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[clave] = _Vuelo()
+            else:
+                vuelo.esperando += 1
+        
+        if not lider:
+            if not vuelo.terminado.wait(self.espera_max):
+                return calcular()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.valor
+        
+        try:
+            if self.redis is not None:
+                vuelo.valor = self.redis.ejecutar(":".join(map(str, clave)), calcular)
+            else:
+                vuelo.valor = calcular()
+            return vuelo.valor
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._vuelos[clave]
+                self.calculos += 1
+                self.compartidos += vuelo.esperando
+            vuelo.terminado.set()
+
+
+_coalescedor: Optional[Coalescedor] = None
+
+
+def coalescedor() -> Coalescedor:
+    """Coalescedor del proceso según COALESCE_BACKEND, creado al primer uso"""
+    global _coalescedor
+    if _coalescedor is None:
+        redis = None
+        if settings.COALESCE_BACKEND == "redis":
+            redis = CoordinadorRedis(settings.REDIS_URL, settings.COALESCE_WAIT_SECONDS)
+        _coalescedor = Coalescedor(settings.COALESCE_WAIT_SECONDS, redis)
+    return _coalescedor
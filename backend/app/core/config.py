@@ -19,6 +19,16 @@ class Settings(BaseSettings):
     DATABASE_URL: str = Field(..., env="DATABASE_URL")
     DATABASE_TEST_URL: Optional[str] = None
     
+    # Servidor y pool de conexiones (ver app/core/capacidad.py y gunicorn.conf.py)
+    WEB_CONCURRENCY: Optional[int] = None  # Workers del servidor; None = 1 (uvicorn simple)
+    DB_MAX_CONNECTIONS: int = 100  # max_connections de Postgres para esta app
+    DB_RESERVED_CONNECTIONS: int = 10  # Para migraciones, scripts y consolas
+    DB_POOL_SIZE: Optional[int] = None  # None = repartir el presupuesto entre workers
+    DB_MAX_OVERFLOW: Optional[int] = None
+    DB_POOL_TIMEOUT: int = 30  # Segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = 1800  # Renovar conexiones con más de N segundos
+    DB_PGBOUNCER: bool = False  # PgBouncer en modo transacción: sin pool propio
+    
     # Seguridad JWT
     SECRET_KEY: str = Field(..., env="SECRET_KEY")
     ALGORITHM: str = "HS256"
@@ -35,6 +45,59 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE_MB: int = 10
     ALLOWED_IMAGE_EXTENSIONS: List[str] = ["jpg", "jpeg", "png", "webp"]
     
+    # Almacenamiento de medios (local o compatible con S3)
+    MEDIA_BACKEND: str = "local"  # local, s3
+    MEDIA_ROOT: str = "media"
+    MEDIA_URL: str = "/media"
+    S3_BUCKET: Optional[str] = None
+    S3_ENDPOINT_URL: Optional[str] = None  # MinIO u otro servicio compatible
+    S3_REGION: Optional[str] = None
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_PUBLIC_URL: Optional[str] = None  # URL pública base (CDN) de los objetos
+    MEDIA_CACHE_MAX_AGE: int = 3600  # Segundos, para archivos sin hash en el nombre
+    MEDIA_SENDFILE: Optional[str] = None  # x-accel-redirect (nginx), x-sendfile (Apache)
+    MEDIA_ACCEL_PREFIX: str = "/media-interno"  # location interna de nginx
+    
+    # Reportes descargables (PDF/XLSX); no se sirven como estáticos. Se guardan con
+    # MEDIA_BACKEND: en local bajo REPORTES_ROOT (un solo nodo, o disco compartido),
+    # en S3 bajo REPORTES_S3_PREFIX del bucket, que no debe ser de lectura pública
+    REPORTES_ROOT: str = "reportes"
+    REPORTES_S3_PREFIX: str = "reportes"
+    REPORTES_WORKERS: int = 2  # Hilos dedicados a generar reportes
+    REPORTES_TIMEOUT_MINUTOS: int = 30  # Un trabajo en proceso por más tiempo se da por abandonado
+    REPORTES_RETENCION_DIAS: float = 7  # Archivos sin pedir por más tiempo se borran
+    
+    # Arranque: crear tablas y usuario inicial en cada arranque (desarrollo).
+    # En producción conviene False y ejecutar python preparar_db.py una vez por deploy
+    INIT_DB_ON_STARTUP: bool = True
+    DB_POOL_PREWARM: int = 2  # Conexiones abiertas al arrancar cada worker
+    
+    # Métricas de rendimiento (Server-Timing en cada respuesta). /metrics en formato
+    # Prometheus solo existe con METRICS_TOKEN y exige "Authorization: Bearer <token>";
+    # las métricas son por worker (ver app/core/metricas.py)
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None
+    # Detector de consultas N+1 para desarrollo: None (apagado), log o raise
+    N1_DETECTOR: Optional[str] = None
+    N1_THRESHOLD: int = 10  # Repeticiones de una misma consulta por request
+    # Registro de consultas lentas (None = apagado); EXPLAIN solo en Postgres
+    SLOW_QUERY_MS: Optional[int] = 500
+    SLOW_QUERY_SAMPLE_RATE: float = 1.0  # Fracción de las consultas lentas que se registra
+    SLOW_QUERY_MAX_PER_MINUTE: int = 30  # Por proceso
+    SLOW_QUERY_EXPLAIN: bool = True  # Plan en un hilo y conexión aparte, sin demorar la request
+    SLOW_QUERY_EXPLAIN_ANALYZE: bool = False  # ANALYZE vuelve a ejecutar la consulta: solo para diagnosticar
+    
+    # Límites de uso por usuario y finca (ver app/core/limites.py)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Optional[str] = None  # memory, redis (compartido); None = redis con WEB_CONCURRENCY > 1
+    RATE_LIMIT_FACTOR: float = 1.0  # Escala todos los presupuestos
+    # Descarte de carga: 503 si la espera por el pool supera N ms (None = apagado)
+    LOAD_SHED_POOL_WAIT_MS: Optional[int] = 250
+    # Agregados concurrentes idénticos: una sola ejecución (ver app/core/coalescencia.py)
+    COALESCE_BACKEND: str = "memory"  # memory (por worker), redis (también entre workers)
+    COALESCE_WAIT_SECONDS: float = 30  # Espera máxima por el resultado de otro worker
+    
     # Localización
     TIMEZONE: str = "America/Bogota"
     LOCALE: str = "es_CO"
@@ -0,0 +1,153 @@
+"""
+Detector de consultas N+1 (desarrollo y pruebas).
+
+Cuenta las sentencias SQL de cada request agrupadas por su texto
+parametrizado (el mismo SELECT con distinto id cuenta como la misma). Si una
+se repite más de N1_THRESHOLD veces, se registra una advertencia o se lanza
+ConsultasRepetidasError (según N1_DETECTOR) con la traza hasta la línea del
+código de la app que la originó, típicamente un db.query() dentro de un for.
+
+En las pruebas, presupuesto_consultas() limita además el total de consultas
+de un bloque (ver app/core/pytest_consultas.py).
+"""
+import logging
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+MODOS = ("log", "raise")
+
+_DIR_APP = str(Path(__file__).resolve().parent.parent)
+_ESTE_ARCHIVO = str(Path(__file__).resolve())
+
+
+class ConsultasRepetidasError(RuntimeError):
+    """Una misma sentencia superó el umbral de repeticiones en una request"""
+
+
+class PresupuestoConsultasExcedido(AssertionError):
+    """Un bloque vigilado ejecutó más consultas que las permitidas"""
+
+
+class RegistroConsultas:
+    """
+    Sentencias ejecutadas dentro de un bloque vigilado. Si el bloque está
+    dentro de otro (p.ej. la request de una prueba con presupuesto), cada
+    sentencia se cuenta también en el registro de afuera.
+    """
+    
+    def __init__(self, umbral: Optional[int], modo: str = "raise", padre: Optional["RegistroConsultas"] = None):
+        if modo not in MODOS:
+            raise ValueError(f"Modo inválido: {modo}. Use: {', '.join(MODOS)}")
+        self.umbral = umbral
+        self.modo = modo
+        self.padre = padre
+        self.conteos: Counter = Counter()
+        self.reportadas: List[str] = []
+    
+    @property
+    def total(self) -> int:
+        return sum(self.conteos.values())
+    
+    def registrar(self, sentencia: str) -> None:
+        if self.padre is not None:
+            self.padre.registrar(sentencia)
+        self.conteos[sentencia] += 1
+        if self.umbral is None or self.conteos[sentencia] != self.umbral + 1:
+            return
+        # Se reporta una sola vez por sentencia, al superar el umbral
+        self.reportadas.append(sentencia)
+        mensaje = (
+            f"Posible N+1: la misma consulta se ejecutó más de {self.umbral} veces en una request\n"
+            f"  {_resumir(sentencia)}\n"
+            f"Originada en:\n{_traza_app()}"
+        )
+        if self.modo == "raise":
+            raise ConsultasRepetidasError(mensaje)
+        logger.warning(mensaje)
+
+
+# Registro del bloque en curso. Viaja con el contexto: el TestClient copia el
+# de la prueba al hilo de la app y FastAPI al del endpoint, así que solo se
+# cuentan las sentencias de las requests de la prueba, no las de otros hilos
+_registro_actual: ContextVar[Optional[RegistroConsultas]] = ContextVar("registro_consultas", default=None)
+
+
+def _resumir(sentencia: str, largo: int = 300) -> str:
+    sentencia = " ".join(sentencia.split())
+    return sentencia if len(sentencia) <= largo else sentencia[:largo] + "..."
+
+
+def _traza_app() -> str:
+    """Frames del código de la app (sin SQLAlchemy, Starlette ni este módulo)"""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(_DIR_APP) and frame.filename != _ESTE_ARCHIVO
+    ]
+    return "".join(traceback.format_list(frames[-6:])) or "  (fuera del código de la app)\n"
+
+
+def _contar_sentencia(conn, cursor, statement, parameters, context, executemany):
+    registro = _registro_actual.get()
+    if registro is not None:
+        registro.registrar(statement)
+
+
+def instrumentar_engine(engine: Engine) -> None:
+    """Registrar el contador de sentencias en el engine (una sola vez)"""
+    if not event.contains(engine, "before_cursor_execute", _contar_sentencia):
+        event.listen(engine, "before_cursor_execute", _contar_sentencia)
+
+
+@contextmanager
+def vigilar_consultas(umbral: Optional[int], modo: str = "raise") -> Iterator[RegistroConsultas]:
+    """Contar las sentencias ejecutadas dentro del bloque (en su contexto)"""
+    registro = RegistroConsultas(umbral, modo, padre=_registro_actual.get())
+    token = _registro_actual.set(registro)
+    try:
+        yield registro
+    finally:
+        _registro_actual.reset(token)
+
+
+@contextmanager
+def presupuesto_consultas(maximo: Optional[int] = None, repeticiones: Optional[int] = None) -> Iterator[RegistroConsultas]:
+    """
+    Fallar si el bloque ejecuta más de `maximo` consultas en total, o si una
+    misma sentencia se repite más de `repeticiones` veces.
+    
+    Ejemplo:
+        with presupuesto_consultas(maximo=4, repeticiones=1):
+            client.get("/api/v1/control-sanitario/", headers=headers)
+    """
+    with vigilar_consultas(repeticiones, "raise") as registro:
+        yield registro
+    if maximo is not None and registro.total > maximo:
+        detalle = "\n".join(f"  {veces} x {_resumir(sentencia, 150)}" for sentencia, veces in registro.conteos.most_common())
+        raise PresupuestoConsultasExcedido(
+            f"Se ejecutaron {registro.total} consultas (máximo {maximo}):\n{detalle}"
+        )
+
+
+class DetectorNMasUnoMiddleware:
+    """Middleware ASGI que vigila las consultas de cada request"""
+    
+    def __init__(self, app, umbral: int, modo: str = "log"):
+        self.app = app
+        self.umbral = umbral
+        self.modo = modo
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with vigilar_consultas(self.umbral, self.modo):
+            await self.app(scope, receive, send)
@@ -0,0 +1,237 @@
+"""
+Registro de consultas lentas.
+
+Cada sentencia que tarda más de SLOW_QUERY_MS se registra (logger
+app.core.consultas_lentas) con su duración, el SQL, los parámetros con los
+textos ocultos, el endpoint y la línea de la app que la ejecutó y, en
+Postgres, su plan de ejecución.
+
+Para dejarlo encendido con carga:
+- Muestreo: solo una fracción (SLOW_QUERY_SAMPLE_RATE) de las lentas se registra.
+- Límite: como máximo SLOW_QUERY_MAX_PER_MINUTE registros por minuto y proceso.
+- El plan se obtiene fuera de la request: un hilo aparte lo pide en una
+  conexión propia (fuera del pool de la app) y registra la consulta cuando lo
+  tiene, así la request no espera ni se ocupa su conexión. Solo para SELECT,
+  una vez por sentencia cada EXPLAIN_INTERVALO segundos.
+- Por defecto es un EXPLAIN simple, que no ejecuta la consulta. EXPLAIN
+  (ANALYZE, BUFFERS) la vuelve a ejecutar y duplica su costo en la base:
+  se activa con SLOW_QUERY_EXPLAIN_ANALYZE, en una transacción de solo
+  lectura con statement_timeout.
+"""
+import hashlib
+import logging
+import random
+import re
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from threading import Lock
+from time import monotonic, perf_counter
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.pool import NullPool
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_INTERVALO = 600  # Segundos antes de volver a explicar la misma sentencia
+EXPLAIN_PENDIENTES = 10  # Planes en cola; con más, las lentas se registran sin plan
+EXPLAIN_TIMEOUT_MS = 30_000  # statement_timeout de EXPLAIN ANALYZE
+MAX_SQL = 4000  # Caracteres del SQL en el registro
+
+_DIR_APP = str(Path(__file__).resolve().parent.parent)
+_DIR_ENDPOINTS = str(Path(_DIR_APP) / "api")
+_ESTE_ARCHIVO = str(Path(__file__).resolve())
+_SOLO_LECTURA = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_ESCRITURA = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+
+class LimiteRegistros:
+    """Ventana fija de un minuto: cuántos registros quedan en el minuto actual"""
+    
+    def __init__(self, por_minuto: int):
+        self.por_minuto = por_minuto
+        self._inicio_ventana = monotonic()
+        self._usados = 0
+        self._omitidos = 0
+        self._lock = Lock()
+    
+    def permitir(self) -> tuple:
+        """(permitido, omitidos desde el último registro permitido)"""
+        with self._lock:
+            ahora = monotonic()
+            if ahora - self._inicio_ventana >= 60:
+                self._inicio_ventana = ahora
+                self._usados = 0
+            if self._usados >= self.por_minuto:
+                self._omitidos += 1
+                return False, 0
+            self._usados += 1
+            omitidos, self._omitidos = self._omitidos, 0
+            return True, omitidos
+
+
+def ocultar_parametros(parametros: Any) -> Any:
+    """Conservar números, fechas y nulos; reemplazar textos y binarios por su tipo y largo"""
+    if isinstance(parametros, dict):
+        return {clave: ocultar_parametros(valor) for clave, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [ocultar_parametros(valor) for valor in parametros]
+    if parametros is None or isinstance(parametros, (bool, int, float, date, datetime)):
+        return parametros
+    if isinstance(parametros, (str, bytes)):
+        return f"<{type(parametros).__name__} len={len(parametros)}>"
+    return f"<{type(parametros).__name__}>"
+
+
+def _origen() -> Dict[str, Optional[str]]:
+    """Endpoint (función en app/api) y línea más interna de la app que ejecutó la consulta"""
+    endpoint = linea = None
+    for frame in traceback.extract_stack():
+        if not frame.filename.startswith(_DIR_APP) or frame.filename == _ESTE_ARCHIVO:
+            continue
+        ubicacion = f"{Path(frame.filename).relative_to(Path(_DIR_APP).parent)}:{frame.lineno} {frame.name}"
+        if frame.filename.startswith(_DIR_ENDPOINTS) and endpoint is None:
+            endpoint = ubicacion
+        linea = ubicacion
+    return {"endpoint": endpoint, "linea": linea}
+
+
+class RegistroConsultasLentas:
+    """Listener de engine que mide y registra las consultas lentas"""
+    
+    def __init__(
+        self,
+        umbral_ms: float,
+        muestreo: float = 1.0,
+        por_minuto: int = 30,
+        explain: bool = True,
+        explain_analyze: bool = False
+    ):
+        self.umbral = umbral_ms / 1000
+        self.muestreo = muestreo
+        self.limite = LimiteRegistros(por_minuto)
+        self.explain = explain
+        self.explain_analyze = explain_analyze
+        self._explicadas: Dict[str, float] = {}
+        self._lock = Lock()
+        self._pendientes = 0
+        # Hilo y engine sin pool para los EXPLAIN, creados al primer uso
+        self._ejecutor: Optional[ThreadPoolExecutor] = None
+        self._motor_explain: Optional[Engine] = None
+    
+    def antes(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._inicio_lenta = perf_counter()
+    
+    def despues(self, conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, "_inicio_lenta", None)
+        if inicio is None:
+            return
+        duracion = perf_counter() - inicio
+        if duracion < self.umbral or random.random() >= self.muestreo:
+            return
+        permitido, omitidos = self.limite.permitir()
+        if not permitido:
+            return
+        
+        datos = {
+            "duracion_ms": round(duracion * 1000, 1),
+            "sql": statement[:MAX_SQL],
+            "parametros": (
+                f"<executemany: {len(parameters)} filas>" if executemany else ocultar_parametros(parameters)
+            ),
+            **_origen(),
+        }
+        if omitidos:
+            datos["omitidas_por_limite"] = omitidos
+        
+        if self._reservar_explain(conn.dialect.name, statement, executemany):
+            # El registro sale del hilo de EXPLAIN, con el plan
+            self._ejecutor_explain().submit(self._explicar_y_registrar, conn.engine.url, statement, parameters, datos)
+        else:
+            self._registrar(datos)
+    
+    def _registrar(self, datos: Dict[str, Any]) -> None:
+        plan = datos.get("plan")
+        logger.warning(
+            "Consulta lenta (%.1f ms) en %s\n%s\nParámetros: %s%s",
+            datos["duracion_ms"], datos["endpoint"] or datos["linea"] or "(fuera de la app)",
+            datos["sql"], datos["parametros"], f"\nPlan:\n{plan}" if plan else "",
+            extra={"consulta_lenta": datos}
+        )
+    
+    def _reservar_explain(self, dialecto: str, statement: str, executemany: bool) -> bool:
+        """Si corresponde pedir el plan de esta sentencia (y ocupar su lugar en la cola)"""
+        if not self.explain or executemany or dialecto != "postgresql":
+            return False
+        if not _SOLO_LECTURA.match(statement) or _ESCRITURA.search(statement):
+            return False
+        clave = hashlib.sha1(statement.encode()).hexdigest()
+        ahora = monotonic()
+        with self._lock:
+            if self._pendientes >= EXPLAIN_PENDIENTES:
+                return False
+            if ahora - self._explicadas.get(clave, -EXPLAIN_INTERVALO) < EXPLAIN_INTERVALO:
+                return False
+            self._explicadas[clave] = ahora
+            if len(self._explicadas) > 1000:
+                self._explicadas = {k: v for k, v in self._explicadas.items() if ahora - v < EXPLAIN_INTERVALO}
+            self._pendientes += 1
+        return True
+    
+    def _ejecutor_explain(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._ejecutor is None:
+                self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+            return self._ejecutor
+    
+    def _explicar_y_registrar(self, url: URL, statement: str, parameters, datos: Dict[str, Any]) -> None:
+        try:
+            datos["plan"] = self._explicar(url, statement, parameters)
+        except Exception as e:
+            datos["plan"] = f"(EXPLAIN falló: {e})"
+        finally:
+            with self._lock:
+                self._pendientes -= 1
+        self._registrar(datos)
+    
+    def _explicar(self, url: URL, statement: str, parameters) -> str:
+        """
+        Plan de la sentencia en una conexión propia (sin pool: no le quita
+        conexiones a las requests). Las escrituras sin confirmar de la request
+        no se ven, lo que no cambia el plan de un SELECT.
+        """
+        if self._motor_explain is None:
+            self._motor_explain = create_engine(url, poolclass=NullPool)
+        conexion = self._motor_explain.raw_connection()
+        try:
+            cursor = conexion.cursor()
+            if self.explain_analyze:
+                # ANALYZE ejecuta la consulta: solo lectura y con tiempo máximo
+                cursor.execute("SET TRANSACTION READ ONLY")
+                cursor.execute(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}")
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+            else:
+                cursor.execute(f"EXPLAIN {statement}", parameters)
+            return "\n".join(fila[0] for fila in cursor.fetchall())
+        finally:
+            conexion.rollback()
+            conexion.close()
+
+
+def instrumentar_engine(
+    engine: Engine,
+    umbral_ms: float,
+    muestreo: float = 1.0,
+    por_minuto: int = 30,
+    explain: bool = True,
+    explain_analyze: bool = False
+) -> RegistroConsultasLentas:
+    """Registrar el log de consultas lentas en el engine"""
+    registro = RegistroConsultasLentas(umbral_ms, muestreo, por_minuto, explain, explain_analyze)
+    event.listen(engine, "before_cursor_execute", registro.antes)
+    event.listen(engine, "after_cursor_execute", registro.despues)
+    return registro
@@ -0,0 +1,315 @@
+"""
+Límites de uso por usuario y por finca, y descarte de carga.
+
+Límites (429): cubetas de tokens por usuario y por finca para cada categoría
+de endpoints; las pesadas (dashboard, sync, reportes) tienen presupuestos más
+chicos que la general. Cada cubeta admite una ráfaga de `capacidad` requests
+y se rellena a `por_minuto`. El estado vive en memoria (un solo nodo,
+pruebas) o en Redis (varios workers o nodos), según RATE_LIMIT_BACKEND; sin
+configurarlo se usa Redis cuando WEB_CONCURRENCY > 1, porque en memoria cada
+worker tendría sus propias cubetas y el límite efectivo se multiplicaría por
+el número de workers. La dependencia lee el usuario y la finca del JWT sin
+tocar la base, así un cliente que sincroniza en bucle no consume conexiones
+del pool.
+
+Descarte de carga (503): se mide cuánto esperan las requests por una
+conexión del pool (promedio móvil que decae con el tiempo). Si supera
+LOAD_SHED_POOL_WAIT_MS se rechazan primero las categorías pesadas, y con el
+doble, todo salvo /health y /metrics, con Retry-After para que los clientes
+reintenten más tarde en vez de encolarse.
+"""
+import logging
+import math
+from dataclasses import dataclass
+from threading import Lock
+from time import monotonic, perf_counter
+from typing import Callable, Dict, Iterable, Tuple
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.security import decode_token
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Presupuesto:
+    """Ráfaga y ritmo sostenido (requests por minuto) de una cubeta"""
+    capacidad: int
+    por_minuto: float
+
+
+# Presupuestos por categoría: (por usuario, por finca). RATE_LIMIT_FACTOR los escala
+PRESUPUESTOS: Dict[str, Tuple[Presupuesto, Presupuesto]] = {
+    "general": (Presupuesto(60, 300), Presupuesto(200, 1200)),
+    "dashboard": (Presupuesto(10, 30), Presupuesto(30, 120)),
+    "sync": (Presupuesto(4, 12), Presupuesto(12, 60)),
+    "reportes": (Presupuesto(5, 20), Presupuesto(15, 60)),
+}
+
+# Prefijos de cada categoría pesada, para descartar carga antes de resolver la ruta
+PREFIJOS_PESADOS = {
+    "dashboard": "/api/v1/dashboard",
+    "sync": "/api/v1/sync",
+    "reportes": "/api/v1/reportes",
+}
+SIN_DESCARTE = ("/health", "/metrics")
+
+
+class LimitadorMemoria:
+    """Cubetas de tokens en memoria del proceso (un worker, pruebas)"""
+    
+    def __init__(self, max_claves: int = 100_000):
+        self._cubetas: Dict[str, Tuple[float, float]] = {}
+        self._lock = Lock()
+        self.max_claves = max_claves
+    
+    def consumir(self, clave: str, presupuesto: Presupuesto, costo: float = 1) -> Tuple[bool, float]:
+        """(permitido, segundos hasta tener tokens suficientes)"""
+        ritmo = presupuesto.por_minuto / 60
+        with self._lock:
+            ahora = monotonic()
+            tokens, ultimo = self._cubetas.get(clave, (presupuesto.capacidad, ahora))
+            tokens = min(presupuesto.capacidad, tokens + (ahora - ultimo) * ritmo)
+            permitido = tokens >= costo
+            if permitido:
+                tokens -= costo
+            if len(self._cubetas) >= self.max_claves and clave not in self._cubetas:
+                self._purgar(ahora)
+            self._cubetas[clave] = (tokens, ahora)
+        return permitido, 0.0 if permitido else (costo - tokens) / ritmo
+    
+    def _purgar(self, ahora: float) -> None:
+        # Una cubeta sin uso por 10 minutos ya está llena: olvidarla no cambia nada
+        self._cubetas = {k: v for k, v in self._cubetas.items() if ahora - v[1] < 600}
+    
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._cubetas.clear()
+
+
+# Cubeta de tokens atómica en Redis: HASH con tokens y marca de tiempo (ms)
+_SCRIPT_REDIS = """
+local capacidad = tonumber(ARGV[1])
+local ritmo = tonumber(ARGV[2])
+local costo = tonumber(ARGV[3])
+local ahora = tonumber(ARGV[4])
+local estado = redis.call('HMGET', KEYS[1], 't', 'u')
+local tokens = tonumber(estado[1]) or capacidad
+local ultimo = tonumber(estado[2]) or ahora
+tokens = math.min(capacidad, tokens + math.max(0, ahora - ultimo) / 1000 * ritmo)
+local permitido = 0
+if tokens >= costo then
+    tokens = tokens - costo
+    permitido = 1
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'u', ahora)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacidad / ritmo * 1000) + 1000)
+return {permitido, tostring(tokens)}
+"""
+
+
+class LimitadorRedis:
+    """Cubetas de tokens en Redis, compartidas entre workers y nodos"""
+    
+    def __init__(self, url: str, prefijo: str = "limite:"):
+        import redis  # Solo con RATE_LIMIT_BACKEND=redis
+        
+        self.cliente = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.script = self.cliente.register_script(_SCRIPT_REDIS)
+        self.prefijo = prefijo
+        self._ultimo_aviso = -math.inf
+    
+    def consumir(self, clave: str, presupuesto: Presupuesto, costo: float = 1) -> Tuple[bool, float]:
+        ritmo = presupuesto.por_minuto / 60
+        try:
+            # Hora del servidor de Redis: la misma para todos los nodos
+            segundos, microsegundos = self.cliente.time()
+            ahora = segundos * 1000 + microsegundos // 1000
+            permitido, tokens = self.script(
+                keys=[self.prefijo + clave], args=[presupuesto.capacidad, ritmo, costo, ahora]
+            )
+        except Exception as e:
+            # Si Redis no responde se deja pasar: el límite protege, no debe tumbar la API.
+            # Un aviso por minuto, no uno por request
+            if monotonic() - self._ultimo_aviso > 60:
+                self._ultimo_aviso = monotonic()
+                logger.warning("Límite de uso sin Redis (%s); requests permitidas", e)
+            return True, 0.0
+        return bool(permitido), 0.0 if permitido else (costo - float(tokens)) / ritmo
+
+
+_limitador = None
+
+
+def backend_limitador() -> str:
+    """RATE_LIMIT_BACKEND o, si no se configuró, redis con varios workers y memory con uno"""
+    if settings.RATE_LIMIT_BACKEND:
+        return settings.RATE_LIMIT_BACKEND
+    return "redis" if (settings.WEB_CONCURRENCY or 1) > 1 else "memory"
+
+
+def limitador():
+    """Backend configurado (ver backend_limitador), creado al primer uso"""
+    global _limitador
+    if _limitador is None:
+        if backend_limitador() == "redis":
+            _limitador = LimitadorRedis(settings.REDIS_URL)
+        else:
+            _limitador = LimitadorMemoria()
+    return _limitador
+
+
+def verificar_limitador() -> None:
+    """
+    Al arrancar cada worker: avisar en el log si los límites no se aplicarán
+    como están configurados (cubetas por worker o Redis inalcanzable)
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    workers = settings.WEB_CONCURRENCY or 1
+    backend = limitador()
+    if isinstance(backend, LimitadorMemoria) and workers > 1:
+        logger.warning(
+            "RATE_LIMIT_BACKEND=memory con %d workers: cada worker tiene sus propias cubetas "
+            "y los límites efectivos son %d veces los configurados. Use RATE_LIMIT_BACKEND=redis",
+            workers, workers
+        )
+    elif isinstance(backend, LimitadorRedis):
+        try:
+            backend.cliente.ping()
+        except Exception as e:
+            logger.warning("Límites de uso en Redis, pero %s no responde (%s): no se aplicarán hasta que responda",
+                           settings.REDIS_URL, e)
+
+
+def _escalar(presupuesto: Presupuesto) -> Presupuesto:
+    factor = settings.RATE_LIMIT_FACTOR
+    return Presupuesto(max(1, round(presupuesto.capacidad * factor)), presupuesto.por_minuto * factor)
+
+
+def limitar(categoria: str, costo: float = 1) -> Callable:
+    """
+    Dependencia que aplica los límites de `categoria` al usuario y a la finca
+    del token. Sin token válido no limita: la autenticación la rechaza después.
+    
+    Ejemplo:
+        api_router.include_router(sync.router, dependencies=[Depends(limitar("sync"))])
+    """
+    por_usuario, por_finca = PRESUPUESTOS[categoria]
+    
+    def dependencia(request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        esquema, _, token = request.headers.get("authorization", "").partition(" ")
+        payload = decode_token(token) if esquema.lower() == "bearer" and token else None
+        if not payload:
+            return
+        
+        cubetas = [(f"{categoria}:usuario:{payload.get('sub')}", _escalar(por_usuario))]
+        if payload.get("finca_id") is not None:
+            cubetas.append((f"{categoria}:finca:{payload['finca_id']}", _escalar(por_finca)))
+        for clave, presupuesto in cubetas:
+            permitido, espera = limitador().consumir(clave, presupuesto, costo)
+            if not permitido:
+                alcance = "la finca" if ":finca:" in clave else "el usuario"
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=f"Demasiadas solicitudes ({categoria}) para {alcance}. Intente de nuevo en unos segundos",
+                    headers={"Retry-After": str(max(1, math.ceil(espera)))}
+                )
+    
+    return dependencia
+
+
+class EsperaPool:
+    """
+    Promedio móvil exponencial de la espera por conexiones del pool. Decae
+    con el tiempo sin muestras, para que el descarte se levante solo cuando
+    dejan de llegar requests a la base.
+    """
+    
+    def __init__(self, alfa: float = 0.2, vida_media: float = 2.0):
+        self.alfa = alfa
+        self.vida_media = vida_media
+        self._valor = 0.0
+        self._ultimo = monotonic()
+        self._lock = Lock()
+    
+    def _decaido(self, ahora: float) -> float:
+        return self._valor * 0.5 ** ((ahora - self._ultimo) / self.vida_media)
+    
+    def registrar(self, segundos: float) -> None:
+        with self._lock:
+            ahora = monotonic()
+            self._valor = self._decaido(ahora) * (1 - self.alfa) + segundos * self.alfa
+            self._ultimo = ahora
+    
+    def actual(self) -> float:
+        """Espera promedio reciente en segundos"""
+        with self._lock:
+            return self._decaido(monotonic())
+
+
+espera_pool = EsperaPool()
+
+
+def instrumentar_engine(engine: Engine) -> None:
+    """Medir la espera de cada checkout del pool (envuelve pool.connect)"""
+    pool = engine.pool
+    connect_original = pool.connect
+    
+    def _connect_medido():
+        inicio = perf_counter()
+        try:
+            return connect_original()
+        finally:
+            espera_pool.registrar(perf_counter() - inicio)
+    
+    pool.connect = _connect_medido
+
+
+class DescarteCargaMiddleware:
+    """
+    Middleware ASGI que responde 503 cuando el pool está saturado: primero a
+    las categorías pesadas (espera > umbral) y luego a todo (espera > 2 x umbral).
+    """
+    
+    def __init__(
+        self,
+        app,
+        umbral_ms: float,
+        reintentar_en: int = 5,
+        pesados: Iterable[str] = PREFIJOS_PESADOS.values(),
+        excluir: Iterable[str] = SIN_DESCARTE
+    ):
+        self.app = app
+        self.umbral = umbral_ms / 1000
+        self.reintentar_en = reintentar_en
+        self.pesados = tuple(pesados)
+        self.excluir = tuple(excluir)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.excluir):
+            await self.app(scope, receive, send)
+            return
+        
+        espera = espera_pool.actual()
+        limite = self.umbral if scope["path"].startswith(self.pesados) else self.umbral * 2
+        if espera <= limite:
+            await self.app(scope, receive, send)
+            return
+        
+        cuerpo = b'{"detail":"Servidor ocupado, intente de nuevo en unos segundos"}'
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(cuerpo)).encode()),
+                (b"retry-after", str(self.reintentar_en).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": cuerpo})
@@ -0,0 +1,161 @@
+"""
+Servidor de archivos de medios con cabeceras de caché, peticiones condicionales
+y rangos, y delegación opcional al servidor web (X-Accel-Redirect / X-Sendfile)
+"""
+import os
+import re
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response, StreamingResponse
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Scope
+
+from app.core.config import settings
+
+# Nombres direccionados por contenido (ver app/services/almacenamiento.py):
+# el contenido de estas URLs nunca cambia, se pueden cachear para siempre
+NOMBRE_INMUTABLE = re.compile(r"^[0-9a-f]{64}_[a-z]+\.webp$")
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+
+RANGO_BYTES = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def _parsear_rango(valor: str, tamano: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpretar una cabecera Range de un solo intervalo.
+    
+    Returns:
+        (inicio, fin) inclusivos, o None si el rango no es satisfacible
+    Raises:
+        ValueError: Si la cabecera no tiene el formato soportado
+    """
+    coincidencia = RANGO_BYTES.match(valor.strip())
+    if not coincidencia:
+        raise ValueError(valor)
+    inicio_txt, fin_txt = coincidencia.groups()
+    if not inicio_txt and not fin_txt:
+        raise ValueError(valor)
+    
+    if not inicio_txt:
+        # bytes=-N: los últimos N bytes
+        sufijo = int(fin_txt)
+        if sufijo == 0:
+            return None
+        return max(tamano - sufijo, 0), tamano - 1
+    
+    inicio = int(inicio_txt)
+    fin = int(fin_txt) if fin_txt else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        return None
+    return inicio, min(fin, tamano - 1)
+
+
+async def _leer_rango(ruta: PathLike, inicio: int, fin: int) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(ruta, "rb") as archivo:
+        await archivo.seek(inicio)
+        restante = fin - inicio + 1
+        while restante > 0:
+            chunk = await archivo.read(min(CHUNK_SIZE, restante))
+            if not chunk:
+                break
+            restante -= len(chunk)
+            yield chunk
+
+
+class MediaStaticFiles(StaticFiles):
+    """
+    StaticFiles con:
+    - Cache-Control inmutable para nombres direccionados por contenido
+    - Respuestas 304 (If-None-Match / If-Modified-Since) que conservan Cache-Control
+    - Rangos de bytes (206 / 416) con soporte de If-Range
+    - MEDIA_SENDFILE: delegar el envío del archivo a nginx (x-accel-redirect)
+      o Apache/lighttpd (x-sendfile) para no ocupar el worker de la API
+    """
+    
+    def cache_control(self, full_path: PathLike) -> str:
+        if NOMBRE_INMUTABLE.match(Path(full_path).name):
+            return CACHE_INMUTABLE
+        return f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+    
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        cabeceras = {"Cache-Control": self.cache_control(full_path)}
+        
+        if settings.MEDIA_SENDFILE and status_code == 200:
+            return self._respuesta_delegada(full_path, cabeceras)
+        
+        cabeceras["Accept-Ranges"] = "bytes"
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result, headers=cabeceras
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        
+        rango = request_headers.get("range")
+        if rango and status_code == 200 and self._if_range_vigente(response.headers, request_headers):
+            return self._respuesta_parcial(full_path, stat_result, rango, response, scope)
+        
+        return response
+    
+    def _if_range_vigente(self, response_headers: Headers, request_headers: Headers) -> bool:
+        """If-Range ausente, o igual al ETag / Last-Modified actual"""
+        if_range = request_headers.get("if-range")
+        if if_range is None:
+            return True
+        return if_range in (response_headers.get("etag"), response_headers.get("last-modified"))
+    
+    def _respuesta_parcial(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        rango: str,
+        completa: FileResponse,
+        scope: Scope,
+    ) -> Response:
+        tamano = stat_result.st_size
+        try:
+            intervalo = _parsear_rango(rango, tamano)
+        except ValueError:
+            # Formato no soportado (p.ej. múltiples rangos): enviar el archivo completo
+            return completa
+        
+        if intervalo is None:
+            return Response(
+                status_code=416,
+                headers={"Content-Range": f"bytes */{tamano}"},
+            )
+        
+        inicio, fin = intervalo
+        cabeceras = {
+            key: value for key, value in completa.headers.items()
+            if key in ("cache-control", "etag", "last-modified", "content-type", "accept-ranges")
+        }
+        cabeceras["Content-Range"] = f"bytes {inicio}-{fin}/{tamano}"
+        cabeceras["Content-Length"] = str(fin - inicio + 1)
+        
+        if scope.get("method") == "HEAD":
+            return Response(status_code=206, headers=cabeceras)
+        return StreamingResponse(
+            _leer_rango(full_path, inicio, fin), status_code=206, headers=cabeceras
+        )
+    
+    def _respuesta_delegada(self, full_path: PathLike, cabeceras: dict) -> Response:
+        """Respuesta vacía; el servidor web envía el archivo"""
+        ruta = Path(full_path).resolve()
+        if settings.MEDIA_SENDFILE == "x-accel-redirect":
+            relativa = ruta.relative_to(Path(self.directory).resolve()).as_posix()
+            prefijo = settings.MEDIA_ACCEL_PREFIX.rstrip("/")
+            cabeceras["X-Accel-Redirect"] = f"{prefijo}/{relativa}"
+        else:
+            cabeceras["X-Sendfile"] = str(ruta)
+        return Response(status_code=200, headers=cabeceras, media_type=None)
@@ -0,0 +1,253 @@
+"""
+Métricas de rendimiento por request.
+
+Por cada request se mide la latencia, el número de consultas SQL y su tiempo
+total, la espera por una conexión del pool y el tamaño de la respuesta. Se
+exponen de dos formas:
+
+- Encabezado Server-Timing en cada respuesta (visible en las DevTools del
+  navegador): app, sql y pool en milisegundos.
+- Texto de Prometheus en /metrics, con histogramas por ruta (la plantilla de
+  la ruta, p.ej. /api/v1/animales/{animal_id}, no la URL concreta). Solo se
+  expone con METRICS_TOKEN y con ese token como Bearer.
+
+Las métricas son por proceso: con varios workers de gunicorn cada scrape de
+/metrics lo responde un solo worker, elegido por el balanceo, y muestra solo
+sus requests. Para ver la finca completa hay que consultar cada worker por
+separado o correr con un solo worker.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PREFIJO = "ganadero"
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+BUCKETS_BYTES = (512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+RUTA_DESCONOCIDA = "sin_ruta"  # 404 y rutas fuera del router: no crear una serie por URL
+
+
+class MedicionRequest:
+    """Acumulado de la request en curso (compartido con el hilo del endpoint)"""
+    
+    __slots__ = ("consultas", "tiempo_sql", "espera_pool")
+    
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.espera_pool = 0.0
+
+
+_medicion_actual: ContextVar[Optional[MedicionRequest]] = ContextVar("medicion_actual", default=None)
+
+
+def medicion_actual() -> Optional[MedicionRequest]:
+    return _medicion_actual.get()
+
+
+class Histograma:
+    """Histograma acumulativo con etiquetas, en el formato de Prometheus"""
+    
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...], buckets: Iterable[float]):
+        self.nombre = f"{PREFIJO}_{nombre}"
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}  # valores de etiquetas -> [conteos por bucket, suma, total]
+        self._lock = Lock()
+    
+    def observar(self, valor: float, *valores_etiquetas: str) -> None:
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores_etiquetas)
+            if serie is None:
+                serie = self._series[valores_etiquetas] = [[0] * len(self.buckets), 0.0, 0]
+            if indice < len(self.buckets):
+                serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+    
+    def exportar(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = [(clave, list(conteos), suma, total) for clave, (conteos, suma, total) in self._series.items()]
+        for clave, conteos, suma, total in sorted(series):
+            etiquetas = ",".join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(self.etiquetas, clave))
+            separador = "," if etiquetas else ""
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                lineas.append(f'{self.nombre}_bucket{{{etiquetas}{separador}le="{limite}"}} {acumulado}')
+            lineas.append(f'{self.nombre}_bucket{{{etiquetas}{separador}le="+Inf"}} {total}')
+            lineas.append(f"{self.nombre}_sum{{{etiquetas}}} {suma}")
+            lineas.append(f"{self.nombre}_count{{{etiquetas}}} {total}")
+        return lineas
+
+
+class Contador:
+    """Contador con etiquetas, en el formato de Prometheus"""
+    
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...]):
+        self.nombre = f"{PREFIJO}_{nombre}"
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._series: Dict[tuple, int] = {}
+        self._lock = Lock()
+    
+    def incrementar(self, *valores_etiquetas: str) -> None:
+        with self._lock:
+            self._series[valores_etiquetas] = self._series.get(valores_etiquetas, 0) + 1
+    
+    def exportar(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for clave, valor in series:
+            etiquetas = ",".join(f'{nombre}="{_escapar(v)}"' for nombre, v in zip(self.etiquetas, clave))
+            lineas.append(f"{self.nombre}{{{etiquetas}}} {valor}")
+        return lineas
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+RUTA = ("method", "route")
+
+requests_total = Contador("http_requests_total", "Requests atendidas", ("method", "route", "status"))
+duracion_request = Histograma(
+    "http_request_duration_seconds", "Latencia de la request", RUTA, BUCKETS_SEGUNDOS
+)
+consultas_request = Histograma(
+    "http_request_sql_queries", "Consultas SQL por request", RUTA, BUCKETS_CONSULTAS
+)
+tiempo_sql_request = Histograma(
+    "http_request_sql_duration_seconds", "Tiempo total en SQL por request", RUTA, BUCKETS_SEGUNDOS
+)
+espera_pool_request = Histograma(
+    "http_request_pool_wait_seconds", "Espera por conexiones del pool por request", RUTA, BUCKETS_SEGUNDOS
+)
+tamano_respuesta = Histograma(
+    "http_response_size_bytes", "Tamaño del cuerpo de la respuesta", RUTA, BUCKETS_BYTES
+)
+
+METRICAS = (
+    requests_total,
+    duracion_request,
+    consultas_request,
+    tiempo_sql_request,
+    espera_pool_request,
+    tamano_respuesta,
+)
+
+
+def exportar_prometheus() -> str:
+    lineas = []
+    for metrica in METRICAS:
+        lineas.extend(metrica.exportar())
+    return "\n".join(lineas) + "\n"
+
+
+def instrumentar_engine(engine: Engine) -> None:
+    """
+    Registrar los eventos que miden el SQL y la espera del pool. Solo se
+    acumula cuando hay una request en curso (scripts y tareas no cuentan).
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and _medicion_actual.get() is not None:
+            context._inicio_consulta = perf_counter()
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+        medicion = _medicion_actual.get()
+        inicio = getattr(context, "_inicio_consulta", None)
+        if medicion is not None and inicio is not None:
+            medicion.consultas += 1
+            medicion.tiempo_sql += perf_counter() - inicio
+    
+    # SQLAlchemy no tiene un evento previo al checkout: se envuelve pool.connect,
+    # que es lo que llama engine.connect() / la sesión al pedir una conexión
+    pool = engine.pool
+    connect_original = pool.connect
+    
+    def _connect_medido():
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return connect_original()
+        inicio = perf_counter()
+        try:
+            return connect_original()
+        finally:
+            medicion.espera_pool += perf_counter() - inicio
+    
+    pool.connect = _connect_medido
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI que mide cada request y agrega el encabezado Server-Timing.
+    
+    Es ASGI puro (no BaseHTTPMiddleware) para poder contar los bytes de
+    respuestas en streaming y no agregar una tarea extra por request.
+    """
+    
+    def __init__(self, app, excluir: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.excluir = set(excluir)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluir:
+            await self.app(scope, receive, send)
+            return
+        
+        medicion = MedicionRequest()
+        token = _medicion_actual.set(medicion)
+        inicio = perf_counter()
+        estado = {"status": 500, "bytes": 0, "registrado": False}
+        
+        def registrar():
+            if estado["registrado"]:
+                return
+            estado["registrado"] = True
+            ruta = scope.get("route")
+            etiquetas = (scope["method"], getattr(ruta, "path", RUTA_DESCONOCIDA))
+            requests_total.incrementar(*etiquetas, str(estado["status"]))
+            duracion_request.observar(perf_counter() - inicio, *etiquetas)
+            consultas_request.observar(medicion.consultas, *etiquetas)
+            tiempo_sql_request.observar(medicion.tiempo_sql, *etiquetas)
+            espera_pool_request.observar(medicion.espera_pool, *etiquetas)
+            tamano_respuesta.observar(estado["bytes"], *etiquetas)
+        
+        async def send_medido(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["status"] = mensaje["status"]
+                encabezados = list(mensaje.get("headers", []))
+                encabezados.append((b"server-timing", _server_timing(medicion, perf_counter() - inicio)))
+                mensaje = {**mensaje, "headers": encabezados}
+            elif mensaje["type"] == "http.response.body":
+                estado["bytes"] += len(mensaje.get("body", b""))
+                if not mensaje.get("more_body", False):
+                    registrar()
+            await send(mensaje)
+        
+        try:
+            await self.app(scope, receive, send_medido)
+        finally:
+            registrar()
+            _medicion_actual.reset(token)
+
+
+def _server_timing(medicion: MedicionRequest, duracion: float) -> bytes:
+    return (
+        f'app;dur={duracion * 1000:.1f}, '
+        f'sql;dur={medicion.tiempo_sql * 1000:.1f};desc="{medicion.consultas} consultas", '
+        f'pool;dur={medicion.espera_pool * 1000:.1f}'
+    ).encode("latin-1")
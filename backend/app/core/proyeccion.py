@@ -0,0 +1,110 @@
+"""
+Proyección de columnas en los listados (parámetro fields=).
+
+Con fields=numero_identificacion,nombre cada item trae solo esos campos (más
+el id) y la consulta selecciona solo las columnas necesarias, sin instanciar
+el ORM: los textos largos como observaciones no salen de la base, no ocupan
+memoria ni viajan en la respuesta. Cada listado define presets con nombre,
+p.ej. fields=resumen para las tablas de la app móvil.
+
+Sin fields= el listado responde como siempre, con todos los campos.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel, create_model
+from sqlalchemy import inspect
+
+from app.core.respuestas import columnas_orm, respuesta_json
+
+DESCRIPCION_FIELDS = "Campos separados por coma o un preset (p.ej. resumen); por defecto, todos"
+
+
+@lru_cache(maxsize=None)
+def esquema_parcial(esquema: Type[BaseModel]) -> Type[BaseModel]:
+    """El mismo schema con todos los campos opcionales, para validar filas proyectadas"""
+    return create_model(
+        f"{esquema.__name__}Parcial",
+        __base__=esquema,
+        **{nombre: (Optional[campo.annotation], None) for nombre, campo in esquema.model_fields.items()}
+    )
+
+
+@lru_cache(maxsize=None)
+def _lista_parcial(lista: Type[BaseModel]) -> Type[BaseModel]:
+    item = lista.model_fields["items"].annotation.__args__[0]
+    return create_model(f"{lista.__name__}Parcial", __base__=lista, items=(List[esquema_parcial(item)], ...))
+
+
+class Proyeccion:
+    """
+    Campos proyectables de un listado.
+    
+    Args:
+        modelo: Modelo del ORM que se consulta
+        esquema: Schema de cada item de la respuesta
+        presets: Conjuntos de campos con nombre (p.ej. {"resumen": [...]})
+        dependencias: Columnas que necesita cada campo que no es columna
+            (computados o datos de otra tabla, p.ej. animal_numero -> animal_id)
+    """
+    
+    def __init__(
+        self,
+        modelo: Any,
+        esquema: Type[BaseModel],
+        presets: Dict[str, Sequence[str]],
+        dependencias: Optional[Dict[str, Sequence[str]]] = None
+    ):
+        self.modelo = modelo
+        self.esquema = esquema
+        self.presets = presets
+        self.dependencias = dependencias or {}
+        self.validos = set(esquema.model_fields) | set(esquema.__pydantic_decorators__.computed_fields)
+        self._columnas = set(inspect(modelo).column_attrs.keys())
+    
+    def campos(self, fields: Optional[str]) -> Optional[List[str]]:
+        """Campos pedidos, con el id primero (None = todos)"""
+        if not fields:
+            return None
+        if fields in self.presets:
+            pedidos = list(self.presets[fields])
+        else:
+            pedidos = [campo.strip() for campo in fields.split(",") if campo.strip()]
+        invalidos = [campo for campo in pedidos if campo not in self.validos]
+        if invalidos:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=(
+                    f"Campos inválidos: {', '.join(invalidos)}. Disponibles: {', '.join(sorted(self.validos))}; "
+                    f"presets: {', '.join(self.presets)}"
+                )
+            )
+        return list(dict.fromkeys(["id", *pedidos]))
+    
+    @staticmethod
+    def incluye(campos: Optional[List[str]], *nombres: str) -> bool:
+        """Si la respuesta lleva alguno de estos campos (para evitar consultas de datos no pedidos)"""
+        return campos is None or any(nombre in campos for nombre in nombres)
+    
+    def filas(self, query, campos: Optional[List[str]]) -> List[Dict[str, Any]]:
+        """
+        Ejecutar la consulta (ya filtrada y paginada) y devolver cada fila como
+        dict: completa desde el ORM o solo con las columnas de los campos.
+        """
+        if campos is None:
+            return [columnas_orm(objeto) for objeto in query.all()]
+        nombres = []
+        for campo in campos:
+            for columna in self.dependencias.get(campo, (campo,)):
+                if columna in self._columnas and columna not in nombres:
+                    nombres.append(columna)
+        return [fila._asdict() for fila in query.with_entities(*(getattr(self.modelo, n) for n in nombres))]
+    
+    def respuesta(self, lista: Type[BaseModel], campos: Optional[List[str]], **datos: Any) -> Response:
+        """Respuesta JSON del listado (schema `lista`, con `items`) con solo los campos pedidos"""
+        if campos is None:
+            return respuesta_json(lista(**datos))
+        incluir: Dict[str, Any] = {nombre: True for nombre in lista.model_fields}
+        incluir["items"] = {"__all__": set(campos)}
+        return respuesta_json(_lista_parcial(lista)(**datos), include=incluir)
@@ -0,0 +1,45 @@
+"""
+Plugin de pytest para presupuestos de consultas SQL.
+
+Activar en el conftest.py de las pruebas:
+
+    pytest_plugins = ["app.core.pytest_consultas"]
+
+y usar el fixture o el marcador:
+
+    def test_listar_sanitarios(client, headers, presupuesto_consultas):
+        with presupuesto_consultas(maximo=5, repeticiones=1):
+            client.get("/api/v1/control-sanitario/", headers=headers)
+    
+    @pytest.mark.presupuesto_consultas(maximo=5, repeticiones=1)
+    def test_alertas(client, headers):
+        client.get("/api/v1/dashboard/alertas", headers=headers)
+"""
+import pytest
+
+from app.core.consultas import instrumentar_engine, presupuesto_consultas as _presupuesto_consultas
+
+
+def pytest_configure(config):
+    from app.db.database import engine
+    instrumentar_engine(engine)
+    config.addinivalue_line(
+        "markers",
+        "presupuesto_consultas(maximo=None, repeticiones=None): límite de consultas SQL de la prueba"
+    )
+
+
+@pytest.fixture
+def presupuesto_consultas():
+    """Context manager que falla si el bloque supera el presupuesto de consultas"""
+    return _presupuesto_consultas
+
+
+@pytest.fixture(autouse=True)
+def _aplicar_marcador_presupuesto(request):
+    marcador = request.node.get_closest_marker("presupuesto_consultas")
+    if marcador is None:
+        yield
+        return
+    with _presupuesto_consultas(*marcador.args, **marcador.kwargs):
+        yield
@@ -0,0 +1,75 @@
+"""
+Respuestas JSON serializadas directamente por Pydantic.
+
+Cuando un endpoint devuelve un modelo, FastAPI lo convierte a dict, lo vuelve
+a validar contra response_model, lo pasa a tipos JSON y recién entonces lo
+serializa con json.dumps: cada fila se valida dos veces. respuesta_json()
+devuelve una Response con los bytes del serializador de pydantic-core, así
+que FastAPI la envía tal cual; la validación (desde los atributos del ORM)
+ocurre una sola vez al construir el modelo, y response_model del decorador
+queda para la documentación de la API.
+
+Validar desde los atributos del ORM (from_attributes) pasa por los
+descriptores de SQLAlchemy en cada campo de cada fila, y eso cuesta más que
+la validación misma: columnas_orm() entrega los valores ya cargados como dict.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import inspect
+
+
+@lru_cache(maxsize=None)
+def _adaptador(tipo: Any) -> TypeAdapter:
+    return TypeAdapter(tipo)
+
+
+@lru_cache(maxsize=None)
+def _columnas(clase: type) -> Tuple[str, ...]:
+    return tuple(inspect(clase).column_attrs.keys())
+
+
+def columnas_orm(objeto: Any, **extra: Any) -> Dict[str, Any]:
+    """
+    Valores de columna de una instancia del ORM (más `extra`) para construir
+    un schema: un dict nuevo, solo con las columnas del mapper (sin
+    _sa_instance_state ni relaciones cargadas). Las columnas sin cargar
+    (expiradas tras un commit, diferidas) se cargan antes.
+    """
+    columnas = _columnas(type(objeto))
+    datos = objeto.__dict__
+    try:
+        fila = {clave: datos[clave] for clave in columnas}
+    except KeyError:
+        for clave in columnas:
+            if clave not in datos:
+                getattr(objeto, clave)
+        fila = {clave: datos[clave] for clave in columnas}
+    if extra:
+        fila.update(extra)
+    return fila
+
+
+def respuesta_json(
+    datos: Any,
+    tipo: Optional[Any] = None,
+    status_code: int = 200,
+    include: Optional[Dict[str, Any]] = None
+) -> Response:
+    """
+    Serializar a JSON en una sola pasada.
+    
+    Args:
+        datos: Modelo ya validado, o datos a validar contra `tipo`
+            (p.ej. [columnas_orm(a) for a in animales] con tipo=list[AnimalResponse])
+        tipo: Tipo de Pydantic de los datos; no hace falta si `datos` es un modelo
+        include: Campos a serializar, como en model_dump (ver app/core/proyeccion.py)
+    """
+    if tipo is None and isinstance(datos, BaseModel):
+        contenido = datos.__pydantic_serializer__.to_json(datos, include=include)
+    else:
+        adaptador = _adaptador(tipo)
+        contenido = adaptador.dump_json(adaptador.validate_python(datos, from_attributes=True), include=include)
+    return Response(content=contenido, status_code=status_code, media_type="application/json")
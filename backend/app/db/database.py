@@ -6,15 +6,31 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from typing import Generator
 from app.core.config import settings
+from app.core.capacidad import opciones_pool
+from app.core import consultas, consultas_lentas, limites, metricas
 
 # Crear engine de base de datos
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,  # Verificar conexiones antes de usarlas
-    pool_size=10,  # Tamaño del pool de conexiones
-    max_overflow=20,  # Conexiones adicionales permitidas
-    echo=settings.DEBUG  # Loggear queries SQL en modo debug
+    echo=settings.DEBUG,  # Loggear queries SQL en modo debug
+    **opciones_pool(settings)  # Tamaño repartido entre los workers del servidor
 )
+if settings.METRICS_ENABLED:
+    metricas.instrumentar_engine(engine)  # Consultas, tiempo SQL y espera del pool por request
+if settings.N1_DETECTOR:
+    consultas.instrumentar_engine(engine)  # Consultas repetidas por request (solo desarrollo)
+if settings.SLOW_QUERY_MS:
+    consultas_lentas.instrumentar_engine(
+        engine,
+        umbral_ms=settings.SLOW_QUERY_MS,
+        muestreo=settings.SLOW_QUERY_SAMPLE_RATE,
+        por_minuto=settings.SLOW_QUERY_MAX_PER_MINUTE,
+        explain=settings.SLOW_QUERY_EXPLAIN,
+        explain_analyze=settings.SLOW_QUERY_EXPLAIN_ANALYZE
+    )
+if settings.LOAD_SHED_POOL_WAIT_MS:
+    limites.instrumentar_engine(engine)  # Espera por el pool, para el descarte de carga
 
 # Session maker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -38,6 +54,30 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def precalentar_pool(conexiones: int) -> int:
+    """
+    Abrir de antemano conexiones del pool para que las primeras requests no
+    paguen la conexión (TCP, TLS y autenticación).
+    
+    Returns:
+        Número de conexiones abiertas
+    """
+    tamano = getattr(engine.pool, "size", None)
+    if tamano is None:
+        return 0  # Sin pool propio (NullPool con PgBouncer)
+    conexiones = min(conexiones, tamano())
+    abiertas = []
+    try:
+        for _ in range(conexiones):
+            abiertas.append(engine.connect())
+    except Exception as e:
+        print(f"⚠️  No se pudo precalentar el pool de conexiones: {e}")
+    finally:
+        for conexion in abiertas:
+            conexion.close()  # Vuelve al pool, abierta
+    return len(abiertas)
+
+
 def init_db():
     """
     Inicializar base de datos.
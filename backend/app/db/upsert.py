@@ -0,0 +1,103 @@
+"""
+Upsert incremental para tablas de resumen (rollups)
+"""
+from typing import Any, Dict, List, Optional, Type
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app.db.database import Base
+
+
+def upsert_incremental(
+    db: Session,
+    modelo: Type[Base],
+    claves: Dict[str, Any],
+    incrementos: Dict[str, Any],
+    valores: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    Sumar `incrementos` a la fila identificada por `claves`, creándola si no existe.
+    
+    En PostgreSQL y SQLite se usa INSERT ... ON CONFLICT DO UPDATE, que es atómico
+    frente a peticiones concurrentes. Las `claves` deben coincidir con una
+    restricción UNIQUE del modelo.
+    
+    Args:
+        db: Sesión (la operación queda dentro de su transacción)
+        modelo: Modelo de la tabla de resumen
+        claves: Columnas de la restricción UNIQUE
+        incrementos: Columna -> cantidad a sumar
+        valores: Columnas adicionales que solo se fijan al crear la fila
+    """
+    valores = valores or {}
+    tabla = modelo.__table__
+    dialecto = db.get_bind().dialect.name
+    
+    if dialecto in ("postgresql", "sqlite"):
+        if dialecto == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        
+        stmt = insert(tabla).values(**claves, **valores, **incrementos)
+        cambios = {col: tabla.c[col] + stmt.excluded[col] for col in incrementos}
+        cambios["updated_at"] = func.now()
+        stmt = stmt.on_conflict_do_update(index_elements=list(claves), set_=cambios)
+        db.execute(stmt)
+        return
+    
+    # Otros motores: actualizar y, si no había fila, insertar
+    condiciones = [tabla.c[col] == valor for col, valor in claves.items()]
+    resultado = db.execute(
+        update(tabla)
+        .where(*condiciones)
+        .values({col: tabla.c[col] + valor for col, valor in incrementos.items()}, updated_at=func.now())
+    )
+    if resultado.rowcount == 0:
+        db.execute(tabla.insert().values(**claves, **valores, **incrementos))
+
+
+def upsert_incremental_lote(
+    db: Session,
+    modelo: Type[Base],
+    claves: List[str],
+    incrementos: List[str],
+    filas: List[Dict[str, Any]]
+) -> None:
+    """
+    Versión por lotes de upsert_incremental: un solo INSERT ... ON CONFLICT
+    ejecutado con todas las filas (executemany).
+    
+    Args:
+        db: Sesión (la operación queda dentro de su transacción)
+        modelo: Modelo de la tabla de resumen
+        claves: Columnas de la restricción UNIQUE
+        incrementos: Columnas a sumar
+        filas: Diccionarios con las claves, los incrementos y los valores
+            que solo se fijan al crear la fila (todas con las mismas columnas)
+    """
+    if not filas:
+        return
+    tabla = modelo.__table__
+    dialecto = db.get_bind().dialect.name
+    
+    if dialecto in ("postgresql", "sqlite"):
+        if dialecto == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        
+        stmt = insert(tabla)
+        cambios = {col: tabla.c[col] + stmt.excluded[col] for col in incrementos}
+        cambios["updated_at"] = func.now()
+        db.execute(stmt.on_conflict_do_update(index_elements=claves, set_=cambios), filas)
+        return
+    
+    for fila in filas:
+        upsert_incremental(
+            db, modelo,
+            claves={col: fila[col] for col in claves},
+            incrementos={col: fila[col] for col in incrementos},
+            valores={col: valor for col, valor in fila.items() if col not in claves and col not in incrementos}
+        )
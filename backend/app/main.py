@@ -1,13 +1,19 @@
 """
 Punto de entrada de FastAPI
 """
-from fastapi import FastAPI
+import secrets
+from fastapi import FastAPI, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from app.core.config import settings
-from app.db.database import init_db
+from app.core.media import MediaStaticFiles
+from app.core.metricas import MetricasMiddleware, exportar_prometheus
+from app.core.consultas import DetectorNMasUnoMiddleware
+from app.core.limites import DescarteCargaMiddleware, verificar_limitador
+from app.db.database import init_db, precalentar_pool
 from app.api.v1.api import api_router
+from app.services.reportes_archivos import reencolar_pendientes
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -17,6 +23,11 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Descarte de carga con el pool saturado (dentro de CORS, para que el 503
+# llegue al navegador con sus encabezados)
+if settings.LOAD_SHED_POOL_WAIT_MS:
+    app.add_middleware(DescarteCargaMiddleware, umbral_ms=settings.LOAD_SHED_POOL_WAIT_MS)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -26,11 +37,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latencia, consultas SQL y tamaño de respuesta por ruta
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricasMiddleware)
+
+# Detector de consultas N+1 (desarrollo): N1_DETECTOR=log o raise
+if settings.N1_DETECTOR:
+    app.add_middleware(DetectorNMasUnoMiddleware, umbral=settings.N1_THRESHOLD, modo=settings.N1_DETECTOR)
+
 
 @app.on_event("startup")
 def on_startup():
-    # Inicializar DB (para desarrollo; en producción usar Alembic)
-    init_db()
+    # Inicializar DB (para desarrollo; en producción INIT_DB_ON_STARTUP=False
+    # y preparar_db.py una vez por deploy, no en cada worker que arranca)
+    if settings.INIT_DB_ON_STARTUP:
+        init_db()
+    if settings.DB_POOL_PREWARM:
+        precalentar_pool(settings.DB_POOL_PREWARM)
+    # Retomar reportes que quedaron sin generar al detenerse el servidor
+    reencolar_pendientes()
+    verificar_limitador()
 
 
 @app.get("/health", tags=["health"])
@@ -42,10 +68,26 @@ def health_check():
     }
 
 
-# Servir archivos estáticos (imágenes)
-media_dir = Path("media")
-media_dir.mkdir(exist_ok=True)
-app.mount("/media", StaticFiles(directory="media"), name="media")
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", tags=["health"], include_in_schema=False)
+    def metrics(authorization: str = Header(default="")):
+        # Rutas, latencias y consultas por ruta: sin METRICS_TOKEN no existe
+        if not settings.METRICS_TOKEN:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+        if not secrets.compare_digest(authorization.encode(), f"Bearer {settings.METRICS_TOKEN}".encode()):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token de métricas inválido",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return PlainTextResponse(exportar_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+# Servir archivos estáticos (imágenes) cuando el almacenamiento es local
+if settings.MEDIA_BACKEND == "local":
+    media_dir = Path(settings.MEDIA_ROOT)
+    media_dir.mkdir(exist_ok=True)
+    app.mount(settings.MEDIA_URL, MediaStaticFiles(directory=settings.MEDIA_ROOT), name="media")
 
 # Incluir routers de API
 app.include_router(api_router, prefix="/api/v1")
@@ -0,0 +1,41 @@
+"""
+Modelo EstadoReproductivoActual - Estado reproductivo vigente de cada hembra
+"""
+from sqlalchemy import Column, String, Date, ForeignKey, Integer, Boolean, Index
+from app.db.base_model import BaseModel
+
+
+class EstadoReproductivoActual(BaseModel):
+    """
+    Estado reproductivo actual de una hembra, derivado de sus eventos
+    (servicio, diagnóstico, parto, aborto, secado).
+    Se recalcula al crear, editar o eliminar un evento reproductivo, así los
+    indicadores de la finca son conteos sobre esta tabla en lugar de buscar
+    el último diagnóstico de cada vaca en controles_reproductivos.
+    """
+    __tablename__ = "estado_reproductivo_actual"
+    __table_args__ = (
+        Index("ix_estado_reproductivo_finca_estado", "finca_id", "estado"),
+        Index("ix_estado_reproductivo_finca_parto", "finca_id", "fecha_probable_parto"),
+    )
+    
+    finca_id = Column(Integer, ForeignKey("fincas.id", ondelete="CASCADE"), nullable=False)
+    animal_id = Column(Integer, ForeignKey("animales.id", ondelete="CASCADE"), nullable=False, unique=True)
+    
+    # vacia, servida, prenada, parida, seca
+    estado = Column(String(20), nullable=False)
+    fecha_estado = Column(Date, nullable=False)  # Fecha del evento que fijó el estado
+    # Gestación confirmada y no terminada (una vaca seca suele estar preñada)
+    gestante = Column(Boolean, nullable=False, default=False)
+    
+    # Ciclo actual (desde el último parto)
+    ultimo_parto = Column(Date)
+    numero_partos = Column(Integer, nullable=False, default=0)
+    ultimo_servicio = Column(Date)
+    servicios_ciclo = Column(Integer, nullable=False, default=0)
+    fecha_concepcion = Column(Date)
+    dias_abiertos = Column(Integer)  # Parto -> concepción, fijado al confirmar la preñez
+    fecha_probable_parto = Column(Date)
+    
+    def __repr__(self):
+        return f"<EstadoReproductivoActual(animal_id={self.animal_id}, estado={self.estado})>"
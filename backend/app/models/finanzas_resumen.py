@@ -0,0 +1,77 @@
+"""
+Modelos de resumen financiero (rollup mensual del libro), versión del libro
+y cierres de periodo
+"""
+from sqlalchemy import Column, String, Float, ForeignKey, Integer, DateTime, UniqueConstraint, Index
+from app.db.base_model import BaseModel
+
+
+class ResumenFinancieroMensual(BaseModel):
+    """
+    Totales de transacciones por finca, mes, tipo y categoría de gasto.
+    Se mantiene de forma incremental al crear, editar o eliminar transacciones,
+    así los balances históricos suman unas pocas filas por mes.
+    """
+    __tablename__ = "resumen_financiero_mensual"
+    __table_args__ = (
+        UniqueConstraint(
+            "finca_id", "anio", "mes", "tipo", "categoria",
+            name="uq_resumen_financiero_periodo_tipo_categoria"
+        ),
+        Index("ix_resumen_financiero_finca_tipo", "finca_id", "tipo"),
+    )
+    
+    finca_id = Column(Integer, ForeignKey("fincas.id", ondelete="CASCADE"), nullable=False)
+    anio = Column(Integer, nullable=False)
+    mes = Column(Integer, nullable=False)
+    tipo = Column(String(50), nullable=False)  # venta, compra, gasto
+    # Cadena vacía = sin categoría (NULL no participaría en la restricción UNIQUE)
+    categoria = Column(String(100), nullable=False, default="")
+    
+    monto_total = Column(Float, nullable=False, default=0.0)
+    numero_transacciones = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ResumenFinancieroMensual(finca_id={self.finca_id}, {self.anio}-{self.mes:02d}, {self.tipo}={self.monto_total})>"
+
+
+class VersionLibro(BaseModel):
+    """
+    Contador por finca que sube con cada alta, edición o baja de transacciones
+    y de controles sanitarios o reproductivos (sus costos entran al PyG).
+    Es la versión de la caché de reportes financieros: leerla es una sola fila.
+    """
+    __tablename__ = "versiones_libro"
+    
+    finca_id = Column(Integer, ForeignKey("fincas.id", ondelete="CASCADE"), nullable=False, unique=True)
+    version = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<VersionLibro(finca_id={self.finca_id}, version={self.version})>"
+
+
+class CierrePeriodo(BaseModel):
+    """
+    Cierre contable de un mes: las transacciones del periodo quedan congeladas
+    y se guarda una foto de los totales al momento del cierre.
+    """
+    __tablename__ = "cierres_periodo"
+    __table_args__ = (
+        UniqueConstraint("finca_id", "anio", "mes", name="uq_cierres_periodo_finca_mes"),
+    )
+    
+    finca_id = Column(Integer, ForeignKey("fincas.id", ondelete="CASCADE"), nullable=False, index=True)
+    anio = Column(Integer, nullable=False)
+    mes = Column(Integer, nullable=False)
+    
+    # Foto de los totales al cerrar
+    total_ventas = Column(Float, nullable=False, default=0.0)
+    total_compras = Column(Float, nullable=False, default=0.0)
+    total_gastos = Column(Float, nullable=False, default=0.0)
+    numero_transacciones = Column(Integer, nullable=False, default=0)
+    
+    cerrado_por = Column(Integer, ForeignKey("usuarios.id", ondelete="SET NULL"))
+    fecha_cierre = Column(DateTime(timezone=True), nullable=False)
+    
+    def __repr__(self):
+        return f"<CierrePeriodo(finca_id={self.finca_id}, {self.anio}-{self.mes:02d})>"
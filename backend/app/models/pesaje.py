@@ -0,0 +1,44 @@
+"""
+Modelo Pesaje - Historial de pesos de los animales
+"""
+from sqlalchemy import Column, String, Date, Float, ForeignKey, Integer, Text, UniqueConstraint, Index
+from app.db.base_model import BaseModel
+
+
+class Pesaje(BaseModel):
+    """
+    Modelo de Pesaje.
+    Cada fila es una pesada de un animal; guarda además la ganancia diaria
+    respecto a la pesada anterior para consultar animales bajo objetivo
+    sin recalcular el historial.
+    """
+    __tablename__ = "pesajes"
+    __table_args__ = (
+        # Un pesaje por animal y día; también sirve para "último pesaje del animal"
+        UniqueConstraint("animal_id", "fecha", name="uq_pesajes_animal_fecha"),
+        Index("ix_pesajes_finca_fecha", "finca_id", "fecha"),
+        Index("ix_pesajes_finca_ganancia", "finca_id", "ganancia_diaria"),
+    )
+    
+    # Relación con Finca (multi-tenant)
+    finca_id = Column(Integer, ForeignKey("fincas.id", ondelete="CASCADE"), nullable=False)
+    
+    # Relación con Animal
+    animal_id = Column(Integer, ForeignKey("animales.id", ondelete="CASCADE"), nullable=False)
+    
+    fecha = Column(Date, nullable=False)
+    peso = Column(Float, nullable=False)  # kg
+    
+    # Ganancia respecto al pesaje anterior del mismo animal
+    dias_desde_anterior = Column(Integer)
+    ganancia_diaria = Column(Float)  # kg/día
+    
+    # Sesión de báscula (todos los animales pesados juntos comparten el mismo id)
+    sesion_id = Column(String(36), index=True)
+    metodo = Column(String(20))  # bascula, cinta, estimado
+    
+    observaciones = Column(Text)
+    registrado_por = Column(Integer, ForeignKey("usuarios.id", ondelete="SET NULL"))
+    
+    def __repr__(self):
+        return f"<Pesaje(animal_id={self.animal_id}, fecha={self.fecha}, peso={self.peso})>"
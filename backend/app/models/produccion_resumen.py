@@ -0,0 +1,62 @@
+"""
+Modelos de resumen de producción lechera (rollups diarios y mensuales)
+"""
+from sqlalchemy import Column, Date, Float, ForeignKey, Integer, UniqueConstraint, Index
+from app.db.base_model import BaseModel
+
+
+class ProduccionDiaria(BaseModel):
+    """
+    Producción de leche por animal y día.
+    Se mantiene de forma incremental al crear, editar o eliminar registros de producción.
+    """
+    __tablename__ = "produccion_diaria"
+    __table_args__ = (
+        UniqueConstraint("animal_id", "fecha", name="uq_produccion_diaria_animal_fecha"),
+        Index("ix_produccion_diaria_finca_fecha", "finca_id", "fecha"),
+    )
+    
+    finca_id = Column(Integer, ForeignKey("fincas.id", ondelete="CASCADE"), nullable=False)
+    animal_id = Column(Integer, ForeignKey("animales.id", ondelete="CASCADE"), nullable=False)
+    fecha = Column(Date, nullable=False)
+    
+    # Totales
+    litros_total = Column(Float, nullable=False, default=0.0)
+    numero_ordenos = Column(Integer, nullable=False, default=0)
+    
+    # Desglose por turno
+    litros_manana = Column(Float, nullable=False, default=0.0)
+    litros_tarde = Column(Float, nullable=False, default=0.0)
+    litros_noche = Column(Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f"<ProduccionDiaria(animal_id={self.animal_id}, fecha={self.fecha}, litros={self.litros_total})>"
+
+
+class ProduccionMensual(BaseModel):
+    """
+    Producción de leche por animal y mes.
+    Los totales de la finca se obtienen sumando las filas del mes (una por animal).
+    """
+    __tablename__ = "produccion_mensual"
+    __table_args__ = (
+        UniqueConstraint("animal_id", "anio", "mes", name="uq_produccion_mensual_animal_periodo"),
+        Index("ix_produccion_mensual_finca_periodo", "finca_id", "anio", "mes"),
+    )
+    
+    finca_id = Column(Integer, ForeignKey("fincas.id", ondelete="CASCADE"), nullable=False)
+    animal_id = Column(Integer, ForeignKey("animales.id", ondelete="CASCADE"), nullable=False)
+    anio = Column(Integer, nullable=False)
+    mes = Column(Integer, nullable=False)
+    
+    # Totales
+    litros_total = Column(Float, nullable=False, default=0.0)
+    numero_ordenos = Column(Integer, nullable=False, default=0)
+    
+    # Desglose por turno
+    litros_manana = Column(Float, nullable=False, default=0.0)
+    litros_tarde = Column(Float, nullable=False, default=0.0)
+    litros_noche = Column(Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f"<ProduccionMensual(animal_id={self.animal_id}, periodo={self.anio}-{self.mes:02d})>"
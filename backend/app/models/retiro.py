@@ -0,0 +1,35 @@
+"""
+Modelo RetiroSanitario - Ventanas de retiro de leche y carne
+"""
+from sqlalchemy import Column, String, Date, ForeignKey, Integer, UniqueConstraint, Index
+from app.db.base_model import BaseModel
+
+
+class RetiroSanitario(BaseModel):
+    """
+    Ventana de retiro derivada de un control sanitario con días de retiro.
+    Se mantiene al crear, editar o eliminar el control, así saber si la leche
+    de una vaca puede ir al tanque (o si un animal se puede vender para carne)
+    es una búsqueda por índice en lugar de recorrer todos los tratamientos.
+    """
+    __tablename__ = "retiros_sanitarios"
+    __table_args__ = (
+        UniqueConstraint("control_sanitario_id", "tipo", name="uq_retiros_control_tipo"),
+        # "¿Este animal está en retiro?" y "animales en retiro de la finca"
+        Index("ix_retiros_animal_tipo_liberacion", "animal_id", "tipo", "fecha_liberacion"),
+        Index("ix_retiros_finca_tipo_liberacion", "finca_id", "tipo", "fecha_liberacion"),
+    )
+    
+    finca_id = Column(Integer, ForeignKey("fincas.id", ondelete="CASCADE"), nullable=False)
+    animal_id = Column(Integer, ForeignKey("animales.id", ondelete="CASCADE"), nullable=False)
+    control_sanitario_id = Column(
+        Integer, ForeignKey("controles_sanitarios.id", ondelete="CASCADE"), nullable=False
+    )
+    
+    tipo = Column(String(10), nullable=False)  # leche, carne
+    fecha_inicio = Column(Date, nullable=False)  # Fecha del tratamiento
+    # Primer día en que el producto vuelve a ser apto (fecha + días de retiro)
+    fecha_liberacion = Column(Date, nullable=False)
+    
+    def __repr__(self):
+        return f"<RetiroSanitario(animal_id={self.animal_id}, tipo={self.tipo}, hasta={self.fecha_liberacion})>"
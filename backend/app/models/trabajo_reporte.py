@@ -0,0 +1,41 @@
+"""
+Modelo TrabajoReporte - Generación asíncrona de reportes PDF/XLSX
+"""
+from sqlalchemy import Column, String, ForeignKey, Integer, Text, DateTime, Index
+from app.db.base_model import BaseModel
+
+
+class TrabajoReporte(BaseModel):
+    """
+    Solicitud de un reporte descargable.
+    El archivo se genera fuera del request y se guarda con el nombre de su
+    huella (tipo + formato + parámetros + versión de los datos), así dos
+    solicitudes idénticas sobre los mismos datos reutilizan el mismo archivo.
+    """
+    __tablename__ = "trabajos_reporte"
+    __table_args__ = (
+        Index("ix_trabajos_reporte_finca_huella", "finca_id", "huella"),
+    )
+    
+    finca_id = Column(Integer, ForeignKey("fincas.id", ondelete="CASCADE"), nullable=False, index=True)
+    
+    # Qué se pidió
+    tipo = Column(String(50), nullable=False)  # inventario, sanitario_ica, financiero, produccion
+    formato = Column(String(10), nullable=False)  # pdf, xlsx
+    parametros = Column(Text)  # JSON con fecha_desde / fecha_hasta
+    huella = Column(String(64), nullable=False)  # SHA-256
+    
+    # Estado del trabajo
+    estado = Column(String(20), nullable=False, default="pendiente")  # pendiente, procesando, completado, error
+    error = Column(Text)
+    iniciado_en = Column(DateTime(timezone=True))
+    terminado_en = Column(DateTime(timezone=True))
+    
+    # Resultado
+    nombre_archivo = Column(String(200))
+    tamano_bytes = Column(Integer)
+    
+    solicitado_por = Column(Integer, ForeignKey("usuarios.id", ondelete="SET NULL"))
+    
+    def __repr__(self):
+        return f"<TrabajoReporte(id={self.id}, tipo={self.tipo}, formato={self.formato}, estado={self.estado})>"
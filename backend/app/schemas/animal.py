@@ -1,9 +1,11 @@
 """
 Schemas Pydantic para Animal
 """
-from typing import Optional
+from typing import Dict, Optional
 from datetime import date, datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
+
+from app.services.imagenes import urls_foto
 
 
 class AnimalBase(BaseModel):
@@ -71,6 +73,12 @@ class AnimalInDB(AnimalBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
+    @computed_field
+    @property
+    def foto_urls(self) -> Optional[Dict[str, str]]:
+        """URLs de la foto por tamaño (thumb, medium, full)"""
+        return urls_foto(self.foto_url)
+
     class Config:
         from_attributes = True
 
@@ -167,3 +167,64 @@ class EstadisticasReproductivas(BaseModel):
     tasa_prenez: float = Field(..., description="Porcentaje de preñez")
     promedio_dias_gestacion: Optional[float] = None
     proximos_partos_30_dias: int
+
+
+class EstadoReproductivoResponse(BaseModel):
+    """Estado reproductivo actual de una hembra"""
+    animal_id: int
+    animal_numero: Optional[str] = None
+    animal_nombre: Optional[str] = None
+    estado: str  # vacia, servida, prenada, parida, seca
+    fecha_estado: date
+    gestante: bool
+    ultimo_parto: Optional[date] = None
+    numero_partos: int
+    ultimo_servicio: Optional[date] = None
+    servicios_ciclo: int
+    fecha_concepcion: Optional[date] = None
+    dias_abiertos: Optional[int] = Field(None, description="Parto a concepción; a hoy si aún no está preñada")
+    fecha_probable_parto: Optional[date] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class EstadoReproductivoListResponse(BaseModel):
+    total: int
+    resumen: dict[str, int]  # Hembras por estado, más "gestantes"
+    items: list[EstadoReproductivoResponse]
+
+
+class EstadisticaDias(BaseModel):
+    promedio: Optional[float] = None
+    mediana: Optional[float] = None
+    n: int
+
+
+class KpiToro(BaseModel):
+    """Desempeño de un toro (o pajuela de inseminación) en el periodo"""
+    toro_id: Optional[int] = None
+    toro: str  # Número del toro o identificación de la pajuela
+    servicios: int
+    concepciones: int
+    tasa_concepcion: Optional[float] = None
+
+
+class KpisReproductivos(BaseModel):
+    """Indicadores reproductivos de un periodo"""
+    fecha_desde: date
+    fecha_hasta: date
+    partos: int
+    servicios: int
+    concepciones: int
+    concepciones_sin_servicio: int = Field(
+        0, description="Preñeces diagnosticadas sin servicio registrado (fuera de la tasa de concepción)"
+    )
+    intervalo_entre_partos: EstadisticaDias
+    dias_abiertos: EstadisticaDias
+    servicios_por_concepcion: Optional[float] = None
+    tasa_concepcion: Optional[float] = Field(None, description="Concepciones de servicios registrados / servicios (%)")
+    ciclos_elegibles: float = Field(..., description="Días de hembras abiertas y aptas / 21")
+    tasa_deteccion_celos: Optional[float] = Field(None, description="Servicios / ciclos elegibles (%)")
+    tasa_prenez_21_dias: Optional[float] = Field(None, description="Concepciones / ciclos elegibles (%)")
+    por_toro: list[KpiToro] = []
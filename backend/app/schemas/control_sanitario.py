@@ -3,7 +3,10 @@ Schemas para Control Sanitario (vacunas, tratamientos, desparasitaciones)
 """
 from datetime import date
 from typing import Optional
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+TIPOS_VALIDOS = ['vacuna', 'tratamiento', 'desparasitacion', 'cirugia', 'otro']
+VIAS_VALIDAS = ['intramuscular', 'subcutanea', 'oral', 'topica', 'intravenosa', 'intramamaria']
 
 
 # ============================================
@@ -33,9 +36,8 @@ class ControlSanitarioBase(BaseModel):
     @field_validator('tipo')
     @classmethod
     def validar_tipo(cls, v: str) -> str:
-        tipos_validos = ['vacuna', 'tratamiento', 'desparasitacion', 'cirugia', 'otro']
-        if v.lower() not in tipos_validos:
-            raise ValueError(f'Tipo debe ser uno de: {", ".join(tipos_validos)}')
+        if v.lower() not in TIPOS_VALIDOS:
+            raise ValueError(f'Tipo debe ser uno de: {", ".join(TIPOS_VALIDOS)}')
         return v.lower()
 
     @field_validator('via_administracion')
@@ -43,9 +45,8 @@ class ControlSanitarioBase(BaseModel):
     def validar_via(cls, v: Optional[str]) -> Optional[str]:
         if v is None:
             return v
-        vias_validas = ['intramuscular', 'subcutanea', 'oral', 'topica', 'intravenosa', 'intramamaria']
-        if v.lower() not in vias_validas:
-            raise ValueError(f'Vía debe ser una de: {", ".join(vias_validas)}')
+        if v.lower() not in VIAS_VALIDAS:
+            raise ValueError(f'Vía debe ser una de: {", ".join(VIAS_VALIDAS)}')
         return v.lower()
 
 
@@ -58,6 +59,59 @@ class ControlSanitarioCreate(ControlSanitarioBase):
     pass
 
 
+class CampanaSelector(BaseModel):
+    """
+    Animales a los que se aplica una campaña. Sin criterios = todos los
+    animales activos de la finca; los criterios se combinan (Y).
+    """
+    animal_ids: Optional[list[int]] = Field(None, min_length=1, max_length=5000, description="Lista explícita")
+    lote: Optional[str] = None
+    potrero: Optional[str] = None
+    categoria: Optional[str] = Field(None, description="ternero, novillo, vaca, toro, etc.")
+    sexo: Optional[str] = Field(None, description="macho, hembra")
+
+
+class CampanaSanitariaCreate(BaseModel):
+    """Schema para aplicar un mismo producto a muchos animales (ciclos de aftosa, brucelosis, etc.)"""
+    tipo: str = Field('vacuna', description="vacuna, tratamiento, desparasitacion, cirugia, otro")
+    fecha: date = Field(..., description="Fecha de aplicación")
+    producto: str = Field(..., min_length=1, max_length=200)
+    dosis: Optional[str] = Field(None, description="Dosis por animal (ej: 2ml)")
+    via_administracion: Optional[str] = None
+    lote_producto: Optional[str] = None
+    fecha_vencimiento: Optional[date] = None
+    veterinario: Optional[str] = None
+    diagnostico: Optional[str] = Field(None, description="Motivo (ej: ciclo de vacunación)")
+    costo_por_animal: Optional[float] = Field(None, ge=0)
+    proxima_dosis: Optional[date] = Field(None, description="Fecha del refuerzo")
+    dias_retiro_leche: Optional[int] = Field(None, ge=0)
+    dias_retiro_carne: Optional[int] = Field(None, ge=0)
+    observaciones: Optional[str] = Field(None, max_length=1000)
+    selector: CampanaSelector = Field(default_factory=CampanaSelector)
+    
+    @field_validator('tipo')
+    @classmethod
+    def validar_tipo(cls, v: str) -> str:
+        if v.lower() not in TIPOS_VALIDOS:
+            raise ValueError(f'Tipo debe ser uno de: {", ".join(TIPOS_VALIDOS)}')
+        return v.lower()
+    
+    @field_validator('via_administracion')
+    @classmethod
+    def validar_via(cls, v: Optional[str]) -> Optional[str]:
+        if v is None:
+            return v
+        if v.lower() not in VIAS_VALIDAS:
+            raise ValueError(f'Vía debe ser una de: {", ".join(VIAS_VALIDAS)}')
+        return v.lower()
+    
+    @model_validator(mode='after')
+    def validar_proxima_dosis(self):
+        if self.proxima_dosis and self.proxima_dosis <= self.fecha:
+            raise ValueError('proxima_dosis debe ser posterior a la fecha de aplicación')
+        return self
+
+
 # ============================================
 # Update Schemas
 # ============================================
@@ -102,6 +156,44 @@ class ControlSanitarioResponse(ControlSanitarioInDB):
     animal_nombre: Optional[str] = None
 
 
+class RetiroResponse(BaseModel):
+    """Ventana de retiro vigente de un animal"""
+    animal_id: int
+    animal_numero: Optional[str] = None
+    animal_nombre: Optional[str] = None
+    tipo: str  # leche, carne
+    fecha_inicio: date
+    fecha_liberacion: date  # Primer día en que el producto vuelve a ser apto
+    control_sanitario_id: int
+    producto: Optional[str] = None
+
+
+class RetiroListResponse(BaseModel):
+    fecha: date
+    total: int
+    items: list[RetiroResponse]
+
+
+class CampanaSanitariaResponse(BaseModel):
+    """Resultado de aplicar una campaña"""
+    fecha: date
+    producto: str
+    aplicados: int
+    omitidos: int  # Ya tenían este producto registrado en la fecha
+    proxima_dosis: Optional[date] = None
+    costo_total: Optional[float] = None
+
+
+class EstadoRetiroAnimal(BaseModel):
+    """Aptitud de la leche y la carne de un animal en una fecha"""
+    animal_id: int
+    fecha: date
+    apto_leche: bool
+    leche_liberada_desde: Optional[date] = None
+    apto_carne: bool
+    carne_liberada_desde: Optional[date] = None
+
+
 # ============================================
 # List/Filter Schemas
 # ============================================
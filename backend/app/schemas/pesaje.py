@@ -0,0 +1,109 @@
+"""
+Schemas para Pesajes (historial de peso y ganancia diaria)
+"""
+from datetime import date
+from typing import Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+
+METODOS_VALIDOS = ['bascula', 'cinta', 'estimado']
+
+
+class PesajeSesionItem(BaseModel):
+    """Un animal pesado en la sesión (por ID o por número de identificación)"""
+    animal_id: Optional[int] = None
+    numero_identificacion: Optional[str] = None
+    peso: float = Field(..., gt=0, le=3000, description="Peso en kg")
+    
+    @model_validator(mode='after')
+    def validar_identificacion(self):
+        if self.animal_id is None and not self.numero_identificacion:
+            raise ValueError('Indique animal_id o numero_identificacion')
+        return self
+
+
+class PesajeSesionCreate(BaseModel):
+    """Sesión de báscula: varios animales pesados el mismo día"""
+    fecha: date
+    metodo: Optional[str] = Field('bascula', description="bascula, cinta, estimado")
+    observaciones: Optional[str] = Field(None, max_length=500)
+    pesajes: list[PesajeSesionItem] = Field(..., min_length=1, max_length=2000)
+    
+    @field_validator('metodo')
+    @classmethod
+    def validar_metodo(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None and v.lower() not in METODOS_VALIDOS:
+            raise ValueError(f'Método debe ser uno de: {", ".join(METODOS_VALIDOS)}')
+        return v.lower() if v else v
+
+
+class PesajeResponse(BaseModel):
+    id: int
+    finca_id: int
+    animal_id: int
+    fecha: date
+    peso: float
+    dias_desde_anterior: Optional[int] = None
+    ganancia_diaria: Optional[float] = None
+    sesion_id: Optional[str] = None
+    metodo: Optional[str] = None
+    observaciones: Optional[str] = None
+    registrado_por: Optional[int] = None
+    animal_numero: Optional[str] = None
+    animal_nombre: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class PesajeSesionResponse(BaseModel):
+    sesion_id: str
+    fecha: date
+    registrados: int
+    items: list[PesajeResponse]
+
+
+class PesajeListResponse(BaseModel):
+    total: int
+    items: list[PesajeResponse]
+    skip: int
+    limit: int
+
+
+class GananciaGrupo(BaseModel):
+    """Ganancia diaria de peso (kg/día) de un animal, lote o potrero"""
+    clave: Optional[str] = None
+    etiqueta: str
+    animales: int
+    pesajes: int
+    peso_inicial: Optional[float] = None
+    peso_final: Optional[float] = None
+    dias: Optional[int] = None
+    ganancia_diaria: Optional[float] = None
+    ganancia_diaria_min: Optional[float] = None
+    ganancia_diaria_max: Optional[float] = None
+
+
+class GananciaResponse(BaseModel):
+    agrupar: str
+    fecha_desde: date
+    fecha_hasta: date
+    items: list[GananciaGrupo]
+
+
+class AnimalBajoObjetivo(BaseModel):
+    animal_id: int
+    animal_numero: str
+    animal_nombre: Optional[str] = None
+    lote_actual: Optional[str] = None
+    potrero_actual: Optional[str] = None
+    fecha_ultimo_pesaje: date
+    peso: float
+    dias_desde_anterior: Optional[int] = None
+    ganancia_diaria: float
+
+
+class BajoObjetivoResponse(BaseModel):
+    objetivo: float
+    total: int
+    items: list[AnimalBajoObjetivo]
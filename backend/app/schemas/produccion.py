@@ -3,7 +3,7 @@ Schemas para Registro de Producción (leche, carne, etc)
 """
 from datetime import date, time
 from typing import Optional
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class RegistroProduccionBase(BaseModel):
@@ -65,3 +65,95 @@ class RegistroProduccionListResponse(BaseModel):
     items: list[RegistroProduccionResponse]
     skip: int
     limit: int
+
+
+class OrdenoLoteItem(BaseModel):
+    """Leche de un animal en el ordeño (por ID o por número de identificación)"""
+    animal_id: Optional[int] = None
+    numero_identificacion: Optional[str] = None
+    cantidad_litros: float = Field(..., ge=0, description="Litros de leche")
+    calidad: Optional[str] = Field(None, description="alta, media, baja")
+    observaciones: Optional[str] = Field(None, max_length=500)
+    
+    @model_validator(mode='after')
+    def validar_identificacion(self):
+        if self.animal_id is None and not self.numero_identificacion:
+            raise ValueError('Indique animal_id o numero_identificacion')
+        return self
+
+
+class OrdenoLoteCreate(BaseModel):
+    """Ordeño completo: la leche de varios animales en una fecha y turno"""
+    fecha: date
+    turno: Optional[str] = Field(None, description="manana, tarde, noche")
+    registros: list[OrdenoLoteItem] = Field(..., min_length=1, max_length=2000)
+    
+    @field_validator('turno')
+    @classmethod
+    def validar_turno(cls, v: Optional[str]) -> Optional[str]:
+        turnos_validos = ['manana', 'tarde', 'noche']
+        if v is not None and v.lower() not in turnos_validos:
+            raise ValueError(f'Turno debe ser uno de: {", ".join(turnos_validos)}')
+        return v.lower() if v else v
+
+
+class OrdenoRechazado(BaseModel):
+    """Leche no registrada porque el animal está en retiro"""
+    animal_id: int
+    animal_numero: Optional[str] = None
+    cantidad_litros: float
+    leche_liberada_desde: date
+
+
+class OrdenoLoteResponse(BaseModel):
+    fecha: date
+    turno: Optional[str] = None
+    registrados: int
+    litros_registrados: float
+    rechazados: list[OrdenoRechazado]
+
+
+class LactanciaResponse(BaseModel):
+    """Métricas de una lactancia (curva de Wood: y = a·t^b·e^(-c·t))"""
+    animal_id: int
+    animal_numero: Optional[str] = None
+    animal_nombre: Optional[str] = None
+    numero_lactancia: int
+    fecha_parto: date
+    fecha_secado: Optional[date] = None
+    en_curso: bool
+    dias_en_leche: int
+    dias_con_registro: int
+    litros_acumulados: float
+    produccion_305_proyectada: Optional[float] = None
+    pico_litros: Optional[float] = None
+    dia_pico: Optional[float] = None
+    persistencia: Optional[float] = None
+    wood_a: Optional[float] = None
+    wood_b: Optional[float] = None
+    wood_c: Optional[float] = None
+
+
+class LactanciaListResponse(BaseModel):
+    total: int
+    items: list[LactanciaResponse]
+
+
+class PuntoSerie(BaseModel):
+    fecha: date
+    litros: float
+    numero_ordenos: int
+
+
+class SerieProduccion(BaseModel):
+    clave: Optional[str] = None  # animal_id o lote; None para la finca completa
+    etiqueta: str
+    puntos: list[PuntoSerie]
+
+
+class SeriesProduccionResponse(BaseModel):
+    agrupar: str
+    resolucion: str
+    fecha_desde: date
+    fecha_hasta: date
+    series: list[SerieProduccion]
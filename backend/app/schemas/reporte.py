@@ -0,0 +1,102 @@
+"""
+Schemas para Reportes: estado de resultados / flujo de caja y reportes descargables
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+TIPOS_REPORTE = ['inventario', 'sanitario_ica', 'financiero', 'produccion']
+FORMATOS_REPORTE = ['pdf', 'xlsx']
+
+
+class FilaResultados(BaseModel):
+    """Una fila del PyG: montos por concepto y resultado"""
+    clave: Optional[str] = None  # YYYY-MM, categoría o animal_id
+    etiqueta: str
+    ingresos: float
+    compras: float
+    gastos: float
+    costos_sanitarios: float
+    costos_reproductivos: float
+    resultado: float
+    flujo_acumulado: Optional[float] = None  # Solo por mes
+    resultado_comparado: Optional[float] = None  # Misma fila en el periodo comparado
+
+
+class ComparacionPeriodo(BaseModel):
+    tipo: str  # periodo_anterior, anio_anterior
+    fecha_desde: date
+    fecha_hasta: date
+    totales: FilaResultados
+    variacion_resultado: float
+    variacion_resultado_pct: Optional[float] = None
+
+
+class EstadoResultadosResponse(BaseModel):
+    fecha_desde: date
+    fecha_hasta: date
+    dimension: str
+    totales: FilaResultados
+    items: list[FilaResultados]
+    comparacion: Optional[ComparacionPeriodo] = None
+
+
+# ============================================
+# Reportes descargables (PDF / XLSX)
+# ============================================
+
+class TrabajoReporteCreate(BaseModel):
+    """Solicitud de un reporte descargable"""
+    tipo: str = Field(..., description="inventario, sanitario_ica, financiero, produccion")
+    formato: str = Field('pdf', description="pdf, xlsx")
+    fecha_desde: Optional[date] = Field(None, description="Por defecto, inicio del año")
+    fecha_hasta: Optional[date] = Field(None, description="Por defecto, hoy")
+    
+    @field_validator('tipo')
+    @classmethod
+    def validar_tipo(cls, v: str) -> str:
+        if v.lower() not in TIPOS_REPORTE:
+            raise ValueError(f'Tipo debe ser uno de: {", ".join(TIPOS_REPORTE)}')
+        return v.lower()
+    
+    @field_validator('formato')
+    @classmethod
+    def validar_formato(cls, v: str) -> str:
+        if v.lower() not in FORMATOS_REPORTE:
+            raise ValueError(f'Formato debe ser uno de: {", ".join(FORMATOS_REPORTE)}')
+        return v.lower()
+    
+    @model_validator(mode='after')
+    def validar_rango(self):
+        if self.fecha_desde and self.fecha_hasta and self.fecha_desde > self.fecha_hasta:
+            raise ValueError('fecha_desde debe ser anterior a fecha_hasta')
+        return self
+
+
+class TrabajoReporteResponse(BaseModel):
+    id: int
+    tipo: str
+    formato: str
+    estado: str  # pendiente, procesando, completado, error
+    parametros: Dict[str, Any] = {}
+    error: Optional[str] = None
+    tamano_bytes: Optional[int] = None
+    created_at: datetime
+    iniciado_en: Optional[datetime] = None
+    terminado_en: Optional[datetime] = None
+    
+    @field_validator('parametros', mode='before')
+    @classmethod
+    def decodificar_parametros(cls, valor):
+        if isinstance(valor, str):
+            return json.loads(valor)
+        return valor or {}
+    
+    class Config:
+        from_attributes = True
+
+
+class TrabajoReporteListResponse(BaseModel):
+    total: int
+    items: List[TrabajoReporteResponse]
@@ -1,7 +1,7 @@
 """
 Schemas para Transacciones Financieras (ventas, compras, gastos)
 """
-from datetime import date
+from datetime import date, datetime
 from typing import Optional
 from pydantic import BaseModel, Field, field_validator
 
@@ -90,3 +90,25 @@ class ResumenFinanciero(BaseModel):
     ventas_mes_actual: float
     gastos_mes_actual: float
     gasto_por_categoria: dict[str, float]
+
+
+class CierrePeriodoCreate(BaseModel):
+    """Mes a cerrar"""
+    anio: int = Field(..., ge=2000, le=2100)
+    mes: int = Field(..., ge=1, le=12)
+
+
+class CierrePeriodoResponse(BaseModel):
+    id: int
+    finca_id: int
+    anio: int
+    mes: int
+    total_ventas: float
+    total_compras: float
+    total_gastos: float
+    numero_transacciones: int
+    cerrado_por: Optional[int] = None
+    fecha_cierre: datetime
+    
+    class Config:
+        from_attributes = True
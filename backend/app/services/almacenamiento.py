@@ -0,0 +1,366 @@
+"""
+Almacenamiento de archivos de medios (fotos) direccionado por contenido.
+
+Las claves se derivan del hash SHA-256 del archivo original, así que subir dos
+veces la misma foto reutiliza los mismos blobs. El backend es intercambiable:
+disco local (desarrollo, un solo nodo) o un bucket compatible con S3
+(AWS, MinIO, etc.) para escalar horizontalmente sin disco compartido.
+
+Los archivos de reportes (PDF/XLSX) usan el mismo backend en otro almacén
+(obtener_almacen_reportes): en S3 bajo su propio prefijo, así cualquier nodo
+descarga lo que generó otro.
+
+Como un blob puede estar a punto de ser referenciado por una subida que aún
+no hizo commit, nada se borra si se modificó hace menos de un periodo de
+gracia: la subida que reutiliza blobs existentes los renueva (renovar()) y
+tanto el borrado al reemplazar una foto como la recolección de huérfanos
+respetan esa fecha.
+"""
+import os
+import shutil
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Set, Tuple
+from uuid import uuid4
+
+from app.core.config import settings
+
+PREFIJO_ANIMALES = "animales"
+CHUNK_LECTURA = 64 * 1024
+
+# Blobs modificados hace menos que esto no se borran (subidas sin commit todavía)
+GRACIA_SUBIDAS = timedelta(minutes=10)
+
+
+def clave_foto_animal(hash_contenido: str, rendicion: str) -> str:
+    """Clave de una rendición: animales/ab/abcdef..._thumb.webp"""
+    return f"{PREFIJO_ANIMALES}/{hash_contenido[:2]}/{hash_contenido}_{rendicion}.webp"
+
+
+class AlmacenMedia(ABC):
+    """Interfaz común de los backends de almacenamiento"""
+    
+    @abstractmethod
+    def existe(self, clave: str) -> bool:
+        ...
+    
+    @abstractmethod
+    def guardar(self, clave: str, datos: bytes, content_type: str) -> None:
+        ...
+    
+    @abstractmethod
+    def subir(self, clave: str, origen: Path, content_type: str) -> None:
+        """Guardar el contenido de un archivo local sin cargarlo en memoria"""
+        ...
+    
+    @abstractmethod
+    def leer(self, clave: str) -> Iterator[bytes]:
+        """Contenido de un blob por partes; FileNotFoundError si no existe"""
+        ...
+    
+    @abstractmethod
+    def renovar(self, clave: str, content_type: str) -> bool:
+        """Actualizar la fecha de modificación de un blob; False si no existe"""
+        ...
+    
+    @abstractmethod
+    def modificado(self, clave: str) -> Optional[datetime]:
+        """Fecha de modificación de un blob, o None si no existe"""
+        ...
+    
+    @abstractmethod
+    def eliminar(self, clave: str) -> None:
+        ...
+    
+    @abstractmethod
+    def listar(self, prefijo: str) -> Iterator[Tuple[str, datetime]]:
+        """Listar (clave, fecha de modificación) bajo un prefijo"""
+        ...
+    
+    @abstractmethod
+    def url(self, clave: str) -> str:
+        ...
+    
+    @abstractmethod
+    def clave_desde_url(self, url: str) -> Optional[str]:
+        """Clave correspondiente a una URL pública, o None si no pertenece al almacén"""
+        ...
+
+
+class AlmacenLocal(AlmacenMedia):
+    """Archivos en un directorio local servidos bajo MEDIA_URL"""
+    
+    def __init__(self, raiz: str, url_base: str):
+        self.raiz = Path(raiz)
+        self.url_base = url_base.rstrip("/")
+        self.raiz.mkdir(parents=True, exist_ok=True)
+    
+    def _ruta(self, clave: str) -> Path:
+        return self.raiz / clave
+    
+    def existe(self, clave: str) -> bool:
+        return self._ruta(clave).is_file()
+    
+    def guardar(self, clave: str, datos: bytes, content_type: str) -> None:
+        destino = self._ruta(clave)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        # Escribir a un temporal y publicar con rename atómico
+        temporal = destino.with_name(f".{destino.name}.{uuid4().hex}.tmp")
+        temporal.write_bytes(datos)
+        temporal.replace(destino)
+    
+    def subir(self, clave: str, origen: Path, content_type: str) -> None:
+        destino = self._ruta(clave)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        # Copia (el origen puede estar en otro sistema de archivos) y rename atómico
+        temporal = destino.with_name(f".{destino.name}.{uuid4().hex}.tmp")
+        try:
+            shutil.copyfile(origen, temporal)
+            temporal.replace(destino)
+        finally:
+            temporal.unlink(missing_ok=True)
+    
+    def leer(self, clave: str) -> Iterator[bytes]:
+        with open(self._ruta(clave), "rb") as archivo:
+            while chunk := archivo.read(CHUNK_LECTURA):
+                yield chunk
+    
+    def renovar(self, clave: str, content_type: str) -> bool:
+        try:
+            os.utime(self._ruta(clave))
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def modificado(self, clave: str) -> Optional[datetime]:
+        try:
+            return datetime.fromtimestamp(self._ruta(clave).stat().st_mtime, tz=timezone.utc)
+        except FileNotFoundError:
+            return None
+    
+    def eliminar(self, clave: str) -> None:
+        self._ruta(clave).unlink(missing_ok=True)
+    
+    def listar(self, prefijo: str) -> Iterator[Tuple[str, datetime]]:
+        base = self._ruta(prefijo)
+        if not base.exists():
+            return
+        for ruta in base.rglob("*"):
+            if ruta.is_file() and not ruta.name.startswith("."):
+                modificado = datetime.fromtimestamp(ruta.stat().st_mtime, tz=timezone.utc)
+                yield ruta.relative_to(self.raiz).as_posix(), modificado
+    
+    def url(self, clave: str) -> str:
+        return f"{self.url_base}/{clave}"
+    
+    def clave_desde_url(self, url: str) -> Optional[str]:
+        prefijo = f"{self.url_base}/"
+        return url[len(prefijo):] if url.startswith(prefijo) else None
+
+
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+
+
+class AlmacenS3(AlmacenMedia):
+    """
+    Bucket compatible con S3 (AWS S3, MinIO, etc.). Con `prefijo`, las claves
+    se guardan bajo ese prefijo del bucket (p.ej. reportes/ab/abcdef.pdf).
+    """
+    
+    def __init__(
+        self,
+        bucket: str,
+        url_publica: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        cliente=None,
+        prefijo: str = ""
+    ):
+        if cliente is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError(
+                    "MEDIA_BACKEND=s3 requiere el paquete boto3 (pip install boto3)"
+                ) from e
+            cliente = boto3.client(
+                "s3",
+                endpoint_url=endpoint_url,
+                region_name=region,
+                aws_access_key_id=access_key_id,
+                aws_secret_access_key=secret_access_key,
+            )
+        self.cliente = cliente
+        self.bucket = bucket
+        self.url_publica = url_publica.rstrip("/")
+        self.prefijo = prefijo.strip("/")
+    
+    def _key(self, clave: str) -> str:
+        return f"{self.prefijo}/{clave}" if self.prefijo else clave
+    
+    @staticmethod
+    def _no_existe(error) -> bool:
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+    
+    def existe(self, clave: str) -> bool:
+        return self.modificado(clave) is not None
+    
+    def guardar(self, clave: str, datos: bytes, content_type: str) -> None:
+        # Contenido direccionado por hash: nunca cambia para una misma clave
+        self.cliente.put_object(
+            Bucket=self.bucket,
+            Key=self._key(clave),
+            Body=datos,
+            ContentType=content_type,
+            CacheControl=CACHE_INMUTABLE,
+        )
+    
+    def subir(self, clave: str, origen: Path, content_type: str) -> None:
+        # Subida por partes para archivos grandes (boto3 decide según el tamaño)
+        self.cliente.upload_file(
+            str(origen), self.bucket, self._key(clave),
+            ExtraArgs={"ContentType": content_type, "CacheControl": CACHE_INMUTABLE},
+        )
+    
+    def leer(self, clave: str) -> Iterator[bytes]:
+        from botocore.exceptions import ClientError
+        try:
+            cuerpo = self.cliente.get_object(Bucket=self.bucket, Key=self._key(clave))["Body"]
+        except ClientError as e:
+            if self._no_existe(e):
+                raise FileNotFoundError(clave) from e
+            raise
+        try:
+            yield from cuerpo.iter_chunks(CHUNK_LECTURA)
+        finally:
+            cuerpo.close()
+    
+    def renovar(self, clave: str, content_type: str) -> bool:
+        # Copiar el objeto sobre sí mismo (en el servidor) actualiza LastModified
+        from botocore.exceptions import ClientError
+        try:
+            self.cliente.copy_object(
+                Bucket=self.bucket,
+                Key=self._key(clave),
+                CopySource={"Bucket": self.bucket, "Key": self._key(clave)},
+                MetadataDirective="REPLACE",
+                ContentType=content_type,
+                CacheControl=CACHE_INMUTABLE,
+            )
+            return True
+        except ClientError as e:
+            if self._no_existe(e):
+                return False
+            raise
+    
+    def modificado(self, clave: str) -> Optional[datetime]:
+        from botocore.exceptions import ClientError
+        try:
+            return self.cliente.head_object(Bucket=self.bucket, Key=self._key(clave))["LastModified"]
+        except ClientError as e:
+            if self._no_existe(e):
+                return None
+            raise
+    
+    def eliminar(self, clave: str) -> None:
+        self.cliente.delete_object(Bucket=self.bucket, Key=self._key(clave))
+    
+    def listar(self, prefijo: str) -> Iterator[Tuple[str, datetime]]:
+        base = self._key(prefijo) if prefijo else self.prefijo
+        desde = len(self.prefijo) + 1 if self.prefijo else 0
+        paginador = self.cliente.get_paginator("list_objects_v2")
+        for pagina in paginador.paginate(Bucket=self.bucket, Prefix=f"{base}/" if base else ""):
+            for objeto in pagina.get("Contents", []):
+                yield objeto["Key"][desde:], objeto["LastModified"]
+    
+    def url(self, clave: str) -> str:
+        return f"{self.url_publica}/{self._key(clave)}"
+    
+    def clave_desde_url(self, url: str) -> Optional[str]:
+        prefijo = f"{self.url_publica}/{self._key('')}"
+        return url[len(prefijo):] if url.startswith(prefijo) else None
+
+
+def _almacen_s3(prefijo: str = "") -> AlmacenS3:
+    if not settings.S3_BUCKET:
+        raise RuntimeError("MEDIA_BACKEND=s3 requiere S3_BUCKET")
+    url_publica = settings.S3_PUBLIC_URL or (
+        f"{settings.S3_ENDPOINT_URL.rstrip('/')}/{settings.S3_BUCKET}"
+        if settings.S3_ENDPOINT_URL
+        else f"https://{settings.S3_BUCKET}.s3.amazonaws.com"
+    )
+    return AlmacenS3(
+        bucket=settings.S3_BUCKET,
+        url_publica=url_publica,
+        endpoint_url=settings.S3_ENDPOINT_URL,
+        region=settings.S3_REGION,
+        access_key_id=settings.S3_ACCESS_KEY_ID,
+        secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+        prefijo=prefijo,
+    )
+
+
+@lru_cache
+def obtener_almacen() -> AlmacenMedia:
+    """Backend de almacenamiento configurado (MEDIA_BACKEND)"""
+    if settings.MEDIA_BACKEND == "s3":
+        return _almacen_s3()
+    return AlmacenLocal(settings.MEDIA_ROOT, settings.MEDIA_URL)
+
+
+@lru_cache
+def obtener_almacen_reportes() -> AlmacenMedia:
+    """
+    Almacén de los archivos de reportes, con el mismo backend que los medios:
+    REPORTES_ROOT en local (no se sirve como estático) o REPORTES_S3_PREFIX
+    del bucket. Se descargan siempre a través de la API, nunca por su URL.
+    """
+    if settings.MEDIA_BACKEND == "s3":
+        return _almacen_s3(settings.REPORTES_S3_PREFIX)
+    return AlmacenLocal(settings.REPORTES_ROOT, "")
+
+
+def recolectar_huerfanos(
+    almacen: AlmacenMedia,
+    urls_referenciadas: Iterable[str],
+    antiguedad_minima: timedelta = timedelta(hours=1),
+    simulacion: bool = False
+) -> Set[str]:
+    """
+    Eliminar los blobs de fotos que ningún animal referencia.
+    
+    Solo se borran blobs más antiguos que `antiguedad_minima`, para no competir
+    con subidas en curso cuyo commit aún no se ha hecho. La fecha se vuelve a
+    consultar justo antes de borrar: una subida de la misma foto pudo
+    renovarlo después del listado.
+    
+    Args:
+        almacen: Backend de almacenamiento
+        urls_referenciadas: Todas las URLs de rendiciones en uso
+        antiguedad_minima: Periodo de gracia
+        simulacion: Si es True, no elimina nada (solo reporta)
+    
+    Returns:
+        Claves eliminadas (o que se eliminarían en simulación)
+    """
+    referenciadas = {
+        clave for clave in (almacen.clave_desde_url(url) for url in urls_referenciadas)
+        if clave
+    }
+    limite = datetime.now(timezone.utc) - antiguedad_minima
+    
+    eliminadas: Set[str] = set()
+    for clave, modificado in almacen.listar(PREFIJO_ANIMALES):
+        if clave in referenciadas or modificado > limite:
+            continue
+        if not simulacion:
+            modificado = almacen.modificado(clave)
+            if modificado is None or modificado > limite:
+                continue
+            almacen.eliminar(clave)
+        eliminadas.add(clave)
+    return eliminadas
@@ -0,0 +1,225 @@
+"""
+Máquina de estados reproductivos por hembra.
+
+El estado se deriva recorriendo en orden cronológico los eventos de la hembra:
+
+    servicio            -> servida
+    diagnóstico preñada -> preñada (gestante)
+    diagnóstico vacía   -> vacía
+    parto               -> parida (nuevo ciclo)
+    aborto              -> vacía (nuevo ciclo)
+    secado              -> seca (conserva la gestación)
+
+Al crear, editar o eliminar un evento se recalcula solo la hembra afectada
+(sus eventos son pocos) y se guarda en EstadoReproductivoActual dentro de la
+misma transacción.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.animal import Animal
+from app.models.control_reproductivo import ControlReproductivo
+from app.models.estado_reproductivo import EstadoReproductivoActual
+
+DIAS_GESTACION = 283  # Promedio bovino, si el diagnóstico no trae fecha probable de parto
+
+COLUMNAS_EVENTO = (
+    ControlReproductivo.animal_id,
+    ControlReproductivo.finca_id,
+    ControlReproductivo.tipo_evento,
+    ControlReproductivo.fecha_evento,
+    ControlReproductivo.diagnostico,
+    ControlReproductivo.dias_gestacion,
+    ControlReproductivo.fecha_probable_parto,
+)
+
+
+def recorrer_eventos(eventos: Iterable) -> Optional[Dict[str, Any]]:
+    """
+    Estado resultante de una secuencia de eventos de una hembra, ordenados
+    por fecha. Devuelve None si ningún evento define un estado.
+    """
+    estado: Optional[Dict[str, Any]] = None
+    for evento in eventos:
+        if estado is None:
+            estado = {
+                "finca_id": evento.finca_id,
+                "animal_id": evento.animal_id,
+                "estado": None,
+                "fecha_estado": None,
+                "gestante": False,
+                "ultimo_parto": None,
+                "numero_partos": 0,
+                "ultimo_servicio": None,
+                "servicios_ciclo": 0,
+                "fecha_concepcion": None,
+                "dias_abiertos": None,
+                "fecha_probable_parto": None,
+            }
+        tipo = evento.tipo_evento
+        fecha = evento.fecha_evento
+        
+        if tipo == "servicio":
+            estado.update(estado="servida", ultimo_servicio=fecha)
+            estado["servicios_ciclo"] += 1
+        elif tipo == "diagnostico" and evento.diagnostico == "prenada":
+            if evento.dias_gestacion is not None:
+                concepcion = fecha - timedelta(days=evento.dias_gestacion)
+            else:
+                concepcion = estado["ultimo_servicio"] or fecha
+            estado.update(
+                estado="prenada",
+                gestante=True,
+                fecha_concepcion=concepcion,
+                fecha_probable_parto=(
+                    evento.fecha_probable_parto or concepcion + timedelta(days=DIAS_GESTACION)
+                ),
+                dias_abiertos=(
+                    (concepcion - estado["ultimo_parto"]).days if estado["ultimo_parto"] else None
+                )
+            )
+        elif tipo == "diagnostico" and evento.diagnostico == "vacia":
+            estado.update(
+                estado="vacia", gestante=False, fecha_concepcion=None,
+                fecha_probable_parto=None, dias_abiertos=None
+            )
+        elif tipo in ("parto", "aborto"):
+            estado.update(
+                estado="parida" if tipo == "parto" else "vacia",
+                gestante=False,
+                servicios_ciclo=0,
+                fecha_concepcion=None,
+                fecha_probable_parto=None,
+                dias_abiertos=None
+            )
+            if tipo == "parto":
+                estado["ultimo_parto"] = fecha
+                estado["numero_partos"] += 1
+        elif tipo == "secado":
+            estado["estado"] = "seca"
+        else:
+            # Diagnóstico dudoso u otros eventos: no cambian el estado
+            continue
+        estado["fecha_estado"] = fecha
+    
+    if estado is None or estado["estado"] is None:
+        return None
+    return estado
+
+
+def actualizar_estado(db: Session, animal_id: int) -> None:
+    """
+    Recalcular el estado de una hembra desde sus eventos. No hace commit;
+    llamar después de flush para que el evento nuevo o editado sea visible.
+    """
+    eventos = db.execute(
+        select(*COLUMNAS_EVENTO)
+        .where(ControlReproductivo.animal_id == animal_id)
+        .order_by(ControlReproductivo.fecha_evento, ControlReproductivo.id)
+    ).all()
+    nuevo = recorrer_eventos(eventos)
+    
+    actual = db.query(EstadoReproductivoActual).filter(
+        EstadoReproductivoActual.animal_id == animal_id
+    ).first()
+    if nuevo is None:
+        if actual:
+            db.delete(actual)
+    elif actual:
+        for campo, valor in nuevo.items():
+            setattr(actual, campo, valor)
+    else:
+        db.add(EstadoReproductivoActual(**nuevo))
+
+
+def resumen_estados(db: Session, finca_id: int) -> Dict[str, int]:
+    """Conteo de hembras activas por estado, más las gestantes (las vendidas o muertas no cuentan)"""
+    filas = db.execute(
+        select(EstadoReproductivoActual.estado, func.count())
+        .join(Animal, Animal.id == EstadoReproductivoActual.animal_id)
+        .where(EstadoReproductivoActual.finca_id == finca_id, Animal.estado == "activo")
+        .group_by(EstadoReproductivoActual.estado)
+    ).all()
+    resumen = {estado: cantidad for estado, cantidad in filas}
+    resumen["gestantes"] = db.execute(
+        select(func.count())
+        .select_from(EstadoReproductivoActual)
+        .join(Animal, Animal.id == EstadoReproductivoActual.animal_id)
+        .where(
+            EstadoReproductivoActual.finca_id == finca_id,
+            EstadoReproductivoActual.gestante.is_(True),
+            Animal.estado == "activo"
+        )
+    ).scalar()
+    return resumen
+
+
+def proximos_partos(db: Session, finca_id: int, hasta: date, desde: Optional[date] = None):
+    """
+    Consulta de las hembras activas gestantes con parto probable entre
+    `desde` (hoy) y `hasta`. Ya une Animal, para traerlo con with_entities.
+    """
+    desde = desde or date.today()
+    return db.query(EstadoReproductivoActual).join(
+        Animal, Animal.id == EstadoReproductivoActual.animal_id
+    ).filter(
+        EstadoReproductivoActual.finca_id == finca_id,
+        EstadoReproductivoActual.gestante.is_(True),
+        EstadoReproductivoActual.fecha_probable_parto >= desde,
+        EstadoReproductivoActual.fecha_probable_parto <= hasta,
+        Animal.estado == "activo"
+    )
+
+
+def recalcular_estados(db: Session, finca_id: Optional[int] = None, lote: int = 1000) -> int:
+    """
+    Reconstruir la tabla de estados desde todos los eventos (backfill), en
+    un solo recorrido ordenado por hembra y fecha. No hace commit.
+    
+    Returns:
+        Número de hembras con estado
+    """
+    filtros = []
+    if finca_id is not None:
+        filtros.append(ControlReproductivo.finca_id == finca_id)
+        db.execute(delete(EstadoReproductivoActual).where(EstadoReproductivoActual.finca_id == finca_id))
+    else:
+        db.execute(delete(EstadoReproductivoActual))
+    
+    eventos = db.execute(
+        select(*COLUMNAS_EVENTO)
+        .where(*filtros)
+        .order_by(ControlReproductivo.animal_id, ControlReproductivo.fecha_evento, ControlReproductivo.id)
+        .execution_options(yield_per=lote)
+    )
+    
+    estados = []
+    total = 0
+    
+    def guardar():
+        nonlocal estados, total
+        if estados:
+            db.execute(insert(EstadoReproductivoActual), estados)
+            total += len(estados)
+            estados = []
+    
+    animal_actual = None
+    eventos_animal = []
+    for evento in eventos:
+        if evento.animal_id != animal_actual:
+            estado = recorrer_eventos(eventos_animal)
+            if estado:
+                estados.append(estado)
+                if len(estados) >= lote:
+                    guardar()
+            animal_actual = evento.animal_id
+            eventos_animal = []
+        eventos_animal.append(evento)
+    estado = recorrer_eventos(eventos_animal)
+    if estado:
+        estados.append(estado)
+    guardar()
+    return total
@@ -0,0 +1,95 @@
+"""
+Procesamiento de imágenes de animales (miniaturas y re-codificación WebP).
+
+Pillow se importa en procesar_imagen: solo lo necesitan las subidas de fotos.
+"""
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+# Tamaños generados para cada foto: nombre -> lado mayor en píxeles
+RENDICIONES: Dict[str, int] = {
+    "thumb": 160,   # Avatares en listas
+    "medium": 640,  # Fichas y modales
+    "full": 1600,   # Vista completa
+}
+
+RENDICION_PRINCIPAL = "full"
+CALIDAD_WEBP = {"thumb": 70, "medium": 78, "full": 82}
+
+# Bytes necesarios para identificar el formato por su firma
+BYTES_FIRMA = 12
+
+
+class ImagenInvalidaError(ValueError):
+    """El contenido subido no es una imagen que Pillow pueda decodificar"""
+
+
+def detectar_formato(cabecera: bytes) -> Optional[str]:
+    """
+    Identificar el formato de imagen por sus primeros bytes (magic bytes).
+    
+    Returns:
+        "jpeg", "png", "webp" o None si no es un formato permitido
+    """
+    if cabecera.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if cabecera.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def procesar_imagen(origen: Union[bytes, str, Path]) -> Dict[str, bytes]:
+    """
+    Generar las rendiciones WebP de una foto (bytes o ruta a archivo).
+    
+    - Corrige la orientación según EXIF y luego descarta todos los metadatos
+    - Reduce al lado mayor de cada rendición (nunca amplía)
+    - Re-codifica en WebP
+    
+    Operación intensiva en CPU: llamarla fuera del event loop.
+    
+    Returns:
+        Diccionario nombre_rendicion -> bytes WebP
+    """
+    from PIL import Image, ImageOps
+    
+    try:
+        imagen = Image.open(BytesIO(origen) if isinstance(origen, bytes) else origen)
+        imagen.load()
+    except Exception as e:
+        raise ImagenInvalidaError("No se pudo leer la imagen: el archivo está dañado o incompleto") from e
+    
+    imagen = ImageOps.exif_transpose(imagen)
+    modo = "RGBA" if imagen.mode in ("RGBA", "LA", "P") else "RGB"
+    imagen = imagen.convert(modo)
+    
+    rendiciones: Dict[str, bytes] = {}
+    for nombre, lado in RENDICIONES.items():
+        copia = imagen.copy()
+        copia.thumbnail((lado, lado), Image.LANCZOS)
+        buffer = BytesIO()
+        # Sin parámetro exif: la imagen resultante no lleva metadatos
+        copia.save(buffer, format="WEBP", quality=CALIDAD_WEBP[nombre], method=4)
+        rendiciones[nombre] = buffer.getvalue()
+    
+    return rendiciones
+
+
+def urls_foto(foto_url: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    Obtener las URLs por tamaño a partir de la URL principal guardada en el animal.
+    
+    Las fotos antiguas (sin rendiciones) devuelven la misma URL para todos los tamaños.
+    """
+    if not foto_url:
+        return None
+    
+    sufijo = f"_{RENDICION_PRINCIPAL}.webp"
+    if not foto_url.endswith(sufijo):
+        return {nombre: foto_url for nombre in RENDICIONES}
+    
+    base = foto_url[: -len(sufijo)]
+    return {nombre: f"{base}_{nombre}.webp" for nombre in RENDICIONES}
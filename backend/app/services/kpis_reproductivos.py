@@ -0,0 +1,256 @@
+"""
+Indicadores reproductivos de la finca: intervalo entre partos, días abiertos,
+servicios por concepción, tasa de concepción, tasa de detección de celos y
+tasa de preñez a 21 días, con desglose por toro / pajuela.
+
+Todos salen de un único recorrido de los eventos de la finca ordenados por
+hembra y fecha: cada hembra se procesa de forma secuencial (streaming) y los
+resultados se acumulan en totales, sin cargar el historial completo en memoria.
+Se cachean por (finca, periodo) hasta que cambian los eventos.
+"""
+from datetime import date, timedelta
+from statistics import mean, median
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import CacheVersionado
+from app.models.animal import Animal
+from app.models.control_reproductivo import ControlReproductivo
+
+# Periodo de espera voluntario tras el parto antes de volver a servir
+DIAS_ESPERA_VOLUNTARIA = 45
+# Duración del ciclo estral (base de las tasas de detección y de preñez)
+DIAS_CICLO = 21
+# Gestación mínima para inferir la concepción desde un parto sin diagnóstico
+DIAS_GESTACION_MINIMA = 240
+
+_cache = CacheVersionado(max_entradas=128)
+
+
+def version_eventos(db: Session, finca_id: int) -> tuple:
+    """Huella de los eventos reproductivos y de las salidas de hembras"""
+    eventos = db.execute(
+        select(
+            func.count(),
+            func.max(ControlReproductivo.id),
+            func.max(ControlReproductivo.updated_at)
+        ).where(ControlReproductivo.finca_id == finca_id)
+    ).one()
+    hembras = db.execute(
+        select(func.count(Animal.fecha_salida), func.max(Animal.updated_at)).where(
+            Animal.finca_id == finca_id,
+            Animal.sexo == "hembra"
+        )
+    ).one()
+    return tuple(eventos) + tuple(hembras)
+
+
+class _Acumulador:
+    """Totales del periodo, alimentados hembra por hembra"""
+    
+    def __init__(self, desde: date, hasta: date):
+        self.desde = desde
+        self.hasta = hasta
+        self.intervalos_parto: List[int] = []
+        self.dias_abiertos: List[int] = []
+        self.servicios_concepcion: List[int] = []
+        self.servicios = 0
+        self.concepciones = 0
+        self.concepciones_sin_servicio = 0  # Diagnósticos sin servicio registrado en el ciclo
+        self.partos = 0
+        self.dias_elegibles = 0
+        self.toros: Dict[Any, Dict[str, int]] = {}
+    
+    def en_periodo(self, fecha: date) -> bool:
+        return self.desde <= fecha <= self.hasta
+    
+    def toro(self, clave) -> Dict[str, int]:
+        return self.toros.setdefault(clave, {"servicios": 0, "concepciones": 0})
+    
+    def sumar_elegible(self, inicio: Optional[date], fin: date) -> None:
+        """Días de [inicio, fin) en que la hembra estaba abierta y apta para servicio"""
+        if inicio is None:
+            return
+        dias = (min(fin, self.hasta + timedelta(days=1)) - max(inicio, self.desde)).days
+        if dias > 0:
+            self.dias_elegibles += dias
+
+
+def _recorrer_hembra(eventos: list, fecha_salida: Optional[date], acumulado: _Acumulador) -> None:
+    """Recorrer los eventos (ordenados) de una hembra y sumar sus aportes al periodo"""
+    ultimo_parto: Optional[date] = None
+    servicios_ciclo: list = []  # (fecha, toro) desde el último parto o la última concepción
+    gestante = False
+    elegible_desde: Optional[date] = None
+    
+    def concebir(fecha_concepcion: date) -> None:
+        nonlocal gestante, servicios_ciclo
+        acumulado.sumar_elegible(elegible_desde, fecha_concepcion)
+        if acumulado.en_periodo(fecha_concepcion):
+            acumulado.concepciones += 1
+            if servicios_ciclo:
+                acumulado.servicios_concepcion.append(len(servicios_ciclo))
+                acumulado.toro(servicios_ciclo[-1][1])["concepciones"] += 1
+            else:
+                acumulado.concepciones_sin_servicio += 1
+            if ultimo_parto:
+                acumulado.dias_abiertos.append((fecha_concepcion - ultimo_parto).days)
+        gestante = True
+        servicios_ciclo = []
+    
+    for evento in eventos:
+        tipo = evento.tipo_evento
+        fecha = evento.fecha_evento
+        if elegible_desde is None and ultimo_parto is None and not gestante:
+            # Novillas: elegibles desde su primer evento registrado
+            elegible_desde = fecha
+        
+        if tipo == "servicio" and not gestante:
+            toro = evento.toro_id or evento.toro_pajuela
+            servicios_ciclo.append((fecha, toro))
+            if acumulado.en_periodo(fecha):
+                acumulado.servicios += 1
+                acumulado.toro(toro)["servicios"] += 1
+        elif tipo == "diagnostico" and evento.diagnostico == "prenada" and not gestante:
+            if servicios_ciclo:
+                concebir(servicios_ciclo[-1][0])
+            elif evento.dias_gestacion is not None:
+                concebir(fecha - timedelta(days=evento.dias_gestacion))
+            else:
+                concebir(fecha)
+        elif tipo == "diagnostico" and evento.diagnostico == "vacia" and gestante:
+            # Pérdida de la gestación: vuelve a estar abierta
+            gestante = False
+            elegible_desde = fecha
+        elif tipo == "parto":
+            if not gestante and servicios_ciclo and (fecha - servicios_ciclo[-1][0]).days >= DIAS_GESTACION_MINIMA:
+                # Parto sin diagnóstico registrado: el último servicio fue el fértil
+                concebir(servicios_ciclo[-1][0])
+            elif not gestante:
+                acumulado.sumar_elegible(elegible_desde, fecha)
+            if acumulado.en_periodo(fecha):
+                acumulado.partos += 1
+                if ultimo_parto:
+                    acumulado.intervalos_parto.append((fecha - ultimo_parto).days)
+            ultimo_parto = fecha
+            servicios_ciclo = []
+            gestante = False
+            elegible_desde = fecha + timedelta(days=DIAS_ESPERA_VOLUNTARIA)
+        elif tipo == "aborto":
+            if not gestante:
+                acumulado.sumar_elegible(elegible_desde, fecha)
+            servicios_ciclo = []
+            gestante = False
+            elegible_desde = fecha
+    
+    # Sigue abierta hasta el final del periodo (o hasta que salió de la finca)
+    if not gestante:
+        fin = acumulado.hasta + timedelta(days=1)
+        if fecha_salida:
+            fin = min(fin, fecha_salida)
+        acumulado.sumar_elegible(elegible_desde, fin)
+
+
+def _estadistica(valores: List[int]) -> Dict[str, Any]:
+    if not valores:
+        return {"promedio": None, "mediana": None, "n": 0}
+    return {"promedio": round(mean(valores), 1), "mediana": float(median(valores)), "n": len(valores)}
+
+
+def _porcentaje(parte: float, total: float) -> Optional[float]:
+    return round(parte / total * 100, 1) if total else None
+
+
+def _calcular(db: Session, finca_id: int, desde: date, hasta: date) -> Dict[str, Any]:
+    eventos = db.execute(
+        select(
+            ControlReproductivo.animal_id,
+            ControlReproductivo.tipo_evento,
+            ControlReproductivo.fecha_evento,
+            ControlReproductivo.diagnostico,
+            ControlReproductivo.dias_gestacion,
+            ControlReproductivo.toro_id,
+            ControlReproductivo.toro_pajuela,
+            Animal.fecha_salida,
+        )
+        .join(Animal, Animal.id == ControlReproductivo.animal_id)
+        .where(
+            ControlReproductivo.finca_id == finca_id,
+            ControlReproductivo.fecha_evento <= hasta
+        )
+        .order_by(ControlReproductivo.animal_id, ControlReproductivo.fecha_evento, ControlReproductivo.id)
+        .execution_options(yield_per=2000)
+    )
+    
+    acumulado = _Acumulador(desde, hasta)
+    animal_actual = None
+    eventos_hembra: list = []
+    fecha_salida = None
+    for evento in eventos:
+        if evento.animal_id != animal_actual:
+            if eventos_hembra:
+                _recorrer_hembra(eventos_hembra, fecha_salida, acumulado)
+            animal_actual = evento.animal_id
+            eventos_hembra = []
+            fecha_salida = evento.fecha_salida
+        eventos_hembra.append(evento)
+    if eventos_hembra:
+        _recorrer_hembra(eventos_hembra, fecha_salida, acumulado)
+    
+    ciclos = acumulado.dias_elegibles / DIAS_CICLO
+    
+    # Etiquetas de los toros de la finca en una sola consulta
+    toro_ids = [clave for clave in acumulado.toros if isinstance(clave, int)]
+    numeros = dict(
+        db.query(Animal.id, Animal.numero_identificacion).filter(Animal.id.in_(toro_ids)).all()
+    ) if toro_ids else {}
+    por_toro = [
+        {
+            "toro_id": clave if isinstance(clave, int) else None,
+            "toro": numeros.get(clave, str(clave)) if clave is not None else "Sin registrar",
+            "servicios": datos["servicios"],
+            "concepciones": datos["concepciones"],
+            "tasa_concepcion": _porcentaje(datos["concepciones"], datos["servicios"]),
+        }
+        for clave, datos in acumulado.toros.items()
+    ]
+    por_toro.sort(key=lambda toro: toro["servicios"], reverse=True)
+    
+    return {
+        "fecha_desde": desde,
+        "fecha_hasta": hasta,
+        "partos": acumulado.partos,
+        "servicios": acumulado.servicios,
+        "concepciones": acumulado.concepciones,
+        "concepciones_sin_servicio": acumulado.concepciones_sin_servicio,
+        "intervalo_entre_partos": _estadistica(acumulado.intervalos_parto),
+        "dias_abiertos": _estadistica(acumulado.dias_abiertos),
+        "servicios_por_concepcion": (
+            round(mean(acumulado.servicios_concepcion), 2) if acumulado.servicios_concepcion else None
+        ),
+        # Solo las concepciones de un servicio registrado: las demás no tienen servicio en el denominador
+        "tasa_concepcion": _porcentaje(
+            acumulado.concepciones - acumulado.concepciones_sin_servicio, acumulado.servicios
+        ),
+        "ciclos_elegibles": round(ciclos, 1),
+        "tasa_deteccion_celos": _porcentaje(acumulado.servicios, ciclos),
+        "tasa_prenez_21_dias": _porcentaje(acumulado.concepciones, ciclos),
+        "por_toro": por_toro,
+    }
+
+
+def kpis_reproductivos(db: Session, finca_id: int, fecha_desde: date, fecha_hasta: date) -> Dict[str, Any]:
+    """
+    Indicadores reproductivos de los eventos ocurridos en el periodo.
+    
+    Los partos, servicios y concepciones se atribuyen al periodo según su
+    fecha; los días abiertos y los servicios por concepción se cuentan en la
+    concepción, y el intervalo entre partos en el segundo parto.
+    """
+    return _cache.obtener_o_calcular(
+        (finca_id, fecha_desde, fecha_hasta),
+        version_eventos(db, finca_id),
+        lambda: _calcular(db, finca_id, fecha_desde, fecha_hasta)
+    )
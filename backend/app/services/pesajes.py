@@ -0,0 +1,315 @@
+"""
+Historial de pesajes y ganancia diaria de peso (GDP).
+
+Cada pesaje guarda la ganancia respecto a la pesada anterior del mismo animal,
+así "¿qué animales están bajo el objetivo?" es una sola consulta indexada.
+Las ganancias de un periodo (por animal, lote o potrero) se calculan con una
+regresión lineal peso~fecha por animal, vectorizada con NumPy para todo el hato.
+"""
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session, aliased
+
+from app.models.animal import Animal
+from app.models.pesaje import Pesaje
+
+
+def _vecinos(db: Session, animal_ids: Iterable[int], condicion, agregado) -> Dict[int, Pesaje]:
+    """
+    Pesaje inmediatamente anterior (agregado=func.max) o posterior (func.min)
+    de cada animal, en una sola consulta
+    """
+    limite = (
+        select(Pesaje.animal_id, agregado(Pesaje.fecha).label("fecha"))
+        .where(Pesaje.animal_id.in_(list(animal_ids)), condicion)
+        .group_by(Pesaje.animal_id)
+        .subquery()
+    )
+    filas = db.query(Pesaje).join(
+        limite,
+        and_(Pesaje.animal_id == limite.c.animal_id, Pesaje.fecha == limite.c.fecha)
+    )
+    return {pesaje.animal_id: pesaje for pesaje in filas}
+
+
+def _enlazar(pesaje: Pesaje, peso_anterior: Optional[float], fecha_anterior: Optional[date]) -> None:
+    """Calcular días y ganancia diaria respecto a la pesada anterior"""
+    if peso_anterior is None or fecha_anterior is None or fecha_anterior >= pesaje.fecha:
+        pesaje.dias_desde_anterior = None
+        pesaje.ganancia_diaria = None
+        return
+    dias = (pesaje.fecha - fecha_anterior).days
+    pesaje.dias_desde_anterior = dias
+    pesaje.ganancia_diaria = round((pesaje.peso - peso_anterior) / dias, 4)
+
+
+def registrar_pesajes(
+    db: Session,
+    *,
+    finca_id: int,
+    fecha: date,
+    pesos: Dict[int, float],
+    animales: Dict[int, Animal],
+    sesion_id: Optional[str] = None,
+    metodo: Optional[str] = None,
+    observaciones: Optional[str] = None,
+    registrado_por: Optional[int] = None,
+    marcar_sync: bool = True
+) -> List[Pesaje]:
+    """
+    Registrar los pesos de varios animales en una fecha (sesión de báscula).
+    
+    Un segundo pesaje del mismo animal en la misma fecha reemplaza al primero.
+    Actualiza la ganancia del pesaje siguiente si se registra con fecha pasada,
+    y el peso actual/anterior de los animales. No hace commit.
+    
+    Args:
+        pesos: {animal_id: peso en kg}
+        animales: Los animales ya cargados (y validados) de la finca
+        marcar_sync: Incrementar sync_version de los animales cuyo peso cambia
+            (False si el llamador ya lo hace)
+    """
+    ids = list(pesos)
+    anteriores = _vecinos(db, ids, Pesaje.fecha < fecha, func.max)
+    siguientes = _vecinos(db, ids, Pesaje.fecha > fecha, func.min)
+    existentes = {
+        p.animal_id: p for p in db.query(Pesaje).filter(
+            Pesaje.animal_id.in_(ids),
+            Pesaje.fecha == fecha
+        )
+    }
+    
+    registrados = []
+    for animal_id, peso in pesos.items():
+        animal = animales[animal_id]
+        pesaje = existentes.get(animal_id)
+        if pesaje is None:
+            pesaje = Pesaje(finca_id=finca_id, animal_id=animal_id, fecha=fecha)
+            db.add(pesaje)
+        pesaje.peso = peso
+        pesaje.sesion_id = sesion_id
+        pesaje.metodo = metodo
+        pesaje.observaciones = observaciones
+        pesaje.registrado_por = registrado_por
+        
+        anterior = anteriores.get(animal_id)
+        if anterior is not None:
+            _enlazar(pesaje, anterior.peso, anterior.fecha)
+        else:
+            # Animales con peso registrado antes de existir el historial
+            _enlazar(pesaje, animal.peso_actual, animal.ultima_fecha_pesaje)
+        
+        siguiente = siguientes.get(animal_id)
+        if siguiente is not None:
+            _enlazar(siguiente, peso, fecha)
+        
+        registrados.append(pesaje)
+        
+        # El peso actual del animal solo cambia si este es su último pesaje
+        if animal.ultima_fecha_pesaje is None or fecha > animal.ultima_fecha_pesaje:
+            if animal.peso_actual is not None:
+                animal.peso_anterior = animal.peso_actual
+            animal.peso_actual = peso
+            animal.ultima_fecha_pesaje = fecha
+        elif fecha == animal.ultima_fecha_pesaje:
+            animal.peso_actual = peso
+        else:
+            continue
+        if marcar_sync:
+            animal.sync_version += 1
+            animal.sync_status = "pending"
+    
+    return registrados
+
+
+def eliminar_pesaje(db: Session, pesaje: Pesaje, animal: Animal) -> None:
+    """
+    Eliminar un pesaje, reenlazando el siguiente con el anterior y restaurando
+    el peso actual del animal si era su último pesaje. No hace commit.
+    """
+    anterior = _vecinos(db, [animal.id], Pesaje.fecha < pesaje.fecha, func.max).get(animal.id)
+    siguiente = _vecinos(db, [animal.id], Pesaje.fecha > pesaje.fecha, func.min).get(animal.id)
+    
+    if siguiente is not None:
+        _enlazar(siguiente, anterior.peso if anterior else None, anterior.fecha if anterior else None)
+    elif anterior is not None and animal.ultima_fecha_pesaje == pesaje.fecha:
+        previo = _vecinos(db, [animal.id], Pesaje.fecha < anterior.fecha, func.max).get(animal.id)
+        animal.peso_actual = anterior.peso
+        animal.peso_anterior = previo.peso if previo else None
+        animal.ultima_fecha_pesaje = anterior.fecha
+        animal.sync_version += 1
+        animal.sync_status = "pending"
+    elif anterior is None and animal.ultima_fecha_pesaje == pesaje.fecha:
+        # Era su único pesaje: el animal queda sin peso registrado
+        animal.peso_actual = None
+        animal.peso_anterior = None
+        animal.ultima_fecha_pesaje = None
+        animal.sync_version += 1
+        animal.sync_status = "pending"
+    
+    db.delete(pesaje)
+
+
+def ganancia_por_grupo(
+    db: Session,
+    finca_id: int,
+    *,
+    agrupar: str,
+    fecha_desde: date,
+    fecha_hasta: date,
+    lote: Optional[str] = None,
+    potrero: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Ganancia diaria de peso de los animales activos en un periodo.
+    
+    La GDP de cada animal es la pendiente de la recta de mínimos cuadrados
+    peso~día sobre todos sus pesajes del periodo (al menos dos en fechas
+    distintas). Para lotes y potreros se resumen las GDP de sus animales.
+    
+    Args:
+        agrupar: animal, lote o potrero
+    
+    Returns:
+        Un elemento por grupo con animales, pesajes, GDP promedio/mín/máx y peso promedio
+    """
+    consulta = (
+        select(Pesaje.animal_id, Pesaje.fecha, Pesaje.peso)
+        .join(Animal, Animal.id == Pesaje.animal_id)
+        .where(
+            Pesaje.finca_id == finca_id,
+            Pesaje.fecha >= fecha_desde,
+            Pesaje.fecha <= fecha_hasta,
+            Animal.estado == "activo"
+        )
+    )
+    if lote is not None:
+        consulta = consulta.where(Animal.lote_actual == lote)
+    if potrero is not None:
+        consulta = consulta.where(Animal.potrero_actual == potrero)
+    filas = db.execute(consulta).all()
+    if not filas:
+        return []
+    
+    n = len(filas)
+    animal = np.fromiter((f[0] for f in filas), dtype=np.int64, count=n)
+    x = np.fromiter((f[1].toordinal() for f in filas), dtype=np.float64, count=n) - fecha_desde.toordinal()
+    y = np.fromiter((f[2] for f in filas), dtype=np.float64, count=n)
+    
+    # ---------- Regresión por animal ----------
+    ids, inv = np.unique(animal, return_inverse=True)
+    total = len(ids)
+    conteo = np.bincount(inv, minlength=total).astype(np.float64)
+    sx = np.bincount(inv, weights=x, minlength=total)
+    sy = np.bincount(inv, weights=y, minlength=total)
+    sxx = np.bincount(inv, weights=x * x, minlength=total)
+    sxy = np.bincount(inv, weights=x * y, minlength=total)
+    denominador = conteo * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gdp = np.where(denominador > 0, (conteo * sxy - sx * sy) / denominador, np.nan)
+    
+    # Primer y último pesaje de cada animal en el periodo
+    orden = np.lexsort((x, inv))
+    grupos_ordenados = inv[orden]
+    primero = orden[np.searchsorted(grupos_ordenados, np.arange(total), side="left")]
+    ultimo = orden[np.searchsorted(grupos_ordenados, np.arange(total), side="right") - 1]
+    peso_final = y[ultimo]
+    
+    info = {
+        fila.id: fila for fila in db.query(
+            Animal.id, Animal.numero_identificacion, Animal.nombre,
+            Animal.lote_actual, Animal.potrero_actual
+        ).filter(Animal.id.in_(ids.tolist()))
+    }
+    
+    def opcional(valor: float) -> Optional[float]:
+        return None if np.isnan(valor) else round(float(valor), 4)
+    
+    if agrupar == "animal":
+        return [
+            {
+                "clave": str(animal_id),
+                "etiqueta": info[animal_id].numero_identificacion,
+                "animales": 1,
+                "pesajes": int(conteo[i]),
+                "peso_inicial": float(y[primero[i]]),
+                "peso_final": float(peso_final[i]),
+                "dias": int(x[ultimo[i]] - x[primero[i]]),
+                "ganancia_diaria": opcional(gdp[i]),
+                "ganancia_diaria_min": opcional(gdp[i]),
+                "ganancia_diaria_max": opcional(gdp[i]),
+            }
+            for i, animal_id in enumerate(ids.tolist())
+        ]
+    
+    # ---------- Resumen por lote / potrero ----------
+    atributo = "lote_actual" if agrupar == "lote" else "potrero_actual"
+    etiquetas = [getattr(info[animal_id], atributo) or "" for animal_id in ids.tolist()]
+    claves, grupo = np.unique(np.array(etiquetas, dtype=object), return_inverse=True)
+    cantidad = len(claves)
+    valido = ~np.isnan(gdp)
+    
+    animales = np.bincount(grupo, minlength=cantidad)
+    pesajes = np.bincount(grupo, weights=conteo, minlength=cantidad)
+    con_gdp = np.bincount(grupo[valido], minlength=cantidad)
+    suma_gdp = np.bincount(grupo[valido], weights=gdp[valido], minlength=cantidad)
+    minimo = np.full(cantidad, np.inf)
+    maximo = np.full(cantidad, -np.inf)
+    np.minimum.at(minimo, grupo[valido], gdp[valido])
+    np.maximum.at(maximo, grupo[valido], gdp[valido])
+    peso_promedio = np.bincount(grupo, weights=peso_final, minlength=cantidad) / animales
+    
+    resultado = []
+    for j, clave in enumerate(claves.tolist()):
+        hay_gdp = con_gdp[j] > 0
+        resultado.append({
+            "clave": clave or None,
+            "etiqueta": clave or ("Sin lote" if agrupar == "lote" else "Sin potrero"),
+            "animales": int(animales[j]),
+            "pesajes": int(pesajes[j]),
+            "peso_final": round(float(peso_promedio[j]), 1),
+            "ganancia_diaria": round(float(suma_gdp[j] / con_gdp[j]), 4) if hay_gdp else None,
+            "ganancia_diaria_min": round(float(minimo[j]), 4) if hay_gdp else None,
+            "ganancia_diaria_max": round(float(maximo[j]), 4) if hay_gdp else None,
+        })
+    return resultado
+
+
+def animales_bajo_objetivo(
+    db: Session,
+    finca_id: int,
+    objetivo: float,
+    lote: Optional[str] = None,
+    potrero: Optional[str] = None
+) -> List[Any]:
+    """
+    Animales activos cuya ganancia en el último pesaje es menor al objetivo.
+    Una sola consulta: el último pesaje se resuelve con el índice (animal_id, fecha).
+    """
+    ultimo = aliased(Pesaje)
+    fecha_ultimo = (
+        select(func.max(ultimo.fecha))
+        .where(ultimo.animal_id == Pesaje.animal_id)
+        .correlate(Pesaje)
+        .scalar_subquery()
+    )
+    consulta = db.query(
+        Pesaje,
+        Animal.numero_identificacion,
+        Animal.nombre,
+        Animal.lote_actual,
+        Animal.potrero_actual
+    ).join(Animal, Animal.id == Pesaje.animal_id).filter(
+        Pesaje.finca_id == finca_id,
+        Pesaje.ganancia_diaria < objetivo,
+        Pesaje.fecha == fecha_ultimo,
+        Animal.estado == "activo"
+    )
+    if lote is not None:
+        consulta = consulta.filter(Animal.lote_actual == lote)
+    if potrero is not None:
+        consulta = consulta.filter(Animal.potrero_actual == potrero)
+    return consulta.order_by(Pesaje.ganancia_diaria).all()
@@ -0,0 +1,538 @@
+"""
+Generación de reportes descargables (PDF y Excel) fuera del request.
+
+Un POST crea un TrabajoReporte y lo encola en un pool de hilos propio, así el
+render no ocupa los hilos que atienden la API. Las filas se leen con un cursor
+del lado del servidor (yield_per) y se escriben a medida que llegan: openpyxl
+en modo write_only y el PDF dibujado página a página con el canvas de
+reportlab, sin armar el documento completo en memoria.
+
+El archivo se nombra con la huella del reporte (finca, tipo, formato,
+parámetros y versión de los datos de origen); si ya existe uno idéntico, se
+reutiliza sin volver a generarlo. Se genera en un temporal local y se guarda
+en el almacén de reportes (app/services/almacenamiento.py): con S3, cualquier
+nodo descarga lo que generó otro; en local, REPORTES_ROOT debe ser compartido
+si hay más de un nodo.
+
+Un trabajo que lleva en "procesando" más de REPORTES_TIMEOUT_MINUTOS se da
+por abandonado (el worker que lo generaba murió o fue reciclado): se puede
+volver a reclamar, no cuenta como idéntico en curso y al arrancar vuelve a
+"pendiente". Los archivos sin pedir en REPORTES_RETENCION_DIAS se borran.
+
+openpyxl y reportlab se importan al generar el primer archivo, no al cargar
+el módulo, para no sumarlos al arranque de cada worker.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.finca import Finca
+from app.models.animal import Animal
+from app.models.control_sanitario import ControlSanitario
+from app.models.produccion_resumen import ProduccionDiaria
+from app.models.trabajo_reporte import TrabajoReporte
+from app.services.almacenamiento import obtener_almacen_reportes
+from app.services.reportes_financieros import estado_resultados, version_libro
+
+FORMATOS = {
+    "pdf": "application/pdf",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Filas leídas por viaje al servidor
+LOTE_CURSOR = 1000
+
+_ejecutor = ThreadPoolExecutor(max_workers=settings.REPORTES_WORKERS, thread_name_prefix="reportes")
+
+
+# ============================================
+# Definición de cada reporte
+# ============================================
+
+def _filas_consulta(db: Session, consulta) -> Iterator[tuple]:
+    """Recorrer una consulta con cursor del lado del servidor"""
+    for fila in db.execute(consulta.execution_options(yield_per=LOTE_CURSOR)):
+        yield tuple(fila)
+
+
+def _inventario(db: Session, finca_id: int, parametros: Dict[str, Any]) -> Iterator[tuple]:
+    return _filas_consulta(db, select(
+        Animal.numero_identificacion,
+        Animal.nombre,
+        Animal.numero_registro_ica,
+        Animal.sexo,
+        Animal.raza,
+        Animal.fecha_nacimiento,
+        Animal.categoria,
+        Animal.proposito,
+        Animal.lote_actual,
+        Animal.potrero_actual,
+        Animal.peso_actual,
+        Animal.ultima_fecha_pesaje,
+    ).where(
+        Animal.finca_id == finca_id,
+        Animal.estado == "activo"
+    ).order_by(Animal.numero_identificacion))
+
+
+def _sanitario_ica(db: Session, finca_id: int, parametros: Dict[str, Any]) -> Iterator[tuple]:
+    return _filas_consulta(db, select(
+        ControlSanitario.fecha,
+        Animal.numero_identificacion,
+        Animal.numero_registro_ica,
+        ControlSanitario.tipo,
+        ControlSanitario.producto,
+        ControlSanitario.lote_producto,
+        ControlSanitario.dosis,
+        ControlSanitario.via_administracion,
+        ControlSanitario.veterinario,
+        ControlSanitario.dias_retiro_leche,
+        ControlSanitario.dias_retiro_carne,
+        ControlSanitario.diagnostico,
+    ).join(
+        Animal, Animal.id == ControlSanitario.animal_id
+    ).where(
+        ControlSanitario.finca_id == finca_id,
+        ControlSanitario.fecha >= parametros["fecha_desde"],
+        ControlSanitario.fecha <= parametros["fecha_hasta"]
+    ).order_by(ControlSanitario.fecha, Animal.numero_identificacion))
+
+
+def _financiero(db: Session, finca_id: int, parametros: Dict[str, Any]) -> Iterator[tuple]:
+    # El PyG ya viene agregado por mes (una fila por mes), no hace falta cursor
+    reporte = estado_resultados(
+        db,
+        finca_id,
+        fecha_desde=parametros["fecha_desde"],
+        fecha_hasta=parametros["fecha_hasta"],
+        dimension="mes"
+    )
+    for fila in reporte["items"] + [reporte["totales"]]:
+        yield (
+            fila["etiqueta"],
+            fila["ingresos"],
+            fila["compras"],
+            fila["gastos"],
+            fila["costos_sanitarios"],
+            fila["costos_reproductivos"],
+            fila["resultado"],
+            fila.get("flujo_acumulado"),
+        )
+
+
+def _produccion(db: Session, finca_id: int, parametros: Dict[str, Any]) -> Iterator[tuple]:
+    return _filas_consulta(db, select(
+        ProduccionDiaria.fecha,
+        Animal.numero_identificacion,
+        Animal.nombre,
+        ProduccionDiaria.litros_manana,
+        ProduccionDiaria.litros_tarde,
+        ProduccionDiaria.litros_noche,
+        ProduccionDiaria.litros_total,
+        ProduccionDiaria.numero_ordenos,
+    ).join(
+        Animal, Animal.id == ProduccionDiaria.animal_id
+    ).where(
+        ProduccionDiaria.finca_id == finca_id,
+        ProduccionDiaria.fecha >= parametros["fecha_desde"],
+        ProduccionDiaria.fecha <= parametros["fecha_hasta"]
+    ).order_by(ProduccionDiaria.fecha, Animal.numero_identificacion))
+
+
+def _version_tablas(*tablas) -> Any:
+    """Versión de datos como (conteo, última edición, suma) de cada tabla de origen"""
+    def version(db: Session, finca_id: int) -> Tuple:
+        columnas = []
+        for modelo, columna in tablas:
+            columnas += [
+                select(func.count()).where(modelo.finca_id == finca_id).scalar_subquery(),
+                select(func.max(modelo.updated_at)).where(modelo.finca_id == finca_id).scalar_subquery(),
+                select(func.sum(columna)).where(modelo.finca_id == finca_id).scalar_subquery(),
+            ]
+        return tuple(db.execute(select(*columnas)).one())
+    return version
+
+
+REPORTES = {
+    "inventario": {
+        "titulo": "Inventario del hato",
+        "columnas": [
+            "Número", "Nombre", "Registro ICA", "Sexo", "Raza", "Nacimiento", "Categoría",
+            "Propósito", "Lote", "Potrero", "Peso (kg)", "Último pesaje",
+        ],
+        "usa_fechas": False,
+        "filas": _inventario,
+        "version": _version_tablas((Animal, Animal.sync_version)),
+    },
+    "sanitario_ica": {
+        "titulo": "Registro sanitario (ICA)",
+        "columnas": [
+            "Fecha", "Animal", "Registro ICA", "Tipo", "Producto", "Lote producto", "Dosis",
+            "Vía", "Veterinario", "Retiro leche (d)", "Retiro carne (d)", "Diagnóstico",
+        ],
+        "usa_fechas": True,
+        "filas": _sanitario_ica,
+        "version": _version_tablas(
+            (ControlSanitario, ControlSanitario.sync_version),
+            (Animal, Animal.sync_version)
+        ),
+    },
+    "financiero": {
+        "titulo": "Estado de resultados",
+        "columnas": [
+            "Mes", "Ingresos", "Compras", "Gastos", "Costos sanitarios",
+            "Costos reproductivos", "Resultado", "Flujo acumulado",
+        ],
+        "usa_fechas": True,
+        "filas": _financiero,
+        "version": version_libro,
+    },
+    "produccion": {
+        "titulo": "Producción de leche",
+        "columnas": [
+            "Fecha", "Animal", "Nombre", "Mañana (L)", "Tarde (L)", "Noche (L)", "Total (L)", "Ordeños",
+        ],
+        "usa_fechas": True,
+        "filas": _produccion,
+        "version": _version_tablas(
+            (ProduccionDiaria, ProduccionDiaria.litros_total),
+            (Animal, Animal.sync_version)
+        ),
+    },
+}
+
+
+# ============================================
+# Escritura de archivos
+# ============================================
+
+def _texto(valor: Any) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, float):
+        return f"{valor:,.2f}"
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _recortar(texto: str, ancho: float, fuente: str, tamano: float, stringWidth: Callable) -> str:
+    """Recortar el texto para que quepa en la columna (stringWidth de reportlab)"""
+    medida = stringWidth(texto, fuente, tamano)
+    if medida <= ancho:
+        return texto
+    # Primer corte proporcional y luego ajuste fino de a un carácter
+    texto = texto[:int(len(texto) * ancho / medida)]
+    while texto and stringWidth(texto + "…", fuente, tamano) > ancho:
+        texto = texto[:-1]
+    return texto + "…"
+
+
+def escribir_xlsx(ruta: Path, titulo: str, subtitulo: str, columnas: List[str], filas: Iterable[tuple]) -> None:
+    """Excel en modo write_only: cada fila se vuelca al archivo temporal al agregarla"""
+    from openpyxl import Workbook
+    
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(title=titulo[:31])
+    hoja.append([titulo])
+    hoja.append([subtitulo])
+    hoja.append([])
+    hoja.append(columnas)
+    for fila in filas:
+        hoja.append(fila)
+    libro.save(ruta)
+
+
+def escribir_pdf(ruta: Path, titulo: str, subtitulo: str, columnas: List[str], filas: Iterable[tuple]) -> None:
+    """Tabla en A4 horizontal dibujada fila a fila, repitiendo el encabezado en cada página"""
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.units import mm
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfgen import canvas
+    
+    ancho, alto = landscape(A4)
+    margen = 12 * mm
+    alto_fila = 11
+    tamano = 7
+    ancho_columna = (ancho - 2 * margen) / len(columnas)
+    lienzo = canvas.Canvas(str(ruta), pagesize=(ancho, alto))
+    lienzo.setTitle(titulo)
+    pagina = 0
+    
+    def encabezado() -> float:
+        nonlocal pagina
+        pagina += 1
+        lienzo.setFont("Helvetica-Bold", 12)
+        lienzo.drawString(margen, alto - margen, titulo)
+        lienzo.setFont("Helvetica", 8)
+        lienzo.drawString(margen, alto - margen - 12, subtitulo)
+        lienzo.drawRightString(ancho - margen, margen / 2, f"Página {pagina}")
+        y = alto - margen - 32
+        lienzo.setFont("Helvetica-Bold", tamano)
+        for i, columna in enumerate(columnas):
+            lienzo.drawString(
+                margen + i * ancho_columna, y,
+                _recortar(columna, ancho_columna - 3, "Helvetica-Bold", tamano, stringWidth)
+            )
+        lienzo.line(margen, y - 3, ancho - margen, y - 3)
+        lienzo.setFont("Helvetica", tamano)
+        return y - alto_fila - 2
+    
+    y = encabezado()
+    for fila in filas:
+        if y < margen:
+            lienzo.showPage()
+            y = encabezado()
+        for i, valor in enumerate(fila):
+            lienzo.drawString(
+                margen + i * ancho_columna, y,
+                _recortar(_texto(valor), ancho_columna - 3, "Helvetica", tamano, stringWidth)
+            )
+        y -= alto_fila
+    lienzo.save()
+
+
+ESCRITORES = {"pdf": escribir_pdf, "xlsx": escribir_xlsx}
+
+
+# ============================================
+# Trabajos
+# ============================================
+
+def _parametros(tipo: str, fecha_desde: Optional[date], fecha_hasta: Optional[date]) -> Dict[str, Any]:
+    """Parámetros normalizados (solo los que afectan al contenido del reporte)"""
+    if not REPORTES[tipo]["usa_fechas"]:
+        return {}
+    fecha_hasta = fecha_hasta or date.today()
+    fecha_desde = fecha_desde or fecha_hasta.replace(month=1, day=1)
+    return {"fecha_desde": fecha_desde.isoformat(), "fecha_hasta": fecha_hasta.isoformat()}
+
+
+def _parametros_fecha(parametros: Dict[str, Any]) -> Dict[str, Any]:
+    return {clave: date.fromisoformat(valor) for clave, valor in parametros.items()}
+
+
+def huella_reporte(db: Session, finca_id: int, tipo: str, formato: str, parametros: Dict[str, Any]) -> str:
+    """SHA-256 de todo lo que determina el contenido del archivo"""
+    version = REPORTES[tipo]["version"](db, finca_id)
+    contenido = json.dumps(
+        [finca_id, tipo, formato, parametros, [str(v) for v in version]],
+        sort_keys=True
+    )
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def leer_archivo(nombre_archivo: str) -> Optional[Iterator[bytes]]:
+    """Contenido del archivo de un reporte por partes, o None si ya no existe"""
+    almacen = obtener_almacen_reportes()
+    if not almacen.existe(nombre_archivo):
+        return None
+    return almacen.leer(nombre_archivo)
+
+
+def _abandonados():
+    """Condición de los trabajos en proceso hace más de REPORTES_TIMEOUT_MINUTOS"""
+    limite = datetime.now(timezone.utc) - timedelta(minutes=settings.REPORTES_TIMEOUT_MINUTOS)
+    return and_(TrabajoReporte.estado == "procesando", TrabajoReporte.iniciado_en < limite)
+
+
+def _nombre_archivo(huella: str, formato: str) -> str:
+    return f"{huella[:2]}/{huella}.{formato}"
+
+
+def solicitar_reporte(
+    db: Session,
+    *,
+    finca_id: int,
+    tipo: str,
+    formato: str,
+    fecha_desde: Optional[date],
+    fecha_hasta: Optional[date],
+    usuario_id: Optional[int]
+) -> Tuple[TrabajoReporte, bool]:
+    """
+    Crear un trabajo de reporte, o reutilizar uno idéntico en curso o ya generado.
+    No hace commit; si el trabajo es nuevo, el llamador lo encola tras el commit.
+    
+    Returns:
+        (trabajo, es_nuevo)
+    """
+    parametros = _parametros(tipo, fecha_desde, fecha_hasta)
+    huella = huella_reporte(db, finca_id, tipo, formato, parametros)
+    
+    existente = db.query(TrabajoReporte).filter(
+        TrabajoReporte.finca_id == finca_id,
+        TrabajoReporte.huella == huella,
+        TrabajoReporte.estado != "error",
+        ~_abandonados()
+    ).order_by(TrabajoReporte.id.desc()).first()
+    if existente and existente.estado != "completado":
+        return existente, False
+    # Si el archivo sigue en el almacén, vuelve a contar su retención desde este pedido
+    if existente and obtener_almacen_reportes().renovar(existente.nombre_archivo, FORMATOS[existente.formato]):
+        return existente, False
+    
+    trabajo = TrabajoReporte(
+        finca_id=finca_id,
+        tipo=tipo,
+        formato=formato,
+        parametros=json.dumps(parametros),
+        huella=huella,
+        estado="pendiente",
+        solicitado_por=usuario_id
+    )
+    db.add(trabajo)
+    db.flush()
+    return trabajo, True
+
+
+def encolar(trabajo_id: int) -> None:
+    _ejecutor.submit(procesar_trabajo, trabajo_id)
+
+
+def _generar(db: Session, trabajo: TrabajoReporte, destino: Path) -> None:
+    definicion = REPORTES[trabajo.tipo]
+    parametros = json.loads(trabajo.parametros or "{}")
+    finca = db.get(Finca, trabajo.finca_id)
+    
+    partes = [finca.nombre]
+    if finca.nit:
+        partes.append(f"NIT {finca.nit}")
+    partes.append(f"{finca.municipio}, {finca.departamento}")
+    if parametros:
+        partes.append(f"Periodo {parametros['fecha_desde']} a {parametros['fecha_hasta']}")
+    partes.append(f"Generado {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    
+    filas = definicion["filas"](db, trabajo.finca_id, _parametros_fecha(parametros))
+    ESCRITORES[trabajo.formato](destino, definicion["titulo"], " · ".join(partes), definicion["columnas"], filas)
+
+
+def procesar_trabajo(trabajo_id: int) -> None:
+    """Generar el archivo de un trabajo pendiente (se ejecuta en el pool de reportes)"""
+    db = SessionLocal()
+    try:
+        # Reclamar el trabajo de forma atómica: otro proceso pudo haberlo tomado
+        reclamado = db.execute(
+            update(TrabajoReporte)
+            .where(TrabajoReporte.id == trabajo_id, or_(TrabajoReporte.estado == "pendiente", _abandonados()))
+            .values(estado="procesando", iniciado_en=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if not reclamado:
+            return
+        
+        trabajo = db.get(TrabajoReporte, trabajo_id)
+        nombre = _nombre_archivo(trabajo.huella, trabajo.formato)
+        almacen = obtener_almacen_reportes()
+        try:
+            tamano = _tamano_generado(db, trabajo.huella)
+            if tamano is None or not almacen.renovar(nombre, FORMATOS[trabajo.formato]):
+                # Generar en un temporal local y publicarlo en el almacén
+                descriptor, temporal = tempfile.mkstemp(prefix="reporte_", suffix=f".{trabajo.formato}")
+                os.close(descriptor)
+                try:
+                    _generar(db, trabajo, Path(temporal))
+                    almacen.subir(nombre, Path(temporal), FORMATOS[trabajo.formato])
+                    tamano = os.path.getsize(temporal)
+                finally:
+                    os.unlink(temporal)
+            trabajo.estado = "completado"
+            trabajo.nombre_archivo = nombre
+            trabajo.tamano_bytes = tamano
+        except Exception as e:
+            db.rollback()
+            trabajo = db.get(TrabajoReporte, trabajo_id)
+            trabajo.estado = "error"
+            trabajo.error = f"{type(e).__name__}: {e}"[:1000]
+        trabajo.terminado_en = datetime.now(timezone.utc)
+        db.commit()
+    finally:
+        db.close()
+    limpiar_si_corresponde()
+
+
+def _tamano_generado(db: Session, huella: str) -> Optional[int]:
+    """Tamaño del último archivo generado con esta huella (None si nunca se generó)"""
+    return db.scalar(
+        select(TrabajoReporte.tamano_bytes)
+        .where(TrabajoReporte.huella == huella, TrabajoReporte.estado == "completado")
+        .order_by(TrabajoReporte.id.desc())
+        .limit(1)
+    )
+
+
+def reencolar_pendientes() -> int:
+    """
+    Encolar los trabajos que quedaron pendientes, y los abandonados a mitad de
+    generación, p. ej. tras reiniciar el servidor o reciclar un worker
+    """
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(TrabajoReporte)
+            .where(_abandonados())
+            .values(estado="pendiente", iniciado_en=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        ids = db.scalars(
+            select(TrabajoReporte.id).where(TrabajoReporte.estado == "pendiente")
+        ).all()
+    finally:
+        db.close()
+    for trabajo_id in ids:
+        encolar(trabajo_id)
+    _ejecutor.submit(limpiar_si_corresponde)
+    return len(ids)
+
+
+# ============================================
+# Retención de archivos
+# ============================================
+
+_ultima_limpieza: Optional[float] = None
+
+
+def limpiar_archivos(retencion_dias: Optional[float] = None) -> int:
+    """
+    Borrar del almacén los archivos de reportes no pedidos en `retencion_dias`
+    (por defecto REPORTES_RETENCION_DIAS). Sus trabajos quedan completados: al
+    descargarlos se responde 410 y al pedirlos de nuevo se generan otra vez.
+    
+    Returns:
+        Archivos borrados
+    """
+    almacen = obtener_almacen_reportes()
+    dias = settings.REPORTES_RETENCION_DIAS if retencion_dias is None else retencion_dias
+    limite = datetime.now(timezone.utc) - timedelta(days=dias)
+    borrados = 0
+    for clave, modificado in list(almacen.listar("")):
+        if modificado >= limite:
+            continue
+        # La fecha se vuelve a consultar: un pedido pudo renovarlo después del listado
+        actual = almacen.modificado(clave)
+        if actual is not None and actual < limite:
+            almacen.eliminar(clave)  # Si otro worker ya lo borró, no falla
+            borrados += 1
+    return borrados
+
+
+def limpiar_si_corresponde(cada_horas: float = 6) -> None:
+    """Barrido de retención, como mucho cada `cada_horas` por proceso"""
+    global _ultima_limpieza
+    if _ultima_limpieza is not None and time.monotonic() - _ultima_limpieza < cada_horas * 3600:
+        return
+    _ultima_limpieza = time.monotonic()
+    limpiar_archivos()
@@ -0,0 +1,237 @@
+"""
+Estado de resultados (PyG) sobre rangos de fechas arbitrarios.
+
+Las transacciones y los costos de los controles sanitarios y reproductivos se
+unen en una sola subconsulta de "movimientos" (UNION ALL); cada dimensión del
+reporte (mes, categoría, animal) es una única consulta agrupada sobre ella que
+pivota los montos por concepto.
+
+Los resultados se cachean por (finca, rango, dimensión) hasta que cambia la
+versión del libro (VersionLibro), que suben las transacciones y los controles.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import case, extract, func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.cache import CacheVersionado
+from app.models.animal import Animal
+from app.models.transaccion import Transaccion
+from app.models.control_sanitario import ControlSanitario
+from app.models.control_reproductivo import ControlReproductivo
+from app.models.finanzas_resumen import VersionLibro
+
+# Columnas del reporte: concepto del movimiento -> campo de salida
+CONCEPTOS = {
+    "venta": "ingresos",
+    "compra": "compras",
+    "gasto": "gastos",
+    "sanitario": "costos_sanitarios",
+    "reproductivo": "costos_reproductivos",
+}
+
+_cache = CacheVersionado(max_entradas=256)
+
+
+def _movimientos(finca_id: int, fecha_desde: date, fecha_hasta: date):
+    """Subconsulta (concepto, fecha, monto, categoria, animal_id) de todo lo que suma o resta"""
+    transacciones = select(
+        Transaccion.tipo.label("concepto"),
+        Transaccion.fecha.label("fecha"),
+        Transaccion.monto.label("monto"),
+        case(
+            (Transaccion.tipo == "gasto", func.coalesce(Transaccion.categoria_gasto, "sin_categoria")),
+            else_=Transaccion.tipo
+        ).label("categoria"),
+        Transaccion.animal_id.label("animal_id"),
+    ).where(
+        Transaccion.finca_id == finca_id,
+        Transaccion.fecha >= fecha_desde,
+        Transaccion.fecha <= fecha_hasta
+    )
+    sanitarios = select(
+        literal("sanitario"),
+        ControlSanitario.fecha,
+        ControlSanitario.costo,
+        literal("control_sanitario"),
+        ControlSanitario.animal_id,
+    ).where(
+        ControlSanitario.finca_id == finca_id,
+        ControlSanitario.fecha >= fecha_desde,
+        ControlSanitario.fecha <= fecha_hasta,
+        ControlSanitario.costo.isnot(None)
+    )
+    reproductivos = select(
+        literal("reproductivo"),
+        ControlReproductivo.fecha_evento,
+        ControlReproductivo.costo,
+        literal("control_reproductivo"),
+        ControlReproductivo.animal_id,
+    ).where(
+        ControlReproductivo.finca_id == finca_id,
+        ControlReproductivo.fecha_evento >= fecha_desde,
+        ControlReproductivo.fecha_evento <= fecha_hasta,
+        ControlReproductivo.costo.isnot(None)
+    )
+    return union_all(transacciones, sanitarios, reproductivos).subquery("movimientos")
+
+
+def _pivote(movimientos) -> list:
+    """Suma del monto de cada concepto como columna"""
+    return [
+        func.coalesce(
+            func.sum(case((movimientos.c.concepto == concepto, movimientos.c.monto), else_=0.0)), 0.0
+        ).label(campo)
+        for concepto, campo in CONCEPTOS.items()
+    ]
+
+
+def _fila(clave: Optional[str], etiqueta: str, valores) -> Dict[str, Any]:
+    fila = {"clave": clave, "etiqueta": etiqueta}
+    for campo in CONCEPTOS.values():
+        fila[campo] = round(float(getattr(valores, campo) or 0.0), 2)
+    fila["resultado"] = round(
+        fila["ingresos"] - fila["compras"] - fila["gastos"]
+        - fila["costos_sanitarios"] - fila["costos_reproductivos"], 2
+    )
+    return fila
+
+
+def _calcular(db: Session, finca_id: int, fecha_desde: date, fecha_hasta: date, dimension: str) -> Dict[str, Any]:
+    movimientos = _movimientos(finca_id, fecha_desde, fecha_hasta)
+    pivote = _pivote(movimientos)
+    
+    totales = db.execute(select(*pivote)).one()
+    
+    if dimension == "mes":
+        anio = extract("year", movimientos.c.fecha).label("anio")
+        mes = extract("month", movimientos.c.fecha).label("mes")
+        filas = db.execute(
+            select(anio, mes, *pivote).group_by(anio, mes).order_by(anio, mes)
+        ).all()
+        items = [
+            _fila(f"{int(f.anio)}-{int(f.mes):02d}", f"{int(f.anio)}-{int(f.mes):02d}", f)
+            for f in filas
+        ]
+        # Flujo de caja: resultado acumulado mes a mes
+        acumulado = 0.0
+        for fila in items:
+            acumulado += fila["resultado"]
+            fila["flujo_acumulado"] = round(acumulado, 2)
+    elif dimension == "categoria":
+        filas = db.execute(
+            select(movimientos.c.categoria, *pivote)
+            .group_by(movimientos.c.categoria)
+            .order_by(movimientos.c.categoria)
+        ).all()
+        items = [_fila(f.categoria, f.categoria, f) for f in filas]
+    else:
+        filas = db.execute(
+            select(movimientos.c.animal_id, *pivote)
+            .where(movimientos.c.animal_id.isnot(None))
+            .group_by(movimientos.c.animal_id)
+        ).all()
+        numeros = dict(
+            db.query(Animal.id, Animal.numero_identificacion).filter(
+                Animal.id.in_([f.animal_id for f in filas])
+            ).all()
+        ) if filas else {}
+        items = [
+            _fila(str(f.animal_id), numeros.get(f.animal_id, str(f.animal_id)), f)
+            for f in filas
+        ]
+        items.sort(key=lambda fila: fila["resultado"])
+    
+    return {"totales": _fila(None, "Total", totales), "items": items}
+
+
+def version_libro(db: Session, finca_id: int) -> Tuple:
+    """
+    Versión del libro de la finca: el contador que suben las altas, ediciones
+    y bajas de transacciones y controles (rollups_finanzas.marcar_libro).
+    Es una sola fila, no un recorrido de las tablas de origen.
+    """
+    version = db.execute(select(VersionLibro.version).where(VersionLibro.finca_id == finca_id)).scalar()
+    return (version or 0,)
+
+
+def periodo_comparado(fecha_desde: date, fecha_hasta: date, comparar: str) -> Tuple[date, date]:
+    """Rango equivalente anterior: el periodo inmediatamente previo o el mismo del año anterior"""
+    if comparar == "anio_anterior":
+        def restar_anio(fecha: date) -> date:
+            try:
+                return fecha.replace(year=fecha.year - 1)
+            except ValueError:  # 29 de febrero
+                return fecha.replace(year=fecha.year - 1, day=28)
+        return restar_anio(fecha_desde), restar_anio(fecha_hasta)
+    dias = (fecha_hasta - fecha_desde).days + 1
+    return fecha_desde - timedelta(days=dias), fecha_desde - timedelta(days=1)
+
+
+def estado_resultados(
+    db: Session,
+    finca_id: int,
+    *,
+    fecha_desde: date,
+    fecha_hasta: date,
+    dimension: str,
+    comparar: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    PyG de un rango por mes, categoría o animal, opcionalmente comparado con
+    el periodo anterior o el mismo periodo del año anterior.
+    
+    Las filas comparables (misma categoría, mismo animal, o mismo mes del año
+    anterior) incluyen el resultado del periodo comparado.
+    """
+    version = version_libro(db, finca_id)
+    
+    def calcular(desde: date, hasta: date) -> Dict[str, Any]:
+        return _cache.obtener_o_calcular(
+            (finca_id, desde, hasta, dimension),
+            version,
+            lambda: _calcular(db, finca_id, desde, hasta, dimension)
+        )
+    
+    actual = calcular(fecha_desde, fecha_hasta)
+    reporte = {
+        "fecha_desde": fecha_desde,
+        "fecha_hasta": fecha_hasta,
+        "dimension": dimension,
+        "totales": actual["totales"],
+        "items": [dict(fila) for fila in actual["items"]],
+        "comparacion": None,
+    }
+    if not comparar:
+        return reporte
+    
+    desde_c, hasta_c = periodo_comparado(fecha_desde, fecha_hasta, comparar)
+    anterior = calcular(desde_c, hasta_c)
+    resultado_actual = actual["totales"]["resultado"]
+    resultado_anterior = anterior["totales"]["resultado"]
+    reporte["comparacion"] = {
+        "tipo": comparar,
+        "fecha_desde": desde_c,
+        "fecha_hasta": hasta_c,
+        "totales": anterior["totales"],
+        "variacion_resultado": round(resultado_actual - resultado_anterior, 2),
+        "variacion_resultado_pct": (
+            round((resultado_actual - resultado_anterior) / abs(resultado_anterior) * 100, 1)
+            if resultado_anterior else None
+        ),
+    }
+    
+    # Emparejar filas: por clave, o por mes del año anterior
+    def clave_comparada(clave: Optional[str]) -> Optional[str]:
+        if dimension != "mes":
+            return clave
+        if comparar != "anio_anterior" or not clave:
+            return None
+        anio, mes = clave.split("-")
+        return f"{int(anio) - 1}-{mes}"
+    
+    resultados_anteriores = {fila["clave"]: fila["resultado"] for fila in anterior["items"]}
+    for fila in reporte["items"]:
+        fila["resultado_comparado"] = resultados_anteriores.get(clave_comparada(fila["clave"]))
+    return reporte
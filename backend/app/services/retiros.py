@@ -0,0 +1,142 @@
+"""
+Índice de retiros de leche y carne.
+
+Cada control sanitario con días de retiro genera una ventana
+[fecha del tratamiento, fecha de liberación) por tipo de producto en
+RetiroSanitario. Las ventanas se reescriben en la misma transacción que el
+control, así las verificaciones en el ordeño y en la venta consultan solo el
+índice (animal, tipo, fecha de liberación).
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.control_sanitario import ControlSanitario
+from app.models.retiro import RetiroSanitario
+
+# Tipo de retiro -> columna de días en ControlSanitario
+TIPOS_RETIRO = {
+    "leche": "dias_retiro_leche",
+    "carne": "dias_retiro_carne",
+}
+
+
+def _ventanas(control) -> list:
+    ventanas = []
+    for tipo, campo in TIPOS_RETIRO.items():
+        dias = getattr(control, campo)
+        if dias:
+            ventanas.append({
+                "finca_id": control.finca_id,
+                "animal_id": control.animal_id,
+                "control_sanitario_id": control.id,
+                "tipo": tipo,
+                "fecha_inicio": control.fecha,
+                "fecha_liberacion": control.fecha + timedelta(days=dias),
+            })
+    return ventanas
+
+
+def sincronizar_retiros(db: Session, control: ControlSanitario) -> None:
+    """
+    Reescribir las ventanas de retiro de un control (alta o edición).
+    El control debe tener id (hacer flush antes). No hace commit.
+    """
+    eliminar_retiros(db, control.id)
+    ventanas = _ventanas(control)
+    if ventanas:
+        db.execute(insert(RetiroSanitario), ventanas)
+
+
+def registrar_retiros_lote(db: Session, controles: Iterable) -> None:
+    """
+    Insertar en un solo INSERT las ventanas de muchos controles nuevos
+    (objetos o filas con id, finca_id, animal_id, fecha y días de retiro).
+    """
+    ventanas = [ventana for control in controles for ventana in _ventanas(control)]
+    if ventanas:
+        db.execute(insert(RetiroSanitario), ventanas)
+
+
+def eliminar_retiros(db: Session, control_id: int) -> None:
+    db.execute(delete(RetiroSanitario).where(RetiroSanitario.control_sanitario_id == control_id))
+
+
+def fecha_liberacion(db: Session, animal_id: int, tipo: str, fecha: Optional[date] = None) -> Optional[date]:
+    """
+    Fecha desde la cual el producto del animal vuelve a ser apto, o None si
+    no está en retiro en `fecha` (por defecto, hoy).
+    """
+    fecha = fecha or date.today()
+    return db.execute(
+        select(func.max(RetiroSanitario.fecha_liberacion)).where(
+            RetiroSanitario.animal_id == animal_id,
+            RetiroSanitario.tipo == tipo,
+            RetiroSanitario.fecha_liberacion > fecha,
+            RetiroSanitario.fecha_inicio <= fecha
+        )
+    ).scalar()
+
+
+def animales_en_retiro(
+    db: Session,
+    finca_id: int,
+    tipo: str,
+    fecha: Optional[date] = None,
+    animal_ids: Optional[Iterable[int]] = None
+) -> Dict[int, date]:
+    """
+    Animales en retiro en `fecha` -> fecha de liberación (la más lejana si
+    tienen varios tratamientos solapados).
+    """
+    fecha = fecha or date.today()
+    consulta = select(
+        RetiroSanitario.animal_id,
+        func.max(RetiroSanitario.fecha_liberacion)
+    ).where(
+        RetiroSanitario.finca_id == finca_id,
+        RetiroSanitario.tipo == tipo,
+        RetiroSanitario.fecha_liberacion > fecha,
+        RetiroSanitario.fecha_inicio <= fecha
+    )
+    if animal_ids is not None:
+        consulta = consulta.where(RetiroSanitario.animal_id.in_(list(animal_ids)))
+    return dict(db.execute(consulta.group_by(RetiroSanitario.animal_id)).all())
+
+
+def recalcular_retiros(db: Session, finca_id: Optional[int] = None, lote: int = 1000) -> int:
+    """
+    Reconstruir el índice de retiros desde los controles sanitarios (backfill).
+    No hace commit.
+    
+    Returns:
+        Número de ventanas creadas
+    """
+    filtros = [
+        (ControlSanitario.dias_retiro_leche > 0) | (ControlSanitario.dias_retiro_carne > 0)
+    ]
+    if finca_id is not None:
+        filtros.append(ControlSanitario.finca_id == finca_id)
+        db.execute(delete(RetiroSanitario).where(RetiroSanitario.finca_id == finca_id))
+    else:
+        db.execute(delete(RetiroSanitario))
+    
+    controles = db.execute(
+        select(
+            ControlSanitario.id,
+            ControlSanitario.finca_id,
+            ControlSanitario.animal_id,
+            ControlSanitario.fecha,
+            ControlSanitario.dias_retiro_leche,
+            ControlSanitario.dias_retiro_carne,
+        ).where(*filtros).execution_options(yield_per=lote)
+    )
+    total = 0
+    for particion in controles.partitions():
+        ventanas = [ventana for control in particion for ventana in _ventanas(control)]
+        if ventanas:
+            db.execute(insert(RetiroSanitario), ventanas)
+            total += len(ventanas)
+    return total
@@ -0,0 +1,201 @@
+"""
+Mantenimiento del resumen financiero mensual y de los cierres de periodo.
+
+Cada alta, edición o baja de una Transaccion se aplica como un delta sobre
+ResumenFinancieroMensual dentro de la misma transacción de base de datos, así
+los balances (totales históricos, mes actual, gasto por categoría) se calculan
+sumando unas pocas filas por mes en lugar de recorrer todo el libro.
+
+Cada uno de esos cambios, y los de los controles sanitarios y reproductivos,
+sube además la VersionLibro de la finca, que invalida la caché de reportes.
+"""
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, extract, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.upsert import upsert_incremental
+from app.models.transaccion import Transaccion
+from app.models.finanzas_resumen import ResumenFinancieroMensual, CierrePeriodo, VersionLibro
+
+CAMPOS_RELEVANTES = ("finca_id", "tipo", "fecha", "monto", "categoria_gasto")
+
+
+def datos_transaccion(transaccion: Transaccion) -> Dict[str, Any]:
+    """Copia de los campos que afectan al resumen (para calcular deltas en ediciones)"""
+    return {campo: getattr(transaccion, campo) for campo in CAMPOS_RELEVANTES}
+
+
+def aplicar_delta(
+    db: Session,
+    *,
+    finca_id: int,
+    tipo: str,
+    fecha: date,
+    monto: float,
+    categoria_gasto: Optional[str],
+    signo: int = 1
+) -> None:
+    """Sumar (signo=1) o restar (signo=-1) una transacción al resumen mensual"""
+    upsert_incremental(
+        db, ResumenFinancieroMensual,
+        claves={
+            "finca_id": finca_id,
+            "anio": fecha.year,
+            "mes": fecha.month,
+            "tipo": tipo,
+            "categoria": categoria_gasto or "",
+        },
+        incrementos={"monto_total": monto * signo, "numero_transacciones": signo}
+    )
+
+
+def marcar_libro(db: Session, finca_id: int) -> None:
+    """Subir la versión del libro de la finca (en la misma transacción del cambio)"""
+    upsert_incremental(db, VersionLibro, claves={"finca_id": finca_id}, incrementos={"version": 1})
+
+
+def registrar_alta(db: Session, transaccion: Transaccion) -> None:
+    aplicar_delta(db, **datos_transaccion(transaccion), signo=1)
+    marcar_libro(db, transaccion.finca_id)
+
+
+def registrar_baja(db: Session, transaccion: Transaccion) -> None:
+    aplicar_delta(db, **datos_transaccion(transaccion), signo=-1)
+    marcar_libro(db, transaccion.finca_id)
+
+
+def registrar_cambio(db: Session, anterior: Dict[str, Any], transaccion: Transaccion) -> None:
+    """Aplicar una edición: restar los valores anteriores y sumar los nuevos"""
+    # El PyG por animal depende también de campos fuera del resumen
+    marcar_libro(db, transaccion.finca_id)
+    nuevo = datos_transaccion(transaccion)
+    if nuevo == anterior:
+        return
+    aplicar_delta(db, **anterior, signo=-1)
+    aplicar_delta(db, **nuevo, signo=1)
+
+
+# ============================================
+# Consultas sobre el resumen
+# ============================================
+
+def _periodo(anio: int, mes: int) -> int:
+    return anio * 100 + mes
+
+
+def totales_por_tipo(db: Session, finca_id: int, desde: Optional[date] = None) -> Dict[str, float]:
+    """
+    Suma de montos por tipo (venta, compra, gasto).
+    
+    Args:
+        desde: Solo meses a partir del mes de esta fecha (None = todo el historial)
+    """
+    consulta = select(
+        ResumenFinancieroMensual.tipo,
+        func.sum(ResumenFinancieroMensual.monto_total)
+    ).where(ResumenFinancieroMensual.finca_id == finca_id)
+    if desde is not None:
+        consulta = consulta.where(
+            ResumenFinancieroMensual.anio * 100 + ResumenFinancieroMensual.mes
+            >= _periodo(desde.year, desde.month)
+        )
+    filas = db.execute(consulta.group_by(ResumenFinancieroMensual.tipo)).all()
+    return {tipo: float(total or 0.0) for tipo, total in filas}
+
+
+def gasto_por_categoria(db: Session, finca_id: int) -> Dict[str, float]:
+    """Total histórico de gastos por categoría (sin los gastos no categorizados)"""
+    filas = db.execute(
+        select(
+            ResumenFinancieroMensual.categoria,
+            func.sum(ResumenFinancieroMensual.monto_total)
+        ).where(
+            ResumenFinancieroMensual.finca_id == finca_id,
+            ResumenFinancieroMensual.tipo == "gasto",
+            ResumenFinancieroMensual.categoria != ""
+        ).group_by(ResumenFinancieroMensual.categoria)
+    ).all()
+    return {categoria: float(total) for categoria, total in filas if total}
+
+
+# ============================================
+# Cierres de periodo
+# ============================================
+
+def periodo_cerrado(db: Session, finca_id: int, fecha: date) -> bool:
+    """¿El mes de `fecha` está cerrado para la finca?"""
+    return db.query(CierrePeriodo.id).filter(
+        CierrePeriodo.finca_id == finca_id,
+        CierrePeriodo.anio == fecha.year,
+        CierrePeriodo.mes == fecha.month
+    ).first() is not None
+
+
+def cerrar_periodo(db: Session, finca_id: int, anio: int, mes: int, usuario_id: Optional[int]) -> CierrePeriodo:
+    """
+    Cerrar un mes guardando la foto de sus totales. No hace commit.
+    El llamador valida que el mes haya terminado y no esté ya cerrado.
+    """
+    filas = db.execute(
+        select(
+            ResumenFinancieroMensual.tipo,
+            func.sum(ResumenFinancieroMensual.monto_total),
+            func.sum(ResumenFinancieroMensual.numero_transacciones)
+        ).where(
+            ResumenFinancieroMensual.finca_id == finca_id,
+            ResumenFinancieroMensual.anio == anio,
+            ResumenFinancieroMensual.mes == mes
+        ).group_by(ResumenFinancieroMensual.tipo)
+    ).all()
+    totales = {tipo: float(total or 0.0) for tipo, total, _ in filas}
+    
+    cierre = CierrePeriodo(
+        finca_id=finca_id,
+        anio=anio,
+        mes=mes,
+        total_ventas=totales.get("venta", 0.0),
+        total_compras=totales.get("compra", 0.0),
+        total_gastos=totales.get("gasto", 0.0),
+        numero_transacciones=int(sum(cantidad or 0 for _, _, cantidad in filas)),
+        cerrado_por=usuario_id,
+        fecha_cierre=datetime.now(timezone.utc)
+    )
+    db.add(cierre)
+    return cierre
+
+
+def recalcular_resumenes(db: Session, finca_id: Optional[int] = None) -> None:
+    """
+    Reconstruir el resumen financiero desde las transacciones (backfill).
+    No hace commit.
+    
+    Args:
+        db: Sesión de base de datos
+        finca_id: Limitar a una finca (None = todas)
+    """
+    filtros = []
+    if finca_id is not None:
+        filtros.append(Transaccion.finca_id == finca_id)
+        db.execute(delete(ResumenFinancieroMensual).where(ResumenFinancieroMensual.finca_id == finca_id))
+    else:
+        db.execute(delete(ResumenFinancieroMensual))
+    
+    anio = extract("year", Transaccion.fecha)
+    mes = extract("month", Transaccion.fecha)
+    categoria = func.coalesce(Transaccion.categoria_gasto, "")
+    mensual = (
+        select(
+            Transaccion.finca_id, anio, mes, Transaccion.tipo, categoria,
+            func.sum(Transaccion.monto), func.count()
+        )
+        .where(*filtros)
+        .group_by(Transaccion.finca_id, anio, mes, Transaccion.tipo, categoria)
+    )
+    db.execute(
+        insert(ResumenFinancieroMensual).from_select(
+            ["finca_id", "anio", "mes", "tipo", "categoria", "monto_total", "numero_transacciones"],
+            mensual
+        )
+    )
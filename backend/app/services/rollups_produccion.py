@@ -0,0 +1,168 @@
+"""
+Mantenimiento de los resúmenes de producción lechera (diario y mensual).
+
+Cada alta, edición o baja de un RegistroProduccion de leche se aplica como un
+delta sobre ProduccionDiaria y ProduccionMensual dentro de la misma transacción,
+así los totales nunca requieren sumar los registros crudos.
+"""
+from datetime import date
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import case, delete, extract, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.upsert import upsert_incremental, upsert_incremental_lote
+from app.models.registro_produccion import RegistroProduccion
+from app.models.produccion_resumen import ProduccionDiaria, ProduccionMensual
+
+TURNOS = ("manana", "tarde", "noche")
+CAMPOS_RELEVANTES = ("finca_id", "animal_id", "tipo_produccion", "fecha", "cantidad_litros", "turno")
+
+
+def datos_registro(registro: RegistroProduccion) -> Dict[str, Any]:
+    """Copia de los campos que afectan a los resúmenes (para calcular deltas en ediciones)"""
+    return {campo: getattr(registro, campo) for campo in CAMPOS_RELEVANTES}
+
+
+def aplicar_delta(
+    db: Session,
+    *,
+    finca_id: int,
+    animal_id: int,
+    tipo_produccion: str,
+    fecha: date,
+    cantidad_litros: Optional[float],
+    turno: Optional[str],
+    signo: int = 1
+) -> None:
+    """
+    Sumar (signo=1) o restar (signo=-1) un registro a los resúmenes.
+    Solo cuentan los registros de leche con cantidad.
+    """
+    if tipo_produccion != "leche" or cantidad_litros is None:
+        return
+    
+    litros = cantidad_litros * signo
+    incrementos = {"litros_total": litros, "numero_ordenos": signo}
+    if turno in TURNOS:
+        incrementos[f"litros_{turno}"] = litros
+    
+    upsert_incremental(
+        db, ProduccionDiaria,
+        claves={"animal_id": animal_id, "fecha": fecha},
+        incrementos=incrementos,
+        valores={"finca_id": finca_id}
+    )
+    upsert_incremental(
+        db, ProduccionMensual,
+        claves={"animal_id": animal_id, "anio": fecha.year, "mes": fecha.month},
+        incrementos=incrementos,
+        valores={"finca_id": finca_id}
+    )
+
+
+def registrar_alta(db: Session, registro: RegistroProduccion) -> None:
+    aplicar_delta(db, **datos_registro(registro), signo=1)
+
+
+def registrar_altas(db: Session, registros: Iterable[RegistroProduccion]) -> None:
+    """
+    Aplicar muchas altas a la vez (ingreso por lotes): los deltas se acumulan
+    por animal y día / mes y se escriben con un upsert por lote en cada tabla.
+    """
+    columnas = ["litros_total", "numero_ordenos", *[f"litros_{turno}" for turno in TURNOS]]
+    diarios: Dict[tuple, Dict[str, Any]] = {}
+    mensuales: Dict[tuple, Dict[str, Any]] = {}
+    for registro in registros:
+        if registro.tipo_produccion != "leche" or registro.cantidad_litros is None:
+            continue
+        for acumulado, claves in (
+            (diarios, {"animal_id": registro.animal_id, "fecha": registro.fecha}),
+            (mensuales, {"animal_id": registro.animal_id, "anio": registro.fecha.year, "mes": registro.fecha.month}),
+        ):
+            fila = acumulado.setdefault(
+                tuple(claves.values()),
+                {**claves, "finca_id": registro.finca_id, **{columna: 0 for columna in columnas}}
+            )
+            fila["litros_total"] += registro.cantidad_litros
+            fila["numero_ordenos"] += 1
+            if registro.turno in TURNOS:
+                fila[f"litros_{registro.turno}"] += registro.cantidad_litros
+    
+    upsert_incremental_lote(db, ProduccionDiaria, ["animal_id", "fecha"], columnas, list(diarios.values()))
+    upsert_incremental_lote(db, ProduccionMensual, ["animal_id", "anio", "mes"], columnas, list(mensuales.values()))
+
+
+def registrar_baja(db: Session, registro: RegistroProduccion) -> None:
+    aplicar_delta(db, **datos_registro(registro), signo=-1)
+
+
+def registrar_cambio(db: Session, anterior: Dict[str, Any], registro: RegistroProduccion) -> None:
+    """Aplicar una edición: restar los valores anteriores y sumar los nuevos"""
+    nuevo = datos_registro(registro)
+    if nuevo == anterior:
+        return
+    aplicar_delta(db, **anterior, signo=-1)
+    aplicar_delta(db, **nuevo, signo=1)
+
+
+def recalcular_resumenes(db: Session, finca_id: Optional[int] = None) -> None:
+    """
+    Reconstruir los resúmenes desde los registros crudos (backfill).
+    No hace commit.
+    
+    Args:
+        db: Sesión de base de datos
+        finca_id: Limitar a una finca (None = todas)
+    """
+    filtros_registro = [
+        RegistroProduccion.tipo_produccion == "leche",
+        RegistroProduccion.cantidad_litros.isnot(None),
+    ]
+    if finca_id is not None:
+        filtros_registro.append(RegistroProduccion.finca_id == finca_id)
+        db.execute(delete(ProduccionDiaria).where(ProduccionDiaria.finca_id == finca_id))
+        db.execute(delete(ProduccionMensual).where(ProduccionMensual.finca_id == finca_id))
+    else:
+        db.execute(delete(ProduccionDiaria))
+        db.execute(delete(ProduccionMensual))
+    
+    litros = RegistroProduccion.cantidad_litros
+    metricas = [
+        func.sum(litros),
+        func.count(),
+        *[
+            func.coalesce(func.sum(case((RegistroProduccion.turno == turno, litros), else_=0.0)), 0.0)
+            for turno in TURNOS
+        ],
+    ]
+    columnas_metricas = ["litros_total", "numero_ordenos", *[f"litros_{turno}" for turno in TURNOS]]
+    
+    diario = (
+        select(
+            RegistroProduccion.finca_id,
+            RegistroProduccion.animal_id,
+            RegistroProduccion.fecha,
+            *metricas
+        )
+        .where(*filtros_registro)
+        .group_by(RegistroProduccion.finca_id, RegistroProduccion.animal_id, RegistroProduccion.fecha)
+    )
+    db.execute(
+        insert(ProduccionDiaria).from_select(
+            ["finca_id", "animal_id", "fecha", *columnas_metricas], diario
+        )
+    )
+    
+    anio = extract("year", RegistroProduccion.fecha)
+    mes = extract("month", RegistroProduccion.fecha)
+    mensual = (
+        select(RegistroProduccion.finca_id, RegistroProduccion.animal_id, anio, mes, *metricas)
+        .where(*filtros_registro)
+        .group_by(RegistroProduccion.finca_id, RegistroProduccion.animal_id, anio, mes)
+    )
+    db.execute(
+        insert(ProduccionMensual).from_select(
+            ["finca_id", "animal_id", "anio", "mes", *columnas_metricas], mensual
+        )
+    )
@@ -0,0 +1,181 @@
+"""
+Series temporales de producción para gráficos.
+
+Se leen de las tablas de resumen (produccion_diaria / produccion_mensual) con
+consultas agrupadas, y si hay más puntos de los que el gráfico puede mostrar se
+reducen en el servidor con LTTB (Largest-Triangle-Three-Buckets), que conserva
+la forma visual de la curva (picos y caídas) mucho mejor que promediar.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.animal import Animal
+from app.models.produccion_resumen import ProduccionDiaria, ProduccionMensual
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_puntos: int) -> np.ndarray:
+    """
+    Índices de los puntos que conserva el algoritmo LTTB.
+    
+    El primer y el último punto se mantienen; el resto se divide en
+    max_puntos - 2 cubetas y de cada una se elige el punto que forma el
+    triángulo de mayor área con el punto elegido antes y el promedio de la
+    cubeta siguiente.
+    """
+    n = len(x)
+    if max_puntos >= n or max_puntos < 3:
+        return np.arange(n)
+    
+    limites = np.linspace(1, n - 1, max_puntos - 1).astype(np.int64)
+    indices = np.empty(max_puntos, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    
+    anterior = 0
+    for i in range(max_puntos - 2):
+        inicio, fin = limites[i], limites[i + 1]
+        if i + 2 < len(limites):
+            siguiente_x = x[fin:limites[i + 2]].mean()
+            siguiente_y = y[fin:limites[i + 2]].mean()
+        else:
+            siguiente_x, siguiente_y = x[n - 1], y[n - 1]
+        
+        areas = np.abs(
+            (x[anterior] - siguiente_x) * (y[inicio:fin] - y[anterior])
+            - (x[anterior] - x[inicio:fin]) * (siguiente_y - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        indices[i + 1] = anterior
+    return indices
+
+
+def _columna_grupo(modelo, agrupar: str):
+    if agrupar == "animal":
+        return modelo.animal_id
+    if agrupar == "lote":
+        return Animal.lote_actual
+    # Finca: columna constante dentro del filtro (GROUP BY NULL no es portable)
+    return modelo.finca_id
+
+
+def _filtrar(consulta, modelo, finca_id: int, agrupar: str, animal_id: Optional[int], lote: Optional[str]):
+    consulta = consulta.where(modelo.finca_id == finca_id)
+    if agrupar == "lote" or lote is not None:
+        consulta = consulta.join(Animal, Animal.id == modelo.animal_id)
+    if animal_id is not None:
+        consulta = consulta.where(modelo.animal_id == animal_id)
+    if lote is not None:
+        consulta = consulta.where(Animal.lote_actual == lote)
+    return consulta
+
+
+def _filas_diarias(db, finca_id, agrupar, fecha_desde, fecha_hasta, animal_id, lote):
+    grupo = _columna_grupo(ProduccionDiaria, agrupar).label("grupo")
+    consulta = select(
+        grupo,
+        ProduccionDiaria.fecha,
+        func.sum(ProduccionDiaria.litros_total),
+        func.sum(ProduccionDiaria.numero_ordenos)
+    ).where(
+        ProduccionDiaria.fecha >= fecha_desde,
+        ProduccionDiaria.fecha <= fecha_hasta,
+        ProduccionDiaria.numero_ordenos > 0
+    )
+    consulta = _filtrar(consulta, ProduccionDiaria, finca_id, agrupar, animal_id, lote)
+    return db.execute(consulta.group_by(grupo, ProduccionDiaria.fecha)).all()
+
+
+def _filas_mensuales(db, finca_id, agrupar, fecha_desde, fecha_hasta, animal_id, lote):
+    grupo = _columna_grupo(ProduccionMensual, agrupar).label("grupo")
+    periodo = ProduccionMensual.anio * 100 + ProduccionMensual.mes
+    consulta = select(
+        grupo,
+        ProduccionMensual.anio,
+        ProduccionMensual.mes,
+        func.sum(ProduccionMensual.litros_total),
+        func.sum(ProduccionMensual.numero_ordenos)
+    ).where(
+        periodo >= fecha_desde.year * 100 + fecha_desde.month,
+        periodo <= fecha_hasta.year * 100 + fecha_hasta.month,
+        ProduccionMensual.numero_ordenos > 0
+    )
+    consulta = _filtrar(consulta, ProduccionMensual, finca_id, agrupar, animal_id, lote)
+    filas = db.execute(
+        consulta.group_by(grupo, ProduccionMensual.anio, ProduccionMensual.mes)
+    ).all()
+    return [(g, date(anio, mes, 1), litros, ordenos) for g, anio, mes, litros, ordenos in filas]
+
+
+def serie_produccion(
+    db: Session,
+    finca_id: int,
+    *,
+    agrupar: str,
+    resolucion: str,
+    fecha_desde: date,
+    fecha_hasta: date,
+    animal_id: Optional[int] = None,
+    lote: Optional[str] = None,
+    max_puntos: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Series de litros de leche por finca, lote o animal.
+    
+    Returns:
+        Una serie por grupo: {"clave", "etiqueta", "puntos": [{"fecha", "litros", "numero_ordenos"}]}
+    """
+    if resolucion == "mes":
+        filas = _filas_mensuales(db, finca_id, agrupar, fecha_desde, fecha_hasta, animal_id, lote)
+    else:
+        filas = _filas_diarias(db, finca_id, agrupar, fecha_desde, fecha_hasta, animal_id, lote)
+    
+    # Acumular por grupo y periodo (las semanas empiezan el lunes)
+    acumulado: Dict[Any, Dict[date, list]] = defaultdict(lambda: defaultdict(lambda: [0.0, 0]))
+    for grupo, fecha, litros, ordenos in filas:
+        if resolucion == "semana":
+            fecha = fecha - timedelta(days=fecha.weekday())
+        punto = acumulado[grupo][fecha]
+        punto[0] += litros or 0.0
+        punto[1] += ordenos or 0
+    
+    etiquetas: Dict[Any, str] = {}
+    if agrupar == "animal" and acumulado:
+        etiquetas = {
+            id_: numero for id_, numero in db.query(Animal.id, Animal.numero_identificacion).filter(
+                Animal.id.in_(list(acumulado))
+            )
+        }
+    
+    series = []
+    for grupo in sorted(acumulado, key=lambda g: (g is None, str(g))):
+        fechas = sorted(acumulado[grupo])
+        litros = np.array([acumulado[grupo][f][0] for f in fechas])
+        seleccion = range(len(fechas))
+        if max_puntos:
+            x = np.array([f.toordinal() for f in fechas], dtype=np.float64)
+            seleccion = lttb(x, litros, max_puntos)
+        
+        if agrupar == "animal":
+            clave, etiqueta = str(grupo), etiquetas.get(grupo, str(grupo))
+        elif agrupar == "lote":
+            clave, etiqueta = grupo, grupo or "Sin lote"
+        else:
+            clave, etiqueta = None, "Finca"
+        
+        series.append({
+            "clave": clave,
+            "etiqueta": etiqueta,
+            "puntos": [
+                {
+                    "fecha": fechas[i],
+                    "litros": round(float(litros[i]), 2),
+                    "numero_ordenos": acumulado[grupo][fechas[i]][1]
+                }
+                for i in seleccion
+            ]
+        })
+    return series
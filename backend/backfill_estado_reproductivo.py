@@ -0,0 +1,43 @@
+"""
+Script para reconstruir el estado reproductivo actual de cada hembra desde
+los eventos reproductivos. Ejecutar una vez tras desplegar la tabla
+estado_reproductivo_actual, o cuando se sospeche de una desviación.
+
+Uso:
+    python backfill_estado_reproductivo.py
+    python backfill_estado_reproductivo.py --finca-id 3
+"""
+import argparse
+
+from app.db.database import Base, SessionLocal, engine
+from app.models.finca import Finca  # noqa: F401 (registrar relaciones)
+from app.models.usuario import Usuario  # noqa: F401
+from app.models.animal import Animal  # noqa: F401
+from app.models.estado_reproductivo import EstadoReproductivoActual
+from app.services.estado_reproductivo import recalcular_estados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruir el estado reproductivo actual")
+    parser.add_argument("--finca-id", type=int, default=None, help="Solo esta finca")
+    args = parser.parse_args()
+    
+    # Crear la tabla si aún no existe
+    Base.metadata.create_all(bind=engine, tables=[EstadoReproductivoActual.__table__])
+    
+    db = SessionLocal()
+    try:
+        print("🔨 Recalculando estados reproductivos...")
+        total = recalcular_estados(db, finca_id=args.finca_id)
+        db.commit()
+        print(f"✅ Estados listos: {total} hembras")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Script para reconstruir el resumen financiero mensual desde las transacciones.
+Ejecutar una vez tras desplegar la tabla de resumen, o cuando se sospeche
+de una desviación. No modifica los cierres de periodo existentes.
+
+Uso:
+    python backfill_resumen_financiero.py
+    python backfill_resumen_financiero.py --finca-id 3
+"""
+import argparse
+
+from app.db.database import Base, SessionLocal, engine
+from app.models.finca import Finca  # noqa: F401 (registrar relaciones)
+from app.models.usuario import Usuario  # noqa: F401
+from app.models.animal import Animal  # noqa: F401
+from app.models.finanzas_resumen import ResumenFinancieroMensual, CierrePeriodo, VersionLibro
+from app.services.rollups_finanzas import recalcular_resumenes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruir el resumen financiero mensual")
+    parser.add_argument("--finca-id", type=int, default=None, help="Solo esta finca")
+    args = parser.parse_args()
+    
+    # Crear las tablas si aún no existen
+    Base.metadata.create_all(
+        bind=engine, tables=[ResumenFinancieroMensual.__table__, CierrePeriodo.__table__, VersionLibro.__table__]
+    )
+    
+    db = SessionLocal()
+    try:
+        print("🔨 Recalculando resumen financiero...")
+        recalcular_resumenes(db, finca_id=args.finca_id)
+        db.commit()
+        filas = db.query(ResumenFinancieroMensual).count()
+        print(f"✅ Resumen listo: {filas} filas mensuales")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
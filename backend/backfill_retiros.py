@@ -0,0 +1,43 @@
+"""
+Script para construir el índice de retiros de leche y carne desde los
+controles sanitarios existentes. Ejecutar una vez tras desplegar la tabla
+retiros_sanitarios, o cuando se sospeche de una desviación.
+
+Uso:
+    python backfill_retiros.py
+    python backfill_retiros.py --finca-id 3
+"""
+import argparse
+
+from app.db.database import Base, SessionLocal, engine
+from app.models.finca import Finca  # noqa: F401 (registrar relaciones)
+from app.models.usuario import Usuario  # noqa: F401
+from app.models.animal import Animal  # noqa: F401
+from app.models.retiro import RetiroSanitario
+from app.services.retiros import recalcular_retiros
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruir el índice de retiros")
+    parser.add_argument("--finca-id", type=int, default=None, help="Solo esta finca")
+    args = parser.parse_args()
+    
+    # Crear la tabla si aún no existe
+    Base.metadata.create_all(bind=engine, tables=[RetiroSanitario.__table__])
+    
+    db = SessionLocal()
+    try:
+        print("🔨 Recalculando retiros...")
+        total = recalcular_retiros(db, finca_id=args.finca_id)
+        db.commit()
+        print(f"✅ Índice listo: {total} ventanas de retiro")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Script para reconstruir los resúmenes de producción lechera (diario y mensual)
+desde los registros de producción. Ejecutar una vez tras desplegar las tablas
+de resumen, o cuando se sospeche de una desviación.
+
+Uso:
+    python backfill_rollups_produccion.py
+    python backfill_rollups_produccion.py --finca-id 3
+"""
+import argparse
+
+from app.db.database import Base, SessionLocal, engine
+from app.models.finca import Finca  # noqa: F401 (registrar relaciones)
+from app.models.usuario import Usuario  # noqa: F401
+from app.models.animal import Animal  # noqa: F401
+from app.models.produccion_resumen import ProduccionDiaria, ProduccionMensual
+from app.services.rollups_produccion import recalcular_resumenes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruir resúmenes de producción")
+    parser.add_argument("--finca-id", type=int, default=None, help="Solo esta finca")
+    args = parser.parse_args()
+    
+    # Crear las tablas de resumen si aún no existen
+    Base.metadata.create_all(
+        bind=engine, tables=[ProduccionDiaria.__table__, ProduccionMensual.__table__]
+    )
+    
+    db = SessionLocal()
+    try:
+        print("🔨 Recalculando resúmenes de producción...")
+        recalcular_resumenes(db, finca_id=args.finca_id)
+        db.commit()
+        dias = db.query(ProduccionDiaria).count()
+        meses = db.query(ProduccionMensual).count()
+        print(f"✅ Resúmenes listos: {dias} filas diarias, {meses} filas mensuales")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark de arranque en frío de un worker.
+
+Lanza N procesos nuevos por modo y mide en cada uno el tiempo de importar
+app.main, el de los eventos de startup y la latencia de la primera request
+con base de datos. Compara el arranque completo (INIT_DB_ON_STARTUP=True: DDL
+y usuario inicial en cada worker) con el rápido (INIT_DB_ON_STARTUP=False, con
+la base preparada antes por preparar_db.py), y lista los módulos que más
+tardan en importarse (python -X importtime).
+
+Uso:
+    python benchmarks/bench_arranque.py --procesos 5
+    python benchmarks/bench_arranque.py --database-url postgresql://localhost/bench_ganadero
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# Código que ejecuta cada proceso hijo; imprime una línea JSON con los tiempos
+HIJO = """
+import asyncio, json, time
+inicio = time.perf_counter()
+from app.main import app
+importado = time.perf_counter()
+asyncio.run(app.router.startup())
+arrancado = time.perf_counter()
+
+import httpx
+from app.core.security import create_access_token
+
+async def primera_request():
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        t = time.perf_counter()
+        r = await cliente.get("/api/v1/auth/me", headers={"Authorization": "Bearer " + create_access_token({"sub": "1"})})
+        r.raise_for_status()
+        return time.perf_counter() - t
+
+primera = asyncio.run(primera_request())
+print(json.dumps({
+    "import_ms": (importado - inicio) * 1000,
+    "startup_ms": (arrancado - importado) * 1000,
+    "primera_request_ms": primera * 1000,
+}))
+"""
+
+MODOS = {
+    "completo": {"INIT_DB_ON_STARTUP": "true", "DB_POOL_PREWARM": "0"},
+    "rapido": {"INIT_DB_ON_STARTUP": "false"},
+}
+
+
+def entorno(database_url: str, extra: dict) -> dict:
+    variables = dict(os.environ)
+    variables.setdefault("SECRET_KEY", "benchmark-secret-key")
+    variables["DATABASE_URL"] = database_url
+    variables["PYTHONPATH"] = str(BACKEND)
+    variables.update(extra)
+    return variables
+
+
+def ejecutar_hijo(database_url: str, extra: dict, directorio: str) -> dict:
+    resultado = subprocess.run(
+        [sys.executable, "-c", HIJO], env=entorno(database_url, extra), cwd=directorio,
+        capture_output=True, text=True
+    )
+    if resultado.returncode != 0:
+        sys.exit(f"El proceso hijo falló:\n{resultado.stderr[-2000:]}")
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def importaciones_lentas(database_url: str, directorio: str, cantidad: int) -> list[tuple[int, str]]:
+    """Módulos de primer nivel con mayor tiempo acumulado de importación (µs)"""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=entorno(database_url, {}), cwd=directorio, capture_output=True, text=True, check=True
+    )
+    tiempos = {}
+    for linea in resultado.stderr.splitlines():
+        encontrado = re.match(r"import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)", linea)
+        if encontrado and len(encontrado.group(2)) <= 2:
+            nombre = encontrado.group(3).split(".")[0] if not encontrado.group(3).startswith("app.") else encontrado.group(3)
+            tiempos[nombre] = max(tiempos.get(nombre, 0), int(encontrado.group(1)))
+    return sorted(((us, nombre) for nombre, us in tiempos.items()), reverse=True)[:cantidad]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--procesos", type=int, default=5, help="Procesos nuevos por modo")
+    parser.add_argument("--database-url", default=None, help="Por defecto, SQLite temporal")
+    parser.add_argument("--top", type=int, default=12, help="Importaciones más lentas a listar")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="bench_arranque_")
+    database_url = args.database_url or f"sqlite:///{directorio}/bench.db"
+
+    # La base se prepara una vez, como en un deploy con INIT_DB_ON_STARTUP=False
+    subprocess.run(
+        [sys.executable, str(BACKEND / "preparar_db.py")], env=entorno(database_url, {}),
+        cwd=directorio, capture_output=True, check=True
+    )
+
+    print(f"{'Modo':<10} {'import':>9} {'startup':>9} {'1ª request':>11} {'total':>9}   (mediana de {args.procesos}, ms)")
+    for modo, extra in MODOS.items():
+        muestras = [ejecutar_hijo(database_url, extra, directorio) for _ in range(args.procesos)]
+        mediana = {clave: statistics.median(m[clave] for m in muestras) for clave in muestras[0]}
+        total = sum(mediana.values())
+        print(
+            f"{modo:<10} {mediana['import_ms']:>9.1f} {mediana['startup_ms']:>9.1f} "
+            f"{mediana['primera_request_ms']:>11.1f} {total:>9.1f}"
+        )
+
+    print("\nImportaciones más lentas (acumulado):")
+    for microsegundos, nombre in importaciones_lentas(database_url, directorio, args.top):
+        print(f"   {microsegundos / 1000:>7.1f} ms  {nombre}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark de POST /control-sanitario/campana (vacunación masiva) sobre un hato grande.
+
+Genera una finca sintética (1.400 vientres y un año de historia: unas 2.000
+cabezas activas) y aplica campañas a toda la finca a través de la app real
+(ASGI en proceso), cada una en una fecha distinta y con su ventana de
+retiro de carne, más el reintento de la última, que debe omitir a todos
+los animales. Termina con código 1 si la mediana supera --limite-ms.
+
+Uso:
+    python benchmarks/bench_campana.py
+    python benchmarks/bench_campana.py --vacas 3000 --repeticiones 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench_campana_')}/bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["SLOW_QUERY_MS"] = "0"  # La carga masiva de la finca no es lo que se mide
+os.environ["INIT_DB_ON_STARTUP"] = "false"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.security import create_access_token  # noqa: E402
+from app.db.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.animal import Animal  # noqa: E402
+from generador_datos import generar_finca  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vacas", type=int, default=1400, help="Vientres fundadores de la finca sintética")
+    parser.add_argument("--anios", type=int, default=1, help="Años de historia")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Campañas medidas")
+    parser.add_argument("--limite-ms", type=float, default=250.0, help="Mediana máxima de una campaña")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        print(f"🐄 Generando finca sintética ({args.vacas} vientres, {args.anios} años)...")
+        finca = generar_finca(db, args.vacas, args.anios)
+        cabezas = db.scalar(
+            select(func.count()).where(Animal.finca_id == finca["finca_id"], Animal.estado == "activo")
+        )
+        print(f"   {cabezas} animales activos en {finca['segundos']} s")
+    finally:
+        db.close()
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(finca['usuario_id'])})}"}
+    fecha = date.today() + timedelta(days=1)  # Sin registros previos del producto
+
+    def campana(cliente: TestClient, dia: int) -> tuple:
+        inicio = time.perf_counter()
+        respuesta = cliente.post("/api/v1/control-sanitario/campana", headers=headers, json={
+            "tipo": "vacuna", "producto": "Aftosa (benchmark)", "fecha": (fecha + timedelta(days=dia)).isoformat(),
+            "dosis": "2ml", "costo_por_animal": 1800, "dias_retiro_carne": 21,
+        })
+        return time.perf_counter() - inicio, respuesta
+
+    with TestClient(app) as cliente:
+        tiempos = []
+        for dia in range(args.repeticiones):
+            segundos, respuesta = campana(cliente, dia)
+            if respuesta.status_code != 201 or respuesta.json()["aplicados"] != cabezas:
+                print(f"❌ HTTP {respuesta.status_code}: {respuesta.text[:200]}")
+                return 1
+            tiempos.append(segundos)
+        reintento, respuesta = campana(cliente, args.repeticiones - 1)
+    if respuesta.status_code != 201 or respuesta.json()["omitidos"] != cabezas:
+        print(f"❌ El reintento no omitió a los {cabezas} animales: {respuesta.text[:200]}")
+        return 1
+
+    mediana = statistics.median(tiempos) * 1000
+    print(f"\nCampaña a {cabezas} cabezas")
+    print(f"   aplicar      mediana {mediana:8.1f} ms   máx {max(tiempos) * 1000:8.1f} ms")
+    print(f"   reintento            {reintento * 1000:8.1f} ms (todos omitidos)")
+
+    if mediana > args.limite_ms:
+        print(f"\n❌ La campaña supera {args.limite_ms} ms")
+        return 1
+    print(f"\n✅ Por debajo de {args.limite_ms} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
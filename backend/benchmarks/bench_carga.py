@@ -0,0 +1,207 @@
+"""
+Prueba de carga del perfil de producción con 1, 2, 4... workers.
+
+Genera una finca sintética, levanta el servidor real (gunicorn con
+gunicorn.conf.py, o uvicorn --workers si gunicorn no está instalado) con
+WEB_CONCURRENCY=N y lo satura durante unos segundos desde varios procesos
+cliente, midiendo requests por segundo y latencia. El escalado ideal es
+lineal hasta el número de CPUs; con Postgres conviene correrlo contra una
+base de prueba (--database-url), SQLite serializa parte del trabajo.
+
+Uso:
+    python benchmarks/bench_carga.py
+    python benchmarks/bench_carga.py --workers 1,2,4,8 --segundos 20 --concurrencia 64
+    python benchmarks/bench_carga.py --database-url postgresql://localhost/bench_ganadero
+"""
+import argparse
+import asyncio
+import importlib.util
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+CPUS = os.cpu_count() or 1
+
+# Mezcla de lecturas: listados paginados, el dashboard y las alertas
+RUTAS = [
+    "/api/v1/animales",
+    "/api/v1/dashboard/",
+    "/api/v1/dashboard/alertas",
+    "/api/v1/produccion/",
+    "/api/v1/control-sanitario/",
+]
+
+
+def _argumentos() -> argparse.Namespace:
+    por_defecto = sorted({1, 2} | {2 ** i for i in range(CPUS.bit_length()) if 2 ** i <= CPUS})
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default=",".join(map(str, por_defecto)), help="Lista de workers a probar")
+    parser.add_argument("--servidor", choices=("gunicorn", "uvicorn"), default=None)
+    parser.add_argument("--database-url", default=None, help="Por defecto, SQLite temporal")
+    parser.add_argument("--vacas", type=int, default=50, help="Vientres de la finca sintética")
+    parser.add_argument("--segundos", type=float, default=10, help="Duración de cada medición")
+    parser.add_argument("--concurrencia", type=int, default=32, help="Requests simultáneas en total")
+    parser.add_argument("--clientes", type=int, default=max(1, CPUS // 2), help="Procesos que generan la carga")
+    args = parser.parse_args()
+    args.workers = [int(n) for n in args.workers.split(",")]
+    args.servidor = args.servidor or ("gunicorn" if importlib.util.find_spec("gunicorn") else "uvicorn")
+    return args
+
+
+def preparar_finca(database_url: str, vacas: int) -> str:
+    """Crear tablas y finca sintética; devuelve un token del usuario de la finca"""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+    sys.path.insert(0, str(BACKEND))
+    sys.path.insert(0, str(BACKEND / "benchmarks"))
+
+    from app.api.v1.api import api_router  # noqa: F401 (registrar todos los modelos)
+    from app.core.security import create_access_token
+    from app.db.database import Base, SessionLocal, engine
+    from generador_datos import generar_finca
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        finca = generar_finca(db, vacas, 1)
+    finally:
+        db.close()
+    engine.dispose()  # No heredar conexiones abiertas en los procesos cliente
+    print(f"🐄 Finca sintética: {sum(finca['filas'].values())} filas en {engine.url.get_backend_name()}")
+    return create_access_token({"sub": str(finca["usuario_id"])})
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def levantar_servidor(servidor: str, workers: int, puerto: int, database_url: str, directorio: str) -> subprocess.Popen:
+    entorno = dict(os.environ)
+    entorno.update({
+        "DATABASE_URL": database_url,
+        "PYTHONPATH": str(BACKEND),
+        "WEB_CONCURRENCY": str(workers),
+        "INIT_DB_ON_STARTUP": "false",
+        "PORT": str(puerto),
+        # Se mide el rendimiento bruto: sin límites de uso ni descarte de carga
+        "RATE_LIMIT_ENABLED": "false",
+        "LOAD_SHED_POOL_WAIT_MS": "0",
+    })
+    if servidor == "gunicorn":
+        comando = [
+            sys.executable, "-m", "gunicorn", "-c", str(BACKEND / "gunicorn.conf.py"),
+            "--access-logfile", "/dev/null", "--log-level", "warning", "app.main:app"
+        ]
+    else:
+        comando = [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(puerto),
+            "--workers", str(workers), "--no-access-log", "--log-level", "warning"
+        ]
+    proceso = subprocess.Popen(comando, env=entorno, cwd=directorio)
+
+    import httpx
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(f"http://127.0.0.1:{puerto}/health", timeout=1).status_code == 200:
+                return proceso
+        except httpx.HTTPError:
+            pass
+        if proceso.poll() is not None:
+            raise RuntimeError(f"El servidor terminó con código {proceso.returncode}")
+        time.sleep(0.2)
+    proceso.terminate()
+    raise RuntimeError("El servidor no respondió en 60 s")
+
+
+def _cliente(base_url: str, token: str, concurrencia: int, segundos: float) -> tuple[list[float], int]:
+    """Un proceso cliente: `concurrencia` tareas pidiendo RUTAS en ronda hasta el plazo"""
+    import httpx
+
+    async def cargar():
+        latencias, errores = [], 0
+        limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+        async with httpx.AsyncClient(
+            base_url=base_url, headers={"Authorization": f"Bearer {token}"}, limits=limites, timeout=30
+        ) as cliente:
+            fin = time.perf_counter() + segundos
+
+            async def tarea(desfase: int):
+                nonlocal errores
+                i = desfase
+                while time.perf_counter() < fin:
+                    inicio = time.perf_counter()
+                    try:
+                        respuesta = await cliente.get(RUTAS[i % len(RUTAS)])
+                        if respuesta.status_code >= 400:
+                            errores += 1
+                    except httpx.HTTPError:
+                        errores += 1
+                    latencias.append(time.perf_counter() - inicio)
+                    i += 1
+
+            await asyncio.gather(*(tarea(n) for n in range(concurrencia)))
+        return latencias, errores
+
+    return asyncio.run(cargar())
+
+
+def medir(base_url: str, token: str, clientes: int, concurrencia: int, segundos: float) -> dict:
+    por_cliente = max(1, concurrencia // clientes)
+    with multiprocessing.get_context("spawn").Pool(clientes) as pool:
+        # Calentamiento corto (conexiones del pool, caches, imports perezosos)
+        pool.starmap(_cliente, [(base_url, token, por_cliente, 1.0)] * clientes)
+        inicio = time.perf_counter()
+        resultados = pool.starmap(_cliente, [(base_url, token, por_cliente, segundos)] * clientes)
+        duracion = time.perf_counter() - inicio
+    latencias = sorted(l for lista, _ in resultados for l in lista)
+    cuantiles = statistics.quantiles(latencias, n=100, method="inclusive") if len(latencias) > 1 else latencias * 99
+    return {
+        "rps": len(latencias) / duracion,
+        "p50_ms": cuantiles[49] * 1000,
+        "p95_ms": cuantiles[94] * 1000,
+        "errores": sum(errores for _, errores in resultados),
+    }
+
+
+def main():
+    args = _argumentos()
+    directorio = tempfile.mkdtemp(prefix="bench_carga_")
+    database_url = args.database_url or f"sqlite:///{directorio}/bench.db"
+    token = preparar_finca(database_url, args.vacas)
+
+    print(
+        f"⏱️  {args.servidor}, {CPUS} CPUs, {args.concurrencia} requests simultáneas desde "
+        f"{args.clientes} procesos, {args.segundos:g} s por medición\n"
+    )
+    print(f"{'Workers':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errores':>8} {'escalado':>9} {'eficiencia':>11}")
+    base = None
+    for workers in args.workers:
+        puerto = puerto_libre()
+        servidor = levantar_servidor(args.servidor, workers, puerto, database_url, directorio)
+        try:
+            r = medir(f"http://127.0.0.1:{puerto}", token, args.clientes, args.concurrencia, args.segundos)
+        finally:
+            servidor.terminate()
+            servidor.wait(timeout=30)
+        base = base or r["rps"] / workers
+        escalado = r["rps"] / base
+        print(
+            f"{workers:>7} {r['rps']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+            f"{r['errores']:>8} {escalado:>8.2f}x {escalado / workers:>10.0%}"
+        )
+    if max(args.workers) > CPUS:
+        print(f"\n(Con más workers que CPUs ({CPUS}) el escalado deja de ser lineal)")
+
+
+if __name__ == "__main__":
+    main()
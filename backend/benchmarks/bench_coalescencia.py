@@ -0,0 +1,104 @@
+"""
+Benchmark de coalescencia: N usuarios de una finca abriendo el dashboard a la vez.
+
+Genera una finca sintética y lanza ráfagas de requests simultáneas a
+/dashboard/ y /dashboard/alertas contra la app real (ASGI en proceso), con y
+sin coalescencia, contando las consultas SQL ejecutadas y la latencia de la
+ráfaga. Con coalescencia, cada ráfaga debería calcular cada endpoint una vez
+(o pocas, si las requests no llegan exactamente juntas).
+
+Uso:
+    python benchmarks/bench_coalescencia.py
+    python benchmarks/bench_coalescencia.py --usuarios 40 --vacas 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench_coalescencia_')}/bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ["RATE_LIMIT_ENABLED"] = "false"  # Todas las requests de la ráfaga deben llegar al endpoint
+os.environ["LOAD_SHED_POOL_WAIT_MS"] = "0"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.core import coalescencia  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.db.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from generador_datos import generar_finca  # noqa: E402
+
+RUTAS = ["/api/v1/dashboard/", "/api/v1/dashboard/alertas"]
+
+
+class SinCoalescencia(coalescencia.Coalescedor):
+    """Cada request calcula por su cuenta, como antes"""
+
+    def ejecutar(self, clave, calcular):
+        return calcular()
+
+
+async def rafaga(token: str, usuarios: int) -> float:
+    """Todas las requests a la vez; devuelve la duración en ms"""
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transporte, base_url="http://bench", headers={"Authorization": f"Bearer {token}"}
+    ) as cliente:
+        inicio = time.perf_counter()
+        respuestas = await asyncio.gather(*(
+            cliente.get(RUTAS[i % len(RUTAS)]) for i in range(usuarios)
+        ))
+        duracion = (time.perf_counter() - inicio) * 1000
+    if any(r.status_code != 200 for r in respuestas):
+        sys.exit(f"❌ Respuestas con error: {sorted({r.status_code for r in respuestas})}")
+    if len({r.content for r in respuestas if r.url.path == RUTAS[0]}) != 1:
+        sys.exit("❌ Las requests del dashboard recibieron contenidos distintos")
+    return duracion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--usuarios", type=int, default=30, help="Requests simultáneas por ráfaga")
+    parser.add_argument("--vacas", type=int, default=100, help="Vientres de la finca sintética")
+    parser.add_argument("--rafagas", type=int, default=5, help="Ráfagas medidas por modo")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        finca = generar_finca(db, args.vacas, 1)
+    finally:
+        db.close()
+    token = create_access_token({"sub": str(finca["usuario_id"])})
+
+    consultas = 0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _contar(*_):
+        nonlocal consultas
+        consultas += 1
+
+    print(f"🐄 {args.usuarios} requests simultáneas a {', '.join(RUTAS)}, {args.rafagas} ráfagas\n")
+    print(f"{'Modo':<18} {'consultas/ráfaga':>17} {'ms/ráfaga':>10}")
+    for nombre, coalescedor in (
+        ("sin coalescencia", SinCoalescencia()),
+        ("con coalescencia", coalescencia.Coalescedor()),
+    ):
+        coalescencia._coalescedor = coalescedor
+        asyncio.run(rafaga(token, args.usuarios))  # Calentamiento
+        consultas, tiempos = 0, []
+        for _ in range(args.rafagas):
+            tiempos.append(asyncio.run(rafaga(token, args.usuarios)))
+        print(f"{nombre:<18} {consultas / args.rafagas:>17.0f} {min(tiempos):>10.1f}")
+    print("\n(Incluye las consultas de autenticación, una por request)")
+
+
+if __name__ == "__main__":
+    main()
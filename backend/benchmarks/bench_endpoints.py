@@ -0,0 +1,253 @@
+"""
+Benchmark de los endpoints de lectura de la API contra una finca sintética.
+
+Genera una finca con benchmarks/generador_datos.py y recorre todas las rutas
+GET de /api/v1 en la app real (ASGI en proceso), midiendo la latencia
+p50/p95/p99 y las consultas SQL por request (leídas del encabezado
+Server-Timing). Sirve con SQLite (por defecto, archivo temporal) o con un
+Postgres local vacío (--database-url).
+
+Para CI: guardar una referencia con --json y comparar con --comparar; el
+script termina con código 1 si algún endpoint responde con error HTTP, si una
+ruta de la referencia no se pudo medir, o si ejecuta más consultas que en la
+referencia o su p95 empeora más que la tolerancia
+(.github/workflows/backend.yml compara cada PR contra su rama base).
+
+Uso:
+    python benchmarks/bench_endpoints.py --vacas 200 --anios 2
+    python benchmarks/bench_endpoints.py --database-url postgresql://localhost/bench_ganadero
+    python benchmarks/bench_endpoints.py --json referencia.json
+    python benchmarks/bench_endpoints.py --comparar referencia.json --tolerancia 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def _argumentos() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None, help="Por defecto, SQLite temporal")
+    parser.add_argument("--vacas", type=int, default=200, help="Vientres fundadores de la finca sintética")
+    parser.add_argument("--anios", type=int, default=2, help="Años de historia")
+    parser.add_argument("--repeticiones", type=int, default=30, help="Requests medidas por endpoint")
+    parser.add_argument("--calentamiento", type=int, default=2, help="Requests previas sin medir")
+    parser.add_argument("--filtro", default=None, help="Solo rutas que contengan este texto")
+    parser.add_argument("--json", default=None, help="Guardar los resultados en este archivo")
+    parser.add_argument("--comparar", default=None, help="Referencia JSON contra la cual comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.3, help="Empeoramiento permitido del p95 (0.3 = 30%%)")
+    parser.add_argument("--margen-ms", type=float, default=2.0, help="Diferencia absoluta de p95 que se ignora")
+    args = parser.parse_args()
+    # Rutas relativas al directorio actual, antes de cambiar al temporal
+    args.json = args.json and str(Path(args.json).resolve())
+    args.comparar = args.comparar and str(Path(args.comparar).resolve())
+    return args
+
+
+ARGS = _argumentos() if __name__ == "__main__" else None
+DIRECTORIO_TRABAJO = tempfile.mkdtemp(prefix="bench_endpoints_")
+if ARGS and ARGS.database_url:
+    os.environ["DATABASE_URL"] = ARGS.database_url
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DIRECTORIO_TRABAJO}/bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ["METRICS_ENABLED"] = "true"  # Las consultas por request salen de Server-Timing
+os.environ["RATE_LIMIT_ENABLED"] = "false"  # Mide el endpoint, no el límite de uso
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.chdir(DIRECTORIO_TRABAJO)
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.db.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.models.animal import Animal  # noqa: E402
+from app.models.control_reproductivo import ControlReproductivo  # noqa: E402
+from app.models.control_sanitario import ControlSanitario  # noqa: E402
+from app.models.registro_produccion import RegistroProduccion  # noqa: E402
+from app.models.transaccion import Transaccion  # noqa: E402
+from generador_datos import generar_finca  # noqa: E402
+
+CONSULTAS = re.compile(r'desc="(\d+) consultas"')
+
+# Rutas que no son lecturas repetibles o necesitan un recurso que el generador no crea
+EXCLUIDAS = {
+    "/api/v1/auth/me",
+    "/api/v1/reportes/trabajos/{trabajo_id}",
+    "/api/v1/reportes/trabajos/{trabajo_id}/archivo",
+}
+
+# Parámetros de consulta para rutas que los exigen o que conviene ejercitar con datos
+PARAMETROS_CONSULTA = {
+    "/api/v1/produccion/series": {"resolucion": "semana", "fecha_desde": "2000-01-01"},
+    "/api/v1/pesajes/bajo-objetivo": {"objetivo": 0.6},
+}
+
+
+def muestras_de_ruta(db, finca_id: int) -> dict:
+    """Valores reales para los parámetros de ruta: una vaca con historia y un registro de cada tipo"""
+    vaca = db.query(ControlReproductivo.animal_id).filter(
+        ControlReproductivo.finca_id == finca_id,
+        ControlReproductivo.tipo_evento == "parto"
+    ).order_by(ControlReproductivo.animal_id).first()[0]
+    primero = lambda modelo: db.query(modelo.id).filter(modelo.finca_id == finca_id).order_by(modelo.id).first()[0]  # noqa: E731
+    return {
+        "animal_id": vaca,
+        "/api/v1/control-sanitario/{registro_id}": primero(ControlSanitario),
+        "/api/v1/control-reproductivo/{registro_id}": primero(ControlReproductivo),
+        "/api/v1/produccion/{registro_id}": primero(RegistroProduccion),
+        "/api/v1/transacciones/{transaccion_id}": primero(Transaccion),
+        "/api/v1/animales/{animal_id}": primero(Animal),
+    }
+
+
+def rutas_get(muestras: dict, filtro: str | None) -> list[tuple[str, str, dict]]:
+    """(plantilla, url, params) de cada GET de la API con sus parámetros resueltos"""
+    rutas = []
+    for ruta in app.routes:
+        plantilla = getattr(ruta, "path", "")
+        if "GET" not in getattr(ruta, "methods", ()) or not plantilla.startswith("/api/v1"):
+            continue
+        if plantilla in EXCLUIDAS or (filtro and filtro not in plantilla):
+            continue
+        url = plantilla
+        for parametro in re.findall(r"{(\w+)}", plantilla):
+            valor = muestras.get(plantilla, muestras.get(parametro))
+            if valor is None:
+                print(f"   (omitida {plantilla}: sin valor para {{{parametro}}})")
+                url = None
+                break
+            url = url.replace(f"{{{parametro}}}", str(valor))
+        if url:
+            rutas.append((plantilla, url, PARAMETROS_CONSULTA.get(plantilla, {})))
+    return rutas
+
+
+def percentil(valores: list[float], p: int) -> float:
+    if len(valores) < 2:
+        return valores[0]
+    return statistics.quantiles(valores, n=100, method="inclusive")[p - 1]
+
+
+async def medir(rutas, token: str, repeticiones: int, calentamiento: int) -> tuple[dict, dict]:
+    """Resultados por plantilla y errores HTTP (plantilla -> descripción) de las que fallaron"""
+    headers = {"Authorization": f"Bearer {token}"}
+    transporte = httpx.ASGITransport(app=app)
+    resultados = {}
+    errores = {}
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=120) as cliente:
+        for plantilla, url, params in rutas:
+            latencias = []
+            consultas = None
+            primera = None
+            for i in range(calentamiento + repeticiones):
+                inicio = time.perf_counter()
+                respuesta = await cliente.get(url, params=params, headers=headers)
+                duracion = (time.perf_counter() - inicio) * 1000
+                if respuesta.status_code >= 400:
+                    errores[plantilla] = f"HTTP {respuesta.status_code} {respuesta.text[:120]}"
+                    print(f"   ⚠️  {plantilla}: {errores[plantilla]}")
+                    latencias = []
+                    break
+                if i == 0:
+                    primera = duracion
+                encontrado = CONSULTAS.search(respuesta.headers.get("server-timing", ""))
+                consultas = int(encontrado.group(1)) if encontrado else None
+                if i >= calentamiento:
+                    latencias.append(duracion)
+            if latencias:
+                resultados[plantilla] = {
+                    "primera_ms": round(primera, 2),
+                    "p50_ms": round(percentil(latencias, 50), 2),
+                    "p95_ms": round(percentil(latencias, 95), 2),
+                    "p99_ms": round(percentil(latencias, 99), 2),
+                    "consultas": consultas,
+                    "bytes": len(respuesta.content),
+                }
+    return resultados, errores
+
+
+def imprimir(resultados: dict) -> None:
+    print(f"\n{'Endpoint':<58} {'1ª':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL':>5} {'KB':>7}")
+    for plantilla, r in sorted(resultados.items()):
+        print(
+            f"{plantilla:<58} {r['primera_ms']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+            f"{r['p99_ms']:>8.1f} {r['consultas'] if r['consultas'] is not None else '-':>5} {r['bytes'] / 1024:>7.1f}"
+        )
+
+
+def comparar(resultados: dict, referencia: dict, tolerancia: float, margen_ms: float,
+             filtro: str | None = None) -> list[str]:
+    """
+    Regresiones respecto a la referencia: rutas que ya no se pudieron medir,
+    más consultas o p95 peor que la tolerancia
+    """
+    regresiones = []
+    for plantilla, base in referencia.get("endpoints", {}).items():
+        if filtro and filtro not in plantilla:
+            continue
+        actual = resultados.get(plantilla)
+        if actual is None:
+            regresiones.append(f"{plantilla}: sin resultado (error HTTP, ruta omitida o eliminada)")
+            continue
+        if base["consultas"] is not None and actual["consultas"] is not None and actual["consultas"] > base["consultas"]:
+            regresiones.append(f"{plantilla}: {actual['consultas']} consultas (antes {base['consultas']})")
+        limite = base["p95_ms"] * (1 + tolerancia) + margen_ms
+        if actual["p95_ms"] > limite:
+            regresiones.append(f"{plantilla}: p95 {actual['p95_ms']:.1f} ms (antes {base['p95_ms']:.1f} ms)")
+    return regresiones
+
+
+def main(args: argparse.Namespace) -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        print(f"🐄 Generando finca sintética ({args.vacas} vientres, {args.anios} años) en {engine.url.get_backend_name()}...")
+        finca = generar_finca(db, args.vacas, args.anios)
+        print(f"   {sum(finca['filas'].values())} filas en {finca['segundos']} s")
+        muestras = muestras_de_ruta(db, finca["finca_id"])
+    finally:
+        db.close()
+
+    token = create_access_token({"sub": str(finca["usuario_id"])})
+    rutas = rutas_get(muestras, args.filtro)
+    print(f"⏱️  Midiendo {len(rutas)} endpoints x {args.repeticiones} requests...")
+    resultados, errores = asyncio.run(medir(rutas, token, args.repeticiones, args.calentamiento))
+    imprimir(resultados)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            "motor": engine.url.get_backend_name(),
+            "vacas": args.vacas,
+            "anios": args.anios,
+            "filas": finca["filas"],
+            "endpoints": resultados,
+            "errores": errores,
+        }, indent=2, ensure_ascii=False))
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+    regresiones = [f"{plantilla}: {error}" for plantilla, error in sorted(errores.items())]
+    if args.comparar:
+        referencia = json.loads(Path(args.comparar).read_text())
+        regresiones += [
+            regresion for regresion in comparar(resultados, referencia, args.tolerancia, args.margen_ms, args.filtro)
+            if regresion.split(":", 1)[0] not in errores  # Ya reportada con su error
+        ]
+    if regresiones:
+        print("\n❌ Regresiones:")
+        for regresion in regresiones:
+            print(f"   {regresion}")
+        return 1
+    if args.comparar:
+        print("\n✅ Sin regresiones respecto a la referencia")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(ARGS))
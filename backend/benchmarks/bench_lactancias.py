@@ -0,0 +1,98 @@
+"""
+Benchmark del análisis de lactancias (app/services/lactancias.py) sobre un hato grande.
+
+Genera una finca sintética (1.000 vientres por defecto) y mide el análisis de
+todas sus lactancias sin caché: directamente sobre el servicio y a través de
+GET /produccion/lactancias en la app real (ASGI en proceso). Termina con
+código 1 si la mediana del cálculo sin caché supera --limite-s (1 s).
+
+Uso:
+    python benchmarks/bench_lactancias.py
+    python benchmarks/bench_lactancias.py --vacas 2000 --anios 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench_lactancias_')}/bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["SLOW_QUERY_MS"] = "0"  # La carga masiva de la finca no es lo que se mide
+os.environ["INIT_DB_ON_STARTUP"] = "false"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.security import create_access_token  # noqa: E402
+from app.db.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import lactancias  # noqa: E402
+from generador_datos import generar_finca  # noqa: E402
+
+DESDE = date(2000, 1, 1)  # Todas las lactancias de la finca
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vacas", type=int, default=1000, help="Vientres fundadores de la finca sintética")
+    parser.add_argument("--anios", type=int, default=2, help="Años de historia")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Cálculos sin caché medidos")
+    parser.add_argument("--limite-s", type=float, default=1.0, help="Mediana máxima del cálculo sin caché")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        print(f"🐄 Generando finca sintética ({args.vacas} vientres, {args.anios} años)...")
+        finca = generar_finca(db, args.vacas, args.anios)
+        print(f"   {finca['filas']['registros_produccion']} registros de producción en {finca['segundos']} s")
+    finally:
+        db.close()
+
+    # Sesión nueva, como la de una request
+    db = SessionLocal()
+    try:
+        tiempos = []
+        for _ in range(args.repeticiones):
+            lactancias._cache.limpiar()
+            inicio = time.perf_counter()
+            resultado = lactancias.analizar_lactancias(db, finca["finca_id"], DESDE)
+            tiempos.append(time.perf_counter() - inicio)
+        inicio = time.perf_counter()
+        lactancias.analizar_lactancias(db, finca["finca_id"], DESDE)
+        en_cache = time.perf_counter() - inicio
+    finally:
+        db.close()
+
+    animales = len({l["animal_id"] for l in resultado})
+    ajustadas = sum(l["wood_a"] is not None for l in resultado)
+    print(f"\n{len(resultado)} lactancias de {animales} vacas ({ajustadas} con curva de Wood)")
+    print(f"   servicio sin caché   mediana {statistics.median(tiempos) * 1000:8.1f} ms   máx {max(tiempos) * 1000:8.1f} ms")
+    print(f"   servicio con caché             {en_cache * 1000:8.1f} ms")
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(finca['usuario_id'])})}"}
+    with TestClient(app) as cliente:
+        lactancias._cache.limpiar()
+        inicio = time.perf_counter()
+        respuesta = cliente.get("/api/v1/produccion/lactancias", params={"fecha_desde": DESDE}, headers=headers)
+        endpoint = time.perf_counter() - inicio
+    if respuesta.status_code != 200:
+        print(f"❌ HTTP {respuesta.status_code}: {respuesta.text[:200]}")
+        return 1
+    print(f"   GET /produccion/lactancias sin caché {endpoint * 1000:8.1f} ms")
+
+    if statistics.median(tiempos) > args.limite_s:
+        print(f"\n❌ El análisis sin caché supera {args.limite_s} s")
+        return 1
+    print(f"\n✅ Por debajo de {args.limite_s} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
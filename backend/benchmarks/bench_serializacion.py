@@ -0,0 +1,153 @@
+"""
+Benchmark de serialización de listados: camino de FastAPI vs respuesta_json.
+
+Carga animales del ORM desde una base SQLite temporal y mide el tiempo de CPU
+de convertir una página ya consultada en bytes JSON:
+- antes: el endpoint devuelve AnimalListResponse y FastAPI lo revalida contra
+  response_model (serialize_response) y lo serializa con JSONResponse.
+- después: respuesta_json(AnimalListResponse(...)) con los items tomados
+  con columnas_orm(), una validación y los bytes de pydantic-core.
+
+Se mide una página de 100 animales y una exportación de 10.000, en dos
+tramos: "serializar" (modelo ya construido -> bytes, lo que FastAPI repite
+por su cuenta) y "total" (filas del ORM -> bytes). Ambos caminos deben
+producir el mismo JSON.
+
+Uso:
+    python benchmarks/bench_serializacion.py
+    python benchmarks/bench_serializacion.py --filas 100,10000,50000
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench_serializacion_')}/bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+from app.api.v1.api import api_router  # noqa: E402,F401 (registrar todos los modelos)
+from app.core.respuestas import columnas_orm, respuesta_json  # noqa: E402
+from app.db.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.animal import Animal  # noqa: E402
+from app.schemas.animal import AnimalListResponse  # noqa: E402
+
+RAZAS = ["Holstein", "Jersey", "Normando", "Gyr", "Brahman", "Pardo Suizo"]
+
+
+def cargar_animales(cantidad: int, semilla: int = 7) -> list:
+    """Insertar `cantidad` animales y devolverlos consultados por el ORM"""
+    rng = random.Random(semilla)
+    hoy = date(2026, 1, 1)
+    filas = []
+    for i in range(1, cantidad + 1):
+        nacimiento = hoy - timedelta(days=rng.randint(30, 3000))
+        filas.append({
+            "id": i, "finca_id": 1, "numero_identificacion": f"BEN-{i:06d}", "nombre": f"Vaca {i}",
+            "foto_url": f"/media/animales/{i:x}.jpg" if i % 3 == 0 else None,
+            "sexo": "hembra" if i % 5 else "macho", "fecha_nacimiento": nacimiento, "raza": rng.choice(RAZAS),
+            "color": "Blanco y negro", "madre_id": i - 1 if i > 1 else None,
+            "peso_nacimiento": round(rng.uniform(28, 42), 1), "peso_actual": round(rng.uniform(250, 620), 1),
+            "peso_anterior": round(rng.uniform(240, 600), 1),
+            "ultima_fecha_pesaje": hoy - timedelta(days=rng.randint(0, 90)), "tipo_adquisicion": "nacimiento",
+            "fecha_ingreso": nacimiento, "estado": "activo", "categoria": "vaca", "proposito": "leche",
+            "lote_actual": f"Lote {i % 6 + 1}", "potrero_actual": f"Potrero {i % 12 + 1}",
+            "observaciones": "Sin novedades" if i % 4 == 0 else None,
+            "created_at": datetime(2025, 1, 1) + timedelta(minutes=i),
+        })
+    db = SessionLocal()
+    db.execute(Animal.__table__.delete())
+    db.execute(insert(Animal), filas)
+    db.commit()
+    animales = db.query(Animal).order_by(Animal.id).all()
+    db.expunge_all()  # Sueltos de la sesión, con todas las columnas cargadas
+    db.close()
+    return animales
+
+
+def _campo_respuesta():
+    for ruta in app.routes:
+        if getattr(ruta, "path", None) == "/api/v1/animales" and "GET" in ruta.methods:
+            return ruta.response_field
+    raise RuntimeError("No se encontró GET /api/v1/animales")
+
+
+def construir(animales: list, items: list) -> AnimalListResponse:
+    return AnimalListResponse(total=len(animales), page=1, page_size=len(animales), items=items)
+
+
+async def serializar_fastapi(campo, modelo: AnimalListResponse) -> bytes:
+    """Lo que hace FastAPI con el modelo que devuelve el endpoint"""
+    contenido = await serialize_response(field=campo, response_content=modelo, is_coroutine=True)
+    return JSONResponse(contenido).body
+
+
+def serializar_directo(modelo: AnimalListResponse) -> bytes:
+    return respuesta_json(modelo).body
+
+
+def tiempo_cpu(funcion, repeticiones: int) -> float:
+    """Mejor tiempo de CPU por llamada, en ms"""
+    mejores = []
+    for _ in range(5):
+        gc.collect()
+        inicio = time.process_time()
+        for _ in range(repeticiones):
+            funcion()
+        mejores.append((time.process_time() - inicio) / repeticiones * 1000)
+    return min(mejores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", default="100,10000", help="Tamaños de lista a medir")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    campo = _campo_respuesta()
+    bucle = asyncio.new_event_loop()
+    print(f"{'':>7} {'--------- serializar ---------':>30} {'----------- total -----------':>30}")
+    print(f"{'Filas':>7} {'FastAPI':>9} {'directo':>9} {'mejora':>10} {'FastAPI':>9} {'directo':>9} {'mejora':>10}")
+    for filas in (int(n) for n in args.filas.split(",")):
+        animales = cargar_animales(filas)
+
+        def antes():
+            modelo = construir(animales, animales)  # Validación desde atributos del ORM
+            return bucle.run_until_complete(serializar_fastapi(campo, modelo))
+
+        def despues():
+            return serializar_directo(construir(animales, [columnas_orm(a) for a in animales]))
+
+        if json.loads(antes()) != json.loads(despues()):
+            sys.exit(f"❌ Los dos caminos producen JSON distinto con {filas} filas")
+
+        modelo = construir(animales, animales)
+        repeticiones = max(1, 20000 // filas)
+        serializar = (
+            tiempo_cpu(lambda: bucle.run_until_complete(serializar_fastapi(campo, modelo)), repeticiones),
+            tiempo_cpu(lambda: serializar_directo(modelo), repeticiones),
+        )
+        total = (tiempo_cpu(antes, repeticiones), tiempo_cpu(despues, repeticiones))
+        print(
+            f"{filas:>7} {serializar[0]:>9.2f} {serializar[1]:>9.2f} {serializar[0] / serializar[1]:>9.1f}x "
+            f"{total[0]:>9.2f} {total[1]:>9.2f} {total[0] / total[1]:>9.1f}x"
+        )
+    print("\n(ms de CPU por respuesta, mejor de 5)")
+    bucle.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark de subidas simultáneas de fotos de animales.
+
+Lanza N subidas concurrentes contra la app real (ASGI en proceso, SQLite temporal)
+y mide la latencia de cada subida y el retraso máximo del event loop mientras
+se reciben los archivos. Un retraso alto indica trabajo bloqueante en el loop.
+
+Uso:
+    python benchmarks/bench_subida_imagenes.py --concurrencia 20 --tamano-kb 3000
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+DIRECTORIO_TRABAJO = tempfile.mkdtemp(prefix="bench_subidas_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DIRECTORIO_TRABAJO}/bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(DIRECTORIO_TRABAJO)
+
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.db.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.models.finca import Finca  # noqa: E402
+from app.models.usuario import Usuario  # noqa: E402
+from app.models.animal import Animal  # noqa: E402
+
+
+def preparar_datos(num_animales: int) -> tuple[str, list[int]]:
+    """Crear finca, usuario y animales; devolver token y IDs"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        finca = Finca(nombre="Bench", departamento="Caldas", municipio="Manizales")
+        db.add(finca)
+        db.flush()
+        usuario = Usuario(
+            finca_id=finca.id, nombre_completo="Bench", email="bench@example.com",
+            hashed_password="x", rol="propietario"
+        )
+        db.add(usuario)
+        animales = [
+            Animal(finca_id=finca.id, numero_identificacion=f"B{i}", sexo="hembra",
+                   fecha_ingreso=date.today())
+            for i in range(num_animales)
+        ]
+        db.add_all(animales)
+        db.commit()
+        token = create_access_token({"sub": str(usuario.id)})
+        return token, [a.id for a in animales]
+    finally:
+        db.close()
+
+
+def generar_jpeg(tamano_kb: int) -> bytes:
+    """Generar un JPEG con ruido de aproximadamente el tamaño pedido"""
+    lado = 256
+    while True:
+        imagen = Image.effect_noise((lado, lado), 64).convert("RGB")
+        buffer = io.BytesIO()
+        imagen.save(buffer, format="JPEG", quality=95)
+        if buffer.tell() >= tamano_kb * 1024 or lado >= 4096:
+            return buffer.getvalue()
+        lado = int(lado * 1.5)
+
+
+async def medir_retraso_loop(detener: asyncio.Event, muestras: list[float]) -> None:
+    """Medir cuánto se retrasa un tick de 5 ms del event loop"""
+    intervalo = 0.005
+    while not detener.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        muestras.append(time.perf_counter() - inicio - intervalo)
+
+
+async def ejecutar(concurrencia: int, tamano_kb: int) -> None:
+    token, animal_ids = preparar_datos(concurrencia)
+    contenido = generar_jpeg(tamano_kb)
+    headers = {"Authorization": f"Bearer {token}"}
+    transporte = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        async def subir(animal_id: int) -> float:
+            inicio = time.perf_counter()
+            respuesta = await cliente.post(
+                f"/api/v1/imagenes/animales/{animal_id}/foto",
+                files={"file": ("foto.jpg", contenido, "image/jpeg")},
+                headers=headers,
+            )
+            respuesta.raise_for_status()
+            return time.perf_counter() - inicio
+
+        detener = asyncio.Event()
+        retrasos: list[float] = []
+        monitor = asyncio.create_task(medir_retraso_loop(detener, retrasos))
+
+        inicio = time.perf_counter()
+        latencias = await asyncio.gather(*(subir(a) for a in animal_ids))
+        total = time.perf_counter() - inicio
+
+        detener.set()
+        await monitor
+
+    latencias_ms = sorted(l * 1000 for l in latencias)
+    print(f"Subidas simultáneas: {concurrencia} x {len(contenido) / 1024:.0f} KB")
+    print(f"Tiempo total:        {total:.2f} s ({concurrencia / total:.1f} subidas/s)")
+    print(f"Latencia p50:        {statistics.median(latencias_ms):.0f} ms")
+    print(f"Latencia máx:        {latencias_ms[-1]:.0f} ms")
+    if retrasos:
+        print(f"Retraso loop máx:    {max(retrasos) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrencia", type=int, default=20)
+    parser.add_argument("--tamano-kb", type=int, default=3000)
+    args = parser.parse_args()
+    asyncio.run(ejecutar(args.concurrencia, args.tamano_kb))
@@ -0,0 +1,526 @@
+"""
+Generador de fincas sintéticas realistas para benchmarks y desarrollo.
+
+Simula `anios` de historia de un hato de `vacas` vientres fundadores:
+ciclos reproductivos (servicios cada ~21 días, diagnósticos, partos y algún
+aborto), crías con madre y padre (genealogía de varias generaciones que a su
+vez entran a servicio), ordeños diarios por turno con curva de lactancia,
+campañas sanitarias semestrales, desparasitaciones y tratamientos con retiro,
+pesajes trimestrales por sesión de báscula, ventas de machos y descartes, y
+el libro de ingresos y gastos mensual. Al final reconstruye las tablas
+derivadas (resúmenes de producción y financieros, retiros y estados
+reproductivos) con las mismas funciones de los backfills.
+
+Es determinista para una misma semilla y fecha de referencia.
+
+Uso (contra la base de DATABASE_URL / .env):
+    python benchmarks/generador_datos.py --vacas 300 --anios 3
+"""
+import argparse
+import math
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import insert, update  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.core.security import get_password_hash  # noqa: E402
+from app.models.finca import Finca  # noqa: E402
+from app.models.usuario import Usuario  # noqa: E402
+from app.models.animal import Animal  # noqa: E402
+from app.models.control_reproductivo import ControlReproductivo  # noqa: E402
+from app.models.control_sanitario import ControlSanitario  # noqa: E402
+from app.models.pesaje import Pesaje  # noqa: E402
+from app.models.registro_produccion import RegistroProduccion  # noqa: E402
+from app.models.transaccion import Transaccion  # noqa: E402
+from app.services import rollups_finanzas, rollups_produccion  # noqa: E402
+from app.services.estado_reproductivo import recalcular_estados  # noqa: E402
+from app.services.retiros import recalcular_retiros  # noqa: E402
+
+LOTE = 5000
+PASSWORD = "password123"
+
+EDAD_PRIMER_SERVICIO = 450  # días
+PROBABILIDAD_CONCEPCION = 0.45
+PROBABILIDAD_ABORTO = 0.04
+PROBABILIDAD_MASTITIS = 0.15
+DURACION_LACTANCIA = 305
+MAXIMO_PARTOS = 6
+PRECIO_LITRO = 1800  # COP
+PRECIO_KG_PIE = 9000  # COP
+RAZAS = ["Holstein", "Jersey", "Gyr", "Normando", "Girolando", "Brahman"]
+LOTES = ["Ordeño 1", "Ordeño 2", "Horras", "Levante", "Cría"]
+POTREROS = [f"P{i}" for i in range(1, 13)]
+PAJUELAS = ["Holstein Alta Genética", "Jersey Premium", "Gyr Lechero", "Normando Élite"]
+
+
+class GeneradorFinca:
+    """Construye una finca completa en la sesión dada y hace commit al final"""
+
+    def __init__(self, db: Session, vacas: int, anios: int, semilla: int = 1, hoy: Optional[date] = None):
+        self.db = db
+        self.rng = random.Random(semilla)
+        self.vacas = vacas
+        self.hoy = hoy or date.today()
+        self.inicio = self.hoy - timedelta(days=365 * anios)
+        self.finca_id: Optional[int] = None
+        self.usuario_id: Optional[int] = None
+        self.toros: List[int] = []
+        # Animales generados: id -> datos de presencia y crecimiento
+        self.animales: Dict[int, Dict[str, Any]] = {}
+        self.litros_mes: Dict[tuple, float] = defaultdict(float)
+        self.conteos: Dict[str, int] = defaultdict(int)
+        self._numero_cria = 0
+        self._pendientes: Dict[Any, list] = defaultdict(list)
+
+    # ------------------------------------------------------------------
+    # Inserción por lotes
+    # ------------------------------------------------------------------
+
+    def _agregar(self, modelo, fila: Dict[str, Any]) -> None:
+        fila["finca_id"] = self.finca_id
+        filas = self._pendientes[modelo]
+        filas.append(fila)
+        if len(filas) >= LOTE:
+            self._volcar(modelo)
+
+    def _volcar(self, modelo) -> None:
+        filas = self._pendientes.pop(modelo, [])
+        if filas:
+            self.db.execute(insert(modelo), filas)
+            self.conteos[modelo.__tablename__] += len(filas)
+
+    def _volcar_todo(self) -> None:
+        for modelo in list(self._pendientes):
+            self._volcar(modelo)
+
+    def _insertar_animales(self, filas: List[Dict[str, Any]]) -> List[int]:
+        for fila in filas:
+            fila["finca_id"] = self.finca_id
+        ids = self.db.execute(
+            insert(Animal).returning(Animal.id, sort_by_parameter_order=True), filas
+        ).scalars().all()
+        self.conteos["animales"] += len(ids)
+        for animal_id, fila in zip(ids, filas):
+            self.animales[animal_id] = {
+                "sexo": fila["sexo"],
+                "nacimiento": fila["fecha_nacimiento"],
+                "ingreso": fila["fecha_ingreso"],
+                "salida": fila.get("fecha_salida"),
+                "partos": 0,
+            }
+        return ids
+
+    # ------------------------------------------------------------------
+    # Simulación
+    # ------------------------------------------------------------------
+
+    def generar(self) -> Dict[str, Any]:
+        inicio_reloj = time.perf_counter()
+        self._crear_finca()
+        self._crear_fundadores()
+
+        cola = [
+            (animal_id, self.inicio + timedelta(days=self.rng.randint(0, 120)))
+            for animal_id, datos in self.animales.items()
+            if datos["sexo"] == "hembra"
+        ]
+        generacion = 0
+        while cola:
+            crias = []
+            for vaca_id, apta_desde in cola:
+                crias.extend(self._simular_vientre(vaca_id, apta_desde))
+            self._volcar_todo()
+            ids = self._insertar_animales(crias) if crias else []
+            cola = [
+                (cria_id, fila["fecha_nacimiento"] + timedelta(days=EDAD_PRIMER_SERVICIO + self.rng.randint(0, 60)))
+                for cria_id, fila in zip(ids, crias)
+                if fila["sexo"] == "hembra" and fila["estado"] == "activo"
+                and fila["fecha_nacimiento"] + timedelta(days=EDAD_PRIMER_SERVICIO) < self.hoy
+            ]
+            generacion += 1
+
+        self._actualizar_animales()
+        self._campanas_sanitarias()
+        self._pesajes()
+        self._libro_mensual()
+        self._volcar_todo()
+        self._reconstruir_derivados()
+        self.db.commit()
+
+        return {
+            "finca_id": self.finca_id,
+            "usuario_id": self.usuario_id,
+            "email": f"bench{self.finca_id}@ganadero.test",
+            "generaciones": generacion,
+            "filas": dict(self.conteos),
+            "segundos": round(time.perf_counter() - inicio_reloj, 1),
+        }
+
+    def _crear_finca(self) -> None:
+        finca = Finca(
+            nombre=f"Finca sintética {self.rng.randint(1000, 9999)}",
+            departamento="Antioquia",
+            municipio="San Pedro de los Milagros",
+            tipo_ganaderia="leche",
+            usa_control_lechero=True,
+            usa_control_financiero=True,
+        )
+        self.db.add(finca)
+        self.db.flush()
+        self.finca_id = finca.id
+        usuario = Usuario(
+            finca_id=finca.id,
+            nombre_completo="Usuario Benchmark",
+            email=f"bench{finca.id}@ganadero.test",
+            hashed_password=get_password_hash(PASSWORD),
+            rol="propietario",
+        )
+        self.db.add(usuario)
+        self.db.flush()
+        self.usuario_id = usuario.id
+
+    def _crear_fundadores(self) -> None:
+        filas = []
+        for i in range(self.vacas):
+            filas.append(self._fila_animal(
+                f"V{i + 1:05d}", "hembra", self.inicio - timedelta(days=self.rng.randint(3 * 365, 8 * 365)),
+                categoria="vaca", tipo_adquisicion="comprado", fecha_ingreso=self.inicio
+            ))
+        for i in range(max(1, self.vacas // 25)):
+            filas.append(self._fila_animal(
+                f"T{i + 1:03d}", "macho", self.inicio - timedelta(days=self.rng.randint(3 * 365, 6 * 365)),
+                categoria="toro", tipo_adquisicion="comprado", fecha_ingreso=self.inicio, proposito="reproduccion"
+            ))
+        ids = self._insertar_animales(filas)
+        self.toros = [animal_id for animal_id in ids if self.animales[animal_id]["sexo"] == "macho"]
+
+    def _fila_animal(self, numero: str, sexo: str, nacimiento: date, **extra) -> Dict[str, Any]:
+        fila = {
+            "numero_identificacion": numero,
+            "nombre": None,
+            "sexo": sexo,
+            "fecha_nacimiento": nacimiento,
+            "raza": self.rng.choice(RAZAS),
+            "fecha_ingreso": nacimiento,
+            "tipo_adquisicion": "nacido_finca",
+            "estado": "activo",
+            "fecha_salida": None,
+            "motivo_salida": None,
+            "categoria": None,
+            "proposito": "leche",
+            "lote_actual": self.rng.choice(LOTES),
+            "potrero_actual": self.rng.choice(POTREROS),
+            "madre_id": None,
+            "padre_id": None,
+        }
+        fila.update(extra)
+        return fila
+
+    def _evento(self, vaca_id: int, tipo: str, fecha: date, **extra) -> None:
+        fila = {
+            "animal_id": vaca_id,
+            "tipo_evento": tipo,
+            "fecha_evento": fecha,
+            "registrado_por": self.usuario_id,
+        }
+        fila.update(extra)
+        self._agregar(ControlReproductivo, fila)
+
+    def _simular_vientre(self, vaca_id: int, apta_desde: date) -> List[Dict[str, Any]]:
+        """Ciclos reproductivos de una hembra; devuelve las crías nacidas"""
+        rng = self.rng
+        crias = []
+        fecha = apta_desde
+        partos = 0
+        while fecha < self.hoy:
+            # Servicios cada ~21 días hasta la concepción
+            concepcion = None
+            numero_servicio = 0
+            while fecha < self.hoy:
+                numero_servicio += 1
+                if self.toros and rng.random() < 0.6:
+                    toro_id, pajuela = rng.choice(self.toros), None
+                    tipo_servicio = "monta_natural"
+                else:
+                    toro_id, pajuela = None, rng.choice(PAJUELAS)
+                    tipo_servicio = "inseminacion_artificial"
+                self._evento(
+                    vaca_id, "servicio", fecha, toro_id=toro_id, toro_pajuela=pajuela,
+                    tipo_servicio=tipo_servicio, numero_servicio=numero_servicio
+                )
+                if rng.random() < PROBABILIDAD_CONCEPCION:
+                    concepcion = fecha
+                    break
+                fecha += timedelta(days=rng.randint(18, 24))
+            if concepcion is None:
+                break
+
+            diagnostico = concepcion + timedelta(days=rng.randint(35, 50))
+            if diagnostico >= self.hoy:
+                break
+            parto = concepcion + timedelta(days=rng.randint(275, 290))
+            self._evento(
+                vaca_id, "diagnostico", diagnostico, diagnostico="prenada",
+                metodo_diagnostico=rng.choice(["palpacion", "ecografia"]),
+                dias_gestacion=(diagnostico - concepcion).days, fecha_probable_parto=parto
+            )
+
+            if rng.random() < PROBABILIDAD_ABORTO:
+                aborto = concepcion + timedelta(days=rng.randint(60, 200))
+                if aborto >= self.hoy:
+                    break
+                self._evento(vaca_id, "aborto", aborto)
+                fecha = aborto + timedelta(days=rng.randint(25, 45))
+                continue
+
+            if parto >= self.hoy:
+                break
+            partos += 1
+            sexo = rng.choice(["macho", "hembra"])
+            self._evento(
+                vaca_id, "parto", parto, tipo_parto="normal", numero_crias=1, sexo_cria=sexo,
+                peso_cria=round(rng.uniform(28, 42), 1), facilidad_parto=rng.choice(["facil", "normal"]),
+                vitalidad_cria="viva"
+            )
+            crias.append(self._cria(vaca_id, parto, sexo, toro_id, pajuela))
+
+            descarte = partos >= MAXIMO_PARTOS
+            fin_lactancia = parto + timedelta(days=300 if descarte else DURACION_LACTANCIA)
+            self._lactancia(vaca_id, parto, min(fin_lactancia, self.hoy))
+            if fin_lactancia < self.hoy:
+                self._evento(vaca_id, "secado", fin_lactancia)
+
+            if descarte:
+                if fin_lactancia < self.hoy:
+                    self._vender(vaca_id, fin_lactancia, "Descarte por edad", rng.uniform(450, 550))
+                break
+            fecha = parto + timedelta(days=rng.randint(50, 90))
+
+        self.animales[vaca_id]["partos"] = partos
+        return crias
+
+    def _cria(self, madre_id: int, nacimiento: date, sexo: str, toro_id: Optional[int], pajuela: Optional[str]) -> Dict[str, Any]:
+        self._numero_cria += 1
+        fila = self._fila_animal(
+            f"C{self._numero_cria:06d}", sexo, nacimiento,
+            madre_id=madre_id, padre_id=toro_id,
+            peso_nacimiento=round(self.rng.uniform(28, 42), 1),
+            observaciones=f"Pajuela: {pajuela}" if pajuela else None,
+        )
+        if sexo == "macho":
+            venta = nacimiento + timedelta(days=self.rng.randint(365, 540))
+            if venta < self.hoy:
+                fila.update(estado="vendido", fecha_salida=venta, motivo_salida="Venta de levante")
+                peso = round(35 + 0.75 * (venta - nacimiento).days, 1)
+                self._agregar(Transaccion, {
+                    "tipo": "venta", "fecha": venta, "concepto": f"Venta macho {fila['numero_identificacion']}",
+                    "monto": round(peso * PRECIO_KG_PIE), "numero_animales": 1, "peso_total": peso,
+                    "precio_por_kg": PRECIO_KG_PIE, "metodo_pago": "transferencia",
+                    "registrado_por": self.usuario_id,
+                })
+        return fila
+
+    def _vender(self, animal_id: int, fecha: date, motivo: str, peso: float) -> None:
+        self.animales[animal_id]["salida"] = fecha
+        self.animales[animal_id]["motivo"] = motivo
+        self._agregar(Transaccion, {
+            "tipo": "venta", "fecha": fecha, "concepto": motivo, "monto": round(peso * PRECIO_KG_PIE * 0.8),
+            "animal_id": animal_id, "numero_animales": 1, "peso_total": round(peso, 1),
+            "metodo_pago": "transferencia", "registrado_por": self.usuario_id,
+        })
+
+    def _lactancia(self, vaca_id: int, parto: date, fin: date) -> None:
+        """Ordeños diarios de mañana y tarde con curva de Wood"""
+        rng = self.rng
+        a = rng.uniform(12, 20)
+        b, c = 0.2, 0.004
+        if rng.random() < PROBABILIDAD_MASTITIS:
+            dia = parto + timedelta(days=rng.randint(10, 120))
+            if dia < fin:
+                self._agregar(ControlSanitario, {
+                    "animal_id": vaca_id, "tipo": "tratamiento", "fecha": dia, "producto": "Cefalexina intramamaria",
+                    "via_administracion": "intramamaria", "diagnostico": "Mastitis clínica",
+                    "dias_retiro_leche": 4, "dias_retiro_carne": 7, "costo": 45000,
+                    "aplicado_por": self.usuario_id,
+                })
+        for dias in range(1, (fin - parto).days + 1):
+            fecha = parto + timedelta(days=dias)
+            litros = a * dias ** b * math.exp(-c * dias) * rng.uniform(0.9, 1.1)
+            for turno, fraccion in (("manana", 0.58), ("tarde", 0.42)):
+                cantidad = round(litros * fraccion, 1)
+                self._agregar(RegistroProduccion, {
+                    "animal_id": vaca_id, "tipo_produccion": "leche", "fecha": fecha,
+                    "cantidad_litros": cantidad, "turno": turno, "registrado_por": self.usuario_id,
+                })
+                self.litros_mes[(fecha.year, fecha.month)] += cantidad
+
+    def _presentes(self, fecha: date) -> List[int]:
+        return [
+            animal_id for animal_id, datos in self.animales.items()
+            if datos["ingreso"] <= fecha and (datos["salida"] is None or datos["salida"] > fecha)
+        ]
+
+    def _actualizar_animales(self) -> None:
+        """Descartes y categorías finales, en un UPDATE por lotes"""
+        cambios = []
+        for animal_id, datos in self.animales.items():
+            edad = (self.hoy - datos["nacimiento"]).days
+            if datos["sexo"] == "hembra":
+                categoria = "vaca" if datos["partos"] else ("novilla" if edad >= 365 else "ternera")
+            elif animal_id in self.toros:
+                categoria = "toro"
+            else:
+                categoria = "novillo" if edad >= 365 else "ternero"
+            cambio = {"id": animal_id, "categoria": categoria}
+            if datos.get("motivo"):
+                cambio.update(estado="vendido", fecha_salida=datos["salida"], motivo_salida=datos["motivo"])
+            cambios.append(cambio)
+        for i in range(0, len(cambios), LOTE):
+            self.db.execute(update(Animal), cambios[i:i + LOTE])
+
+    def _campanas_sanitarias(self) -> None:
+        rng = self.rng
+        fecha = self.inicio + timedelta(days=30)
+        while fecha < self.hoy:
+            # Aftosa semestral (campaña ICA) a todo el hato presente
+            if fecha.month in (5, 11):
+                for animal_id in self._presentes(fecha):
+                    self._agregar(ControlSanitario, {
+                        "animal_id": animal_id, "tipo": "vacuna", "fecha": fecha, "producto": "Aftosa bivalente",
+                        "dosis": "2 ml", "via_administracion": "intramuscular", "lote_producto": f"AF{fecha:%Y%m}",
+                        "proxima_dosis": fecha + timedelta(days=180), "costo": 2500,
+                        "aplicado_por": self.usuario_id,
+                    })
+            # Desparasitación trimestral
+            if fecha.month in (2, 5, 8, 11):
+                for animal_id in self._presentes(fecha + timedelta(days=7)):
+                    self._agregar(ControlSanitario, {
+                        "animal_id": animal_id, "tipo": "desparasitacion", "fecha": fecha + timedelta(days=7),
+                        "producto": "Ivermectina 1%", "via_administracion": "subcutanea",
+                        "dias_retiro_carne": 35, "costo": 3500, "aplicado_por": self.usuario_id,
+                    })
+            # Brucelosis a las terneras de 3 a 8 meses
+            for animal_id in self._presentes(fecha):
+                datos = self.animales[animal_id]
+                edad = (fecha - datos["nacimiento"]).days
+                if datos["sexo"] == "hembra" and 90 <= edad < 120 and rng.random() < 0.95:
+                    self._agregar(ControlSanitario, {
+                        "animal_id": animal_id, "tipo": "vacuna", "fecha": fecha, "producto": "Brucelosis RB51",
+                        "via_administracion": "subcutanea", "costo": 4000, "aplicado_por": self.usuario_id,
+                    })
+            fecha += timedelta(days=30)
+
+    def _pesajes(self) -> None:
+        """Sesiones de báscula trimestrales con ganancia diaria"""
+        ultimos: Dict[int, tuple] = {}
+        fecha = self.inicio + timedelta(days=15)
+        cambios: Dict[int, Dict[str, Any]] = {}
+        while fecha < self.hoy:
+            sesion = str(uuid.UUID(int=self.rng.getrandbits(128)))
+            for animal_id in self._presentes(fecha):
+                datos = self.animales[animal_id]
+                edad = (fecha - datos["nacimiento"]).days
+                tope = 550 if datos["sexo"] == "hembra" else 750
+                peso = round(min(tope, 35 + (0.7 if datos["sexo"] == "hembra" else 0.8) * edad) * self.rng.uniform(0.95, 1.05), 1)
+                fila = {"animal_id": animal_id, "fecha": fecha, "peso": peso, "sesion_id": sesion, "metodo": "bascula",
+                        "registrado_por": self.usuario_id}
+                anterior = ultimos.get(animal_id)
+                if anterior:
+                    dias = (fecha - anterior[0]).days
+                    fila.update(dias_desde_anterior=dias, ganancia_diaria=round((peso - anterior[1]) / dias, 3))
+                self._agregar(Pesaje, fila)
+                cambios[animal_id] = {
+                    "id": animal_id, "peso_actual": peso, "ultima_fecha_pesaje": fecha,
+                    "peso_anterior": anterior[1] if anterior else None,
+                }
+                ultimos[animal_id] = (fecha, peso)
+            fecha += timedelta(days=90)
+        filas = list(cambios.values())
+        for i in range(0, len(filas), LOTE):
+            self.db.execute(update(Animal), filas[i:i + LOTE])
+
+    def _libro_mensual(self) -> None:
+        """Venta de leche y gastos recurrentes de cada mes"""
+        rng = self.rng
+        fecha = date(self.inicio.year, self.inicio.month, 1)
+        while fecha < self.hoy:
+            cierre = min(self._fin_de_mes(fecha), self.hoy - timedelta(days=1))
+            litros = self.litros_mes.get((fecha.year, fecha.month), 0)
+            if litros:
+                self._agregar(Transaccion, {
+                    "tipo": "venta", "fecha": cierre, "concepto": f"Venta de leche {fecha:%m/%Y}",
+                    "monto": round(litros * PRECIO_LITRO), "tercero": "Cooperativa Lechera",
+                    "metodo_pago": "transferencia", "registrado_por": self.usuario_id,
+                })
+            cabezas = len(self._presentes(fecha))
+            gastos = [
+                ("alimentacion", "Concentrado y sal mineralizada", cabezas * rng.uniform(55000, 75000)),
+                ("personal", "Nómina de ordeñadores", 3 * 1_300_000 + self.vacas * 4000),
+                ("sanidad", "Drogas veterinarias", cabezas * rng.uniform(3000, 6000)),
+            ]
+            if rng.random() < 0.25:
+                gastos.append(("infraestructura", "Mantenimiento de cercas y equipo de ordeño", rng.uniform(4e5, 3e6)))
+            for categoria, concepto, monto in gastos:
+                if monto < 1:
+                    continue  # Meses sin animales presentes todavía
+                self._agregar(Transaccion, {
+                    "tipo": "gasto", "fecha": min(fecha + timedelta(days=rng.randint(0, 27)), cierre), "concepto": concepto,
+                    "monto": round(monto), "categoria_gasto": categoria, "metodo_pago": "transferencia",
+                    "registrado_por": self.usuario_id,
+                })
+            fecha = cierre + timedelta(days=1)
+
+    @staticmethod
+    def _fin_de_mes(fecha: date) -> date:
+        siguiente = date(fecha.year + fecha.month // 12, fecha.month % 12 + 1, 1)
+        return siguiente - timedelta(days=1)
+
+    def _reconstruir_derivados(self) -> None:
+        rollups_produccion.recalcular_resumenes(self.db, self.finca_id)
+        rollups_finanzas.recalcular_resumenes(self.db, self.finca_id)
+        recalcular_retiros(self.db, self.finca_id)
+        recalcular_estados(self.db, self.finca_id)
+
+
+def generar_finca(db: Session, vacas: int = 200, anios: int = 2, semilla: int = 1, hoy: Optional[date] = None) -> Dict[str, Any]:
+    """Generar una finca sintética completa; devuelve ids, credenciales y conteos"""
+    return GeneradorFinca(db, vacas, anios, semilla, hoy).generar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generar una finca sintética")
+    parser.add_argument("--vacas", type=int, default=200, help="Vientres fundadores")
+    parser.add_argument("--anios", type=int, default=2, help="Años de historia")
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+
+    from app.db.database import Base, SessionLocal, engine
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        print(f"🐄 Generando finca: {args.vacas} vientres, {args.anios} años...")
+        resumen = generar_finca(db, args.vacas, args.anios, args.semilla)
+        print(f"✅ Finca {resumen['finca_id']} lista en {resumen['segundos']} s "
+              f"({resumen['generaciones']} generaciones)")
+        for tabla, filas in sorted(resumen["filas"].items()):
+            print(f"   {tabla:<28} {filas:>9}")
+        print(f"   Usuario: {resumen['email']} / {PASSWORD}")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
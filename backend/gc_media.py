@@ -0,0 +1,55 @@
+"""
+Script para eliminar fotos huérfanas del almacén de medios.
+
+Borra los blobs que ningún animal referencia (fotos reemplazadas, borrados
+fallidos, subidas interrumpidas). Se puede programar como tarea periódica.
+
+Uso:
+    python gc_media.py --simulacion
+    python gc_media.py --horas-gracia 24
+"""
+import argparse
+from datetime import timedelta
+
+from app.db.database import SessionLocal
+from app.models.finca import Finca  # noqa: F401 (registrar relaciones)
+from app.models.usuario import Usuario  # noqa: F401
+from app.models.animal import Animal
+from app.services.almacenamiento import obtener_almacen, recolectar_huerfanos
+from app.services.imagenes import urls_foto
+
+
+def urls_en_uso(db):
+    """Todas las URLs de rendiciones referenciadas por algún animal"""
+    consulta = db.query(Animal.foto_url).filter(Animal.foto_url.isnot(None)).distinct()
+    for (foto_url,) in consulta.yield_per(1000):
+        yield from urls_foto(foto_url).values()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recolectar fotos huérfanas")
+    parser.add_argument("--horas-gracia", type=float, default=1.0,
+                        help="No borrar blobs más recientes que esto (subidas en curso)")
+    parser.add_argument("--simulacion", action="store_true",
+                        help="Solo mostrar lo que se eliminaría")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        eliminadas = recolectar_huerfanos(
+            obtener_almacen(),
+            urls_en_uso(db),
+            antiguedad_minima=timedelta(hours=args.horas_gracia),
+            simulacion=args.simulacion
+        )
+    finally:
+        db.close()
+    
+    accion = "Se eliminarían" if args.simulacion else "Eliminados"
+    for clave in sorted(eliminadas):
+        print(f"  - {clave}")
+    print(f"✅ {accion} {len(eliminadas)} archivos huérfanos")
+
+
+if __name__ == "__main__":
+    main()
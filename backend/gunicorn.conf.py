@@ -0,0 +1,55 @@
+"""
+Configuración de gunicorn para producción: varios workers de uvicorn.
+
+El número de workers sale de WEB_CONCURRENCY o de los CPUs (2 x CPUs + 1),
+limitado por el presupuesto de conexiones de Postgres; se exporta en
+WEB_CONCURRENCY para que cada worker reparta su pool con
+app/core/capacidad.py. Las variables se leen del entorno (no del .env) con
+los mismos valores por defecto que app/core/config.py, sin importar la app
+en el proceso maestro.
+
+La base se prepara antes con preparar_db.py (ver Procfile), así los workers
+no ejecutan DDL al mismo tiempo al arrancar.
+
+Uso:
+    gunicorn -c gunicorn.conf.py app.main:app
+"""
+import os
+
+from app.core.capacidad import conexiones_por_worker, workers_recomendados
+
+
+def _entero(nombre: str, defecto: int) -> int:
+    valor = os.environ.get(nombre)
+    return int(valor) if valor else defecto
+
+
+_presupuesto = _entero("DB_MAX_CONNECTIONS", 100)
+_reservadas = _entero("DB_RESERVED_CONNECTIONS", 10)
+
+workers = workers_recomendados(_entero("WEB_CONCURRENCY", 0), _presupuesto, _reservadas)
+os.environ["WEB_CONCURRENCY"] = str(workers)  # Lo heredan los workers
+os.environ.setdefault("INIT_DB_ON_STARTUP", "false")
+
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+timeout = 60  # Los reportes pesados se generan en segundo plano
+graceful_timeout = 30
+keepalive = 5  # Detrás del proxy de Railway/nginx
+# Reciclar workers de a poco para acotar el crecimiento de memoria
+max_requests = 2000
+max_requests_jitter = 200
+accesslog = "-"
+
+
+def on_starting(server):
+    if os.environ.get("DB_PGBOUNCER", "").lower() in ("1", "true", "yes"):
+        server.log.info("🐄 %s workers, conexiones vía PgBouncer (sin pool propio)", workers)
+        return
+    por_worker = conexiones_por_worker(
+        workers, _presupuesto, _reservadas, _entero("REPORTES_WORKERS", 2)
+    )
+    server.log.info(
+        "🐄 %s workers x %s conexiones = %s de %s (reservadas %s)",
+        workers, por_worker, workers * por_worker, _presupuesto, _reservadas
+    )
@@ -0,0 +1,23 @@
+"""
+Script para preparar la base de datos antes de arrancar la API: crea las
+tablas que falten y la finca y el usuario iniciales si no existen.
+
+Con INIT_DB_ON_STARTUP=False los workers no tocan el esquema al arrancar;
+ejecutar este script una vez por deploy (p.ej. como comando previo al
+arranque en Railway).
+
+Uso:
+    python preparar_db.py
+"""
+from app.api.v1.api import api_router  # noqa: F401 (registrar todos los modelos)
+from app.db.database import init_db
+
+
+def main():
+    print("🔨 Preparando base de datos...")
+    init_db()
+    print("✅ Base de datos lista")
+
+
+if __name__ == "__main__":
+    main()
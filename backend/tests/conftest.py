@@ -0,0 +1,98 @@
+"""
+Configuración común de las pruebas.
+
+Cada corrida usa una base SQLite temporal con una finca sintética pequeña
+(benchmarks/generador_datos.py) para las pruebas de lectura, y fincas vacías
+para las que arman su propia historia.
+
+    cd backend && python -m pytest
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+DIRECTORIO = tempfile.mkdtemp(prefix="pruebas_ganadero_")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{DIRECTORIO}/pruebas.db"
+os.environ.setdefault("SECRET_KEY", "clave-de-pruebas")
+os.environ["MEDIA_BACKEND"] = "local"
+os.environ["MEDIA_ROOT"] = f"{DIRECTORIO}/media"
+os.environ["REPORTES_ROOT"] = f"{DIRECTORIO}/reportes"
+os.environ["INIT_DB_ON_STARTUP"] = "false"
+os.environ["DB_POOL_PREWARM"] = "0"
+os.environ["SLOW_QUERY_MS"] = "0"
+# Los límites y el descarte tienen sus propias pruebas; aquí estorbarían
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["LOAD_SHED_POOL_WAIT_MS"] = "0"
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(BACKEND / "benchmarks"))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.security import create_access_token, get_password_hash  # noqa: E402
+from app.db.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.finca import Finca  # noqa: E402
+from app.models.usuario import Usuario  # noqa: E402
+from generador_datos import generar_finca  # noqa: E402
+
+pytest_plugins = ["app.core.pytest_consultas"]
+
+Base.metadata.create_all(bind=engine)
+
+
+def encabezados(usuario_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(usuario_id)})}"}
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def db():
+    sesion = SessionLocal()
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+
+
+@pytest.fixture(scope="session")
+def finca():
+    """Finca sintética con dos años de historia, compartida por las pruebas de lectura"""
+    sesion = SessionLocal()
+    try:
+        datos = generar_finca(sesion, vacas=30, anios=2, semilla=3)
+    finally:
+        sesion.close()
+    datos["headers"] = encabezados(datos["usuario_id"])
+    return datos
+
+
+@pytest.fixture(scope="session")
+def headers(finca):
+    return finca["headers"]
+
+
+@pytest.fixture
+def finca_vacia(db):
+    """Finca nueva, sin animales, con su usuario propietario"""
+    finca = Finca(nombre="Finca de pruebas", departamento="Caldas", municipio="Riosucio", tipo_ganaderia="leche")
+    db.add(finca)
+    db.flush()
+    usuario = Usuario(
+        finca_id=finca.id,
+        nombre_completo="Usuario Pruebas",
+        email=f"pruebas{finca.id}@ganadero.test",
+        hashed_password=get_password_hash("password123"),
+        rol="propietario",
+    )
+    db.add(usuario)
+    db.commit()
+    return {"finca_id": finca.id, "usuario_id": usuario.id, "headers": encabezados(usuario.id)}
@@ -0,0 +1,258 @@
+"""
+Almacén de medios: backends local y S3 (contra moto), recolección de
+huérfanos y la carrera entre subir una foto repetida y liberar la anterior.
+"""
+import io
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import boto3
+import pytest
+from moto import mock_aws
+from PIL import Image
+
+from app.api.v1.endpoints import imagenes
+from app.models.animal import Animal
+from app.services.almacenamiento import (
+    GRACIA_SUBIDAS, AlmacenLocal, AlmacenS3, obtener_almacen, recolectar_huerfanos
+)
+from app.services.imagenes import urls_foto
+
+BUCKET = "ganadero-media"
+CLAVE = "animales/ab/abcdef_thumb.webp"
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        cliente = boto3.client("s3", region_name="us-east-1")
+        cliente.create_bucket(Bucket=BUCKET)
+        yield AlmacenS3(bucket=BUCKET, url_publica="https://cdn.ganadero.test/media/", cliente=cliente)
+
+
+@pytest.fixture
+def local(tmp_path):
+    return AlmacenLocal(str(tmp_path / "media"), "/media")
+
+
+@pytest.fixture(params=["local", "s3"])
+def almacen(request):
+    return request.getfixturevalue(request.param)
+
+
+def test_guardar_existe_y_eliminar(almacen):
+    assert not almacen.existe(CLAVE)
+    assert almacen.modificado(CLAVE) is None
+    almacen.guardar(CLAVE, b"webp", "image/webp")
+    assert almacen.existe(CLAVE)
+    assert abs(almacen.modificado(CLAVE) - datetime.now(timezone.utc)) < timedelta(minutes=1)
+    almacen.eliminar(CLAVE)
+    assert not almacen.existe(CLAVE)
+    almacen.eliminar(CLAVE)  # Borrar algo que no existe no falla
+
+
+def test_renovar(almacen):
+    assert almacen.renovar(CLAVE, "image/webp") is False
+    almacen.guardar(CLAVE, b"webp", "image/webp")
+    assert almacen.renovar(CLAVE, "image/webp") is True
+    assert almacen.existe(CLAVE)
+
+
+def test_listar_bajo_un_prefijo(almacen):
+    almacen.guardar("animales/ab/uno_thumb.webp", b"1", "image/webp")
+    almacen.guardar("animales/cd/dos_full.webp", b"2", "image/webp")
+    almacen.guardar("otros/tres.webp", b"3", "image/webp")
+    claves = sorted(clave for clave, _ in almacen.listar("animales"))
+    assert claves == ["animales/ab/uno_thumb.webp", "animales/cd/dos_full.webp"]
+
+
+def test_subir_y_leer(almacen, tmp_path):
+    origen = tmp_path / "reporte.pdf"
+    origen.write_bytes(b"%PDF" * 50_000)
+    almacen.subir("reportes/ab/abcdef.pdf", origen, "application/pdf")
+    assert b"".join(almacen.leer("reportes/ab/abcdef.pdf")) == origen.read_bytes()
+    with pytest.raises(FileNotFoundError):
+        b"".join(almacen.leer("reportes/ab/no_existe.pdf"))
+
+
+def test_url_y_clave_desde_url(almacen):
+    url = almacen.url(CLAVE)
+    assert almacen.clave_desde_url(url) == CLAVE
+    assert almacen.clave_desde_url("https://otro.sitio/animales/x.webp") is None
+
+
+def test_s3_guarda_con_cache_inmutable(s3):
+    s3.guardar(CLAVE, b"webp", "image/webp")
+    s3.renovar(CLAVE, "image/webp")
+    cabecera = s3.cliente.head_object(Bucket=BUCKET, Key=CLAVE)
+    assert cabecera["ContentType"] == "image/webp"
+    assert "immutable" in cabecera["CacheControl"]
+    assert s3.url(CLAVE) == f"https://cdn.ganadero.test/media/{CLAVE}"
+
+
+def test_s3_con_prefijo(s3):
+    reportes = AlmacenS3(bucket=BUCKET, url_publica=s3.url_publica, cliente=s3.cliente, prefijo="reportes")
+    reportes.guardar("ab/uno.pdf", b"1", "application/pdf")
+    s3.guardar("ab/otro.webp", b"2", "image/webp")
+    assert s3.existe("reportes/ab/uno.pdf") and not reportes.existe("ab/otro.webp")
+    assert [clave for clave, _ in reportes.listar("")] == ["ab/uno.pdf"]
+    assert [clave for clave, _ in reportes.listar("ab")] == ["ab/uno.pdf"]
+    assert reportes.clave_desde_url(reportes.url("ab/uno.pdf")) == "ab/uno.pdf"
+    reportes.eliminar("ab/uno.pdf")
+    assert not s3.existe("reportes/ab/uno.pdf")
+
+
+def _envejecer_local(almacen, clave, horas):
+    viejo = time.time() - horas * 3600
+    os.utime(almacen._ruta(clave), (viejo, viejo))
+
+
+def test_recoleccion_respeta_referencias_y_gracia(local):
+    for nombre in ("usada", "huerfana", "reciente"):
+        local.guardar(f"animales/aa/{nombre}_full.webp", nombre.encode(), "image/webp")
+    _envejecer_local(local, "animales/aa/usada_full.webp", 5)
+    _envejecer_local(local, "animales/aa/huerfana_full.webp", 5)
+
+    referenciadas = [local.url("animales/aa/usada_full.webp")]
+    assert recolectar_huerfanos(local, referenciadas, simulacion=True) == {"animales/aa/huerfana_full.webp"}
+    assert local.existe("animales/aa/huerfana_full.webp")
+
+    assert recolectar_huerfanos(local, referenciadas) == {"animales/aa/huerfana_full.webp"}
+    assert not local.existe("animales/aa/huerfana_full.webp")
+    assert local.existe("animales/aa/usada_full.webp") and local.existe("animales/aa/reciente_full.webp")
+
+
+def test_recoleccion_en_s3(s3):
+    s3.guardar("animales/aa/usada_full.webp", b"1", "image/webp")
+    s3.guardar("animales/aa/huerfana_full.webp", b"2", "image/webp")
+    referenciadas = [s3.url("animales/aa/usada_full.webp")]
+    # Recién subidas: dentro del periodo de gracia
+    assert recolectar_huerfanos(s3, referenciadas) == set()
+    assert recolectar_huerfanos(s3, referenciadas, antiguedad_minima=timedelta(0)) == {"animales/aa/huerfana_full.webp"}
+    assert sorted(clave for clave, _ in s3.listar("animales")) == ["animales/aa/usada_full.webp"]
+
+
+def test_recoleccion_no_borra_un_blob_renovado_despues_del_listado(local):
+    local.guardar("animales/aa/repetida_full.webp", b"1", "image/webp")
+    _envejecer_local(local, "animales/aa/repetida_full.webp", 5)
+    listar = local.listar
+
+    def listar_y_renovar(prefijo):
+        for clave, modificado in listar(prefijo):
+            local.renovar(clave, "image/webp")  # Otra subida de la misma foto
+            yield clave, modificado
+
+    local.listar = listar_y_renovar
+    assert recolectar_huerfanos(local, []) == set()
+    assert local.existe("animales/aa/repetida_full.webp")
+
+
+# ============================================
+# Subida repetida y liberación de la foto anterior
+# ============================================
+
+def _png(color):
+    salida = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(salida, "PNG")
+    return salida.getvalue()
+
+
+def _animal(db, finca_id, numero):
+    animal = Animal(finca_id=finca_id, numero_identificacion=numero, sexo="hembra", fecha_ingreso=date(2024, 1, 1))
+    db.add(animal)
+    db.commit()
+    return animal
+
+
+def _subir(client, headers, animal_id, contenido):
+    respuesta = client.post(
+        f"/api/v1/imagenes/animales/{animal_id}/foto", headers=headers,
+        files={"file": ("foto.png", contenido, "image/png")}
+    )
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta.json()["url"]
+
+
+def _claves(foto_url):
+    almacen = obtener_almacen()
+    return [almacen.clave_desde_url(url) for url in set(urls_foto(foto_url).values())]
+
+
+def _envejecer_foto(foto_url, horas=1):
+    almacen = obtener_almacen()
+    for clave in _claves(foto_url):
+        _envejecer_local(almacen, clave, horas)
+
+
+def test_reemplazar_foto_borra_la_anterior_sin_uso(client, db, finca_vacia):
+    animal = _animal(db, finca_vacia["finca_id"], "F-1")
+    anterior = _subir(client, finca_vacia["headers"], animal.id, _png("red"))
+    _envejecer_foto(anterior)
+    _subir(client, finca_vacia["headers"], animal.id, _png("blue"))
+    assert not any(obtener_almacen().existe(clave) for clave in _claves(anterior))
+
+
+def test_subida_repetida_renueva_los_blobs_antes_del_commit(client, db, finca_vacia, tmp_path):
+    """
+    B sube la misma foto que usa A y, antes de que B haga commit, A la
+    reemplaza: los blobs recién renovados no se borran.
+    """
+    contenido = _png("green")
+    a = _animal(db, finca_vacia["finca_id"], "F-A")
+    foto = _subir(client, finca_vacia["headers"], a.id, contenido)
+    _envejecer_foto(foto)
+
+    # Primera mitad de la subida de B: los blobs ya existen y se reutilizan
+    origen = tmp_path / "foto.png"
+    origen.write_bytes(contenido)
+    hash_contenido = foto.rsplit("/", 1)[-1].split("_")[0]
+    imagenes._guardar_rendiciones(origen, hash_contenido)
+
+    # A cambia de foto: la anterior ya no tiene referencias confirmadas
+    _subir(client, finca_vacia["headers"], a.id, _png("yellow"))
+    assert all(obtener_almacen().existe(clave) for clave in _claves(foto))
+
+    # Y pasado el periodo de gracia sin que nadie la use, sí se libera
+    _envejecer_foto(foto, GRACIA_SUBIDAS.total_seconds() / 3600 + 1)
+    imagenes._liberar_foto(db, foto)
+    assert not any(obtener_almacen().existe(clave) for clave in _claves(foto))
+
+
+def test_liberar_no_borra_una_foto_en_uso(client, db, finca_vacia):
+    contenido = _png("purple")
+    a = _animal(db, finca_vacia["finca_id"], "F-C")
+    b = _animal(db, finca_vacia["finca_id"], "F-D")
+    foto = _subir(client, finca_vacia["headers"], a.id, contenido)
+    assert _subir(client, finca_vacia["headers"], b.id, contenido) == foto
+    _envejecer_foto(foto)
+
+    assert client.delete(f"/api/v1/imagenes/animales/{a.id}/foto", headers=finca_vacia["headers"]).status_code == 204
+    assert all(obtener_almacen().existe(clave) for clave in _claves(foto))
+
+
+# ============================================
+# Rendiciones de la foto
+# ============================================
+
+@pytest.mark.parametrize("tamano, esperados", [
+    ((2400, 1200), {"thumb": (160, 80), "medium": (640, 320), "full": (1600, 800)}),
+    ((600, 1200), {"thumb": (80, 160), "medium": (320, 640), "full": (600, 1200)}),  # Nunca se amplía
+])
+def test_subida_genera_las_rendiciones(client, db, finca_vacia, tamano, esperados):
+    salida = io.BytesIO()
+    Image.new("RGB", tamano, "orange").save(salida, "JPEG")
+    animal = _animal(db, finca_vacia["finca_id"], f"R-{tamano[0]}")
+    respuesta = client.post(
+        f"/api/v1/imagenes/animales/{animal.id}/foto", headers=finca_vacia["headers"],
+        files={"file": ("foto.jpg", salida.getvalue(), "image/jpeg")}
+    )
+    assert respuesta.status_code == 200, respuesta.text
+    urls = respuesta.json()["urls"]
+    assert urls == urls_foto(respuesta.json()["url"])
+
+    for nombre, dimensiones in esperados.items():
+        servida = client.get(urls[nombre])
+        assert servida.status_code == 200
+        rendicion = Image.open(io.BytesIO(servida.content))
+        assert (rendicion.format, rendicion.size) == ("WEBP", dimensiones)
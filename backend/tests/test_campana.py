@@ -0,0 +1,126 @@
+"""
+Campañas sanitarias (POST /control-sanitario/campana): selectores, animales
+ya tratados en la fecha y ventanas de retiro.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.models.animal import Animal
+from app.models.control_sanitario import ControlSanitario
+from app.models.retiro import RetiroSanitario
+
+FECHA = date(2025, 3, 10)
+
+# numero: (sexo, categoria, lote, potrero, estado)
+HATO = {
+    "V-1": ("hembra", "vaca", "Ordeño 1", "P1", "activo"),
+    "V-2": ("hembra", "vaca", "Ordeño 1", "P2", "activo"),
+    "V-3": ("hembra", "vaca", "Horras", "P2", "activo"),
+    "N-1": ("hembra", "novilla", "Levante", "P3", "activo"),
+    "T-1": ("macho", "ternero", "Cría", "P3", "activo"),
+    "T-2": ("macho", "toro", "Horras", "P2", "activo"),
+    "V-9": ("hembra", "vaca", "Ordeño 1", "P1", "vendido"),
+}
+
+
+@pytest.fixture
+def hato(db, finca_vacia):
+    ids = {}
+    for numero, (sexo, categoria, lote, potrero, estado) in HATO.items():
+        animal = Animal(
+            finca_id=finca_vacia["finca_id"], numero_identificacion=numero, sexo=sexo, categoria=categoria,
+            lote_actual=lote, potrero_actual=potrero, estado=estado, fecha_ingreso=date(2024, 1, 1)
+        )
+        db.add(animal)
+        db.flush()
+        ids[numero] = animal.id
+    db.commit()
+    return {"ids": ids, "headers": finca_vacia["headers"], "finca_id": finca_vacia["finca_id"]}
+
+
+def _campana(client, hato, producto="Aftosa", **extra):
+    return client.post("/api/v1/control-sanitario/campana", headers=hato["headers"], json={
+        "producto": producto, "fecha": FECHA.isoformat(), **extra,
+    })
+
+
+def _tratados(db, hato, producto="Aftosa"):
+    ids = db.scalars(select(ControlSanitario.animal_id).where(
+        ControlSanitario.finca_id == hato["finca_id"], ControlSanitario.producto == producto
+    )).all()
+    numeros = {animal_id: numero for numero, animal_id in hato["ids"].items()}
+    return sorted(numeros[animal_id] for animal_id in ids)
+
+
+@pytest.mark.parametrize("selector, esperados", [
+    ({}, ["N-1", "T-1", "T-2", "V-1", "V-2", "V-3"]),  # Toda la finca, sin los vendidos
+    ({"lote": "Ordeño 1"}, ["V-1", "V-2"]),
+    ({"potrero": "P2"}, ["T-2", "V-2", "V-3"]),
+    ({"categoria": "vaca"}, ["V-1", "V-2", "V-3"]),
+    ({"sexo": "Macho"}, ["T-1", "T-2"]),
+    ({"sexo": "hembra", "potrero": "P2"}, ["V-2", "V-3"]),  # Los criterios se combinan
+    ({"animal_ids": ["V-1", "T-1"]}, ["T-1", "V-1"]),
+])
+def test_selectores(client, db, hato, selector, esperados):
+    if "animal_ids" in selector:
+        selector = {**selector, "animal_ids": [hato["ids"][numero] for numero in selector["animal_ids"]]}
+    respuesta = _campana(client, hato, selector=selector, costo_por_animal=1500)
+
+    assert respuesta.status_code == 201, respuesta.text
+    cuerpo = respuesta.json()
+    assert (cuerpo["aplicados"], cuerpo["omitidos"]) == (len(esperados), 0)
+    assert cuerpo["costo_total"] == 1500 * len(esperados)
+    assert _tratados(db, hato) == esperados
+
+
+def test_se_omiten_los_ya_tratados_en_la_fecha(client, db, hato):
+    client.post("/api/v1/control-sanitario/", headers=hato["headers"], json={
+        "animal_id": hato["ids"]["V-1"], "tipo": "vacuna", "fecha": FECHA.isoformat(), "producto": "Aftosa",
+    })
+    # Otro producto o el mismo en otra fecha no cuentan
+    client.post("/api/v1/control-sanitario/", headers=hato["headers"], json={
+        "animal_id": hato["ids"]["V-2"], "tipo": "vacuna", "fecha": FECHA.isoformat(), "producto": "Brucelosis",
+    })
+    client.post("/api/v1/control-sanitario/", headers=hato["headers"], json={
+        "animal_id": hato["ids"]["V-3"], "tipo": "vacuna", "fecha": "2025-01-10", "producto": "Aftosa",
+    })
+
+    primera = _campana(client, hato, selector={"categoria": "vaca"}).json()
+    assert (primera["aplicados"], primera["omitidos"]) == (2, 1)
+    # Reintentar la misma campaña no duplica registros
+    reintento = _campana(client, hato, selector={"categoria": "vaca"}).json()
+    assert (reintento["aplicados"], reintento["omitidos"]) == (0, 3)
+    assert _tratados(db, hato) == ["V-1", "V-2", "V-3", "V-3"]
+
+
+def test_registra_las_ventanas_de_retiro(client, db, hato):
+    respuesta = _campana(
+        client, hato, producto="Ivermectina", tipo="desparasitacion", dias_retiro_carne=35,
+        selector={"lote": "Ordeño 1"}
+    )
+    assert respuesta.status_code == 201
+    ventanas = db.execute(select(RetiroSanitario.animal_id, RetiroSanitario.tipo).where(
+        RetiroSanitario.finca_id == hato["finca_id"]
+    )).all()
+    assert sorted(ventanas) == sorted([(hato["ids"]["V-1"], "carne"), (hato["ids"]["V-2"], "carne")])
+
+
+def test_consultas_sin_importar_el_tamano_del_grupo(client, hato, presupuesto_consultas):
+    # Usuario, grupo, ya tratados, INSERT de los controles, INSERT de los retiros y versión del libro
+    with presupuesto_consultas(maximo=6, repeticiones=1):
+        assert _campana(client, hato, dias_retiro_leche=3).status_code == 201
+
+
+def test_ids_ajenos_o_inactivos(client, db, hato, finca):
+    ajeno = db.scalar(select(Animal.id).where(Animal.finca_id == finca["finca_id"]))
+    respuesta = _campana(client, hato, selector={"animal_ids": [hato["ids"]["V-1"], hato["ids"]["V-9"], ajeno]})
+    assert respuesta.status_code == 404
+    assert respuesta.json()["detail"].endswith(", ".join(map(str, sorted([hato["ids"]["V-9"], ajeno]))))
+    assert _tratados(db, hato) == []
+
+
+def test_selector_sin_animales(client, hato):
+    respuesta = _campana(client, hato, selector={"lote": "No existe"})
+    assert respuesta.status_code == 400
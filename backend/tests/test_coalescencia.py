@@ -0,0 +1,136 @@
+"""
+Coalescencia de cálculos idénticos (app/core/coalescencia.py) y su uso en el dashboard.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+import pytest
+
+from app.api.v1.endpoints import dashboard
+from app.core import coalescencia
+from app.core.coalescencia import Coalescedor, CoordinadorRedis
+from app.db.database import engine
+
+
+def _esperar(condicion, plazo=5.0):
+    limite = time.monotonic() + plazo
+    while not condicion():
+        assert time.monotonic() < limite, "La condición no se cumplió a tiempo"
+        time.sleep(0.01)
+
+
+def _en_paralelo(funciones):
+    with ThreadPoolExecutor(len(funciones)) as ejecutor:
+        futuros = [ejecutor.submit(funcion) for funcion in funciones]
+        return [futuro.exception() or futuro.result() for futuro in futuros]
+
+
+def test_llamadas_simultaneas_comparten_un_calculo():
+    coalescedor = Coalescedor(espera_max=5)
+    calculos = []
+    liberar = Event()
+
+    def calcular():
+        calculos.append(1)
+        liberar.wait(5)
+        return b'{"ok":true}'
+
+    def llamar():
+        return coalescedor.ejecutar(("dashboard", 1), calcular)
+
+    with ThreadPoolExecutor(8) as ejecutor:
+        futuros = [ejecutor.submit(llamar) for _ in range(8)]
+        _esperar(lambda: coalescedor._vuelos.get(("dashboard", 1)) and coalescedor._vuelos[("dashboard", 1)].esperando == 7)
+        liberar.set()
+        resultados = [futuro.result() for futuro in futuros]
+
+    assert resultados == [b'{"ok":true}'] * 8
+    assert len(calculos) == 1
+    assert (coalescedor.calculos, coalescedor.compartidos) == (1, 7)
+    assert coalescedor._vuelos == {}
+
+
+def test_claves_distintas_no_se_comparten():
+    coalescedor = Coalescedor(espera_max=5)
+    resultados = _en_paralelo([
+        lambda finca=finca: coalescedor.ejecutar(("dashboard", finca), lambda: str(finca).encode())
+        for finca in (1, 2, 3)
+    ])
+    assert resultados == [b"1", b"2", b"3"]
+
+
+def test_error_del_lider_llega_a_quienes_esperan():
+    coalescedor = Coalescedor(espera_max=5)
+    liberar = Event()
+
+    def falla():
+        liberar.wait(5)
+        raise ValueError("base caída")
+
+    with ThreadPoolExecutor(4) as ejecutor:
+        futuros = [ejecutor.submit(coalescedor.ejecutar, ("alertas", 1), falla) for _ in range(4)]
+        _esperar(lambda: coalescedor._vuelos.get(("alertas", 1)) and coalescedor._vuelos[("alertas", 1)].esperando == 3)
+        liberar.set()
+        errores = [futuro.exception() for futuro in futuros]
+
+    assert all(isinstance(error, ValueError) for error in errores)
+    # El vuelo fallido no queda registrado: la siguiente llamada calcula de nuevo
+    assert coalescedor._vuelos == {}
+    assert coalescedor.ejecutar(("alertas", 1), lambda: b"[]") == b"[]"
+
+
+def test_si_el_lider_tarda_demasiado_cada_uno_calcula():
+    coalescedor = Coalescedor(espera_max=0.1)
+    liberar = Event()
+    lider_calculando = Event()
+
+    def lento():
+        lider_calculando.set()
+        liberar.wait(5)
+        return b"lider"
+
+    with ThreadPoolExecutor(2) as ejecutor:
+        lider = ejecutor.submit(coalescedor.ejecutar, ("dashboard", 1), lento)
+        lider_calculando.wait(5)
+        inicio = time.monotonic()
+        assert coalescedor.ejecutar(("dashboard", 1), lambda: b"propio") == b"propio"
+        assert time.monotonic() - inicio < 2
+        liberar.set()
+        assert lider.result() == b"lider"
+
+
+def test_sin_redis_se_calcula_localmente():
+    coalescedor = Coalescedor(espera_max=1, redis=CoordinadorRedis("redis://127.0.0.1:1/0", espera_max=1))
+    assert coalescedor.ejecutar(("dashboard", 1, "2026-01-01"), lambda: b"local") == b"local"
+
+
+@pytest.fixture
+def coalescedor_de_prueba(monkeypatch):
+    coalescedor = Coalescedor(espera_max=10)
+    monkeypatch.setattr(coalescencia, "_coalescedor", coalescedor)
+    return coalescedor
+
+
+def test_dashboard_en_espera_no_retiene_conexiones(client, headers, coalescedor_de_prueba, monkeypatch):
+    """Las requests que esperan el cálculo de otra ya devolvieron su conexión al pool"""
+    liberar = Event()
+    original = dashboard._dashboard_completo
+
+    def calcular_despues_de_liberar(db, finca_id, hoy):
+        liberar.wait(10)
+        return original(db, finca_id, hoy)
+
+    monkeypatch.setattr(dashboard, "_dashboard_completo", calcular_despues_de_liberar)
+    usuarios = 6
+    with ThreadPoolExecutor(usuarios) as ejecutor:
+        futuros = [ejecutor.submit(client.get, "/api/v1/dashboard/", headers=headers) for _ in range(usuarios)]
+        _esperar(lambda: any(vuelo.esperando == usuarios - 1 for vuelo in coalescedor_de_prueba._vuelos.values()))
+        # Todas autenticadas y en espera (la líder aún sin consultar): ninguna conexión prestada
+        assert engine.pool.checkedout() == 0
+        liberar.set()
+        respuestas = [futuro.result() for futuro in futuros]
+
+    assert {respuesta.status_code for respuesta in respuestas} == {200}
+    assert len({respuesta.content for respuesta in respuestas}) == 1
+    assert coalescedor_de_prueba.calculos == 1
@@ -0,0 +1,154 @@
+"""
+Registro de consultas lentas (app/core/consultas_lentas.py): el plan se pide
+fuera de la request y EXPLAIN ANALYZE es opcional.
+"""
+import logging
+from threading import Event
+from time import perf_counter
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core import consultas_lentas
+from app.core.consultas_lentas import RegistroConsultasLentas, instrumentar_engine
+
+SELECT = "SELECT * FROM animales WHERE finca_id = %(finca_id)s"
+
+
+@pytest.fixture
+def registros(caplog):
+    caplog.set_level(logging.WARNING, logger="app.core.consultas_lentas")
+    return caplog
+
+
+def _postgres():
+    return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"), engine=SimpleNamespace(url="postgresql://bd"))
+
+
+def _lenta(registro, statement=SELECT, conn=None):
+    """Simular que la sentencia acaba de tardar un segundo"""
+    contexto = SimpleNamespace(_inicio_lenta=perf_counter() - 1)
+    registro.despues(conn or _postgres(), None, statement, {"finca_id": 1}, contexto, False)
+
+
+def _esperar_hilo(registro):
+    if registro._ejecutor is not None:
+        registro._ejecutor.shutdown(wait=True)
+        registro._ejecutor = None
+
+
+def test_en_sqlite_se_registra_sin_plan(registros):
+    engine = create_engine("sqlite://")
+    registro = instrumentar_engine(engine, umbral_ms=0)
+    with engine.connect() as conexion:
+        conexion.execute(text("SELECT 1"))
+    assert "Consulta lenta" in registros.text
+    assert registros.records[-1].consulta_lenta["sql"] == "SELECT 1"
+    assert registro._ejecutor is None
+
+
+def test_el_plan_se_pide_sin_demorar_la_request(registros):
+    registro = RegistroConsultasLentas(umbral_ms=500)
+    liberar = Event()
+    pedidos = []
+
+    def explicar(url, statement, parameters):
+        pedidos.append((url, statement, parameters))
+        liberar.wait(5)
+        return "Seq Scan on animales"
+
+    registro._explicar = explicar
+    inicio = perf_counter()
+    _lenta(registro)
+    # La request sigue sin esperar el plan; el registro sale después, con él
+    assert perf_counter() - inicio < 1
+    assert registros.records == []
+
+    liberar.set()
+    _esperar_hilo(registro)
+    [registro_log] = registros.records
+    assert registro_log.consulta_lenta["plan"] == "Seq Scan on animales"
+    assert "Plan:\nSeq Scan on animales" in registros.text
+    assert pedidos == [("postgresql://bd", SELECT, {"finca_id": 1})]
+
+
+def test_una_sentencia_se_explica_una_vez_por_intervalo(registros):
+    registro = RegistroConsultasLentas(umbral_ms=500)
+    registro._explicar = lambda url, statement, parameters: "Index Scan"
+    _lenta(registro)
+    _esperar_hilo(registro)
+    _lenta(registro)
+    assert [r.consulta_lenta.get("plan") for r in registros.records] == ["Index Scan", None]
+
+
+@pytest.mark.parametrize("statement", [
+    "UPDATE animales SET estado = 'vendido' WHERE id = %(id)s",
+    "WITH x AS (DELETE FROM pesajes RETURNING *) SELECT * FROM x",
+])
+def test_las_escrituras_no_se_explican(registros, statement):
+    registro = RegistroConsultasLentas(umbral_ms=500)
+    registro._explicar = pytest.fail
+    _lenta(registro, statement)
+    assert len(registros.records) == 1 and registro._ejecutor is None
+
+
+def test_con_la_cola_llena_se_registra_sin_plan(registros):
+    registro = RegistroConsultasLentas(umbral_ms=500)
+    registro._pendientes = consultas_lentas.EXPLAIN_PENDIENTES
+    _lenta(registro)
+    assert len(registros.records) == 1 and "plan" not in registros.records[0].consulta_lenta
+
+
+def test_si_el_explain_falla_igual_se_registra(registros):
+    registro = RegistroConsultasLentas(umbral_ms=500)
+
+    def falla(url, statement, parameters):
+        raise RuntimeError("sin conexión")
+
+    registro._explicar = falla
+    _lenta(registro)
+    _esperar_hilo(registro)
+    assert registros.records[0].consulta_lenta["plan"] == "(EXPLAIN falló: sin conexión)"
+    assert registro._pendientes == 0
+
+
+class ConexionFalsa:
+    def __init__(self):
+        self.ejecutadas = []
+        self.cerrada = self.revertida = False
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, parametros=None):
+        self.ejecutadas.append(sql)
+
+    def fetchall(self):
+        return [("Seq Scan on animales",), ("  Filter: (finca_id = 1)",)]
+
+    def rollback(self):
+        self.revertida = True
+
+    def close(self):
+        self.cerrada = True
+
+
+@pytest.mark.parametrize("analyze, esperadas", [
+    (False, [f"EXPLAIN {SELECT}"]),
+    (True, [
+        "SET TRANSACTION READ ONLY",
+        f"SET LOCAL statement_timeout = {consultas_lentas.EXPLAIN_TIMEOUT_MS}",
+        f"EXPLAIN (ANALYZE, BUFFERS) {SELECT}",
+    ]),
+])
+def test_explain_simple_por_defecto_y_analyze_opcional(analyze, esperadas):
+    registro = RegistroConsultasLentas(umbral_ms=500, explain_analyze=analyze)
+    conexion = ConexionFalsa()
+    registro._motor_explain = SimpleNamespace(raw_connection=lambda: conexion)
+
+    plan = registro._explicar("postgresql://bd", SELECT, {"finca_id": 1})
+
+    assert plan == "Seq Scan on animales\n  Filter: (finca_id = 1)"
+    assert conexion.ejecutadas == esperadas
+    assert conexion.revertida and conexion.cerrada
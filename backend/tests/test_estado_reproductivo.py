@@ -0,0 +1,128 @@
+"""
+Máquina de estados reproductivos (app/services/estado_reproductivo.py):
+historiales de una hembra con el estado resultante calculado a mano.
+"""
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.estado_reproductivo import recorrer_eventos
+
+INICIO = date(2024, 1, 1)
+
+
+def _dia(n):
+    return INICIO + timedelta(days=n)
+
+
+def _evento(dia, tipo, diagnostico=None, dias_gestacion=None, parto_probable=None):
+    return SimpleNamespace(
+        finca_id=1, animal_id=7, tipo_evento=tipo, fecha_evento=_dia(dia), diagnostico=diagnostico,
+        dias_gestacion=dias_gestacion,
+        fecha_probable_parto=_dia(parto_probable) if parto_probable is not None else None
+    )
+
+
+HISTORIALES = {
+    # Concepción en el último servicio; parto probable a 283 días
+    "dos_servicios_y_prenada": (
+        [_evento(0, "servicio"), _evento(21, "servicio"), _evento(60, "diagnostico", "prenada")],
+        dict(estado="prenada", fecha_estado=_dia(60), gestante=True, servicios_ciclo=2,
+             ultimo_servicio=_dia(21), fecha_concepcion=_dia(21), fecha_probable_parto=_dia(304),
+             dias_abiertos=None, numero_partos=0),
+    ),
+    # Los días de gestación del diagnóstico mandan sobre el último servicio
+    "dias_gestacion_tras_parto": (
+        [_evento(0, "parto"), _evento(70, "servicio"), _evento(110, "diagnostico", "prenada", dias_gestacion=45)],
+        dict(estado="prenada", gestante=True, fecha_concepcion=_dia(65), fecha_probable_parto=_dia(348),
+             dias_abiertos=65, ultimo_parto=_dia(0), numero_partos=1, servicios_ciclo=1),
+    ),
+    # Sin servicio ni días de gestación: se concibe el día del diagnóstico
+    "diagnostico_sin_servicio": (
+        [_evento(50, "diagnostico", "prenada")],
+        dict(estado="prenada", gestante=True, fecha_concepcion=_dia(50), fecha_probable_parto=_dia(333),
+             ultimo_servicio=None, servicios_ciclo=0),
+    ),
+    "parto_probable_del_diagnostico": (
+        [_evento(0, "servicio"), _evento(40, "diagnostico", "prenada", parto_probable=280)],
+        dict(fecha_concepcion=_dia(0), fecha_probable_parto=_dia(280)),
+    ),
+    # Pérdida de la gestación: vacía, conserva los servicios del ciclo
+    "perdida_de_la_gestacion": (
+        [_evento(0, "servicio"), _evento(40, "diagnostico", "prenada"), _evento(90, "diagnostico", "vacia")],
+        dict(estado="vacia", fecha_estado=_dia(90), gestante=False, fecha_concepcion=None,
+             fecha_probable_parto=None, dias_abiertos=None, servicios_ciclo=1, ultimo_servicio=_dia(0)),
+    ),
+    # El aborto abre un ciclo nuevo sin contar como parto
+    "aborto": (
+        [_evento(0, "parto"), _evento(60, "servicio"), _evento(100, "diagnostico", "prenada"),
+         _evento(160, "aborto")],
+        dict(estado="vacia", fecha_estado=_dia(160), gestante=False, servicios_ciclo=0, fecha_concepcion=None,
+             fecha_probable_parto=None, dias_abiertos=None, numero_partos=1, ultimo_parto=_dia(0)),
+    ),
+    # El secado conserva la gestación
+    "secado_gestante": (
+        [_evento(0, "parto"), _evento(80, "servicio"), _evento(120, "diagnostico", "prenada"),
+         _evento(300, "secado")],
+        dict(estado="seca", fecha_estado=_dia(300), gestante=True, fecha_concepcion=_dia(80),
+             fecha_probable_parto=_dia(363), dias_abiertos=80),
+    ),
+    "ciclo_completo": (
+        [_evento(0, "parto"), _evento(60, "servicio"), _evento(100, "diagnostico", "prenada"),
+         _evento(340, "parto")],
+        dict(estado="parida", fecha_estado=_dia(340), gestante=False, numero_partos=2, ultimo_parto=_dia(340),
+             servicios_ciclo=0, ultimo_servicio=_dia(60), fecha_concepcion=None, dias_abiertos=None),
+    ),
+    # Un diagnóstico dudoso no cambia el estado ni su fecha
+    "diagnostico_dudoso": (
+        [_evento(0, "servicio"), _evento(30, "diagnostico", "dudosa")],
+        dict(estado="servida", fecha_estado=_dia(0), gestante=False, servicios_ciclo=1),
+    ),
+}
+
+
+@pytest.mark.parametrize("eventos, esperado", HISTORIALES.values(), ids=HISTORIALES.keys())
+def test_estado_resultante(eventos, esperado):
+    estado = recorrer_eventos(eventos)
+    assert (estado["finca_id"], estado["animal_id"]) == (1, 7)
+    assert {campo: estado[campo] for campo in esperado} == esperado
+
+
+@pytest.mark.parametrize("eventos", [[], [_evento(30, "diagnostico", "dudosa")], [_evento(10, "otro")]])
+def test_sin_eventos_que_definan_estado(eventos):
+    assert recorrer_eventos(eventos) is None
+
+
+# ============================================
+# Hembras que salen de la finca
+# ============================================
+
+def test_una_prenada_vendida_sale_de_los_conteos(client, finca_vacia):
+    headers = finca_vacia["headers"]
+    hoy = date.today()
+    ids = []
+    for numero in ("E-1", "E-2"):
+        respuesta = client.post("/api/v1/animales", headers=headers, json={
+            "numero_identificacion": numero, "sexo": "hembra", "fecha_ingreso": "2024-01-01",
+        })
+        ids.append(respuesta.json()["id"])
+        # Servida hace 270 días: parto probable en 13 días
+        for evento in (
+            {"tipo_evento": "servicio", "fecha_evento": (hoy - timedelta(days=270)).isoformat()},
+            {"tipo_evento": "diagnostico", "diagnostico": "prenada", "fecha_evento": (hoy - timedelta(days=220)).isoformat()},
+        ):
+            respuesta = client.post("/api/v1/control-reproductivo/", headers=headers, json={"animal_id": ids[-1], **evento})
+            assert respuesta.status_code == 201, respuesta.text
+    assert client.put(f"/api/v1/animales/{ids[0]}", headers=headers, json={"estado": "vendido"}).status_code == 200
+
+    reproduccion = client.get("/api/v1/dashboard/", headers=headers).json()["reproduccion"]
+    assert (reproduccion["hembras_prenadas"], reproduccion["proximos_partos_30_dias"]) == (1, 1)
+    assert reproduccion["tasa_prenez"] == 100.0
+
+    estados = client.get("/api/v1/control-reproductivo/estados", headers=headers).json()
+    assert [item["animal_id"] for item in estados["items"]] == [ids[1]]
+    assert estados["resumen"] == {"prenada": 1, "gestantes": 1}
+
+    alertas = client.get("/api/v1/dashboard/alertas", headers=headers).json()["alertas"]
+    assert [a["animal_id"] for a in alertas if a["tipo"] == "parto"] == [ids[1]]
@@ -0,0 +1,163 @@
+"""
+Indicadores reproductivos (app/services/kpis_reproductivos.py): aportes de
+historiales de una hembra calculados a mano, y los KPI de la finca.
+"""
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.animal import Animal
+from app.models.control_reproductivo import ControlReproductivo
+from app.services import kpis_reproductivos as kpis
+from app.services.kpis_reproductivos import _Acumulador, _recorrer_hembra
+
+INICIO = date(2024, 1, 1)
+FIN = INICIO + timedelta(days=364)
+
+
+def _dia(n):
+    return INICIO + timedelta(days=n)
+
+
+def _evento(dia, tipo, diagnostico=None, dias_gestacion=None, toro=None):
+    return SimpleNamespace(
+        tipo_evento=tipo, fecha_evento=_dia(dia), diagnostico=diagnostico, dias_gestacion=dias_gestacion,
+        toro_id=toro if isinstance(toro, int) else None, toro_pajuela=toro if isinstance(toro, str) else None
+    )
+
+
+# Parto el día 0, dos servicios y concepción en el segundo (día 81), segundo parto el 361.
+# Elegible desde el fin de la espera voluntaria (día 45) hasta la concepción: 36 días.
+CICLO_COMPLETO = [
+    _evento(0, "parto"), _evento(60, "servicio", toro=5), _evento(81, "servicio", toro=5),
+    _evento(120, "diagnostico", "prenada"), _evento(361, "parto"),
+]
+# Concepción el día 50, pérdida diagnosticada el 130 y dos servicios sin concepción:
+# elegible 45-50 y 130-365 = 240 días.
+PERDIDA = [
+    _evento(0, "parto"), _evento(50, "servicio", toro="P-A"), _evento(90, "diagnostico", "prenada"),
+    _evento(130, "diagnostico", "vacia"), _evento(150, "servicio", toro="P-B"), _evento(171, "servicio", toro="P-B"),
+]
+
+HISTORIALES = {
+    "ciclo_completo": (CICLO_COMPLETO, None, dict(
+        partos=2, servicios=2, concepciones=1, concepciones_sin_servicio=0, intervalos_parto=[361], dias_abiertos=[81],
+        servicios_concepcion=[2], dias_elegibles=36, toros={5: {"servicios": 2, "concepciones": 1}},
+    )),
+    "perdida_de_la_gestacion": (PERDIDA, None, dict(
+        partos=1, servicios=3, concepciones=1, intervalos_parto=[], dias_abiertos=[50],
+        servicios_concepcion=[1], dias_elegibles=240,
+        toros={"P-A": {"servicios": 1, "concepciones": 1}, "P-B": {"servicios": 2, "concepciones": 0}},
+    )),
+    # Parto sin diagnóstico a 280 días del servicio (>= 240): ese servicio fue el fértil
+    "parto_sin_diagnostico": ([_evento(0, "parto"), _evento(50, "servicio", toro="P-1"), _evento(330, "parto")], None, dict(
+        partos=2, servicios=1, concepciones=1, intervalos_parto=[330], dias_abiertos=[50],
+        servicios_concepcion=[1], dias_elegibles=5, toros={"P-1": {"servicios": 1, "concepciones": 1}},
+    )),
+    # A 130 días del servicio no pudo ser el fértil: abierta del día 45 al parto
+    "parto_sin_diagnostico_servicio_tardio": (
+        [_evento(0, "parto"), _evento(200, "servicio", toro="P-1"), _evento(330, "parto")], None, dict(
+            partos=2, servicios=1, concepciones=0, intervalos_parto=[330], dias_abiertos=[],
+            servicios_concepcion=[], dias_elegibles=285,
+        )),
+    # Diagnóstico sin servicio: concepción por días de gestación (día 90) o el día del diagnóstico
+    "diagnostico_sin_servicio_con_dias_gestacion": (
+        [_evento(0, "parto"), _evento(150, "diagnostico", "prenada", dias_gestacion=60)], None, dict(
+            partos=1, servicios=0, concepciones=1, concepciones_sin_servicio=1, dias_abiertos=[90],
+            servicios_concepcion=[], dias_elegibles=45,
+        )),
+    "diagnostico_sin_servicio": ([_evento(0, "parto"), _evento(150, "diagnostico", "prenada")], None, dict(
+        concepciones=1, concepciones_sin_servicio=1, dias_abiertos=[150], servicios_concepcion=[], dias_elegibles=105,
+    )),
+    # El aborto la vuelve elegible desde ese día, sin espera voluntaria
+    "aborto": (
+        [_evento(0, "parto"), _evento(60, "servicio", toro="P-1"), _evento(100, "diagnostico", "prenada"),
+         _evento(160, "aborto"), _evento(190, "servicio", toro="P-1"), _evento(230, "diagnostico", "prenada")], None, dict(
+            partos=1, servicios=2, concepciones=2, intervalos_parto=[], dias_abiertos=[60, 190],
+            servicios_concepcion=[1, 1], dias_elegibles=15 + 30,
+        )),
+    # Espera voluntaria: abierta desde el día 45 hasta el fin del periodo o la salida
+    "espera_voluntaria": ([_evento(0, "parto")], None, dict(partos=1, dias_elegibles=365 - 45)),
+    "espera_voluntaria_y_salida": ([_evento(0, "parto")], _dia(100), dict(partos=1, dias_elegibles=55)),
+    # Un servicio dentro de la espera cuenta, pero no suma días elegibles
+    "concepcion_dentro_de_la_espera": (
+        [_evento(0, "parto"), _evento(30, "servicio"), _evento(70, "diagnostico", "prenada")], None, dict(
+            servicios=1, concepciones=1, dias_abiertos=[30], dias_elegibles=0,
+            toros={None: {"servicios": 1, "concepciones": 1}},
+        )),
+    # Novilla: elegible desde su primer evento
+    "novilla": ([_evento(100, "servicio", toro="P-1"), _evento(121, "servicio", toro="P-1"),
+                 _evento(160, "diagnostico", "prenada")], None, dict(
+        partos=0, servicios=2, concepciones=1, dias_abiertos=[], servicios_concepcion=[2], dias_elegibles=21,
+    )),
+}
+
+
+@pytest.mark.parametrize("eventos, fecha_salida, esperado", HISTORIALES.values(), ids=HISTORIALES.keys())
+def test_aportes_de_una_hembra(eventos, fecha_salida, esperado):
+    acumulado = _Acumulador(INICIO, FIN)
+    _recorrer_hembra(eventos, fecha_salida, acumulado)
+    assert {campo: getattr(acumulado, campo) for campo in esperado} == esperado
+
+
+def test_solo_cuenta_lo_ocurrido_en_el_periodo():
+    # El periodo empieza el día 100: el primer parto y la concepción (día 81) quedan fuera
+    acumulado = _Acumulador(_dia(100), FIN)
+    _recorrer_hembra(CICLO_COMPLETO, None, acumulado)
+    assert (acumulado.partos, acumulado.servicios, acumulado.concepciones) == (1, 0, 0)
+    assert acumulado.intervalos_parto == [361]
+    assert acumulado.dias_abiertos == [] and acumulado.dias_elegibles == 0
+
+
+def _registrar(db, finca_id, historiales):
+    for numero, historial in historiales:
+        vaca = Animal(finca_id=finca_id, numero_identificacion=numero, sexo="hembra", fecha_ingreso=INICIO)
+        db.add(vaca)
+        db.flush()
+        db.add_all(
+            ControlReproductivo(
+                finca_id=finca_id, animal_id=vaca.id, tipo_evento=e.tipo_evento, fecha_evento=e.fecha_evento,
+                diagnostico=e.diagnostico, dias_gestacion=e.dias_gestacion,
+                toro_pajuela=e.toro_pajuela or (str(e.toro_id) if e.toro_id else None)
+            )
+            for e in historial
+        )
+    db.commit()
+
+
+def test_kpis_de_la_finca(db, finca_vacia):
+    finca_id = finca_vacia["finca_id"]
+    _registrar(db, finca_id, (("K-1", CICLO_COMPLETO), ("K-2", PERDIDA)))
+
+    resultado = kpis.kpis_reproductivos(db, finca_id, INICIO, FIN)
+
+    # 36 + 240 días elegibles = 13,14 ciclos de 21 días; 2 concepciones y 5 servicios
+    assert (resultado["partos"], resultado["servicios"], resultado["concepciones"]) == (3, 5, 2)
+    assert resultado["intervalo_entre_partos"] == {"promedio": 361.0, "mediana": 361.0, "n": 1}
+    assert resultado["dias_abiertos"] == {"promedio": 65.5, "mediana": 65.5, "n": 2}
+    assert resultado["servicios_por_concepcion"] == 1.5
+    assert resultado["tasa_concepcion"] == 40.0
+    assert resultado["ciclos_elegibles"] == 13.1
+    assert resultado["tasa_deteccion_celos"] == 38.0
+    assert resultado["tasa_prenez_21_dias"] == 15.2
+    assert [(t["toro"], t["servicios"], t["concepciones"]) for t in resultado["por_toro"]] == [
+        ("5", 2, 1), ("P-B", 2, 0), ("P-A", 1, 1)
+    ]
+
+
+def test_preneces_sin_servicio_fuera_de_la_tasa_de_concepcion(db, finca_vacia):
+    # Un servicio fértil y dos preñeces diagnosticadas sin servicio registrado
+    finca_id = finca_vacia["finca_id"]
+    _registrar(db, finca_id, (
+        ("S-1", [_evento(10, "servicio", toro="P-A"), _evento(50, "diagnostico", "prenada")]),
+        ("S-2", [_evento(60, "diagnostico", "prenada")]),
+        ("S-3", [_evento(0, "parto"), _evento(150, "diagnostico", "prenada", dias_gestacion=60)]),
+    ))
+
+    resultado = kpis.kpis_reproductivos(db, finca_id, INICIO, FIN)
+
+    assert (resultado["servicios"], resultado["concepciones"], resultado["concepciones_sin_servicio"]) == (1, 3, 2)
+    assert resultado["tasa_concepcion"] == 100.0
+    # El desglose por toro suma las concepciones con servicio
+    assert sum(t["concepciones"] for t in resultado["por_toro"]) == 1
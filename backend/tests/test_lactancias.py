@@ -0,0 +1,50 @@
+"""
+Análisis de lactancias (app/services/lactancias.py): caché y días en leche.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.services import lactancias
+from app.services.lactancias import analizar_lactancias
+
+DESDE = date(2000, 1, 1)
+
+
+@pytest.fixture
+def hoy_fijo(monkeypatch):
+    """Permite mover el día que ve el servicio"""
+    fecha = {"hoy": date.today()}
+
+    class Fecha(date):
+        @classmethod
+        def today(cls):
+            return fecha["hoy"]
+
+    monkeypatch.setattr(lactancias, "date", Fecha)
+    lactancias._cache.limpiar()
+    return fecha
+
+
+def _en_curso(resultado):
+    return {(l["animal_id"], l["numero_lactancia"]): l["dias_en_leche"] for l in resultado if l["en_curso"]}
+
+
+def test_los_dias_en_leche_avanzan_aunque_el_resultado_este_en_cache(db, finca, hoy_fijo):
+    hoy = _en_curso(analizar_lactancias(db, finca["finca_id"], DESDE))
+    assert hoy
+    assert _en_curso(analizar_lactancias(db, finca["finca_id"], DESDE)) == hoy
+
+    hoy_fijo["hoy"] += timedelta(days=1)
+    manana = _en_curso(analizar_lactancias(db, finca["finca_id"], DESDE))
+    assert manana == {clave: dias + 1 for clave, dias in hoy.items()}
+
+
+def test_el_resultado_coincide_con_y_sin_cache(db, finca, hoy_fijo):
+    primero = analizar_lactancias(db, finca["finca_id"], DESDE)
+    assert analizar_lactancias(db, finca["finca_id"], DESDE) is primero
+    lactancias._cache.limpiar()
+    assert analizar_lactancias(db, finca["finca_id"], DESDE) == primero
+    assert {l["animal_id"] for l in analizar_lactancias(db, finca["finca_id"], DESDE, primero[0]["animal_id"])} == {
+        primero[0]["animal_id"]
+    }
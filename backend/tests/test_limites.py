@@ -0,0 +1,176 @@
+"""
+Límites de uso (app/core/limites.py): cubetas de tokens, 429 con Retry-After,
+descarte de carga con el pool saturado y elección del backend.
+"""
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import limites
+from app.core.config import settings
+from app.core.limites import (
+    DescarteCargaMiddleware, EsperaPool, LimitadorMemoria, LimitadorRedis, Presupuesto
+)
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(limites, "monotonic", reloj)
+    return reloj
+
+
+# ============================================
+# Cubetas de tokens
+# ============================================
+
+def test_la_cubeta_admite_una_rafaga_y_se_rellena_al_ritmo(reloj):
+    cubetas = LimitadorMemoria()
+    presupuesto = Presupuesto(capacidad=3, por_minuto=60)  # Un token por segundo
+
+    assert [cubetas.consumir("u", presupuesto)[0] for _ in range(3)] == [True] * 3
+    assert cubetas.consumir("u", presupuesto) == (False, pytest.approx(1.0))
+
+    reloj.ahora += 0.5
+    assert cubetas.consumir("u", presupuesto) == (False, pytest.approx(0.5))
+    reloj.ahora += 0.5
+    assert cubetas.consumir("u", presupuesto) == (True, 0.0)
+
+    # Sin uso se llena hasta la capacidad, no más
+    reloj.ahora += 3600
+    assert [cubetas.consumir("u", presupuesto)[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_las_cubetas_son_independientes_y_el_costo_cuenta(reloj):
+    cubetas = LimitadorMemoria()
+    presupuesto = Presupuesto(capacidad=4, por_minuto=60)
+    assert cubetas.consumir("a", presupuesto, costo=3)[0]
+    assert cubetas.consumir("a", presupuesto, costo=3) == (False, pytest.approx(2.0))
+    assert cubetas.consumir("b", presupuesto, costo=3)[0]
+
+
+# ============================================
+# 429 en la API
+# ============================================
+
+@pytest.fixture
+def limites_activos(monkeypatch):
+    """Límites encendidos, con cubetas nuevas y presupuestos al 20 %"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_FACTOR", 0.2)
+    monkeypatch.setattr(limites, "_limitador", LimitadorMemoria())
+
+
+def test_agotar_el_presupuesto_responde_429_con_retry_after(client, headers, limites_activos):
+    capacidad = round(limites.PRESUPUESTOS["dashboard"][0].capacidad * 0.2)
+    respuestas = [client.get("/api/v1/dashboard/alertas", headers=headers) for _ in range(capacidad + 1)]
+
+    assert [r.status_code for r in respuestas] == [200] * capacidad + [429]
+    # 30 por minuto al 20 %: un token cada 10 s
+    assert respuestas[-1].headers["retry-after"] == "10"
+    assert "dashboard" in respuestas[-1].json()["detail"]
+    # Las demás categorías tienen su propia cubeta
+    assert client.get("/api/v1/animales", headers=headers).status_code == 200
+
+
+def test_sin_token_no_se_limita(client, limites_activos):
+    assert {client.get("/api/v1/dashboard/alertas").status_code for _ in range(5)} == {401}
+
+
+# ============================================
+# Descarte de carga (503)
+# ============================================
+
+@pytest.fixture
+def app_con_descarte(monkeypatch):
+    espera = EsperaPool(alfa=1.0, vida_media=1e9)
+    monkeypatch.setattr(limites, "espera_pool", espera)
+    app = FastAPI()
+
+    @app.get("/{ruta:path}")
+    def cualquiera(ruta: str):
+        return {"ruta": ruta}
+
+    app.add_middleware(DescarteCargaMiddleware, umbral_ms=100, reintentar_en=7)
+    return TestClient(app), espera
+
+
+@pytest.mark.parametrize("espera_ms, dashboard, animales, health", [
+    (50, 200, 200, 200),
+    (150, 503, 200, 200),  # Sobre el umbral: solo las categorías pesadas
+    (250, 503, 503, 200),  # Sobre el doble: todo salvo /health y /metrics
+])
+def test_descarte_por_espera_del_pool(app_con_descarte, espera_ms, dashboard, animales, health):
+    cliente, espera = app_con_descarte
+    espera.registrar(espera_ms / 1000)
+    estados = [cliente.get(ruta).status_code for ruta in ("/api/v1/dashboard/", "/api/v1/animales", "/health")]
+    assert estados == [dashboard, animales, health]
+
+
+def test_el_503_pide_reintentar_y_el_descarte_se_levanta_solo(app_con_descarte, reloj, monkeypatch):
+    cliente, _ = app_con_descarte
+    espera = EsperaPool(alfa=1.0, vida_media=2.0)
+    monkeypatch.setattr(limites, "espera_pool", espera)
+    espera.registrar(0.3)
+
+    respuesta = cliente.get("/api/v1/sync/cambios")
+    assert respuesta.status_code == 503
+    assert respuesta.headers["retry-after"] == "7"
+
+    # Sin más esperas el promedio decae a la mitad cada 2 s
+    reloj.ahora += 4
+    assert espera.actual() == pytest.approx(0.075)
+    assert cliente.get("/api/v1/sync/cambios").status_code == 200
+
+
+# ============================================
+# Backend según los workers
+# ============================================
+
+@pytest.mark.parametrize("configurado, workers, esperado", [
+    (None, None, "memory"),
+    (None, 1, "memory"),
+    (None, 4, "redis"),
+    ("memory", 4, "memory"),
+    ("redis", 1, "redis"),
+])
+def test_backend_por_defecto_segun_workers(monkeypatch, configurado, workers, esperado):
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", configurado)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", workers)
+    assert limites.backend_limitador() == esperado
+
+
+def test_avisa_al_arrancar_si_los_limites_quedan_por_worker(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 3)
+    monkeypatch.setattr(limites, "_limitador", None)
+    with caplog.at_level(logging.WARNING, logger="app.core.limites"):
+        limites.verificar_limitador()
+    assert "3 workers" in caplog.text
+
+
+def test_sin_redis_se_permite_y_avisa_una_vez(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", None)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 2)
+    monkeypatch.setattr(settings, "REDIS_URL", "redis://127.0.0.1:1/0")
+    monkeypatch.setattr(limites, "_limitador", None)
+    with caplog.at_level(logging.WARNING, logger="app.core.limites"):
+        limites.verificar_limitador()
+        assert isinstance(limites.limitador(), LimitadorRedis)
+        assert "no responde" in caplog.text
+        caplog.clear()
+        for _ in range(3):
+            assert limites.limitador().consumir("u", Presupuesto(1, 1)) == (True, 0.0)
+    assert len(caplog.records) == 1
@@ -0,0 +1,96 @@
+"""
+Archivos de medios (app/core/media.py): rangos de bytes, If-Range, respuestas
+304 y delegación del envío al servidor web.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.media import CACHE_INMUTABLE, MediaStaticFiles
+
+TAMANO = 1000
+CONTENIDO = bytes(i % 251 for i in range(TAMANO))
+INMUTABLE = "animales/ab/" + "ab" * 32 + "_thumb.webp"
+
+
+@pytest.fixture
+def medios(tmp_path):
+    (tmp_path / "foto.jpg").write_bytes(CONTENIDO)
+    (tmp_path / INMUTABLE).parent.mkdir(parents=True)
+    (tmp_path / INMUTABLE).write_bytes(b"webp")
+    app = FastAPI()
+    app.mount("/media", MediaStaticFiles(directory=str(tmp_path)), name="media")
+    return TestClient(app)
+
+
+def test_archivo_completo(medios):
+    respuesta = medios.get("/media/foto.jpg")
+    assert respuesta.status_code == 200
+    assert respuesta.content == CONTENIDO
+    assert respuesta.headers["accept-ranges"] == "bytes"
+    assert respuesta.headers["cache-control"] == f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+    assert medios.get(f"/media/{INMUTABLE}").headers["cache-control"] == CACHE_INMUTABLE
+
+
+@pytest.mark.parametrize("rango, inicio, fin", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=900-", 900, 999),
+    ("bytes=-100", 900, 999),  # Sufijo: los últimos 100 bytes
+    ("bytes=-5000", 0, 999),  # Sufijo mayor que el archivo: el archivo entero
+    ("bytes=990-5000", 990, 999),  # El final se recorta al tamaño
+])
+def test_rangos(medios, rango, inicio, fin):
+    respuesta = medios.get("/media/foto.jpg", headers={"Range": rango})
+    assert respuesta.status_code == 206
+    assert respuesta.headers["content-range"] == f"bytes {inicio}-{fin}/{TAMANO}"
+    assert respuesta.headers["content-length"] == str(fin - inicio + 1)
+    assert respuesta.content == CONTENIDO[inicio:fin + 1]
+    assert "etag" in respuesta.headers
+
+
+@pytest.mark.parametrize("rango", ["bytes=1000-", "bytes=2000-3000", "bytes=-0", "bytes=50-10"])
+def test_rango_no_satisfacible(medios, rango):
+    respuesta = medios.get("/media/foto.jpg", headers={"Range": rango})
+    assert respuesta.status_code == 416
+    assert respuesta.headers["content-range"] == f"bytes */{TAMANO}"
+    assert respuesta.content == b""
+
+
+def test_rango_no_soportado_envia_el_archivo(medios):
+    respuesta = medios.get("/media/foto.jpg", headers={"Range": "bytes=0-9,20-29"})
+    assert (respuesta.status_code, respuesta.content) == (200, CONTENIDO)
+
+
+def test_if_range(medios):
+    etag = medios.get("/media/foto.jpg").headers["etag"]
+    vigente = medios.get("/media/foto.jpg", headers={"Range": "bytes=0-99", "If-Range": etag})
+    assert (vigente.status_code, vigente.content) == (206, CONTENIDO[:100])
+
+    # El archivo cambió desde que el cliente guardó el ETag: se envía completo
+    viejo = medios.get("/media/foto.jpg", headers={"Range": "bytes=0-99", "If-Range": '"otra-version"'})
+    assert (viejo.status_code, viejo.content) == (200, CONTENIDO)
+    assert "content-range" not in viejo.headers
+
+
+def test_if_none_match(medios):
+    etag = medios.get(f"/media/{INMUTABLE}").headers["etag"]
+    respuesta = medios.get(f"/media/{INMUTABLE}", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 304
+    assert respuesta.content == b""
+    assert respuesta.headers["cache-control"] == CACHE_INMUTABLE
+    assert medios.get(f"/media/{INMUTABLE}", headers={"If-None-Match": '"otra"'}).status_code == 200
+
+
+@pytest.mark.parametrize("modo, cabecera, valor", [
+    ("x-accel-redirect", "x-accel-redirect", "/media-interno/" + INMUTABLE),
+    ("x-sendfile", "x-sendfile", None),
+])
+def test_envio_delegado(medios, tmp_path, monkeypatch, modo, cabecera, valor):
+    monkeypatch.setattr(settings, "MEDIA_SENDFILE", modo)
+    monkeypatch.setattr(settings, "MEDIA_ACCEL_PREFIX", "/media-interno/")
+    respuesta = medios.get(f"/media/{INMUTABLE}")
+    assert respuesta.status_code == 200
+    assert respuesta.content == b""
+    assert respuesta.headers[cabecera] == (valor or str((tmp_path / INMUTABLE).resolve()))
+    assert respuesta.headers["cache-control"] == CACHE_INMUTABLE
@@ -0,0 +1,29 @@
+"""
+/metrics (app/main.py): solo existe con METRICS_TOKEN y exige ese token como Bearer.
+"""
+import pytest
+
+from app.core.config import settings
+
+
+def test_sin_token_no_existe(client):
+    assert settings.METRICS_TOKEN is None
+    assert client.get("/metrics").status_code == 404
+
+
+@pytest.mark.parametrize("authorization, esperado", [
+    (None, 401),
+    ("Bearer otro-token", 401),
+    ("secreto-de-prueba", 401),
+    ("Bearer secreto-de-prueba", 200),
+])
+def test_exige_el_token(client, monkeypatch, authorization, esperado):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secreto-de-prueba")
+    client.get("/health")
+    headers = {"Authorization": authorization} if authorization else {}
+    respuesta = client.get("/metrics", headers=headers)
+    assert respuesta.status_code == esperado
+    if esperado == 200:
+        assert 'route="/health"' in respuesta.text
+    else:
+        assert "/health" not in respuesta.text
@@ -0,0 +1,129 @@
+"""
+Historial de pesajes: pesajes con fecha pasada, peso actual y ganancia diaria.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.models.animal import Animal
+
+INICIO = date.today() - timedelta(days=70)
+
+
+def _dia(n):
+    return (INICIO + timedelta(days=n)).isoformat()
+
+
+@pytest.fixture
+def novillo(client, finca_vacia):
+    headers = finca_vacia["headers"]
+    respuesta = client.post("/api/v1/animales", headers=headers, json={
+        "numero_identificacion": "P-1", "sexo": "macho", "fecha_ingreso": INICIO.isoformat(),
+    })
+    assert respuesta.status_code == 201, respuesta.text
+    return {"id": respuesta.json()["id"], "headers": headers}
+
+
+def _pesar(client, novillo, dia, peso):
+    respuesta = client.post("/api/v1/pesajes/sesion", headers=novillo["headers"], json={
+        "fecha": _dia(dia), "pesajes": [{"animal_id": novillo["id"], "peso": peso}],
+    })
+    assert respuesta.status_code == 201, respuesta.text
+
+
+def _animal(client, novillo):
+    return client.get(f"/api/v1/animales/{novillo['id']}", headers=novillo["headers"]).json()
+
+
+def _historial(client, novillo):
+    respuesta = client.get("/api/v1/pesajes/", headers=novillo["headers"], params={"animal_id": novillo["id"]})
+    return {p["fecha"]: (p["peso"], p["dias_desde_anterior"], p["ganancia_diaria"]) for p in respuesta.json()["items"]}
+
+
+def test_un_pesaje_con_fecha_pasada_no_retrocede_el_peso_actual(client, novillo):
+    _pesar(client, novillo, 0, 300)
+    _pesar(client, novillo, 60, 372)
+    _pesar(client, novillo, 20, 340)
+
+    animal = _animal(client, novillo)
+    assert (animal["peso_actual"], animal["peso_anterior"], animal["ultima_fecha_pesaje"]) == (372, 300, _dia(60))
+    # El pesaje siguiente se reenlaza con el intercalado
+    assert _historial(client, novillo) == {
+        _dia(0): (300, None, None),
+        _dia(20): (340, 20, 2.0),
+        _dia(60): (372, 40, 0.8),
+    }
+
+
+def test_la_ganancia_del_periodo_usa_todo_el_historial(client, novillo):
+    _pesar(client, novillo, 0, 300)
+    _pesar(client, novillo, 60, 372)
+    _pesar(client, novillo, 20, 340)
+
+    respuesta = client.get("/api/v1/pesajes/ganancia", headers=novillo["headers"], params={
+        "agrupar": "animal", "fecha_desde": _dia(0), "fecha_hasta": _dia(70),
+    })
+    [fila] = respuesta.json()["items"]
+    # Pendiente de mínimos cuadrados de (0, 300), (20, 340), (60, 372): 8/7
+    # (con solo los extremos sería 72/60 = 1,2)
+    assert fila["pesajes"] == 3 and fila["dias"] == 60
+    assert fila["ganancia_diaria"] == pytest.approx(8 / 7, abs=1e-4)
+    assert (fila["peso_inicial"], fila["peso_final"]) == (300, 372)
+
+
+def test_editar_el_animal_con_un_peso_pasado_lo_agrega_al_historial(client, novillo):
+    _pesar(client, novillo, 0, 300)
+    _pesar(client, novillo, 60, 372)
+
+    respuesta = client.put(f"/api/v1/animales/{novillo['id']}", headers=novillo["headers"], json={
+        "peso_actual": 320, "ultima_fecha_pesaje": _dia(10),
+    })
+
+    assert respuesta.status_code == 200
+    assert (respuesta.json()["peso_actual"], respuesta.json()["ultima_fecha_pesaje"]) == (372, _dia(60))
+    assert _historial(client, novillo)[_dia(10)] == (320, 10, 2.0)
+    assert _historial(client, novillo)[_dia(60)] == (372, 50, 1.04)
+
+
+def test_editar_solo_la_fecha_de_pesaje_no_la_descarta(client, novillo):
+    respuesta = client.put(f"/api/v1/animales/{novillo['id']}", headers=novillo["headers"], json={
+        "ultima_fecha_pesaje": _dia(5),
+    })
+    assert respuesta.status_code == 200
+    assert respuesta.json()["ultima_fecha_pesaje"] == _dia(5)
+    assert _historial(client, novillo) == {}
+
+
+def test_eliminar_el_unico_pesaje_deja_al_animal_sin_peso(client, db, novillo):
+    _pesar(client, novillo, 10, 310)
+    version = db.get(Animal, novillo["id"]).sync_version
+    [pesaje] = client.get("/api/v1/pesajes/", headers=novillo["headers"], params={"animal_id": novillo["id"]}).json()["items"]
+
+    assert client.delete(f"/api/v1/pesajes/{pesaje['id']}", headers=novillo["headers"]).status_code == 204
+
+    animal = _animal(client, novillo)
+    assert (animal["peso_actual"], animal["peso_anterior"], animal["ultima_fecha_pesaje"]) == (None, None, None)
+    db.expire_all()
+    assert db.get(Animal, novillo["id"]).sync_version == version + 1
+
+
+def test_no_se_anula_el_peso_editando_el_animal(client, novillo):
+    _pesar(client, novillo, 10, 310)
+    respuesta = client.put(f"/api/v1/animales/{novillo['id']}", headers=novillo["headers"], json={"peso_actual": None})
+    assert respuesta.status_code == 422
+    assert _animal(client, novillo)["peso_actual"] == 310
+
+
+def test_el_peso_de_compra_es_el_primer_pesaje(client, finca_vacia):
+    headers = finca_vacia["headers"]
+    respuesta = client.post("/api/v1/transacciones/compra-animal", headers=headers, json={
+        "animal": {"numero_identificacion": "C-1", "sexo": "macho", "raza": "Brahman", "peso_actual": 250},
+        "transaccion": {"fecha": _dia(0), "monto": 2_500_000},
+    })
+    assert respuesta.status_code == 201, respuesta.text
+    comprado = {"id": respuesta.json()["animal_id"], "headers": headers}
+    _pesar(client, comprado, 30, 280)
+
+    assert _historial(client, comprado) == {_dia(0): (250, None, None), _dia(30): (280, 30, 1.0)}
+    animal = _animal(client, comprado)
+    assert (animal["peso_actual"], animal["peso_anterior"], animal["ultima_fecha_pesaje"]) == (280, 250, _dia(30))
@@ -0,0 +1,101 @@
+"""
+Presupuestos de consultas SQL de los listados y las alertas.
+
+Cada listado debe ejecutar las mismas consultas con 5 filas que con 100: si
+un cambio vuelve a consultar el animal (o el toro) de cada fila, el conteo
+crece con la página y la prueba falla mostrando la sentencia repetida.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.models.animal import Animal
+from app.models.control_sanitario import ControlSanitario
+
+LISTADOS = [
+    # (ruta, parámetro de tamaño de página, máximo de consultas)
+    ("/api/v1/animales", "page_size", 3),
+    ("/api/v1/control-sanitario/", "limit", 4),
+    ("/api/v1/control-reproductivo/", "limit", 4),
+    ("/api/v1/produccion/", "limit", 4),
+    ("/api/v1/transacciones/", "limit", 3),
+]
+
+
+def _consultas(client, presupuesto_consultas, ruta, headers, params, maximo):
+    with presupuesto_consultas(maximo=maximo, repeticiones=1) as registro:
+        respuesta = client.get(ruta, headers=headers, params=params)
+    assert respuesta.status_code == 200, respuesta.text
+    return registro.total, respuesta.json()
+
+
+def _filas(cuerpo):
+    return len(cuerpo["items"]) if isinstance(cuerpo, dict) else len(cuerpo)
+
+
+@pytest.mark.parametrize("ruta,parametro,maximo", LISTADOS)
+def test_listado_con_consultas_constantes(client, headers, presupuesto_consultas, ruta, parametro, maximo):
+    chica, cuerpo_chico = _consultas(client, presupuesto_consultas, ruta, headers, {parametro: 5}, maximo)
+    grande, cuerpo_grande = _consultas(client, presupuesto_consultas, ruta, headers, {parametro: 100}, maximo)
+    assert _filas(cuerpo_chico) == 5
+    assert _filas(cuerpo_grande) > 5 * 4, "La finca de pruebas debe llenar una página grande"
+    assert chica == grande
+
+
+def _vacunas_proximas(db, finca_id, cantidad):
+    hoy = date.today()
+    for i in range(cantidad):
+        animal = Animal(
+            finca_id=finca_id, numero_identificacion=f"AL{finca_id}-{i}", sexo="hembra",
+            fecha_ingreso=hoy - timedelta(days=400), categoria="vaca", estado="activo"
+        )
+        db.add(animal)
+        db.flush()
+        db.add(ControlSanitario(
+            finca_id=finca_id, animal_id=animal.id, tipo="vacuna", fecha=hoy - timedelta(days=170),
+            producto="Aftosa", proxima_dosis=hoy + timedelta(days=i % 10 + 1)
+        ))
+    db.commit()
+
+
+def test_alertas_con_consultas_constantes(client, db, finca_vacia, presupuesto_consultas):
+    _vacunas_proximas(db, finca_vacia["finca_id"], 2)
+    pocas, cuerpo = _consultas(client, presupuesto_consultas, "/api/v1/dashboard/alertas", finca_vacia["headers"], {}, 3)
+    assert cuerpo["total"] == 2
+
+    _vacunas_proximas(db, finca_vacia["finca_id"], 40)
+    muchas, cuerpo = _consultas(client, presupuesto_consultas, "/api/v1/dashboard/alertas", finca_vacia["headers"], {}, 3)
+    assert cuerpo["total"] == 42
+    assert pocas == muchas
+
+
+@pytest.mark.presupuesto_consultas(maximo=4, repeticiones=1)
+def test_marcador_de_presupuesto(client, headers):
+    assert client.get("/api/v1/control-sanitario/", headers=headers, params={"limit": 50}).status_code == 200
+
+
+def test_presupuesto_excedido_muestra_las_sentencias(client, headers, presupuesto_consultas):
+    with pytest.raises(AssertionError, match="máximo 1"):
+        with presupuesto_consultas(maximo=1):
+            client.get("/api/v1/control-sanitario/", headers=headers)
+
+
+def test_no_cuenta_consultas_fuera_del_contexto(client, headers, presupuesto_consultas):
+    """Las consultas de otros hilos (requests ajenas a la prueba) no entran en el presupuesto"""
+    from threading import Thread
+
+    from app.db.database import SessionLocal
+
+    def ajena():
+        sesion = SessionLocal()
+        try:
+            for _ in range(5):
+                sesion.query(Animal).count()
+        finally:
+            sesion.close()
+
+    with presupuesto_consultas(maximo=3, repeticiones=1) as registro:
+        hilo = Thread(target=ajena)
+        hilo.start()
+        hilo.join()
+    assert registro.total == 0
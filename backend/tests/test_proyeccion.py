@@ -0,0 +1,103 @@
+"""
+Proyección de campos en los listados (app/core/proyeccion.py): fields= con
+presets y listas de campos, campos calculados y columnas seleccionadas.
+"""
+import re
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app.db.database import engine
+from app.models.animal import Animal
+
+RESUMEN = ["numero_identificacion", "nombre", "sexo", "categoria", "estado", "peso_actual", "foto_urls"]
+
+
+@pytest.fixture
+def animales(db, finca_vacia):
+    db.add_all([
+        Animal(
+            finca_id=finca_vacia["finca_id"], numero_identificacion="P-1", nombre="Pinta", sexo="hembra",
+            categoria="vaca", peso_actual=480.0, fecha_ingreso=date(2024, 1, 1),
+            foto_url="/media/animales/ab/abc_full.webp", observaciones="Texto largo que no debe salir"
+        ),
+        Animal(
+            finca_id=finca_vacia["finca_id"], numero_identificacion="P-2", sexo="macho", fecha_ingreso=date(2024, 2, 1)
+        ),
+    ])
+    db.commit()
+    return finca_vacia["headers"]
+
+
+@pytest.fixture
+def consultas():
+    """SQL ejecutado durante la prueba"""
+    sentencias = []
+
+    def registrar(conn, cursor, sentencia, parametros, contexto, executemany):
+        sentencias.append(sentencia)
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    yield sentencias
+    event.remove(engine, "before_cursor_execute", registrar)
+
+
+def _listar(client, headers, fields=None, ruta="/api/v1/animales"):
+    respuesta = client.get(ruta, headers=headers, params={"fields": fields} if fields else {})
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta.json()
+
+
+def test_preset_resumen(client, animales):
+    cuerpo = _listar(client, animales, "resumen")
+    assert cuerpo["total"] == 2
+    for item in cuerpo["items"]:
+        assert set(item) == {"id", *RESUMEN}
+    pinta = next(item for item in cuerpo["items"] if item["numero_identificacion"] == "P-1")
+    # foto_urls se calcula desde foto_url, que se consulta aunque no se devuelva
+    assert pinta["foto_urls"] == {
+        "thumb": "/media/animales/ab/abc_thumb.webp",
+        "medium": "/media/animales/ab/abc_medium.webp",
+        "full": "/media/animales/ab/abc_full.webp",
+    }
+    assert pinta["peso_actual"] == 480.0
+
+
+def test_lista_de_campos(client, animales):
+    items = _listar(client, animales, " nombre ,numero_identificacion,nombre")["items"]
+    assert sorted((set(item), item["numero_identificacion"], item["nombre"]) for item in items) == [
+        ({"id", "nombre", "numero_identificacion"}, "P-1", "Pinta"),
+        ({"id", "nombre", "numero_identificacion"}, "P-2", None),
+    ]
+
+
+def test_sin_fields_trae_todo(client, animales):
+    item = _listar(client, animales)["items"][0]
+    assert {"observaciones", "foto_urls", "fecha_ingreso", "raza"} <= set(item)
+
+
+@pytest.mark.parametrize("fields", ["no_existe", "nombre,clave_secreta", "hashed_password"])
+def test_campo_desconocido(client, animales, fields):
+    respuesta = client.get("/api/v1/animales", headers=animales, params={"fields": fields})
+    assert respuesta.status_code == 422
+    assert respuesta.json()["detail"].startswith("Campos inválidos")
+
+
+def test_la_consulta_selecciona_solo_las_columnas_proyectadas(client, animales, consultas):
+    _listar(client, animales, "resumen")
+    pagina = next(s for s in consultas if s.lstrip().startswith("SELECT animales.") and "LIMIT" in s)
+    columnas = set(re.findall(r"animales\.(\w+)", re.split(r"\sFROM\s", pagina)[0]))
+    # foto_url por foto_urls; nada de observaciones ni del resto de la fila
+    assert columnas == {"id", "numero_identificacion", "nombre", "sexo", "categoria", "estado", "peso_actual", "foto_url"}
+
+
+@pytest.mark.parametrize("ruta", [
+    "/api/v1/control-sanitario/", "/api/v1/control-reproductivo/", "/api/v1/produccion/", "/api/v1/transacciones/",
+])
+def test_preset_resumen_en_los_demas_listados(client, headers, ruta):
+    completo = _listar(client, headers, ruta=ruta)["items"][0]
+    resumen = _listar(client, headers, "resumen", ruta=ruta)["items"][0]
+    assert resumen["id"] == completo["id"]
+    assert resumen == {campo: completo[campo] for campo in resumen}
+    assert len(resumen) < len(completo)
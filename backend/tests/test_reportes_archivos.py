@@ -0,0 +1,168 @@
+"""
+Trabajos de reportes: recuperación de trabajos abandonados, retención de
+archivos y descarga desde el almacén (local o S3).
+"""
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.core.config import settings
+from app.models.trabajo_reporte import TrabajoReporte
+from app.services import reportes_archivos
+from app.services.almacenamiento import AlmacenS3
+from app.services.reportes_archivos import (
+    leer_archivo, limpiar_archivos, procesar_trabajo, reencolar_pendientes, solicitar_reporte
+)
+
+
+@pytest.fixture
+def encolados(monkeypatch):
+    """Ids encolados, sin generarlos en el pool de hilos"""
+    ids = []
+    monkeypatch.setattr(reportes_archivos, "encolar", ids.append)
+    return ids
+
+
+def _solicitar(db, finca_id):
+    trabajo, es_nuevo = solicitar_reporte(
+        db, finca_id=finca_id, tipo="inventario", formato="xlsx",
+        fecha_desde=None, fecha_hasta=None, usuario_id=None
+    )
+    db.commit()
+    return trabajo, es_nuevo
+
+
+def _en_proceso_desde(db, trabajo, minutos):
+    trabajo.estado = "procesando"
+    trabajo.iniciado_en = datetime.now(timezone.utc) - timedelta(minutes=minutos)
+    db.commit()
+
+
+def test_trabajo_en_proceso_reciente_se_reutiliza(db, finca_vacia):
+    trabajo, _ = _solicitar(db, finca_vacia["finca_id"])
+    _en_proceso_desde(db, trabajo, 1)
+    repetido, es_nuevo = _solicitar(db, finca_vacia["finca_id"])
+    assert (repetido.id, es_nuevo) == (trabajo.id, False)
+
+
+def test_trabajo_abandonado_no_bloquea_pedidos_identicos(db, finca_vacia):
+    trabajo, _ = _solicitar(db, finca_vacia["finca_id"])
+    _en_proceso_desde(db, trabajo, settings.REPORTES_TIMEOUT_MINUTOS + 5)
+    nuevo, es_nuevo = _solicitar(db, finca_vacia["finca_id"])
+    assert es_nuevo and nuevo.id != trabajo.id
+
+
+def test_al_arrancar_los_abandonados_vuelven_a_pendiente(db, finca_vacia, encolados):
+    abandonado, _ = _solicitar(db, finca_vacia["finca_id"])
+    _en_proceso_desde(db, abandonado, settings.REPORTES_TIMEOUT_MINUTOS + 5)
+    otro = TrabajoReporte(
+        finca_id=finca_vacia["finca_id"], tipo="inventario", formato="pdf", parametros="{}",
+        huella="x" * 64, estado="procesando", iniciado_en=datetime.now(timezone.utc)
+    )
+    db.add(otro)
+    db.commit()
+
+    reencolar_pendientes()
+
+    db.expire_all()
+    assert abandonado.estado == "pendiente"
+    assert abandonado.id in encolados
+    # Uno reciente puede estar generándolo otro worker: no se toca
+    assert otro.estado == "procesando" and otro.id not in encolados
+
+
+def test_un_abandonado_se_puede_reclamar_y_completar(db, finca_vacia):
+    trabajo, _ = _solicitar(db, finca_vacia["finca_id"])
+    _en_proceso_desde(db, trabajo, settings.REPORTES_TIMEOUT_MINUTOS + 5)
+
+    procesar_trabajo(trabajo.id)
+
+    db.expire_all()
+    assert trabajo.estado == "completado"
+    assert leer_archivo(trabajo.nombre_archivo) is not None
+
+
+def test_un_trabajo_en_proceso_reciente_no_se_reclama(db, finca_vacia):
+    trabajo, _ = _solicitar(db, finca_vacia["finca_id"])
+    _en_proceso_desde(db, trabajo, 1)
+    procesar_trabajo(trabajo.id)
+    db.expire_all()
+    assert trabajo.estado == "procesando"
+
+
+def _ruta(nombre_archivo):
+    return Path(settings.REPORTES_ROOT) / nombre_archivo
+
+
+def _envejecer(ruta, dias):
+    viejo = time.time() - dias * 86400
+    os.utime(ruta, (viejo, viejo))
+
+
+def test_retencion_borra_los_archivos_viejos(client, db, finca_vacia):
+    trabajo, _ = _solicitar(db, finca_vacia["finca_id"])
+    procesar_trabajo(trabajo.id)
+    db.expire_all()
+    ruta = _ruta(trabajo.nombre_archivo)
+    reciente = ruta.with_name("reciente.xlsx")
+    reciente.write_bytes(b"nuevo")
+
+    assert limpiar_archivos() == 0
+    _envejecer(ruta, settings.REPORTES_RETENCION_DIAS + 1)
+    assert limpiar_archivos() == 1
+    assert not ruta.exists() and reciente.exists()
+
+    descarga = client.get(f"/api/v1/reportes/trabajos/{trabajo.id}/archivo", headers=finca_vacia["headers"])
+    assert descarga.status_code == 410
+    # Pedirlo otra vez genera un trabajo nuevo
+    nuevo, es_nuevo = _solicitar(db, finca_vacia["finca_id"])
+    assert es_nuevo and nuevo.id != trabajo.id
+
+
+def test_pedir_un_reporte_existente_renueva_su_retencion(db, finca_vacia):
+    trabajo, _ = _solicitar(db, finca_vacia["finca_id"])
+    procesar_trabajo(trabajo.id)
+    db.expire_all()
+    ruta = _ruta(trabajo.nombre_archivo)
+    _envejecer(ruta, settings.REPORTES_RETENCION_DIAS - 1)
+
+    repetido, es_nuevo = _solicitar(db, finca_vacia["finca_id"])
+
+    assert (repetido.id, es_nuevo) == (trabajo.id, False)
+    assert time.time() - ruta.stat().st_mtime < 60
+    assert limpiar_archivos() == 0
+
+
+def test_en_s3_cualquier_nodo_descarga_el_archivo(client, db, finca_vacia, monkeypatch):
+    with mock_aws():
+        cliente = boto3.client("s3", region_name="us-east-1")
+        cliente.create_bucket(Bucket="ganadero-media")
+        almacen = AlmacenS3(
+            bucket="ganadero-media", url_publica="https://cdn.ganadero.test", cliente=cliente, prefijo="reportes"
+        )
+        monkeypatch.setattr(reportes_archivos, "obtener_almacen_reportes", lambda: almacen)
+        trabajo, _ = _solicitar(db, finca_vacia["finca_id"])
+
+        procesar_trabajo(trabajo.id)
+
+        db.expire_all()
+        objeto = cliente.get_object(Bucket="ganadero-media", Key=f"reportes/{trabajo.nombre_archivo}")
+        contenido = objeto["Body"].read()
+        assert objeto["ContentType"] == reportes_archivos.FORMATOS["xlsx"]
+        assert trabajo.tamano_bytes == len(contenido)
+        # Nada queda en el disco del worker que lo generó
+        assert not _ruta(trabajo.nombre_archivo).exists()
+
+        url = f"/api/v1/reportes/trabajos/{trabajo.id}/archivo"
+        descarga = client.get(url, headers=finca_vacia["headers"])
+        assert descarga.status_code == 200
+        assert descarga.content == contenido
+        assert descarga.headers["content-disposition"].endswith(f'_{trabajo.id}.xlsx"')
+
+        assert limpiar_archivos(retencion_dias=-1) == 1
+        assert client.get(url, headers=finca_vacia["headers"]).status_code == 410
@@ -0,0 +1,73 @@
+"""
+Estado de resultados (GET /reportes/pyg): la caché se invalida con cada cambio
+del libro o de los costos de los controles, sin recorrer las tablas de origen.
+"""
+from datetime import date
+
+import pytest
+
+from app.models.animal import Animal
+
+RANGO = {"fecha_desde": "2025-01-01", "fecha_hasta": "2025-12-31"}
+
+
+@pytest.fixture
+def libro(client, db, finca_vacia):
+    vacas = [
+        Animal(
+            finca_id=finca_vacia["finca_id"], numero_identificacion=numero, sexo="hembra", fecha_ingreso=date(2024, 1, 1)
+        )
+        for numero in ("F-1", "F-2")
+    ]
+    db.add_all(vacas)
+    db.commit()
+    return {"headers": finca_vacia["headers"], "vacas": [vaca.id for vaca in vacas]}
+
+
+def _pyg(client, libro, dimension="mes"):
+    respuesta = client.get("/api/v1/reportes/pyg", headers=libro["headers"], params={**RANGO, "dimension": dimension})
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta.json()
+
+
+def test_cada_cambio_invalida_el_reporte(client, libro):
+    headers = libro["headers"]
+    primera, segunda = libro["vacas"]
+    assert _pyg(client, libro)["totales"]["resultado"] == 0
+
+    venta = client.post("/api/v1/transacciones/", headers=headers, json={
+        "tipo": "venta", "fecha": "2025-03-05", "concepto": "Venta", "monto": 1000, "animal_id": primera,
+    }).json()
+    assert _pyg(client, libro)["totales"]["ingresos"] == 1000
+
+    sanitario = client.post("/api/v1/control-sanitario/", headers=headers, json={
+        "animal_id": primera, "tipo": "tratamiento", "fecha": "2025-03-01", "producto": "Antibiótico", "costo": 80,
+    }).json()
+    assert _pyg(client, libro)["totales"]["costos_sanitarios"] == 80
+
+    client.put(f"/api/v1/control-sanitario/{sanitario['id']}", headers=headers, json={"costo": 95})
+    assert _pyg(client, libro)["totales"]["costos_sanitarios"] == 95
+
+    servicio = client.post("/api/v1/control-reproductivo/", headers=headers, json={
+        "animal_id": segunda, "tipo_evento": "servicio", "fecha_evento": "2025-04-01", "costo": 40,
+    }).json()
+    assert _pyg(client, libro)["totales"]["costos_reproductivos"] == 40
+
+    # Un cambio que no toca el resumen mensual (solo el animal) también cuenta
+    assert {f["clave"] for f in _pyg(client, libro, "animal")["items"]} == {str(primera), str(segunda)}
+    client.put(f"/api/v1/transacciones/{venta['id']}", headers=headers, json={"animal_id": segunda})
+    por_animal = {f["clave"]: f["ingresos"] for f in _pyg(client, libro, "animal")["items"]}
+    assert por_animal == {str(primera): 0, str(segunda): 1000}
+
+    client.delete(f"/api/v1/control-reproductivo/{servicio['id']}", headers=headers)
+    client.delete(f"/api/v1/control-sanitario/{sanitario['id']}", headers=headers)
+    client.delete(f"/api/v1/transacciones/{venta['id']}", headers=headers)
+    totales = _pyg(client, libro)["totales"]
+    assert [totales[c] for c in ("ingresos", "costos_sanitarios", "costos_reproductivos", "resultado")] == [0] * 4
+
+
+def test_validar_la_cache_es_una_consulta(client, libro, presupuesto_consultas):
+    _pyg(client, libro)
+    # Usuario y versión del libro; el reporte sale de la caché
+    with presupuesto_consultas(maximo=2, repeticiones=1):
+        _pyg(client, libro)
@@ -0,0 +1,74 @@
+"""
+Respuestas serializadas con pydantic-core (app/core/respuestas.py): mismos
+bytes que el camino de FastAPI (validar contra response_model desde los
+atributos del ORM y serializar con JSONResponse).
+"""
+import asyncio
+import json
+from datetime import date
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from app.core.respuestas import columnas_orm
+from app.main import app
+from app.models.animal import Animal
+from app.models.control_reproductivo import ControlReproductivo
+from app.models.control_sanitario import ControlSanitario
+from app.models.registro_produccion import RegistroProduccion
+from app.models.transaccion import Transaccion
+
+LISTADOS = {
+    "/api/v1/animales": (Animal, {"page_size": 100}),
+    "/api/v1/control-sanitario/": (ControlSanitario, {"limit": 100}),
+    "/api/v1/control-reproductivo/": (ControlReproductivo, {"limit": 100}),
+    "/api/v1/produccion/": (RegistroProduccion, {"limit": 100}),
+    "/api/v1/transacciones/": (Transaccion, {"limit": 100}),
+}
+
+
+def _campo_respuesta(ruta):
+    for candidata in app.routes:
+        if getattr(candidata, "path", None) == ruta and "GET" in candidata.methods:
+            return candidata.response_field
+    raise LookupError(ruta)
+
+
+def _camino_fastapi(ruta, modelo, cuerpo, db):
+    """Los bytes que producía el endpoint devolviendo ORM + response_model"""
+    columnas = set(modelo.__table__.columns.keys())
+    objetos = []
+    for item in cuerpo["items"]:
+        objeto = db.get(modelo, item["id"])
+        # Datos de otras tablas (animal_numero, toro_nombre...) como atributos
+        for campo, valor in item.items():
+            if campo not in columnas and not hasattr(type(objeto), campo):
+                setattr(objeto, campo, valor)
+        objetos.append(objeto)
+    contenido = {**cuerpo, "items": objetos}
+    serializado = asyncio.run(serialize_response(field=_campo_respuesta(ruta), response_content=contenido))
+    return JSONResponse(serializado).body
+
+
+@pytest.mark.parametrize("ruta", LISTADOS)
+def test_listados_identicos_al_camino_de_fastapi(client, db, headers, ruta):
+    modelo, parametros = LISTADOS[ruta]
+    respuesta = client.get(ruta, headers=headers, params=parametros)
+    assert respuesta.status_code == 200
+    cuerpo = json.loads(respuesta.content)
+    assert len(cuerpo["items"]) > 10
+    assert respuesta.content == _camino_fastapi(ruta, modelo, cuerpo, db)
+
+
+def test_columnas_orm_solo_trae_columnas(db, finca):
+    animal = db.get(Animal, db.query(Animal.id).filter(Animal.finca_id == finca["finca_id"]).first()[0])
+    animal.finca  # Relación cargada: no entra en el dict
+    db.expire(animal, ["nombre"])  # Columna expirada: se carga
+
+    fila = columnas_orm(animal, animal_numero="X-1")
+    assert set(fila) == set(Animal.__table__.columns.keys()) | {"animal_numero"}
+    assert fila["nombre"] == animal.nombre
+    # Un dict nuevo: modificarlo no toca la instancia
+    fila["fecha_ingreso"] = date(1999, 1, 1)
+    assert "_sa_instance_state" in animal.__dict__ and animal.fecha_ingreso != date(1999, 1, 1)
@@ -0,0 +1,64 @@
+"""
+Retiros de leche: la verificación al registrar y al editar registros de producción.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.models.animal import Animal
+
+TRATAMIENTO = date.today() - timedelta(days=10)
+LIBERACION = TRATAMIENTO + timedelta(days=5)
+
+
+@pytest.fixture
+def vaca(client, db, finca_vacia):
+    """Vaca tratada hace 10 días con 5 días de retiro de leche"""
+    animal = Animal(
+        finca_id=finca_vacia["finca_id"], numero_identificacion="R-1", sexo="hembra", fecha_ingreso=date(2024, 1, 1)
+    )
+    db.add(animal)
+    db.commit()
+    respuesta = client.post("/api/v1/control-sanitario/", headers=finca_vacia["headers"], json={
+        "animal_id": animal.id, "tipo": "tratamiento", "fecha": TRATAMIENTO.isoformat(),
+        "producto": "Oxitetraciclina", "dias_retiro_leche": 5,
+    })
+    assert respuesta.status_code == 201, respuesta.text
+    return {"id": animal.id, "headers": finca_vacia["headers"]}
+
+
+def _registrar(client, vaca, fecha, tipo="leche"):
+    return client.post("/api/v1/produccion/", headers=vaca["headers"], json={
+        "animal_id": vaca["id"], "tipo_produccion": tipo, "fecha": fecha.isoformat(),
+        "cantidad_litros": 12.5, "turno": "manana",
+    })
+
+
+def _editar(client, vaca, registro_id, **cambios):
+    return client.put(f"/api/v1/produccion/{registro_id}", headers=vaca["headers"], json=cambios)
+
+
+def test_no_se_registra_leche_en_retiro(client, vaca):
+    respuesta = _registrar(client, vaca, TRATAMIENTO + timedelta(days=2))
+    assert respuesta.status_code == 409
+    assert LIBERACION.isoformat() in respuesta.json()["detail"]
+    assert _registrar(client, vaca, LIBERACION).status_code == 201
+
+
+def test_no_se_mueve_un_registro_de_leche_a_un_dia_en_retiro(client, vaca):
+    registro = _registrar(client, vaca, LIBERACION).json()
+    respuesta = _editar(client, vaca, registro["id"], fecha=(TRATAMIENTO + timedelta(days=1)).isoformat())
+    assert respuesta.status_code == 409
+    assert client.get(f"/api/v1/produccion/{registro['id']}", headers=vaca["headers"]).json()["fecha"] == LIBERACION.isoformat()
+
+
+def test_no_se_convierte_en_leche_un_registro_de_un_dia_en_retiro(client, vaca):
+    registro = _registrar(client, vaca, TRATAMIENTO + timedelta(days=1), tipo="carne").json()
+    assert _editar(client, vaca, registro["id"], tipo_produccion="leche").status_code == 409
+
+
+def test_editar_fuera_del_retiro_se_permite(client, vaca):
+    registro = _registrar(client, vaca, TRATAMIENTO - timedelta(days=1)).json()
+    respuesta = _editar(client, vaca, registro["id"], cantidad_litros=14.0, fecha=LIBERACION.isoformat())
+    assert respuesta.status_code == 200
+    assert _editar(client, vaca, registro["id"], cantidad_litros=15.0).status_code == 200
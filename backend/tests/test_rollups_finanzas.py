@@ -0,0 +1,138 @@
+"""
+Resumen financiero mensual (app/services/rollups_finanzas.py) y cierres de
+periodo (/transacciones/cierres): deltas por alta, edición y baja, y meses
+cerrados que rechazan cambios hasta reabrirse.
+"""
+from collections import defaultdict
+
+import pytest
+from sqlalchemy import select
+
+from app.models.finanzas_resumen import ResumenFinancieroMensual
+from app.models.transaccion import Transaccion
+
+
+def _agregado(db, finca_id):
+    """(año, mes, tipo, categoría) -> (monto, transacciones) sumando el libro"""
+    totales = defaultdict(lambda: [0.0, 0])
+    for transaccion in db.scalars(select(Transaccion).where(Transaccion.finca_id == finca_id)):
+        fila = totales[(transaccion.fecha.year, transaccion.fecha.month, transaccion.tipo,
+                        transaccion.categoria_gasto or "")]
+        fila[0] += transaccion.monto
+        fila[1] += 1
+    return {clave: (round(monto, 2), cantidad) for clave, (monto, cantidad) in totales.items()}
+
+
+def _resumen(db, finca_id):
+    """Filas del resumen; las que quedaron en cero tras una baja o un traslado no cuentan"""
+    db.expire_all()
+    filas = db.execute(select(
+        ResumenFinancieroMensual.anio, ResumenFinancieroMensual.mes, ResumenFinancieroMensual.tipo,
+        ResumenFinancieroMensual.categoria, ResumenFinancieroMensual.monto_total,
+        ResumenFinancieroMensual.numero_transacciones,
+    ).where(ResumenFinancieroMensual.finca_id == finca_id, ResumenFinancieroMensual.numero_transacciones != 0))
+    return {(anio, mes, tipo, categoria): (round(monto, 2), cantidad)
+            for anio, mes, tipo, categoria, monto, cantidad in filas}
+
+
+def _verificar(db, finca_id):
+    esperado = _agregado(db, finca_id)
+    assert _resumen(db, finca_id) == esperado
+    return esperado
+
+
+def _transaccion(client, headers, **campos):
+    respuesta = client.post("/api/v1/transacciones/", headers=headers, json={
+        "tipo": "gasto", "fecha": "2025-01-20", "concepto": "Concentrado", "monto": 350000,
+        "categoria_gasto": "alimentacion", **campos,
+    })
+    assert respuesta.status_code == 201, respuesta.text
+    return respuesta.json()["id"]
+
+
+def test_deltas_por_alta_edicion_y_baja(client, db, finca_vacia):
+    headers, finca_id = finca_vacia["headers"], finca_vacia["finca_id"]
+    gasto = _transaccion(client, headers)
+    _transaccion(client, headers, monto=120000)
+    _transaccion(client, headers, tipo="venta", fecha="2025-02-03", concepto="Leche", monto=900000,
+                 categoria_gasto=None)
+    assert _verificar(db, finca_id) == {
+        (2025, 1, "gasto", "alimentacion"): (470000, 2),
+        (2025, 2, "venta", ""): (900000, 1),
+    }
+
+    for cambios in (
+        {"monto": 400000},
+        {"fecha": "2025-02-28"},  # Pasa a otro mes
+        {"categoria_gasto": "sanidad"},
+        {"tipo": "compra", "categoria_gasto": None, "fecha": "2024-12-31"},  # Otro año, tipo y categoría
+    ):
+        respuesta = client.put(f"/api/v1/transacciones/{gasto}", headers=headers, json=cambios)
+        assert respuesta.status_code == 200, respuesta.text
+        _verificar(db, finca_id)
+
+    assert client.delete(f"/api/v1/transacciones/{gasto}", headers=headers).status_code == 204
+    assert _verificar(db, finca_id) == {
+        (2025, 1, "gasto", "alimentacion"): (120000, 1),
+        (2025, 2, "venta", ""): (900000, 1),
+    }
+    resumen = client.get("/api/v1/transacciones/resumen/financiero", headers=headers).json()
+    assert (resumen["total_ventas"], resumen["total_gastos"]) == (900000, 120000)
+
+
+@pytest.fixture
+def enero_cerrado(client, finca_vacia):
+    headers = finca_vacia["headers"]
+    ids = {
+        "enero": _transaccion(client, headers),
+        "febrero": _transaccion(client, headers, fecha="2025-02-10", monto=50000),
+    }
+    _transaccion(client, headers, tipo="venta", fecha="2025-01-31", concepto="Leche", monto=800000,
+                 categoria_gasto=None)
+    respuesta = client.post("/api/v1/transacciones/cierres", headers=headers, json={"anio": 2025, "mes": 1})
+    assert respuesta.status_code == 201, respuesta.text
+    return {"headers": headers, "ids": ids, "cierre": respuesta.json(), "finca_id": finca_vacia["finca_id"]}
+
+
+def test_el_cierre_guarda_la_foto_del_mes(enero_cerrado):
+    cierre = enero_cerrado["cierre"]
+    assert (cierre["total_ventas"], cierre["total_gastos"], cierre["numero_transacciones"]) == (800000, 350000, 2)
+
+
+@pytest.mark.parametrize("metodo, destino, cuerpo", [
+    ("post", "/", {"tipo": "gasto", "fecha": "2025-01-05", "concepto": "Sal", "monto": 1000}),
+    ("put", "enero", {"monto": 1}),
+    ("put", "febrero", {"fecha": "2025-01-15"}),  # Mover una transacción abierta al mes cerrado
+    ("delete", "enero", None),
+])
+def test_el_periodo_cerrado_rechaza_cambios(client, db, enero_cerrado, metodo, destino, cuerpo):
+    antes = _resumen(db, enero_cerrado["finca_id"])
+    ruta = "/api/v1/transacciones/" + (str(enero_cerrado["ids"][destino]) if destino != "/" else "")
+    kwargs = {"json": cuerpo} if cuerpo is not None else {}
+    respuesta = getattr(client, metodo)(ruta, headers=enero_cerrado["headers"], **kwargs)
+
+    assert respuesta.status_code == 409
+    assert respuesta.json()["detail"] == "El periodo 2025-01 está cerrado"
+    assert _resumen(db, enero_cerrado["finca_id"]) == antes
+
+
+def test_no_se_cierra_dos_veces_ni_un_mes_en_curso(client, enero_cerrado):
+    headers = enero_cerrado["headers"]
+    assert client.post("/api/v1/transacciones/cierres", headers=headers, json={"anio": 2025, "mes": 1}).status_code == 409
+    assert client.post("/api/v1/transacciones/cierres", headers=headers, json={"anio": 2100, "mes": 1}).status_code == 400
+
+
+def test_reabrir_el_periodo(client, db, enero_cerrado):
+    headers = enero_cerrado["headers"]
+    assert client.delete("/api/v1/transacciones/cierres/2025/1", headers=headers).status_code == 204
+    assert client.get("/api/v1/transacciones/cierres", headers=headers).json() == []
+    assert client.delete("/api/v1/transacciones/cierres/2025/1", headers=headers).status_code == 404
+
+    respuesta = client.put(f"/api/v1/transacciones/{enero_cerrado['ids']['enero']}", headers=headers,
+                           json={"monto": 300000})
+    assert respuesta.status_code == 200
+    _verificar(db, enero_cerrado["finca_id"])
+
+    # Al volver a cerrar, la foto refleja la corrección
+    cierre = client.post("/api/v1/transacciones/cierres", headers=headers, json={"anio": 2025, "mes": 1}).json()
+    assert cierre["total_gastos"] == 300000
@@ -0,0 +1,162 @@
+"""
+Resúmenes de producción (app/services/rollups_produccion.py): después de cada
+alta, edición, baja u ordeño por lotes, ProduccionDiaria y ProduccionMensual
+coinciden con la suma de los registros crudos.
+"""
+from collections import defaultdict
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.models.animal import Animal
+from app.models.produccion_resumen import ProduccionDiaria, ProduccionMensual
+from app.models.registro_produccion import RegistroProduccion
+from app.services import rollups_produccion
+
+METRICAS = ("litros_total", "numero_ordenos", "litros_manana", "litros_tarde", "litros_noche")
+
+
+@pytest.fixture
+def ordeno(db, finca_vacia):
+    vacas = [
+        Animal(
+            finca_id=finca_vacia["finca_id"], numero_identificacion=numero, sexo="hembra", categoria="vaca",
+            fecha_ingreso=date(2024, 1, 1)
+        )
+        for numero in ("L-1", "L-2")
+    ]
+    db.add_all(vacas)
+    db.commit()
+    return {"headers": finca_vacia["headers"], "finca_id": finca_vacia["finca_id"], "vacas": [v.id for v in vacas]}
+
+
+def _redondear(fila):
+    return tuple(round(valor, 6) if isinstance(valor, float) else valor for valor in fila)
+
+
+def _agregado(db, finca_id):
+    """Diario y mensual sumando los registros de leche, sin pasar por el servicio"""
+    diario = defaultdict(lambda: dict.fromkeys(METRICAS, 0))
+    mensual = defaultdict(lambda: dict.fromkeys(METRICAS, 0))
+    registros = db.scalars(select(RegistroProduccion).where(
+        RegistroProduccion.finca_id == finca_id,
+        RegistroProduccion.tipo_produccion == "leche",
+        RegistroProduccion.cantidad_litros.isnot(None),
+    ))
+    for registro in registros:
+        for fila in (
+            diario[(registro.animal_id, registro.fecha)],
+            mensual[(registro.animal_id, registro.fecha.year, registro.fecha.month)],
+        ):
+            fila["litros_total"] += registro.cantidad_litros
+            fila["numero_ordenos"] += 1
+            if registro.turno in rollups_produccion.TURNOS:
+                fila[f"litros_{registro.turno}"] += registro.cantidad_litros
+    return (
+        sorted(_redondear((*clave, *map(float, fila.values()))) for clave, fila in diario.items()),
+        sorted(_redondear((*clave, *map(float, fila.values()))) for clave, fila in mensual.items()),
+    )
+
+
+def _resumenes(db, finca_id):
+    """Filas de los resúmenes; las que quedaron en cero tras una baja no cuentan"""
+    db.expire_all()
+    metricas_diario = [getattr(ProduccionDiaria, m) for m in METRICAS]
+    metricas_mensual = [getattr(ProduccionMensual, m) for m in METRICAS]
+    diario = db.execute(
+        select(ProduccionDiaria.animal_id, ProduccionDiaria.fecha, *metricas_diario)
+        .where(ProduccionDiaria.finca_id == finca_id, ProduccionDiaria.numero_ordenos != 0)
+    ).all()
+    mensual = db.execute(
+        select(ProduccionMensual.animal_id, ProduccionMensual.anio, ProduccionMensual.mes, *metricas_mensual)
+        .where(ProduccionMensual.finca_id == finca_id, ProduccionMensual.numero_ordenos != 0)
+    ).all()
+    return (
+        sorted(_redondear((*fila[:-5], *map(float, fila[-5:]))) for fila in diario),
+        sorted(_redondear((*fila[:-4], *map(float, fila[-4:]))) for fila in mensual),
+    )
+
+
+def _verificar(db, ordeno):
+    esperado = _agregado(db, ordeno["finca_id"])
+    assert _resumenes(db, ordeno["finca_id"]) == esperado
+    return esperado
+
+
+def _crear(client, ordeno, **campos):
+    respuesta = client.post("/api/v1/produccion/", headers=ordeno["headers"], json={
+        "tipo_produccion": "leche", "fecha": "2025-01-31", "turno": "manana", "cantidad_litros": 12.5, **campos,
+    })
+    assert respuesta.status_code == 201, respuesta.text
+    return respuesta.json()["id"]
+
+
+def test_alta_edicion_y_baja(client, db, ordeno):
+    primera, segunda = ordeno["vacas"]
+    registro = _crear(client, ordeno, animal_id=primera)
+    _crear(client, ordeno, animal_id=primera, turno="tarde", cantidad_litros=9.25)
+    _crear(client, ordeno, animal_id=segunda, fecha="2025-02-01", turno=None, cantidad_litros=7.0)
+    _crear(client, ordeno, animal_id=segunda, tipo_produccion="carne", cantidad_litros=None, peso_venta=210)
+    diario, mensual = _verificar(db, ordeno)
+    assert len(diario) == 2 and len(mensual) == 2
+
+    for cambios in (
+        {"cantidad_litros": 14.0},
+        {"turno": "noche"},
+        {"fecha": "2025-02-01"},  # Cambia de día y de mes
+        {"tipo_produccion": "otro"},  # Deja de ser leche
+        {"tipo_produccion": "leche", "fecha": "2025-03-15"},  # Vuelve a contar en otro mes
+    ):
+        respuesta = client.put(f"/api/v1/produccion/{registro}", headers=ordeno["headers"], json=cambios)
+        assert respuesta.status_code == 200, respuesta.text
+        _verificar(db, ordeno)
+
+    assert client.delete(f"/api/v1/produccion/{registro}", headers=ordeno["headers"]).status_code == 204
+    diario, mensual = _verificar(db, ordeno)
+    assert [fila[1] for fila in diario] == [date(2025, 1, 31), date(2025, 2, 1)]
+
+
+def test_cambio_de_animal(client, db, ordeno):
+    # La API no cambia el animal de un registro; el servicio sí lo admite
+    primera, segunda = ordeno["vacas"]
+    registro = db.get(RegistroProduccion, _crear(client, ordeno, animal_id=primera))
+    anterior = rollups_produccion.datos_registro(registro)
+    registro.animal_id = segunda
+    rollups_produccion.registrar_cambio(db, anterior, registro)
+    db.commit()
+    diario, _ = _verificar(db, ordeno)
+    assert [fila[0] for fila in diario] == [segunda]
+
+
+def test_ordeno_por_lotes(client, db, ordeno):
+    primera, segunda = ordeno["vacas"]
+    _crear(client, ordeno, animal_id=primera, fecha="2025-04-02", turno="manana", cantidad_litros=11.0)
+    for turno, litros in (("manana", (3.5, 8.0)), ("tarde", (4.25, 6.0))):
+        respuesta = client.post("/api/v1/produccion/lote", headers=ordeno["headers"], json={
+            "fecha": "2025-04-02", "turno": turno,
+            "registros": [{"animal_id": primera, "cantidad_litros": litros[0]},
+                          {"numero_identificacion": "L-2", "cantidad_litros": litros[1]}],
+        })
+        assert respuesta.status_code == 201, respuesta.text
+        _verificar(db, ordeno)
+
+    # Editar y borrar un registro que entró por lote también mantiene los resúmenes
+    del_lote = db.scalar(select(RegistroProduccion.id).where(
+        RegistroProduccion.animal_id == segunda, RegistroProduccion.turno == "tarde"
+    ))
+    client.put(f"/api/v1/produccion/{del_lote}", headers=ordeno["headers"], json={"fecha": "2025-05-01"})
+    _verificar(db, ordeno)
+    client.delete(f"/api/v1/produccion/{del_lote}", headers=ordeno["headers"])
+    diario, _ = _verificar(db, ordeno)
+    assert [(fila[0], fila[3]) for fila in diario] == sorted([(primera, 3), (segunda, 1)])
+
+
+def test_recalcular_coincide_con_los_deltas(client, db, ordeno):
+    primera, segunda = ordeno["vacas"]
+    _crear(client, ordeno, animal_id=primera, turno="noche", cantidad_litros=5.5)
+    _crear(client, ordeno, animal_id=segunda, fecha="2025-02-28")
+    antes = _resumenes(db, ordeno["finca_id"])
+    rollups_produccion.recalcular_resumenes(db, ordeno["finca_id"])
+    db.commit()
+    assert _resumenes(db, ordeno["finca_id"]) == antes
@@ -0,0 +1,49 @@
+"""
+Series de producción para gráficos (GET /produccion/series): reducción con
+LTTB a max_points conservando los extremos de cada serie.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+HASTA = date.today()
+DESDE = HASTA - timedelta(days=700)
+
+
+def _series(client, headers, **parametros):
+    respuesta = client.get("/api/v1/produccion/series", headers=headers, params={
+        "fecha_desde": DESDE.isoformat(), "fecha_hasta": HASTA.isoformat(), **parametros,
+    })
+    assert respuesta.status_code == 200, respuesta.text
+    return respuesta.json()["series"]
+
+
+@pytest.mark.parametrize("agrupar, max_points", [("finca", 3), ("finca", 120), ("lote", 50)])
+def test_max_points_conserva_primero_y_ultimo(client, headers, agrupar, max_points):
+    completas = {serie["clave"]: serie["puntos"] for serie in _series(client, headers, agrupar=agrupar)}
+    reducidas = {
+        serie["clave"]: serie["puntos"]
+        for serie in _series(client, headers, agrupar=agrupar, max_points=max_points)
+    }
+    assert reducidas.keys() == completas.keys()
+    assert any(len(puntos) > max_points for puntos in completas.values())
+
+    for clave, puntos in reducidas.items():
+        completa = completas[clave]
+        assert len(puntos) == min(max_points, len(completa))
+        assert (puntos[0], puntos[-1]) == (completa[0], completa[-1])
+        # Puntos reales de la serie, en orden y sin repetir
+        assert all(punto in completa for punto in puntos)
+        fechas = [punto["fecha"] for punto in puntos]
+        assert fechas == sorted(set(fechas))
+
+
+def test_max_points_mayor_que_la_serie(client, headers):
+    completa = _series(client, headers, resolucion="mes")[0]["puntos"]
+    assert _series(client, headers, resolucion="mes", max_points=5000)[0]["puntos"] == completa
+
+
+@pytest.mark.parametrize("max_points", [2, 5001])
+def test_max_points_fuera_de_rango(client, headers, max_points):
+    respuesta = client.get("/api/v1/produccion/series", headers=headers, params={"max_points": max_points})
+    assert respuesta.status_code == 422
@@ -4,6 +4,7 @@ import type {
   RegistroProduccionCreate,
   RegistroProduccionUpdate,
   RegistroProduccionListResponse,
+  SeriesProduccionResponse,
 } from '../types/produccion';
 
 export const produccionService = {
@@ -19,6 +20,19 @@ export const produccionService = {
     return response.data;
   },
 
+  async getSeries(params?: {
+    agrupar?: 'finca' | 'lote' | 'animal';
+    resolucion?: 'dia' | 'semana' | 'mes';
+    fecha_desde?: string;
+    fecha_hasta?: string;
+    animal_id?: number;
+    lote?: string;
+    max_points?: number;
+  }): Promise<SeriesProduccionResponse> {
+    const response = await api.get('/produccion/series', { params });
+    return response.data;
+  },
+
   async getRegistro(id: number): Promise<RegistroProduccion> {
     const response = await api.get(`/produccion/${id}`);
     return response.data;
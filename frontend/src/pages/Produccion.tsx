@@ -1,7 +1,20 @@
 import { useState, useEffect } from 'react';
 import { produccionService } from '../api/produccion';
 import ProduccionModal from '../components/ProduccionModal';
-import type { RegistroProduccion } from '../types/produccion';
+import type { PuntoSerie, RegistroProduccion } from '../types/produccion';
+
+const DIAS_GRAFICO = 30;
+const DIA_MS = 24 * 60 * 60 * 1000;
+
+const toFecha = (fecha: Date) => fecha.toISOString().split('T')[0];
+
+// Desde el inicio del mes o hace 30 días, lo que sea antes
+const inicioSerie = () => {
+  const inicioMes = new Date();
+  inicioMes.setDate(1);
+  const hace30 = new Date(Date.now() - (DIAS_GRAFICO - 1) * DIA_MS);
+  return inicioMes < hace30 ? inicioMes : hace30;
+};
 
 export default function ProduccionPage() {
   const [registros, setRegistros] = useState<RegistroProduccion[]>([]);
@@ -16,18 +29,18 @@ export default function ProduccionPage() {
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [selectedRegistro, setSelectedRegistro] = useState<RegistroProduccion | null>(null);
 
-  // Estadísticas
-  const [stats, setStats] = useState({
-    totalLeche: 0,
-    promedioDiario: 0,
-    registrosHoy: 0,
-    registrosMes: 0,
-  });
+  // Estadísticas y gráfico: serie diaria de la finca (GET /produccion/series),
+  // calculada en el servidor sobre todos los registros, no solo la página cargada
+  const [puntos, setPuntos] = useState<PuntoSerie[]>([]);
 
   useEffect(() => {
     loadRegistros();
   }, [filtroTipo]);
 
+  useEffect(() => {
+    loadSerie();
+  }, []);
+
   const loadRegistros = async () => {
     try {
       setLoading(true);
@@ -37,7 +50,6 @@ export default function ProduccionPage() {
       });
       setRegistros(response.items);
       setTotal(response.total);
-      calculateStats(response.items);
     } catch (error) {
       console.error('Error cargando registros:', error);
     } finally {
@@ -45,28 +57,33 @@ export default function ProduccionPage() {
     }
   };
 
-  const calculateStats = (data: RegistroProduccion[]) => {
-    const hoy = new Date().toISOString().split('T')[0];
-    const inicioMes = new Date();
-    inicioMes.setDate(1);
-    const mesStr = inicioMes.toISOString().split('T')[0];
-
-    const lecheros = data.filter(r => r.tipo_produccion === 'leche');
-    const totalLeche = lecheros.reduce((sum, r) => sum + (r.cantidad_litros || 0), 0);
-    const registrosHoy = data.filter(r => r.fecha === hoy).length;
-    const registrosMes = data.filter(r => r.fecha >= mesStr).length;
-
-    // Calcular días únicos para promedio
-    const diasUnicos = new Set(lecheros.map(r => r.fecha)).size;
-    const promedioDiario = diasUnicos > 0 ? totalLeche / diasUnicos : 0;
+  const loadSerie = async () => {
+    try {
+      const response = await produccionService.getSeries({
+        agrupar: 'finca',
+        resolucion: 'dia',
+        fecha_desde: toFecha(inicioSerie()),
+        fecha_hasta: toFecha(new Date()),
+      });
+      setPuntos(response.series[0]?.puntos ?? []);
+    } catch (error) {
+      console.error('Error cargando la serie de producción:', error);
+    }
+  };
 
-    setStats({
-      totalLeche,
-      promedioDiario,
-      registrosHoy,
-      registrosMes,
-    });
+  const hoy = toFecha(new Date());
+  const inicioMes = toFecha(new Date(new Date().setDate(1)));
+  const desde30 = toFecha(new Date(Date.now() - (DIAS_GRAFICO - 1) * DIA_MS));
+  const ultimos30 = puntos.filter(p => p.fecha >= desde30);
+  const totalLeche = ultimos30.reduce((sum, p) => sum + p.litros, 0);
+  const diasConOrdeno = ultimos30.filter(p => p.numero_ordenos > 0).length;
+  const stats = {
+    totalLeche,
+    promedioDiario: diasConOrdeno > 0 ? totalLeche / diasConOrdeno : 0,
+    ordenosHoy: puntos.find(p => p.fecha === hoy)?.numero_ordenos ?? 0,
+    ordenosMes: puntos.filter(p => p.fecha >= inicioMes).reduce((sum, p) => sum + p.numero_ordenos, 0),
   };
+  const maxLitros = Math.max(...ultimos30.map(p => p.litros), 0);
 
   const handleNuevo = () => {
     setSelectedRegistro(null);
@@ -84,6 +101,7 @@ export default function ProduccionPage() {
     try {
       await produccionService.deleteRegistro(id);
       loadRegistros();
+      loadSerie();
     } catch (error) {
       console.error('Error eliminando registro:', error);
       alert('Error al eliminar el registro');
@@ -92,6 +110,7 @@ export default function ProduccionPage() {
 
   const handleModalSave = () => {
     loadRegistros();
+    loadSerie();
   };
 
   const formatDate = (dateStr: string) => {
@@ -155,7 +174,7 @@ export default function ProduccionPage() {
         {/* Estadísticas */}
         <div className="grid grid-cols-1 md:grid-cols-4 gap-4 mb-6">
           <div className="bg-white p-6 rounded-lg shadow">
-            <div className="text-sm text-gray-600">Total Leche</div>
+            <div className="text-sm text-gray-600">Leche últimos {DIAS_GRAFICO} días</div>
             <div className="text-2xl font-bold text-blue-600">{stats.totalLeche.toFixed(1)} L</div>
           </div>
           <div className="bg-white p-6 rounded-lg shadow">
@@ -163,15 +182,38 @@ export default function ProduccionPage() {
             <div className="text-2xl font-bold text-green-600">{stats.promedioDiario.toFixed(1)} L</div>
           </div>
           <div className="bg-white p-6 rounded-lg shadow">
-            <div className="text-sm text-gray-600">Registros Hoy</div>
-            <div className="text-2xl font-bold text-purple-600">{stats.registrosHoy}</div>
+            <div className="text-sm text-gray-600">Ordeños Hoy</div>
+            <div className="text-2xl font-bold text-purple-600">{stats.ordenosHoy}</div>
           </div>
           <div className="bg-white p-6 rounded-lg shadow">
-            <div className="text-sm text-gray-600">Registros este Mes</div>
-            <div className="text-2xl font-bold text-orange-600">{stats.registrosMes}</div>
+            <div className="text-sm text-gray-600">Ordeños este Mes</div>
+            <div className="text-2xl font-bold text-orange-600">{stats.ordenosMes}</div>
           </div>
         </div>
 
+        {/* Gráfico de litros por día */}
+        {ultimos30.length > 0 && (
+          <div className="bg-white p-6 rounded-lg shadow mb-6">
+            <div className="text-sm font-medium text-gray-700 mb-4">
+              🥛 Litros por día (últimos {DIAS_GRAFICO} días)
+            </div>
+            <div className="flex items-end gap-1 h-40">
+              {ultimos30.map((punto) => (
+                <div
+                  key={punto.fecha}
+                  className="flex-1 bg-blue-500 hover:bg-blue-700 rounded-t"
+                  style={{ height: `${maxLitros > 0 ? (punto.litros / maxLitros) * 100 : 0}%` }}
+                  title={`${formatDate(punto.fecha)}: ${punto.litros.toFixed(1)} L (${punto.numero_ordenos} ordeños)`}
+                />
+              ))}
+            </div>
+            <div className="flex justify-between text-xs text-gray-500 mt-2">
+              <span>{formatDate(ultimos30[0].fecha)}</span>
+              <span>{formatDate(ultimos30[ultimos30.length - 1].fecha)}</span>
+            </div>
+          </div>
+        )}
+
         {/* Filtros */}
         <div className="bg-white p-4 rounded-lg shadow mb-6">
           <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
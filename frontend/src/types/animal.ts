@@ -4,6 +4,7 @@ export interface Animal {
   numero_identificacion: string;
   nombre: string | null;
   foto_url: string | null;
+  foto_urls: { thumb: string; medium: string; full: string } | null;
   sexo: 'macho' | 'hembra';
   fecha_nacimiento: string;
   raza: string;
@@ -49,3 +49,23 @@ export interface RegistroProduccionListResponse {
   skip: number;
   limit: number;
 }
+
+export interface PuntoSerie {
+  fecha: string;
+  litros: number;
+  numero_ordenos: number;
+}
+
+export interface SerieProduccion {
+  clave: string | null;
+  etiqueta: string;
+  puntos: PuntoSerie[];
+}
+
+export interface SeriesProduccionResponse {
+  agrupar: 'finca' | 'lote' | 'animal';
+  resolucion: 'dia' | 'semana' | 'mes';
+  fecha_desde: string;
+  fecha_hasta: string;
+  series: SerieProduccion[];
+}